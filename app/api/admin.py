@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Endpoints d'administration (authentification HTTP Basic ADMIN_EMAIL / ADMIN_PASSWORD)
+"""
+
+import json
+import secrets
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.middleware.admission import admission_controller
+from app.models.license import License
+from app.models.revocation import RevocationAudit
+from app.models.sharing import SharingAlert
+from app.schemas.admin import (
+    ActivationTimeline,
+    AdminLicensePage,
+    InvalidationFeedPage,
+    RevocationRequest,
+    RevocationResult,
+    SharingAlertEntry,
+    SharingAlertPage,
+    UsageReport
+)
+from app.services.activation_timeline import timeline_page
+from app.services.revocation import RevocationCriteria, invalidations_after, revoke_licenses
+from app.services.license_search import LicenseFilters, export_csv, export_ndjson, search_page
+from app.services.sharing_detector import alerts_statement
+from app.services.stats import read_stats
+from app.services.usage_analytics import usage_report
+
+security = HTTPBasic()
+
+
+def require_admin(credentials: HTTPBasicCredentials = Depends(security)) -> str:
+    """
+    Vérifie les identifiants admin (comparaison à temps constant)
+
+    Hors développement, routes refusées (503) tant que ADMIN_PASSWORD garde
+    sa valeur par défaut: export, recherche et révocation de toutes les
+    licences seraient ouverts à qui devine "changeme".
+    """
+    if not settings.admin_enabled:
+        raise HTTPException(
+            status_code=503,
+            detail="Administration désactivée: définir ADMIN_PASSWORD",
+        )
+    email_ok = secrets.compare_digest(credentials.username.encode(), settings.ADMIN_EMAIL.encode())
+    password_ok = secrets.compare_digest(credentials.password.encode(), settings.ADMIN_PASSWORD.encode())
+    if not (email_ok and password_ok):
+        raise HTTPException(
+            status_code=401,
+            detail="Identifiants admin invalides",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return credentials.username
+
+
+# Router (toutes les routes exigent l'authentification admin)
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/stats")
+async def license_stats(db: Session = Depends(get_read_db)):
+    """
+    Statistiques des licences (par type, statut, paiement Stripe, revenus par devise)
+
+    Lues dans les compteurs maintenus à chaque changement de licence: coût
+    constant quelle que soit la taille de la table licenses.
+    """
+    return {"success": True, **read_stats(db)}
+
+
+@router.get("/admission")
+async def admission_state():
+    """Contrôle d'admission de ce worker: limites adaptatives, requêtes en cours, refus par classe"""
+    return {"success": True, **admission_controller.snapshot()}
+
+
+@router.get("/licenses", response_model=AdminLicensePage)
+async def search_licenses(
+    filters: LicenseFilters = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Recherche de licences (email, machine_id, stripe_customer_id, is_active,
+    plages created_* / expires_*), des plus récentes aux plus anciennes
+
+    **Pagination**: renvoyer `next_cursor` dans `cursor` pour la page suivante
+    (pagination par clé: coût constant quelle que soit la profondeur).
+    """
+    try:
+        items, next_cursor = search_page(db, filters, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return AdminLicensePage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/licenses/export")
+async def export_licenses(
+    filters: LicenseFilters = Depends(),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    """
+    Export complet des licences filtrées, en flux (NDJSON ou CSV)
+
+    Curseur côté serveur et envoi par lots: mémoire constante, même pour
+    un million de lignes.
+    """
+    filename = f"licenses-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    if format == "csv":
+        body, media_type = export_csv(filters), "text/csv"
+    else:
+        body, media_type = export_ndjson(filters), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/licenses/{license_id}/activations", response_model=ActivationTimeline)
+async def license_activation_timeline(
+    license_id: int,
+    days: int = Query(30, ge=1, le=366),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Historique des vérifications d'une licence, du plus récent au plus ancien
+
+    Chaque jour présent dans la page est accompagné de ses totaux
+    (valides / refusées) sur toute la journée, lus par une seconde requête
+    bornée aux jours de la page.
+    """
+    license_record = db.get(License, license_id)
+    if not license_record:
+        raise HTTPException(status_code=404, detail="Licence introuvable")
+
+    since = datetime.utcnow() - timedelta(days=days)
+    try:
+        items, day_totals, next_cursor = timeline_page(
+            db, license_id, since, cursor, limit, revoked_reason=license_record.revoked_reason
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ActivationTimeline(
+        license_id=license_id,
+        since=since,
+        items=items,
+        days=day_totals,
+        next_cursor=next_cursor
+    )
+
+
+def _revocation_result(audit: RevocationAudit) -> RevocationResult:
+    return RevocationResult(
+        id=audit.id,
+        actor=audit.actor,
+        reason=audit.reason,
+        criteria=json.loads(audit.criteria),
+        dry_run=audit.dry_run,
+        matched=audit.matched,
+        revoked=audit.revoked,
+        created_at=audit.created_at,
+        finished_at=audit.finished_at
+    )
+
+
+@router.post("/revocations", response_model=RevocationResult)
+def revoke(
+    revocation_request: RevocationRequest,
+    admin: str = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Révocation en masse (emails, client Stripe, période de création, lot de codes, ids)
+
+    Critères combinés par ET. `dry_run` compte les licences visées sans rien modifier.
+    Les clés révoquées sont publiées dans le flux d'invalidations (GET /admin/invalidations).
+
+    Endpoint synchrone (exécuté dans le pool de threads): une révocation de
+    plusieurs milliers de licences ne bloque pas la boucle d'événements.
+    """
+    criteria = RevocationCriteria(
+        emails=[str(email) for email in revocation_request.emails],
+        stripe_customer_id=revocation_request.stripe_customer_id,
+        created_from=revocation_request.created_from,
+        created_to=revocation_request.created_to,
+        batch_id=revocation_request.batch_id,
+        license_ids=revocation_request.license_ids
+    )
+    try:
+        audit = revoke_licenses(
+            db, criteria,
+            reason=revocation_request.reason,
+            actor=admin,
+            dry_run=revocation_request.dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _revocation_result(audit)
+
+
+@router.get("/revocations/{audit_id}", response_model=RevocationResult)
+async def get_revocation(audit_id: int, db: Session = Depends(get_read_db)):
+    """Trace d'audit d'une révocation (progression si encore en cours)"""
+    audit = db.get(RevocationAudit, audit_id)
+    if not audit:
+        raise HTTPException(status_code=404, detail="Révocation introuvable")
+    return _revocation_result(audit)
+
+
+@router.get("/invalidations", response_model=InvalidationFeedPage)
+async def invalidation_feed_page(
+    after: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Flux des clés révoquées après la position `after` (émetteurs de baux, nœuds externes)
+
+    Renvoyer `position` dans `after` à l'appel suivant.
+    """
+    rows = invalidations_after(db, after, limit)
+    return InvalidationFeedPage(
+        items=[
+            {
+                "id": row.id,
+                "license_id": row.license_id,
+                "key_digest": row.key_digest,
+                "reason": row.reason,
+                "created_at": row.created_at
+            }
+            for row in rows
+        ],
+        position=rows[-1].id if rows else after
+    )
+
+
+def _sharing_alert_entry(alert: SharingAlert) -> SharingAlertEntry:
+    return SharingAlertEntry(
+        id=alert.id,
+        license_id=alert.license_id,
+        key_digest=alert.key_digest,
+        distinct_machines=alert.distinct_machines,
+        distinct_ips=alert.distinct_ips,
+        distinct_subnets=alert.distinct_subnets,
+        reasons=alert.reasons.split(","),
+        created_at=alert.created_at,
+        updated_at=alert.updated_at,
+        acknowledged_at=alert.acknowledged_at,
+        acknowledged_by=alert.acknowledged_by
+    )
+
+
+@router.get("/sharing-alerts", response_model=SharingAlertPage)
+async def sharing_alerts(
+    include_acknowledged: bool = False,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Licences probablement partagées: clés validées depuis plus de machines,
+    d'adresses IP ou de réseaux que les seuils SHARING_MAX_* sur la fenêtre
+
+    Une alerte ouverte est mise à jour tant que la clé reste dispersée.
+    """
+    alerts = db.execute(alerts_statement(open_only=not include_acknowledged, limit=limit)).scalars().all()
+    return SharingAlertPage(items=[_sharing_alert_entry(alert) for alert in alerts])
+
+
+@router.post("/sharing-alerts/{alert_id}/acknowledge", response_model=SharingAlertEntry)
+def acknowledge_sharing_alert(
+    alert_id: int,
+    admin: str = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Clôt une alerte (licence révoquée, partage légitime...): une nouvelle
+    alerte s'ouvre si la clé reste dispersée au-delà de la fenêtre en cours
+    """
+    alert = db.get(SharingAlert, alert_id)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alerte introuvable")
+    if alert.acknowledged_at is None:
+        alert.acknowledged_at = datetime.utcnow()
+        alert.acknowledged_by = admin
+        db.commit()
+    return _sharing_alert_entry(alert)
+
+
+@router.get("/analytics/usage", response_model=UsageReport)
+def usage_analytics(
+    counter: Optional[str] = Query(None, max_length=100),
+    days: int = Query(30, ge=1, le=92),
+    until: Optional[date] = None,
+    app_version: Optional[str] = Query(None, max_length=20),
+):
+    """
+    Statistiques d'usage des heartbeats (usage_stats) sur `days` jours jusqu'à `until` (défaut: aujourd'hui)
+
+    - percentiles de `counter` par version de l'application
+    - adoption de chaque compteur (part des licences actives l'ayant utilisé)
+    - cohortes hebdomadaires d'usage actif (heartbeat, ou `counter` > 0)
+
+    Calculé sur les colonnes construites par app.jobs.build_usage_analytics
+    (sans lecture de la table heartbeats). Endpoint synchrone: le calcul
+    s'exécute dans le pool de threads.
+    """
+    until = until or datetime.utcnow().date()
+    try:
+        return usage_report(until - timedelta(days=days - 1), until, counter=counter, app_version=app_version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
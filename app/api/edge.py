@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validation des licences en mode edge (SERVER_MODE=edge)
+
+Même contrat que POST /licenses/validate, sans base de données: l'état des
+licences vient du snapshot signé (app.services.validation_snapshot) et les
+vérifications sont mises en file locale pour envoi ultérieur. Un snapshot
+plus ancien que VALIDATION_SNAPSHOT_MAX_AGE_SECONDS n'est plus servi (503):
+les révocations qu'il ignore ne restent pas honorées indéfiniment.
+
+Licences multi-postes: la clé n'est pas liée à une machine, les postes sont
+comptés en mémoire du processus (edge_seats, sans stockage partagé): la
+limite max_seats s'applique par processus edge, exacte avec un seul worker.
+"""
+
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.api.licenses import limiter
+from app.config import settings
+from app.schemas.license import ValidateRequest, ValidationResponse
+from app.services.activation_spool import activation_spool
+from app.services.seat_tracker import LocalSeatStore, SeatTracker, SeatTrackerSync
+from app.services.validation_snapshot import (
+    STATUS_EXPIRED, STATUS_INACTIVE, STATUS_REVOKED, snapshot_digest, snapshot_watcher,
+)
+from app.utils.license_crypto import license_generator
+from app.utils.responses import model_response, validation_failure
+from app.utils.validation_outcome import ValidationOutcome, outcome_message
+
+# Router
+router = APIRouter(prefix="/licenses", tags=["Licenses"])
+
+# Postes des licences multi-postes vus par ce processus (purge: edge_seats_sync, démarrée par main.py)
+edge_seats = SeatTracker(LocalSeatStore())
+edge_seats_sync = SeatTrackerSync(edge_seats)
+
+
+def seat_refusal(license_id, max_seats: int, license_key: str, machine_id: str):
+    """Refus si la licence multi-postes n'a plus de place dans ce processus, None sinon"""
+    if license_id is None:
+        # Clé émise après le snapshot: identifiant provisoire tiré de son empreinte (négatif, sans collision d'id)
+        license_id = -int.from_bytes(snapshot_digest(license_key)[:6], "big")
+    if edge_seats.acquire(license_id, max_seats, machine_id).allowed:
+        return None
+    return validation_failure(outcome_message(ValidationOutcome.SEATS_EXHAUSTED))
+
+
+@router.post("/validate", response_model=ValidationResponse)
+@limiter.limit(settings.VALIDATE_RATE_LIMIT)
+async def validate_license(request: Request, validate_request: ValidateRequest):
+    """
+    Valide une clé de licence à partir du snapshot
+
+    **Logique**:
+    1. Déchiffre et valide la clé (machine, expiration)
+    2. Recherche l'état de la licence dans le snapshot (bisection)
+    3. Licence multi-postes: occupe une place (postes comptés par processus)
+    4. Met la vérification en file locale
+    """
+    snapshot = snapshot_watcher.current
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Snapshot de validation indisponible")
+    now = datetime.utcnow()
+    if snapshot_watcher.is_stale(snapshot, now):
+        raise HTTPException(status_code=503, detail="Snapshot de validation périmé")
+
+    client_ip = request.client.host if request.client else None
+    machine_id = validate_request.machine_id
+
+    # Même contrôle cryptographique que le serveur principal (check_license, base de validate_license)
+    outcome, detail, license_data = license_generator.check_license(validate_request.license_key, machine_id)
+    if outcome != ValidationOutcome.VALID:
+        activation_spool.record(None, machine_id, client_ip, outcome, detail)
+        return validation_failure(outcome_message(outcome, detail))
+
+    entry = snapshot.lookup(validate_request.license_key)
+
+    if entry is None:
+        # Clé authentique émise après le snapshot: acceptée sur la foi de sa signature
+        generated = license_data.get("generated")
+        if generated and snapshot.generated_at and datetime.fromisoformat(generated) > snapshot.generated_at:
+            expiry = license_data.get("expiry")
+            expires_at = datetime.fromisoformat(expiry) if expiry else None
+            if license_data.get("seats"):
+                refusal = seat_refusal(None, license_data["seats"], validate_request.license_key, machine_id)
+                if refusal is not None:
+                    activation_spool.record(None, machine_id, client_ip, ValidationOutcome.SEATS_EXHAUSTED)
+                    return refusal
+            activation_spool.record(None, machine_id, client_ip, ValidationOutcome.VALID)
+            return model_response(ValidationResponse(
+                valid=True,
+                message="Licence valide",
+                expires_at=expires_at,
+                days_remaining=max(0, (expires_at - now).days) if expires_at else None,
+                license_type=license_data.get("license_type"),  # Absent des clés émises avant ce champ
+            ))
+        activation_spool.record(None, machine_id, client_ip, ValidationOutcome.NOT_FOUND)
+        return validation_failure("Licence introuvable")
+
+    if entry.status == STATUS_REVOKED:
+        activation_spool.record(entry.license_id, machine_id, client_ip, ValidationOutcome.REVOKED, entry.revoked_reason)
+        return validation_failure(f"Licence révoquée: {entry.revoked_reason or 'Contactez le support'}")
+
+    if entry.status in (STATUS_INACTIVE, STATUS_EXPIRED) or (entry.expires_at and entry.expires_at <= now):
+        outcome = ValidationOutcome.INACTIVE if entry.status == STATUS_INACTIVE else ValidationOutcome.EXPIRED
+        activation_spool.record(entry.license_id, machine_id, client_ip, outcome)
+        return validation_failure(
+            "Licence inactive" if outcome == ValidationOutcome.INACTIVE else outcome_message(outcome)
+        )
+
+    if entry.max_seats:
+        refusal = seat_refusal(entry.license_id, entry.max_seats, validate_request.license_key, machine_id)
+        if refusal is not None:
+            activation_spool.record(entry.license_id, machine_id, client_ip, ValidationOutcome.SEATS_EXHAUSTED)
+            return refusal
+
+    activation_spool.record(entry.license_id, machine_id, client_ip, ValidationOutcome.VALID)
+    return model_response(ValidationResponse(
+        valid=True,
+        message="Licence valide",
+        expires_at=entry.expires_at,
+        days_remaining=max(0, (entry.expires_at - now).days) if entry.expires_at else None,
+        license_type=entry.license_type
+    ))
@@ -4,23 +4,33 @@
 Endpoints pour la gestion des licences
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from datetime import datetime
+from typing import Optional
+import json
 
-from app.database import get_db
 from app.schemas.license import (
     TrialRequest,
     LicenseResponse,
     ValidateRequest,
     ValidationResponse,
+    HeartbeatRequest,
+    HeartbeatResponse,
     ErrorResponse
 )
+from app.models.heartbeat import Heartbeat
 from app.models.license import License
-from app.models.activation import Activation
+from app.services.expiry_sweeper import expiry_sweeper
+from app.services.idempotency import MAX_KEY_LENGTH, idempotency, request_fingerprint
+from app.services.license_repository import LicenseRepository, get_licenses
+from app.services.revocation_set import revocation_set
+from app.services.seat_tracker import seat_tracker
+from app.services.sharing_detector import sharing_detector
 from app.utils.license_crypto import license_generator
+from app.utils.responses import model_response, validation_failure
+from app.utils.validation_outcome import ValidationOutcome, outcome_message
 from app.config import settings
 
 # Router
@@ -31,11 +41,11 @@ limiter = Limiter(key_func=get_remote_address)
 
 
 @router.post("/trial", response_model=LicenseResponse)
-@limiter.limit(settings.TRIAL_RATE_LIMIT)
 async def request_trial(
     request: Request,
     trial_request: TrialRequest,
-    db: Session = Depends(get_db)
+    repository: LicenseRepository = Depends(get_licenses),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=MAX_KEY_LENGTH)
 ):
     """
     Génère une licence d'essai (30 jours)
@@ -48,26 +58,34 @@ async def request_trial(
     3. Si non, génère une nouvelle licence trial de 30 jours
     4. Sauvegarde dans la base de données
     5. Retourne la clé de licence chiffrée
+
+    **Idempotency-Key** (optionnel): une nouvelle tentative avec la même clé
+    et le même corps reçoit la réponse de la première (même licence), sans
+    réexécution et sans décompte par le rate limit.
     """
-    # Vérifier si déjà une trial pour cet email
-    existing_email = db.query(License).filter(
-        License.email == trial_request.email,
-        License.license_type == "trial"
-    ).first()
+    if idempotency_key:
+        return await idempotency.execute("trial", idempotency_key, request_fingerprint(trial_request),
+                                         lambda: limited_trial(request, trial_request, repository))
+    return await limited_trial(request, trial_request, repository)
+
+
+@limiter.limit(settings.TRIAL_RATE_LIMIT)
+async def limited_trial(request: Request, trial_request: TrialRequest, repository: LicenseRepository) -> Response:
+    """Rate limit appliqué après la relecture idempotente: une réponse rejouée n'est pas décomptée"""
+    return await issue_trial(trial_request, repository)
 
-    if existing_email:
+
+async def issue_trial(trial_request: TrialRequest, repository: LicenseRepository) -> Response:
+    """Vérifications, génération et enregistrement de la licence d'essai"""
+    # Vérifier si déjà une trial pour cet email
+    if repository.has_trial_for_email(trial_request.email):
         raise HTTPException(
             status_code=400,
             detail="Une licence d'essai existe déjà pour cet email"
         )
 
     # Vérifier si déjà une trial pour cette machine
-    existing_machine = db.query(License).filter(
-        License.machine_id == trial_request.machine_id,
-        License.license_type == "trial"
-    ).first()
-
-    if existing_machine:
+    if repository.has_trial_for_machine(trial_request.machine_id):
         raise HTTPException(
             status_code=400,
             detail="Une licence d'essai existe déjà pour cette machine"
@@ -96,18 +114,18 @@ async def request_trial(
         is_revoked=False
     )
 
-    db.add(new_license)
-    db.commit()
-    db.refresh(new_license)
+    repository.add(new_license)
+
+    expiry_sweeper.schedule(new_license.id, expires_at)
 
     # Retourner la réponse
-    return LicenseResponse(
+    return model_response(LicenseResponse(
         success=True,
         message="Licence d'essai générée avec succès",
         license_key=license_key,
         expires_at=expires_at,
         license_type="trial"
-    )
+    ))
 
 
 @router.post("/validate", response_model=ValidationResponse)
@@ -115,7 +133,7 @@ async def request_trial(
 async def validate_license(
     request: Request,
     validate_request: ValidateRequest,
-    db: Session = Depends(get_db)
+    repository: LicenseRepository = Depends(get_licenses)
 ):
     """
     Valide une clé de licence
@@ -124,90 +142,104 @@ async def validate_license(
 
     **Logique**:
     1. Déchiffre et valide la clé de licence
-    2. Vérifie le machine_id
+    2. Vérifie le machine_id (machine, IP et réseau comptés par le détecteur de partage)
     3. Vérifie l'expiration
-    4. Vérifie le statut (active, non révoquée)
-    5. Enregistre l'activation dans la table activations
-    6. Retourne le résultat de validation
+    4. Vérifie le statut (active, non révoquée), d'abord dans le cache de révocation
+    5. Licence multi-postes: occupe une place (refus si toutes sont prises)
+    6. Enregistre l'activation (ligne brute ou compteur journalier selon ACTIVATION_LOG_MODE)
+    7. Retourne le résultat de validation (avec la nouvelle clé si la clé présentée date d'avant une rotation)
     """
+    client_ip = request.client.host if request.client else None
+
     # Valider cryptographiquement la licence
-    is_valid_crypto, message, license_data = license_generator.validate_license(
+    outcome, detail, license_data = license_generator.check_license(
         validate_request.license_key,
         validate_request.machine_id
     )
 
-    if not is_valid_crypto:
+    # Clé déchiffrée: machines, IP et réseaux distincts (détection du partage, en mémoire)
+    if settings.SHARING_DETECTION_ENABLED and outcome in (ValidationOutcome.VALID, ValidationOutcome.MACHINE_MISMATCH):
+        sharing_detector.observe(validate_request.license_key, validate_request.machine_id, client_ip)
+
+    if outcome != ValidationOutcome.VALID:
         # Enregistrer l'échec
-        activation = Activation(
+        repository.record_activation(
             license_id=None,  # Licence non trouvée
             machine_id=validate_request.machine_id,
-            ip_address=request.client.host if request.client else None,
-            is_valid=False,
-            validation_message=message
+            ip_address=client_ip,
+            outcome=outcome,
+            detail=detail
         )
-        db.add(activation)
-        db.commit()
 
-        return ValidationResponse(
-            valid=False,
-            message=message
+        return validation_failure(outcome_message(outcome, detail))
+
+    # Clé bloquée connue du cache de révocation: réponse sans lire la licence
+    blocked = revocation_set.lookup(validate_request.license_key) if settings.REVOCATION_SET_ENABLED else None
+    if blocked is not None:
+        repository.record_activation(
+            license_id=blocked.license_id,
+            machine_id=validate_request.machine_id,
+            ip_address=client_ip,
+            outcome=blocked.outcome,
+            detail=blocked.revoked_reason
         )
 
-    # Rechercher la licence en base de données
-    license_record = db.query(License).filter(
-        License.license_key == validate_request.license_key
-    ).first()
+        if blocked.outcome == ValidationOutcome.REVOKED:
+            message = f"Licence révoquée: {blocked.revoked_reason or 'Contactez le support'}"
+        else:
+            message = "Licence inactive"
+        return validation_failure(message)
+
+    # Rechercher la licence (réplique, puis primaire si absente: licence tout juste créée)
+    license_record = repository.status_by_key(validate_request.license_key)
 
     if not license_record:
         # Licence valide cryptographiquement mais pas en base
-        activation = Activation(
+        repository.record_activation(
             license_id=None,
             machine_id=validate_request.machine_id,
-            ip_address=request.client.host if request.client else None,
-            is_valid=False,
-            validation_message="Licence introuvable dans la base de données"
+            ip_address=client_ip,
+            outcome=ValidationOutcome.NOT_FOUND
         )
-        db.add(activation)
-        db.commit()
 
-        return ValidationResponse(
-            valid=False,
-            message="Licence introuvable"
-        )
+        return validation_failure("Licence introuvable")
 
     # Vérifier si révoquée
     if license_record.is_revoked:
-        activation = Activation(
+        repository.record_activation(
             license_id=license_record.id,
             machine_id=validate_request.machine_id,
-            ip_address=request.client.host if request.client else None,
-            is_valid=False,
-            validation_message=f"Licence révoquée: {license_record.revoked_reason or 'Raison non spécifiée'}"
+            ip_address=client_ip,
+            outcome=ValidationOutcome.REVOKED,
+            detail=license_record.revoked_reason
         )
-        db.add(activation)
-        db.commit()
 
-        return ValidationResponse(
-            valid=False,
-            message=f"Licence révoquée: {license_record.revoked_reason or 'Contactez le support'}"
-        )
+        return validation_failure(f"Licence révoquée: {license_record.revoked_reason or 'Contactez le support'}")
 
-    # Vérifier si active
+    # Vérifier si active (expired_at renseigné par le balayeur d'expiration)
     if not license_record.is_active:
-        activation = Activation(
+        outcome = ValidationOutcome.EXPIRED if license_record.expired_at else ValidationOutcome.INACTIVE
+        repository.record_activation(
             license_id=license_record.id,
             machine_id=validate_request.machine_id,
-            ip_address=request.client.host if request.client else None,
-            is_valid=False,
-            validation_message="Licence inactive"
+            ip_address=client_ip,
+            outcome=outcome
         )
-        db.add(activation)
-        db.commit()
 
-        return ValidationResponse(
-            valid=False,
-            message="Licence inactive"
-        )
+        return validation_failure(outcome_message(outcome) if license_record.expired_at else "Licence inactive")
+
+    # Licence multi-postes: place disponible (décision en mémoire, app.services.seat_tracker)
+    if license_record.max_seats:
+        seat = seat_tracker.acquire(license_record.id, license_record.max_seats, validate_request.machine_id)
+        if not seat.allowed:
+            repository.record_activation(
+                license_id=license_record.id,
+                machine_id=validate_request.machine_id,
+                ip_address=client_ip,
+                outcome=ValidationOutcome.SEATS_EXHAUSTED
+            )
+
+            return validation_failure(outcome_message(ValidationOutcome.SEATS_EXHAUSTED))
 
     # Calculer les jours restants
     days_remaining = None
@@ -216,20 +248,87 @@ async def validate_license(
         days_remaining = max(0, delta.days)
 
     # Licence valide - enregistrer l'activation
-    activation = Activation(
+    repository.record_activation(
         license_id=license_record.id,
         machine_id=validate_request.machine_id,
-        ip_address=request.client.host if request.client else None,
-        is_valid=True,
-        validation_message="Licence valide"
+        ip_address=client_ip,
+        outcome=ValidationOutcome.VALID
     )
-    db.add(activation)
-    db.commit()
 
-    return ValidationResponse(
+    return model_response(ValidationResponse(
         valid=True,
         message="Licence valide",
         expires_at=license_record.expires_at,
         days_remaining=days_remaining,
-        license_type=license_record.license_type
-    )
+        license_type=license_record.license_type,
+        license_key=license_record.replacement_key
+    ))
+
+
+@router.post("/heartbeat", response_model=HeartbeatResponse)
+@limiter.limit(settings.HEARTBEAT_RATE_LIMIT)
+async def heartbeat(
+    request: Request,
+    heartbeat_request: HeartbeatRequest,
+    repository: LicenseRepository = Depends(get_licenses)
+):
+    """
+    Signal périodique du client (Phase 3)
+
+    **Rate limit**: 1000 requêtes par heure par IP
+
+    **Logique**:
+    1. Mêmes contrôles de la clé que /validate (déchiffrement, révocation, statut)
+    2. Licence multi-postes: garde le poste actif (refus si toutes les places sont prises)
+    3. Enregistre le heartbeat
+    """
+    machine_id = heartbeat_request.machine_id
+
+    outcome, detail, _ = license_generator.check_license(heartbeat_request.license_key, machine_id)
+    if outcome != ValidationOutcome.VALID:
+        return model_response(HeartbeatResponse(valid=False, message=outcome_message(outcome, detail)))
+
+    blocked = revocation_set.lookup(heartbeat_request.license_key) if settings.REVOCATION_SET_ENABLED else None
+    if blocked is not None:
+        return model_response(HeartbeatResponse(valid=False, message=outcome_message(
+            blocked.outcome, revoked_reason=blocked.revoked_reason)))
+
+    license_record = repository.status_by_key(heartbeat_request.license_key)
+    if not license_record:
+        return model_response(HeartbeatResponse(valid=False, message="Licence introuvable"))
+    if license_record.is_revoked:
+        return model_response(HeartbeatResponse(valid=False, message=outcome_message(
+            ValidationOutcome.REVOKED, revoked_reason=license_record.revoked_reason)))
+    if not license_record.is_active:
+        outcome = ValidationOutcome.EXPIRED if license_record.expired_at else ValidationOutcome.INACTIVE
+        return model_response(HeartbeatResponse(valid=False, message=outcome_message(outcome)))
+
+    seats_in_use = None
+    if license_record.max_seats:
+        seat = seat_tracker.acquire(license_record.id, license_record.max_seats, machine_id)
+        if not seat.allowed:
+            return model_response(HeartbeatResponse(
+                valid=False,
+                message=outcome_message(ValidationOutcome.SEATS_EXHAUSTED),
+                seats_in_use=seat.in_use,
+                max_seats=license_record.max_seats
+            ))
+        seats_in_use = seat.in_use
+
+    repository.record_heartbeat(Heartbeat(
+        license_id=license_record.id,
+        machine_id=machine_id,
+        app_version=heartbeat_request.app_version,
+        os_info=heartbeat_request.os_info,
+        usage_stats=json.dumps(heartbeat_request.usage_stats) if heartbeat_request.usage_stats else None
+    ))
+
+    return model_response(HeartbeatResponse(
+        valid=True,
+        message="Poste actif",
+        seats_in_use=seats_in_use,
+        max_seats=license_record.max_seats,
+        # Trois heartbeats par fenêtre: un heartbeat perdu ne libère pas la place
+        next_heartbeat_seconds=settings.SEAT_WINDOW_SECONDS // 3,
+        license_key=license_record.replacement_key
+    ))
@@ -5,22 +5,23 @@ Endpoints pour les paiements Stripe
 Gestion des achats de licences lifetime - Version Production Sécurisée
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Header, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, BackgroundTasks, Response
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-import stripe
 import os
+from typing import Optional
 
-from app.database import get_db
 from app.schemas.license import (
     CreateCheckoutSessionRequest,
     CheckoutSessionResponse
 )
 from app.models.license import License
+from app.services.idempotency import MAX_KEY_LENGTH, idempotency, idempotency_digest, request_fingerprint
+from app.services.license_repository import LicenseRepository, get_licenses, get_read_licenses
+from app.services.stats import license_snapshot
 from app.utils.license_crypto import license_generator
+from app.utils.responses import model_response
 from app.config import settings
-from app.utils.mailer import send_license_email
 
 # Router
 router = APIRouter(prefix="/api", tags=["Payment"])
@@ -28,8 +29,7 @@ router = APIRouter(prefix="/api", tags=["Payment"])
 # Rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
-# Configuration Stripe
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+# Configuration Stripe (SDK chargé au premier usage, voir stripe_api)
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
 
 # Prix Stripe par devise
@@ -40,12 +40,37 @@ STRIPE_PRICES = {
     'gbp': os.environ.get('STRIPE_PRICE_GBP', 'price_XXXXXX_GBP'),
 }
 
+_stripe = None
+
+
+def stripe_api():
+    """
+    Module stripe, importé et configuré au premier appel
+
+    L'import du SDK coûte plusieurs centaines de ms: il n'est pas payé au
+    démarrage de chaque worker, mais au premier paiement (ou en tâche de fond
+    après le démarrage, voir main.lifespan).
+    """
+    global _stripe
+    if _stripe is None:
+        import stripe
+        stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+        _stripe = stripe
+    return _stripe
+
+
+def send_license_email(email: str, license_key: str) -> None:
+    """Envoi de la clé par email (mailer importé à la première utilisation, en tâche de fond)"""
+    from app.utils.mailer import send_license_email as send
+    send(email, license_key)
+
+
 @router.post("/create-checkout-session", response_model=CheckoutSessionResponse)
-@limiter.limit("10/hour")
 async def create_checkout_session(
     request: Request,
     checkout_request: CreateCheckoutSessionRequest,
-    db: Session = Depends(get_db)
+    repository: LicenseRepository = Depends(get_read_licenses),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=MAX_KEY_LENGTH)
 ):
     """
     Crée une session Stripe Checkout avec gestion fine des erreurs
@@ -53,17 +78,33 @@ async def create_checkout_session(
     Supporte 2 flux:
     1. Depuis l'app (machine_id + email connus)
     2. Depuis landing page (machine_id et email inconnus -> PENDING)
+
+    Idempotency-Key (optionnel): une nouvelle tentative avec la même clé et
+    le même corps reçoit la même session, sans nouvel appel Stripe et sans
+    décompte par le rate limit.
     """
+    if idempotency_key:
+        return await idempotency.execute(
+            "checkout", idempotency_key, request_fingerprint(checkout_request),
+            lambda: limited_checkout_session(request, checkout_request, repository, idempotency_key),
+        )
+    return await limited_checkout_session(request, checkout_request, repository)
+
+
+@limiter.limit("10/hour")
+async def limited_checkout_session(request: Request, checkout_request: CreateCheckoutSessionRequest,
+                                   repository: LicenseRepository, idempotency_key: Optional[str] = None) -> Response:
+    """Rate limit appliqué après la relecture idempotente: une réponse rejouée n'est pas décomptée"""
+    return await open_checkout_session(checkout_request, repository, idempotency_key)
+
+
+async def open_checkout_session(checkout_request: CreateCheckoutSessionRequest, repository: LicenseRepository,
+                                idempotency_key: Optional[str] = None):
+    """Vérifications puis création de la session Stripe"""
 
     # 1. Gestion propre de l'exception "Déjà licencié" (Évite l'erreur 400 brute)
     if checkout_request.machine_id and "PENDING" not in checkout_request.machine_id:
-        existing_lifetime = db.query(License).filter(
-            License.machine_id == checkout_request.machine_id,
-            License.license_type == "lifetime",
-            License.is_active == True
-        ).first()
-
-        if existing_lifetime:
+        if repository.has_active_lifetime(checkout_request.machine_id):
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -82,6 +123,7 @@ async def create_checkout_session(
             detail={"code": "CONFIG_ERROR", "message": f"Configuration Stripe manquante pour {currency.upper()}"}
         )
 
+    stripe = stripe_api()
     try:
         # 3. Logique d'email intelligent pour la Landing Page
         customer_email = None
@@ -90,7 +132,10 @@ async def create_checkout_session(
             if all(x not in checkout_request.email.lower() for x in ["test", "pending"]):
                 customer_email = checkout_request.email
 
+        # Clé transmise à Stripe: même session si notre réponse n'a pas pu être enregistrée
+        options = {'idempotency_key': f"checkout-{idempotency_digest('checkout', idempotency_key)}"} if idempotency_key else {}
         session = stripe.checkout.Session.create(
+            **options,
             payment_method_types=['card'],
             line_items=[{
                 'price': price_id,
@@ -108,11 +153,11 @@ async def create_checkout_session(
             }
         )
 
-        return CheckoutSessionResponse(
+        return model_response(CheckoutSessionResponse(
             success=True,
             checkout_url=session.url,
             session_id=session.id
-        )
+        ))
 
     except stripe.error.StripeError as e:
         raise HTTPException(status_code=503, detail={"code": "STRIPE_ERROR", "message": str(e)})
@@ -124,7 +169,7 @@ async def create_checkout_session(
 async def stripe_webhook(
     request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    repository: LicenseRepository = Depends(get_licenses),
     stripe_signature: str = Header(None, alias="stripe-signature")
 ):
     """
@@ -136,6 +181,7 @@ async def stripe_webhook(
        (le client activera manuellement plus tard)
     """
     payload = await request.body()
+    stripe = stripe_api()
 
     try:
         event = stripe.Webhook.construct_event(
@@ -171,16 +217,16 @@ async def stripe_webhook(
         amount_paid = session.get('amount_total')
         currency = session.get('currency', 'EUR').upper()
 
-        # Vérifier si une licence existe déjà pour cet email ou machine
-        existing_license = db.query(License).filter(
-            (License.machine_id == machine_id) | (License.email == email)
-        ).first()
+        # Licence existante pour cette machine ou cet email (priorités: app/services/customer_identity.py)
+        existing_license = repository.resolve_customer(machine_id, email)
 
         if existing_license:
             # Mise à jour d'une licence existante (trial -> lifetime)
+            before = license_snapshot(existing_license)
             existing_license.license_type = "lifetime"
             existing_license.email = email
             existing_license.expires_at = None  # Lifetime = pas d'expiration
+            existing_license.expired_at = None
             existing_license.is_active = True
             existing_license.is_revoked = False
 
@@ -204,7 +250,7 @@ async def stripe_webhook(
             )
             existing_license.license_key = license_key
 
-            db.commit()
+            repository.save(before, existing_license)
 
         else:
             # Création d'une nouvelle licence lifetime
@@ -231,8 +277,7 @@ async def stripe_webhook(
                 amount_paid=amount_paid,
                 currency=currency
             )
-            db.add(new_license)
-            db.commit()
+            repository.add(new_license)
 
         # --- ENVOI DE L'EMAIL AVEC LA CLÉ ---
         # Que ce soit depuis l'app ou la landing page, on envoie toujours l'email
@@ -246,16 +291,14 @@ async def stripe_webhook(
 @router.get("/get-license-by-session/{session_id}")
 async def get_license_by_session(
     session_id: str,
-    db: Session = Depends(get_db)
+    repository: LicenseRepository = Depends(get_licenses)
 ):
     """
     Récupère la clé de licence par session_id Stripe
     Utilisé par la page success après paiement
     """
-    # Chercher la licence par stripe_session_id
-    license_record = db.query(License).filter(
-        License.stripe_session_id == session_id
-    ).first()
+    # Chercher la licence par stripe_session_id (le webhook vient peut-être de l'écrire sur le primaire)
+    license_record = repository.license_for_session(session_id)
 
     if not license_record:
         raise HTTPException(
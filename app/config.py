@@ -9,15 +9,30 @@ from pydantic_settings import BaseSettings
 from typing import List
 
 
+# Mots de passe admin par défaut ou d'exemple (.env.example, docker-compose sans ADMIN_PASSWORD)
+DEFAULT_ADMIN_PASSWORDS = ("changeme", "CHANGEME_ADMIN_PASSWORD", "")
+
+
 class Settings(BaseSettings):
     """Configuration de l'application"""
 
     # Database
     DATABASE_URL: str
+    REPLICA_DATABASE_URL: str = ""  # Réplique en lecture (vide = tout sur DATABASE_URL)
+    REPLICA_STICKY_SECONDS: float = 5.0  # Après une écriture, le client lit sur le primaire
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0  # Attente maximale d'une connexion (secondes)
+    DB_POOL_PREWARM: int = 4  # Connexions ouvertes au démarrage du worker, avant de servir (0 = aucune)
+
+    # Contrôle d'admission: requêtes simultanées admises (0 = DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_INFLIGHT: int = 0
 
     # Security
     SECRET_KEY: str
     LICENSE_SECRET_KEY: str
+    LICENSE_SECRET_KEYS_OLD: str = ""  # Anciennes clés, séparées par des virgules (déchiffrement seul, rotation)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
     # API Configuration
@@ -34,6 +49,16 @@ class Settings(BaseSettings):
         """Convertit la chaîne CORS_ORIGINS en liste"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    @property
+    def admin_enabled(self) -> bool:
+        """Routes admin servies: mot de passe configuré (hors valeurs d'exemple), ou développement"""
+        return self.ENVIRONMENT == "development" or self.ADMIN_PASSWORD not in DEFAULT_ADMIN_PASSWORDS
+
+    @property
+    def license_secret_keys_old(self) -> List[str]:
+        """Anciennes clés de licence encore acceptées en déchiffrement"""
+        return [key.strip() for key in self.LICENSE_SECRET_KEYS_OLD.split(",") if key.strip()]
+
     # Rate Limiting
     TRIAL_RATE_LIMIT: str = "3/hour"
     VALIDATE_RATE_LIMIT: str = "100/hour"
@@ -41,6 +66,71 @@ class Settings(BaseSettings):
     # Trial Configuration
     DEFAULT_TRIAL_DAYS: int = 30
 
+    # Journal des activations
+    # "full": une ligne par vérification / "coalesced": compteurs journaliers + échecs et échantillon
+    ACTIVATION_LOG_MODE: str = "full"
+    ACTIVATION_SUCCESS_SAMPLE_RATE: float = 0.01  # Part des succès conservés en ligne brute (mode coalesced)
+
+    # Rétention des activations (partitions mensuelles archivées puis supprimées)
+    ACTIVATION_RETENTION_MONTHS: int = 12
+    ACTIVATION_ARCHIVE_DIR: str = "archives/activations"
+    ACTIVATION_ARCHIVE_FORMAT: str = "ndjson"  # ndjson (gzip) ou parquet (nécessite pyarrow)
+
+    # Balayeur d'expiration intégré: désactivé par défaut, chaque worker uvicorn en lancerait un;
+    # lancer app.jobs.sweep_expired en cron (activer seulement avec un worker unique)
+    EXPIRY_SWEEPER_ENABLED: bool = False
+    EXPIRY_SWEEP_BATCH_SIZE: int = 500
+    EXPIRY_SWEEP_MAX_SLEEP_SECONDS: int = 300  # Relecture de la base au moins à cet intervalle
+
+    # Compteurs de licences: réconciliation intégrée, désactivée par défaut (0): chaque worker uvicorn
+    # appliquerait le même écart; lancer app.jobs.reconcile_stats en cron (activer seulement avec un worker unique)
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 0
+
+    # Flux d'invalidations (révocations): intervalle de lecture par worker
+    INVALIDATION_POLL_SECONDS: float = 2.0
+    INVALIDATION_RETENTION_DAYS: int = 30
+
+    # Cache de révocation (validation sans lecture de la licence pour les clés bloquées),
+    # tenu à jour par le flux d'invalidations
+    REVOCATION_SET_ENABLED: bool = True
+
+    # Licences multi-postes: un poste compte s'il a validé ou envoyé un heartbeat dans la fenêtre
+    SEAT_WINDOW_SECONDS: int = 900
+    SEAT_SYNC_SECONDS: float = 2.0  # Échange des baux entre workers (table seat_leases)
+    SEAT_STORE: str = "database"  # "database" (partagé entre workers) ou "local" (un seul processus)
+    HEARTBEAT_RATE_LIMIT: str = "1000/hour"  # Par IP: tous les postes d'un bureau partagent souvent la même
+
+    # Détection du partage de clés (esquisses HyperLogLog par clé sur une fenêtre glissante)
+    SHARING_DETECTION_ENABLED: bool = True
+    SHARING_WINDOW_SECONDS: int = 24 * 3600
+    SHARING_WINDOW_BUCKETS: int = 4  # Tranches de la fenêtre (la plus ancienne sort d'un bloc)
+    SHARING_MAX_MACHINES: int = 3  # Machines distinctes par clé (x max_seats pour une licence multi-postes)
+    SHARING_MAX_IPS: int = 10
+    SHARING_MAX_SUBNETS: int = 5  # Réseaux /24 (IPv4) ou /64 (IPv6) distincts
+    SHARING_MAX_TRACKED_KEYS: int = 20000  # Clés suivies par worker (~1 Kio chacune; les moins récentes sortent)
+    SHARING_SYNC_SECONDS: float = 10.0  # Fusion des esquisses entre workers et évaluation des seuils
+    SHARING_STORE: str = "database"  # "database" (table license_sharing_sketches) ou "local" (un seul worker)
+
+    # Analyse des usage_stats des heartbeats (colonnes NumPy par jour, app.jobs.build_usage_analytics)
+    USAGE_ANALYTICS_DIR: str = "analytics/usage"
+    USAGE_ANALYTICS_MAX_COUNTERS: int = 63  # Compteurs distincts retenus (clés choisies par le client)
+
+    # En-tête Idempotency-Key (POST /licenses/trial, POST /api/create-checkout-session)
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600  # Durée de rejeu d'une réponse (comme Stripe)
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0  # Attente d'une exécution en cours avant un 409
+    IDEMPOTENCY_STORE: str = "database"  # "database" (table idempotency_keys) ou "local" (un seul worker)
+
+    # Licences des endpoints publics (app.services.license_repository)
+    LICENSE_STORE: str = "database"  # "database" ou "local" (index en mémoire, un seul processus: benchmarks, démo)
+
+    # Mode du serveur: "primary" (base de données) ou "edge" (validation seule depuis un snapshot signé)
+    SERVER_MODE: str = "primary"
+    VALIDATION_SNAPSHOT_PATH: str = "snapshots/licenses.snap"
+    VALIDATION_SNAPSHOT_POLL_SECONDS: float = 10.0  # Détection d'un nouveau snapshot (mode edge)
+    # Au-delà, le validateur edge répond 503 (révocations trop anciennes); 0 = sans limite
+    VALIDATION_SNAPSHOT_MAX_AGE_SECONDS: int = 3600
+    ACTIVATION_SPOOL_DIR: str = "spool/activations"  # Vérifications en attente d'envoi (mode edge)
+
     # Email (optionnel)
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
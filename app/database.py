@@ -2,35 +2,217 @@
 # -*- coding: utf-8 -*-
 """
 Configuration de la base de données PostgreSQL
+
+Écritures sur le primaire (get_db). Lectures sur la réplique si
+REPLICA_DATABASE_URL est défini (get_read_db), avec deux garde-fous contre
+le retard de réplication:
+- un client qui vient d'écrire lit sur le primaire pendant
+  REPLICA_STICKY_SECONDS (il relit ses propres écritures)
+- read_with_fallback relit sur le primaire une ligne absente de la réplique
+  (ligne écrite par un autre client: webhook Stripe puis page de succès)
 """
 
-from sqlalchemy import create_engine
+import logging
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, configure_mappers, sessionmaker
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Tables dont l'écriture ne rend pas le client "collant" au primaire (journal des vérifications)
+STICKY_IGNORED_TABLES = frozenset({"activations", "activation_summaries"})
+REPLICA_RETRY_SECONDS = 30  # Réplique injoignable: lectures sur le primaire pendant ce délai
+
+
+def pool_options(url: str) -> dict:
+    """Dimensionnement du pool (sans objet pour SQLite en mémoire, pool à connexion unique)"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
 # Créer le moteur de base de données
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,  # Vérifie la connexion avant de l'utiliser
-    echo=settings.ENVIRONMENT == "development"  # Log SQL en développement
+    echo=settings.ENVIRONMENT == "development",  # Log SQL en développement
+    **pool_options(settings.DATABASE_URL)
 )
 
+# Moteur de lecture (réplique), absent si REPLICA_DATABASE_URL est vide
+replica_engine = create_engine(
+    settings.REPLICA_DATABASE_URL,
+    pool_pre_ping=True,
+    echo=settings.ENVIRONMENT == "development",
+    **pool_options(settings.REPLICA_DATABASE_URL)
+) if settings.REPLICA_DATABASE_URL else None
+
 # Session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine or engine)
 
 # Base pour les modèles
 Base = declarative_base()
 
 
+class WriteTracker:
+    """Clients ayant écrit récemment (lecture sur le primaire jusqu'à l'échéance)"""
+
+    def __init__(self, max_clients: int = 10000):
+        self.max_clients = max_clients
+        self._until: Dict[str, float] = {}
+        self.replica_down_until = 0.0
+
+    def mark(self, client: str) -> None:
+        now = time.monotonic()
+        if len(self._until) >= self.max_clients:
+            self._until = {key: until for key, until in self._until.items() if until > now}
+        self._until[client] = now + settings.REPLICA_STICKY_SECONDS
+
+    def recently_wrote(self, client: Optional[str]) -> bool:
+        until = self._until.get(client) if client else None
+        return until is not None and until > time.monotonic()
+
+    def replica_available(self) -> bool:
+        return replica_engine is not None and time.monotonic() >= self.replica_down_until
+
+    def mark_replica_down(self) -> None:
+        self.replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+# Instance globale
+write_tracker = WriteTracker()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_flushed_writes(session, flush_context):
+    # Les listes new/dirty/deleted reflètent encore l'état d'avant le flush
+    if not session.info.get("wrote"):
+        changed = session.new | session.dirty | session.deleted
+        session.info["wrote"] = any(obj.__table__.name not in STICKY_IGNORED_TABLES for obj in changed)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_client_after_commit(session):
+    if session.info.pop("wrote", False) and session.info.get("client"):
+        write_tracker.mark(session.info["client"])
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _reject_replica_writes(session, flush_context, instances):
+    raise RuntimeError("Session de lecture (réplique): écriture interdite, utiliser get_db")
+
+
+def _open_connections(bind, wanted: int) -> int:
+    size = bind.pool.size() if hasattr(bind.pool, "size") else 1
+    held = []
+    try:
+        for _ in range(min(wanted, size)):
+            connection = bind.connect()
+            held.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in held:
+            connection.close()
+    return len(held)
+
+
+def warm_pool(connections: Optional[int] = None) -> int:
+    """
+    Prépare la base avant que le worker ne serve (main.lifespan)
+
+    Ouvre `connections` connexions (DB_POOL_PREWARM, au plus la taille du pool)
+    sur le primaire et la réplique puis les rend au pool, et configure les
+    mappers ORM: les premières requêtes ne paient ni la connexion TCP/TLS ni
+    la configuration des modèles. Une base injoignable fait échouer le
+    démarrage au lieu des premières requêtes.
+
+    Returns:
+        int: nombre de connexions ouvertes
+    """
+    configure_mappers()
+    wanted = settings.DB_POOL_PREWARM if connections is None else connections
+    opened = _open_connections(engine, wanted)
+    if replica_engine is not None:
+        try:
+            opened += _open_connections(replica_engine, wanted)
+        except OperationalError:
+            logger.exception("Réplique injoignable au démarrage, lectures sur le primaire pendant %ss",
+                             REPLICA_RETRY_SECONDS)
+            write_tracker.mark_replica_down()
+    return opened
+
+
+def client_key(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+def read_session() -> Session:
+    """Session de lecture hors requête (export en flux...): réplique si disponible"""
+    return ReadSessionLocal() if write_tracker.replica_available() else SessionLocal()
+
+
 # Dépendance pour obtenir une session de base de données
-def get_db():
+def get_db(request: Request):
     """
-    Générateur de session de base de données
+    Générateur de session de base de données (primaire, lectures et écritures)
     Usage dans FastAPI: db: Session = Depends(get_db)
     """
-    db = SessionLocal()
+    db = SessionLocal(info={"client": client_key(request)})
     try:
         yield db
     finally:
         db.close()
+
+
+def use_replica(client: Optional[str]) -> bool:
+    return write_tracker.replica_available() and not write_tracker.recently_wrote(client)
+
+
+def get_read_db(request: Request):
+    """
+    Session de lecture seule: la réplique, ou le primaire si aucune réplique
+    n'est configurée / joignable ou si le client vient d'écrire
+
+    Usage dans FastAPI: db: Session = Depends(get_read_db)
+    """
+    client = client_key(request)
+    db = ReadSessionLocal() if use_replica(client) else SessionLocal(info={"client": client})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def read_with_fallback(db: Session, query: Callable[[Session], Optional[T]]) -> Optional[T]:
+    """
+    Exécute `query` sur la réplique puis, si le résultat est absent (retard de
+    réplication) ou si la réplique échoue, sur la session primaire `db`
+
+    Pour les endpoints qui écrivent aussi: une seule dépendance get_db, la
+    session de lecture n'est ouverte que le temps de la requête SQL.
+    """
+    if not use_replica(db.info.get("client")):
+        return query(db)
+    with ReadSessionLocal() as read_db:
+        try:
+            result = query(read_db)
+        except OperationalError:
+            logger.exception("Réplique injoignable, lectures sur le primaire pendant %ss", REPLICA_RETRY_SECONDS)
+            write_tracker.mark_replica_down()
+            result = None
+    return result if result is not None else query(db)
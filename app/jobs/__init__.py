@@ -0,0 +1 @@
+# Jobs package (tâches d'exploitation lancées via python -m app.jobs.<nom>)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rétention des activations: partitions mensuelles et archive froide
+
+Sous-commandes:
+    ensure   Crée les partitions du mois courant et des mois suivants
+    archive  Détache les mois plus anciens que la rétention, les écrit en
+             archive compressée puis les supprime de la base
+    list     Liste les mois archivés
+    read     Relit un mois archivé (filtres licence / machine / IP)
+
+Relançable: un mois déjà archivé (manifeste présent) n'est jamais réécrit,
+seule sa suppression est reprise. Sur PostgreSQL, à lancer après
+migrations/004_partition_activations.sql; sans partitions natives
+(SQLite), les mois sont des plages de checked_at purgées par lots, comme
+les mois de activations_legacy (supprimée après son dernier mois).
+
+Usage (cron mensuel, ex. le 1er à 03:00):
+    python -m app.jobs.archive_activations ensure --months-ahead 3
+    python -m app.jobs.archive_activations archive [--retention-months 12] [--dry-run]
+    python -m app.jobs.archive_activations read 2025-01 --license-id 42
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from app.config import settings
+from app.database import engine
+from app.services.activation_archive import (
+    find_archive, list_archived_months, manifest_path, read_archive, write_archive,
+)
+from app.services.activation_partitions import (
+    add_months, month_start, parse_month, partitions_for,
+)
+
+
+def archive_expired(retention_months: int, archive_dir: str, fmt: str, dry_run: bool = False) -> list:
+    """Archive puis supprime chaque mois antérieur à la fenêtre de rétention"""
+    partitions = partitions_for(engine)
+    cutoff = add_months(month_start(datetime.utcnow()), -retention_months)
+    report = []
+
+    for month in partitions.months():
+        if month >= cutoff:
+            break
+        rows = partitions.count(month)
+        entry = {"month": f"{month:%Y-%m}", "rows": rows, "native": partitions.native}
+        if dry_run:
+            report.append(entry)
+            continue
+
+        partitions.detach(month)  # Plus d'écriture ni de lecture applicative sur ce mois
+
+        existing = find_archive(archive_dir, month)
+        if existing is None:
+            manifest = write_archive(partitions.stream(month), archive_dir, month, fmt)
+            if manifest["rows"] != rows:
+                raise RuntimeError(
+                    f"{month:%Y-%m}: {manifest['rows']} lignes archivées pour {rows} en base, suppression annulée"
+                )
+        else:
+            manifest = json.loads(manifest_path(existing).read_text(encoding="utf-8"))
+            if rows > manifest["rows"]:
+                raise RuntimeError(
+                    f"{month:%Y-%m}: {rows} lignes en base mais {manifest['rows']} dans {existing.name}"
+                )
+
+        entry.update(file=manifest["file"], archived_rows=manifest["rows"], bytes=manifest["bytes"],
+                     deleted=partitions.drop(month))
+        report.append(entry)
+        print(f"  {entry['month']}: {entry['archived_rows']} lignes -> {entry['file']} "
+              f"({entry['bytes']:,} octets)", file=sys.stderr)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.archive_activations", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ensure = sub.add_parser("ensure", help="Crée les partitions à venir")
+    ensure.add_argument("--months-ahead", type=int, default=3)
+
+    archive = sub.add_parser("archive", help="Archive et supprime les mois hors rétention")
+    archive.add_argument("--retention-months", type=int, default=settings.ACTIVATION_RETENTION_MONTHS)
+    archive.add_argument("--archive-dir", default=settings.ACTIVATION_ARCHIVE_DIR)
+    archive.add_argument("--format", choices=("ndjson", "parquet"), default=settings.ACTIVATION_ARCHIVE_FORMAT)
+    archive.add_argument("--dry-run", action="store_true", help="Affiche les mois concernés sans rien modifier")
+
+    listing = sub.add_parser("list", help="Liste les mois archivés")
+    listing.add_argument("--archive-dir", default=settings.ACTIVATION_ARCHIVE_DIR)
+
+    read = sub.add_parser("read", help="Relit un mois archivé (NDJSON sur stdout)")
+    read.add_argument("month", type=parse_month, help="Mois au format YYYY-MM")
+    read.add_argument("--archive-dir", default=settings.ACTIVATION_ARCHIVE_DIR)
+    read.add_argument("--license-id", type=int)
+    read.add_argument("--machine-id")
+    read.add_argument("--ip-address")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "ensure":
+        created = partitions_for(engine).ensure_future(args.months_ahead)
+        print(json.dumps({"created": created}, indent=2))
+    elif args.command == "archive":
+        report = archive_expired(args.retention_months, args.archive_dir, args.format, args.dry_run)
+        print(json.dumps({"dry_run": args.dry_run, "months": report}, indent=2))
+    elif args.command == "list":
+        print(json.dumps(list_archived_months(args.archive_dir), indent=2))
+    else:
+        for row in read_archive(args.archive_dir, args.month, args.license_id, args.machine_id, args.ip_address):
+            print(json.dumps(row, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Colonnes d'analyse des statistiques d'usage (heartbeats.usage_stats)
+
+Intègre les heartbeats reçus depuis la passe précédente dans
+USAGE_ANALYTICS_DIR (colonnes NumPy partitionnées par jour), lues par
+GET /api/v1/admin/analytics/usage. Relançable: une passe interrompue est
+reprise au dernier point de reprise.
+
+Le répertoire doit être visible des workers qui servent l'endpoint (même
+machine ou volume partagé). Nécessite numpy.
+
+Usage (cron, ex. toutes les 10 minutes):
+    python -m app.jobs.build_usage_analytics [--chunk-size 20000] [--rebuild]
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+
+from app.services.usage_analytics import DEFAULT_CHUNK_SIZE, build_usage_analytics
+
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.build_usage_analytics", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=None, help="Répertoire des colonnes (défaut: USAGE_ANALYTICS_DIR)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--rebuild", action="store_true", help="Vider le répertoire et tout réintégrer")
+    args = parser.parse_args(argv)
+
+    last_report = [0.0]
+
+    def report(progress):
+        now = time.monotonic()
+        if now - last_report[0] >= PROGRESS_INTERVAL_SECONDS:
+            last_report[0] = now
+            print(f"id <= {progress.last_id}: {progress.scanned} heartbeats intégrés, "
+                  f"{progress.segments} segments, {progress.rows_per_s} lignes/s", file=sys.stderr)
+
+    try:
+        progress = build_usage_analytics(directory=args.directory, chunk_size=args.chunk_size,
+                                         rebuild=args.rebuild, on_progress=report)
+    except RuntimeError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+
+    print(json.dumps(asdict(progress), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
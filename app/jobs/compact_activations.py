@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migration en ligne des activations vers le format compact
+
+Convertit les lignes historiques (message texte complet, outcome NULL) en
+code ValidationOutcome, par tranches d'id et en transactions courtes pour ne
+jamais verrouiller la table. Relançable à tout moment: seules les lignes
+encore à NULL sont touchées.
+
+Prérequis: migrations/003_compact_activations.sql
+
+Usage:
+    python -m app.jobs.compact_activations [--chunk-size 10000] [--sleep 0.05] [--vacuum]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from sqlalchemy import case, func, select, update
+
+from app.database import engine
+from app.models.activation import Activation
+from app.utils.validation_outcome import OUTCOME_MESSAGES, ValidationOutcome
+
+CORRUPT_PREFIX = OUTCOME_MESSAGES[ValidationOutcome.CORRUPT].split("{")[0]
+REVOKED_PREFIX = OUTCOME_MESSAGES[ValidationOutcome.REVOKED].split("{")[0]
+
+
+def conversion_values() -> dict:
+    """Expressions SET de l'UPDATE (évaluées sur les valeurs d'avant mise à jour)"""
+    msg = Activation.validation_message
+    exact = {text: code for code, text in OUTCOME_MESSAGES.items() if "{" not in text}
+
+    outcome = case(
+        *[(msg == text, int(code)) for text, code in exact.items()],
+        (msg.like("Licence valide (%"), int(ValidationOutcome.VALID)),  # Ancien message crypto
+        (msg.like(REVOKED_PREFIX + "%"), int(ValidationOutcome.REVOKED)),
+        (msg.like(CORRUPT_PREFIX + "%"), int(ValidationOutcome.CORRUPT)),
+        (msg.is_(None) & Activation.is_valid, int(ValidationOutcome.VALID)),
+        else_=int(ValidationOutcome.REJECTED),
+    )
+    # Seul le texte non dérivable est conservé, dont la raison de révocation de l'époque
+    # (la raison actuelle de la licence a pu changer: re-révocation, rétablissement)
+    detail = case(
+        (msg.like(CORRUPT_PREFIX + "%"), func.substr(msg, len(CORRUPT_PREFIX) + 1)),
+        (msg.like(REVOKED_PREFIX + "%"), func.nullif(func.substr(msg, len(REVOKED_PREFIX) + 1), "")),
+        (msg.in_(list(exact)) | msg.like("Licence valide (%"), None),
+        else_=msg,
+    )
+    return {"outcome": outcome, "validation_message": detail}
+
+
+def table_size_report(conn) -> dict:
+    """Taille de la table activations et volume du texte libre"""
+    report = {
+        "rows": conn.execute(select(func.count()).select_from(Activation)).scalar(),
+        "legacy_rows": conn.execute(
+            select(func.count()).select_from(Activation).where(Activation.outcome.is_(None))
+        ).scalar(),
+    }
+    if conn.dialect.name == "postgresql":
+        report["table_bytes"] = conn.exec_driver_sql("SELECT pg_relation_size('activations')").scalar()
+        report["total_bytes"] = conn.exec_driver_sql("SELECT pg_total_relation_size('activations')").scalar()
+        report["message_bytes"] = conn.execute(
+            select(func.coalesce(func.sum(func.pg_column_size(Activation.validation_message)), 0))
+        ).scalar()
+    else:
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        report["total_bytes"] = conn.exec_driver_sql("PRAGMA page_count").scalar() * page_size
+        report["message_bytes"] = conn.execute(
+            select(func.coalesce(func.sum(func.length(Activation.validation_message)), 0))
+        ).scalar()
+    return report
+
+
+def compact(chunk_size: int, sleep: float) -> int:
+    """Convertit toutes les lignes historiques; retourne le nombre de lignes modifiées"""
+    with engine.connect() as conn:
+        low, high = conn.execute(
+            select(func.min(Activation.id), func.max(Activation.id)).where(Activation.outcome.is_(None))
+        ).one()
+    if low is None:
+        return 0
+
+    values = conversion_values()
+    converted = 0
+    started = time.perf_counter()
+    for start in range(low, high + 1, chunk_size):
+        # Une transaction par tranche: verrous de ligne courts, WAL étalé
+        with engine.begin() as conn:
+            result = conn.execute(
+                update(Activation)
+                .where(Activation.id >= start, Activation.id < start + chunk_size, Activation.outcome.is_(None))
+                .values(**values)
+            )
+        converted += result.rowcount
+        elapsed = time.perf_counter() - started
+        print(f"  ids {start:>12}-{start + chunk_size - 1:<12} {converted:>12} lignes "
+              f"({converted / elapsed:,.0f} lignes/s)", file=sys.stderr)
+        if sleep:
+            time.sleep(sleep)
+    return converted
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.compact_activations", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--sleep", type=float, default=0.0, help="Pause entre tranches (limite la charge/le lag)")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="VACUUM final (PostgreSQL: l'espace devient réutilisable; SQLite: le fichier rétrécit)")
+    args = parser.parse_args(argv)
+
+    with engine.connect() as conn:
+        before = table_size_report(conn)
+
+    converted = compact(args.chunk_size, args.sleep)
+
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM activations" if engine.dialect.name == "postgresql" else "VACUUM")
+
+    with engine.connect() as conn:
+        after = table_size_report(conn)
+
+    print(json.dumps({"converted": converted, "before": before, "after": after}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
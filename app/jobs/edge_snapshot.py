@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Snapshot de validation des validateurs edge
+
+Sur le serveur principal (cron), exporter le snapshot signé puis le copier
+vers les validateurs; sur un validateur, envoyer les vérifications en file
+dès que la base principale est joignable.
+
+Usage:
+    python -m app.jobs.edge_snapshot export [--output snapshots/licenses.snap]
+    python -m app.jobs.edge_snapshot inspect [--path snapshots/licenses.snap] [--key <license_key>]
+    python -m app.jobs.edge_snapshot upload-activations [--spool-dir spool/activations]
+
+Copie vers un validateur (le renommage final rend le remplacement atomique):
+    rsync snapshots/licenses.snap edge:/srv/license-server/snapshots/.licenses.snap.new
+    ssh edge mv /srv/license-server/snapshots/.licenses.snap.new /srv/license-server/snapshots/licenses.snap
+"""
+
+import argparse
+import json
+import sys
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.activation_spool import upload_spool
+from app.services.validation_snapshot import ValidationSnapshot, export_snapshot
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.edge_snapshot", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Écrire le snapshot de toutes les licences")
+    export.add_argument("--output", default=settings.VALIDATION_SNAPSHOT_PATH)
+
+    inspect = commands.add_parser("inspect", help="Vérifier un snapshot (signature, en-tête)")
+    inspect.add_argument("--path", default=settings.VALIDATION_SNAPSHOT_PATH)
+    inspect.add_argument("--key", help="Afficher l'entrée d'une clé de licence")
+
+    upload = commands.add_parser("upload-activations", help="Envoyer les vérifications en file vers la base")
+    upload.add_argument("--spool-dir", default=settings.ACTIVATION_SPOOL_DIR)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "inspect":
+        snapshot = ValidationSnapshot(args.path)
+        result = {
+            "path": args.path,
+            "licenses": snapshot.count,
+            "generated_at": snapshot.generated_at.isoformat() if snapshot.generated_at else None,
+            "high_water": snapshot.high_water.isoformat() if snapshot.high_water else None,
+            "license_types": snapshot.license_types,
+        }
+        if args.key:
+            entry = snapshot.lookup(args.key)
+            result["entry"] = entry._asdict() if entry else None
+        print(json.dumps(result, indent=2, default=str))
+        return 0
+
+    db = SessionLocal()
+    try:
+        if args.command == "export":
+            result = export_snapshot(db, args.output)
+        else:
+            result = upload_spool(db, args.spool_dir)
+    finally:
+        db.close()
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import en masse de licences existantes depuis un fichier CSV ou NDJSON
+
+Champs: email, machine_id, license_type, expiry (date ISO, vide = sans
+expiration), customer_name, company_name et max_seats (licence multi-postes)
+facultatifs. Fichiers .gz acceptés.
+
+Les enregistrements invalides ou déjà présents (même email et même machine)
+sont écrits dans le fichier de rejets (NDJSON, avec numéro de ligne et
+erreurs). Relançable: un enregistrement déjà importé est rejeté comme doublon.
+
+Usage:
+    python -m app.jobs.import_licenses licences.csv [--format csv|ndjson]
+                                       [--workers 8] [--batch-size 1000]
+                                       [--errors licences.csv.rejects.ndjson]
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+
+from app.services.license_import import DEFAULT_BATCH_SIZE, FORMATS, import_licenses
+
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.import_licenses", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Fichier à importer")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Défaut: d'après l'extension")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de génération des clés (défaut: nombre de cœurs)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--errors", default=None, help="Fichier des rejets (défaut: <path>.rejects.ndjson)")
+    args = parser.parse_args(argv)
+
+    last_report = [0.0]
+
+    def report(progress):
+        now = time.monotonic()
+        if now - last_report[0] >= PROGRESS_INTERVAL_SECONDS:
+            last_report[0] = now
+            print(f"{progress.read} lues: {progress.imported} importées, {progress.duplicates} doublons, "
+                  f"{progress.invalid} invalides, {progress.rows_per_s} lignes/s", file=sys.stderr)
+
+    try:
+        progress = import_licenses(args.path, file_format=args.format, errors_path=args.errors,
+                                   workers=args.workers, batch_size=args.batch_size, on_progress=report)
+    except (OSError, ValueError) as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+
+    print(json.dumps(asdict(progress), indent=2))
+    return 0 if not progress.invalid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Création du schéma (tables manquantes) avant le démarrage de l'API
+
+L'API ne crée plus les tables à l'import: avec plusieurs workers uvicorn,
+chaque worker lançait create_all en parallèle au démarrage. Cette étape
+s'exécute une seule fois, avant uvicorn (CMD du Dockerfile, déploiement VPS).
+
+Seules les tables absentes sont créées (installation neuve); les
+modifications de tables existantes passent par migrations/*.sql.
+En développement (ENVIRONMENT=development), l'API crée encore les tables
+manquantes au démarrage.
+
+Usage:
+    python -m app.jobs.init_schema [--check]
+"""
+
+import argparse
+import json
+import sys
+
+from sqlalchemy import inspect
+
+from app.database import Base, engine
+import app.models  # noqa: F401  (enregistre les tables dans Base.metadata)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.init_schema", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true",
+                        help="Lister les tables manquantes sans les créer (code 1 s'il en manque)")
+    args = parser.parse_args(argv)
+
+    existing = set(inspect(engine).get_table_names())
+    missing = [table.name for table in Base.metadata.sorted_tables if table.name not in existing]
+
+    if not args.check and missing:
+        Base.metadata.create_all(bind=engine)
+
+    print(json.dumps({
+        "database": engine.dialect.name,
+        "missing" if args.check else "created": missing,
+    }, indent=2))
+    return 1 if args.check and missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Réconciliation des compteurs de licences
+
+Recalcule les agrégats complets (parcours de la table licenses) et corrige
+l'écart des compteurs. À lancer une première fois après
+migrations/006_license_counters.sql pour initialiser les compteurs, puis
+en cron (service `stats` de docker-compose): un seul processus à la fois,
+l'écart est appliqué comme un incrément. La réconciliation intégrée à
+l'API (STATS_RECONCILE_INTERVAL_SECONDS) est réservée à un worker unique.
+
+Usage:
+    python -m app.jobs.reconcile_stats
+"""
+
+import argparse
+import json
+import sys
+
+from app.database import SessionLocal
+from app.services.stats import read_stats, reconcile
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.reconcile_stats", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        drift = reconcile(db)
+        stats = read_stats(db)
+    finally:
+        db.close()
+
+    print(json.dumps({"corrected": drift, "stats": stats}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Re-chiffrement de toutes les clés de licence avec la nouvelle LICENSE_SECRET_KEY
+
+Rotation:
+    1. LICENSE_SECRET_KEY=<nouvelle clé>, LICENSE_SECRET_KEYS_OLD=<ancienne clé>
+       puis redémarrage des workers (anciennes et nouvelles clés acceptées)
+    2. python -m app.jobs.rekey_licenses (relançable: reprend au point de reprise)
+    3. Nouveau snapshot des validateurs edge (app.jobs.edge_snapshot export)
+
+previous_license_key garde la clé d'origine, chiffrée avec l'ancienne
+LICENSE_SECRET_KEY: elle ne se déchiffre qu'avec LICENSE_SECRET_KEYS_OLD.
+Un client qui la présente reçoit sa nouvelle clé dans la réponse de
+/validate et /heartbeat (champ license_key) et doit l'enregistrer. Retirer
+l'ancienne clé de LICENSE_SECRET_KEYS_OLD seulement quand plus aucun client
+ne présente de clé d'avant rotation: les autres seraient refusés (clé
+corrompue).
+
+Prérequis: migrations/011_license_key_rotation.sql
+
+Usage:
+    python -m app.jobs.rekey_licenses [--workers 8] [--chunk-size 2000]
+                                      [--checkpoint rekey.checkpoint.json] [--restart]
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+
+from app.services.license_rekey import DEFAULT_CHUNK_SIZE, rekey_licenses
+
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.rekey_licenses", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="Processus de calcul (défaut: nombre de cœurs)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--checkpoint", default="rekey.checkpoint.json", help="Fichier de reprise")
+    parser.add_argument("--restart", action="store_true", help="Ignorer le point de reprise existant")
+    args = parser.parse_args(argv)
+
+    last_report = [0.0]
+
+    def report(progress):
+        now = time.monotonic()
+        if now - last_report[0] >= PROGRESS_INTERVAL_SECONDS:
+            last_report[0] = now
+            print(f"id <= {progress.last_id}: {progress.scanned} examinées, {progress.rekeyed} re-chiffrées, "
+                  f"{progress.invalid} illisibles, {progress.rows_per_s} lignes/s", file=sys.stderr)
+
+    try:
+        progress = rekey_licenses(workers=args.workers, chunk_size=args.chunk_size,
+                                  checkpoint_path=args.checkpoint, restart=args.restart, on_progress=report)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+
+    print(json.dumps(asdict(progress), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Révocation en masse des licences (ligne de commande)
+
+Même traitement que POST /api/v1/admin/revocations: UPDATE par tranches,
+trace d'audit, publication dans le flux d'invalidations. Relançable: les
+licences déjà révoquées sont ignorées.
+
+Prérequis: migrations/009_revocations.sql
+
+Usage:
+    python -m app.jobs.revoke_licenses revoke --reason "Fuite lot R-2025-03" --batch-id R-2025-03 --dry-run
+    python -m app.jobs.revoke_licenses revoke --reason "Chargebacks" --emails-file emails.txt
+    python -m app.jobs.revoke_licenses prune-feed [--days 30]
+"""
+
+import argparse
+import getpass
+import json
+import sys
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.revocation import DEFAULT_CHUNK_SIZE, RevocationCriteria, prune_invalidations, revoke_licenses
+
+
+def read_lines(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.revoke_licenses", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    revoke = sub.add_parser("revoke", help="Révoque les licences correspondant aux critères (combinés par ET)")
+    revoke.add_argument("--reason", required=True)
+    revoke.add_argument("--emails-file", help="Un email par ligne")
+    revoke.add_argument("--stripe-customer-id")
+    revoke.add_argument("--created-from", type=datetime.fromisoformat)
+    revoke.add_argument("--created-to", type=datetime.fromisoformat)
+    revoke.add_argument("--batch-id", help="Lot de codes d'activation")
+    revoke.add_argument("--ids-file", help="Un id de licence par ligne")
+    revoke.add_argument("--actor", default=f"cli:{getpass.getuser()}")
+    revoke.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    revoke.add_argument("--dry-run", action="store_true", help="Compte les licences visées sans rien modifier")
+
+    prune = sub.add_parser("prune-feed", help="Purge les anciennes entrées du flux d'invalidations")
+    prune.add_argument("--days", type=int, default=settings.INVALIDATION_RETENTION_DAYS)
+
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "prune-feed":
+            deleted = prune_invalidations(db, datetime.utcnow() - timedelta(days=args.days))
+            print(json.dumps({"deleted": deleted}, indent=2))
+            return 0
+
+        criteria = RevocationCriteria(
+            emails=read_lines(args.emails_file) if args.emails_file else [],
+            stripe_customer_id=args.stripe_customer_id,
+            created_from=args.created_from,
+            created_to=args.created_to,
+            batch_id=args.batch_id,
+            license_ids=[int(value) for value in read_lines(args.ids_file)] if args.ids_file else [],
+        )
+        try:
+            audit = revoke_licenses(db, criteria, args.reason, args.actor,
+                                    dry_run=args.dry_run, chunk_size=args.chunk_size)
+        except ValueError as e:
+            parser.error(str(e))
+
+        print(json.dumps({
+            "audit_id": audit.id,
+            "dry_run": audit.dry_run,
+            "matched": audit.matched,
+            "revoked": audit.revoked,
+        }, indent=2))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
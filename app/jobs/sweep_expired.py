@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Balayage ponctuel des licences expirées
+
+Chemin par défaut de l'expiration (le balayeur intégré à l'API,
+EXPIRY_SWEEPER_ENABLED, est désactivé par défaut: un par worker uvicorn).
+Affiche ensuite la répartition des statuts.
+
+Prérequis: migrations/005_license_expiry.sql
+
+Usage:
+    python -m app.jobs.sweep_expired [--batch-size 500]
+"""
+
+import argparse
+import json
+import sys
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.expiry_sweeper import license_status_counts, sweep_expired
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.sweep_expired", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=settings.EXPIRY_SWEEP_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        swept = sweep_expired(db, batch_size=args.batch_size)
+        counts = license_status_counts(db)
+    finally:
+        db.close()
+
+    print(json.dumps({"expired_now": swept, "status": counts}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
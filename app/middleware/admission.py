@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Contrôle d'admission devant le pool de connexions
+
+Middleware ASGI pur: chaque requête est rattachée à une classe de route
+(validate, heartbeat, trial, payment, admin, webhook). Chaque classe a une limite de
+requêtes simultanées ajustée en AIMD: +1 par "limite" réponses rapides tant
+que la limite est utilisée, x0,9 (au plus une fois par fenêtre de latence
+cible) quand une réponse dépasse la latence cible ou échoue en 5xx.
+
+En plus de sa propre limite, une classe ne peut occuper qu'une part de la
+capacité globale (ADMISSION_MAX_INFLIGHT, par défaut la taille du pool):
+à saturation, les classes de faible priorité (admin, heartbeat, trial) sont
+refusées les premières, puis validate; les paiements gardent toute la capacité.
+Les webhooks Stripe ne sont jamais refusés (mais occupent la capacité).
+
+Refus: 503 avec Retry-After, immédiatement, au lieu d'attendre une
+connexion jusqu'au délai du pool puis d'échouer en 500.
+"""
+
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    share: float              # Part maximale de la capacité globale
+    target_latency: float     # Secondes: au-delà, la limite de la classe diminue
+    retry_after: int          # Secondes annoncées au client refusé
+    shed: bool = True         # False: toujours admise (webhooks)
+
+
+WEBHOOK = RouteClass("webhook", 1.0, 5.0, 0, shed=False)
+PAYMENT = RouteClass("payment", 1.0, 3.0, 2)
+VALIDATE = RouteClass("validate", 0.9, 0.5, 1)
+HEARTBEAT = RouteClass("heartbeat", 0.5, 0.5, 60)  # Périodique: le client renvoie au prochain intervalle
+TRIAL = RouteClass("trial", 0.6, 1.0, 5)
+ADMIN = RouteClass("admin", 0.5, 5.0, 10)
+ROUTE_CLASSES = (WEBHOOK, PAYMENT, VALIDATE, HEARTBEAT, TRIAL, ADMIN)
+
+MIN_LIMIT = 2
+BACKOFF = 0.9
+
+
+def route_class(path: str) -> Optional[RouteClass]:
+    """Classe d'une route; None pour les routes sans base de données (/, /health, docs)"""
+    prefix = settings.API_V1_PREFIX
+    if path == "/api/stripe/webhook":
+        return WEBHOOK
+    if path.startswith(f"{prefix}/licenses/validate"):
+        return VALIDATE
+    if path.startswith(f"{prefix}/licenses/heartbeat"):
+        return HEARTBEAT
+    if path.startswith(f"{prefix}/licenses/trial"):
+        return TRIAL
+    if path.startswith(f"{prefix}/admin"):
+        return ADMIN
+    if path.startswith("/api/") and not path.startswith(f"{prefix}/"):
+        return PAYMENT
+    return None
+
+
+class AdaptiveLimit:
+    """Limite AIMD d'une classe de route (état modifié uniquement depuis la boucle d'événements)"""
+
+    def __init__(self, route: RouteClass, initial: float, maximum: float):
+        self.route = route
+        self.limit = initial
+        self.maximum = maximum
+        self.inflight = 0
+        self.admitted = 0
+        self.shed = 0
+        self._last_decrease = 0.0
+
+    def on_complete(self, latency: float, failed: bool, inflight_at_start: int) -> None:
+        now = time.monotonic()
+        if failed or latency > self.route.target_latency:
+            # Une seule baisse par fenêtre: les requêtes lentes d'une même rafale ne comptent qu'une fois
+            if now - self._last_decrease >= self.route.target_latency:
+                self.limit = max(MIN_LIMIT, self.limit * BACKOFF)
+                self._last_decrease = now
+        elif inflight_at_start * 2 >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+
+class AdmissionController:
+    """État partagé du middleware (limites par classe, requêtes en cours)"""
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or settings.ADMISSION_MAX_INFLIGHT or (
+            settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        )
+        self.inflight = 0
+        self.limits: Dict[str, AdaptiveLimit] = {
+            route.name: AdaptiveLimit(route, initial=max(MIN_LIMIT, self.capacity * route.share),
+                                      maximum=max(MIN_LIMIT, self.capacity))
+            for route in ROUTE_CLASSES
+        }
+
+    def try_admit(self, route: RouteClass) -> bool:
+        limit = self.limits[route.name]
+        if route.shed and (limit.inflight >= int(limit.limit) or self.inflight >= self.capacity * route.share):
+            limit.shed += 1
+            return False
+        limit.inflight += 1
+        limit.admitted += 1
+        self.inflight += 1
+        return True
+
+    def release(self, route: RouteClass, latency: float, failed: bool, inflight_at_start: int) -> None:
+        limit = self.limits[route.name]
+        limit.inflight -= 1
+        self.inflight -= 1
+        limit.on_complete(latency, failed, inflight_at_start)
+
+    def snapshot(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "inflight": self.inflight,
+            "classes": {
+                name: {"limit": round(limit.limit, 2), "inflight": limit.inflight,
+                       "admitted": limit.admitted, "shed": limit.shed}
+                for name, limit in self.limits.items()
+            },
+        }
+
+
+# Instance globale
+admission_controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI: admet, refuse (503 + Retry-After) et mesure chaque requête HTTP"""
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        route = route_class(scope["path"]) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.controller.try_admit(route):
+            await self._reject(route, send)
+            return
+
+        inflight_at_start = self.controller.limits[route.name].inflight
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.controller.release(route, time.monotonic() - started, status["code"] >= 500, inflight_at_start)
+
+    @staticmethod
+    async def _reject(route: RouteClass, send) -> None:
+        body = json.dumps({
+            "success": False,
+            "error": "Service momentanément saturé, réessayez plus tard",
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(route.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
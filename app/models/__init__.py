@@ -1,7 +1,16 @@
 # Models package
 from app.models.license import License
 from app.models.activation import Activation
+from app.models.activation_summary import ActivationSummary
 from app.models.heartbeat import Heartbeat
 from app.models.activation_code import ActivationCode
+from app.models.license_counter import LicenseCounter
+from app.models.revocation import RevocationAudit, LicenseInvalidation
+from app.models.seat_lease import SeatLease
+from app.models.sharing import SharingSketch, SharingAlert
+from app.models.idempotency import IdempotencyRecord
+from app.utils.validation_outcome import ValidationOutcome
 
-__all__ = ["License", "Activation", "Heartbeat", "ActivationCode"]
+__all__ = ["License", "Activation", "ValidationOutcome", "ActivationSummary", "Heartbeat", "ActivationCode", "LicenseCounter",
+           "RevocationAudit", "LicenseInvalidation", "SeatLease",
+           "SharingSketch", "SharingAlert", "IdempotencyRecord"]
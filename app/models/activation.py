@@ -4,10 +4,11 @@
 Modèle Activation - Enregistre chaque vérification de licence
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, SmallInteger, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
+from app.utils.validation_outcome import ValidationOutcome, outcome_message
 
 
 class Activation(Base):
@@ -16,17 +17,17 @@ class Activation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    # Référence à la licence
-    license_id = Column(Integer, ForeignKey("licenses.id"), nullable=False, index=True)
+    # Référence à la licence (NULL si la clé n'a pas pu être rattachée à une licence)
+    license_id = Column(Integer, ForeignKey("licenses.id"), nullable=True, index=True)
 
     # Informations de vérification
     machine_id = Column(String(64), nullable=False, index=True)
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
-    user_agent = Column(String(255), nullable=True)
 
     # Résultat de la vérification
     is_valid = Column(Boolean, nullable=False)
-    validation_message = Column(Text, nullable=True)
+    outcome = Column(SmallInteger, nullable=True)  # ValidationOutcome (NULL = ligne historique non convertie)
+    validation_message = Column(Text, nullable=True)  # Texte libre uniquement s'il n'est pas dérivable du code
 
     # Timestamp
     checked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -34,5 +35,22 @@ class Activation(Base):
     # Relation
     license = relationship("License", back_populates="activations")
 
+    __table_args__ = (
+        # Historique d'une licence, du plus récent au plus ancien (timeline admin).
+        # PostgreSQL: colonnes affichées incluses -> parcours d'index seul, sans accès à la table
+        Index(
+            "ix_activations_license_checked", license_id, checked_at.desc(), id.desc(),
+            postgresql_include=["machine_id", "ip_address", "is_valid", "outcome", "validation_message"],
+        ),
+    )
+
+    @property
+    def message(self) -> str:
+        """Message de validation reconstruit à partir du code (REVOKED: raison stockée, sinon raison actuelle)"""
+        if self.outcome is None:
+            return self.validation_message  # Ligne historique
+        revoked_reason = self.license.revoked_reason if self.outcome == ValidationOutcome.REVOKED and self.license else None
+        return outcome_message(self.outcome, self.validation_message, revoked_reason)
+
     def __repr__(self):
         return f"<Activation(id={self.id}, license_id={self.license_id}, valid={self.is_valid})>"
@@ -5,7 +5,7 @@ Modèle ActivationCode - Codes d'activation pré-générés (Phase 4)
 Pour vente via revendeurs ou activation offline
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Index, text
 from datetime import datetime
 from app.database import Base
 
@@ -36,5 +36,14 @@ class ActivationCode(Base):
     batch_id = Column(String(50), nullable=True, index=True)  # Pour grouper les codes
     notes = Column(Text, nullable=True)
 
+    __table_args__ = (
+        # Révocation par lot: machines ayant utilisé un code du lot
+        Index(
+            "ix_activation_codes_batch_machine", "batch_id", "used_by_machine_id",
+            postgresql_where=text("is_used"),
+            sqlite_where=text("is_used = 1"),
+        ),
+    )
+
     def __repr__(self):
         return f"<ActivationCode(id={self.id}, code={self.code}, used={self.is_used})>"
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèle ActivationSummary - Compteurs journaliers des vérifications de licence
+Mode coalescé: une ligne par (licence, machine, IP, résultat, jour)
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, SmallInteger, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class ActivationSummary(Base):
+    """Table des résumés d'activations (upsert à chaque vérification)"""
+    __tablename__ = "activation_summaries"
+    __table_args__ = (
+        UniqueConstraint(
+            "license_id", "machine_id", "ip_address", "outcome", "day",
+            name="uq_activation_summaries_key"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Clé de regroupement
+    license_id = Column(Integer, ForeignKey("licenses.id", ondelete="CASCADE"), nullable=False, index=True)
+    machine_id = Column(String(64), nullable=False)
+    ip_address = Column(String(45), nullable=False, default="")  # '' si inconnue (NULL casserait l'unicité)
+    outcome = Column(SmallInteger, nullable=False)  # ValidationOutcome
+    day = Column(Date, nullable=False, index=True)
+
+    # Compteurs
+    hit_count = Column(Integer, nullable=False, default=1)
+    first_seen = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_seen = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ActivationSummary(license_id={self.license_id}, day={self.day}, hits={self.hit_count})>"
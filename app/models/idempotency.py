@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèle IdempotencyRecord - Réponses des requêtes rejouables (en-tête Idempotency-Key)
+Une ligne par clé client et par endpoint: réservée avant l'exécution, puis
+complétée par la réponse renvoyée telle quelle aux nouvelles tentatives
+(app.services.idempotency).
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from datetime import datetime
+from app.database import Base
+
+
+class IdempotencyRecord(Base):
+    """Table des clés d'idempotence (purgées après IDEMPOTENCY_TTL_SECONDS)"""
+    __tablename__ = "idempotency_keys"
+
+    key_digest = Column(String(32), primary_key=True)  # BLAKE2b (endpoint, Idempotency-Key)
+    request_hash = Column(String(32), nullable=False)  # BLAKE2b du corps: une clé ne sert qu'à une requête
+
+    status_code = Column(Integer, nullable=True)  # NULL: exécution en cours
+    body = Column(LargeBinary, nullable=True)  # Corps JSON renvoyé
+
+    claimed_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Reprise d'une exécution abandonnée
+    expires_at = Column(DateTime, nullable=False, index=True)  # Purge
+
+    def __repr__(self):
+        return f"<IdempotencyRecord(key_digest={self.key_digest[:12]}, status_code={self.status_code})>"
@@ -4,7 +4,7 @@
 Modèle License - Représente une licence générée
 """
 
-from sqlalchemy import Column, String, DateTime, Integer, Boolean, Text
+from sqlalchemy import Column, String, DateTime, Integer, Boolean, Text, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -26,12 +26,15 @@ class License(Base):
 
     # Type de licence
     license_type = Column(String(50), nullable=False)  # trial, monthly, annual, lifetime, etc.
+    max_seats = Column(Integer, nullable=True)  # Licence multi-postes: machines actives simultanées (NULL = liée à machine_id)
 
     # Clé de licence (chiffrée)
     license_key = Column(Text, nullable=False, unique=True)
+    previous_license_key = Column(Text, nullable=True)  # Clé d'avant rotation, encore détenue par le client
 
     # Dates
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
     expires_at = Column(DateTime, nullable=True, index=True)  # NULL pour lifetime
 
     # Statut
@@ -39,6 +42,7 @@ class License(Base):
     is_revoked = Column(Boolean, default=False, nullable=False)
     revoked_at = Column(DateTime, nullable=True)
     revoked_reason = Column(Text, nullable=True)
+    expired_at = Column(DateTime, nullable=True)  # Passage à inactive par le balayeur d'expiration
 
     # Métadonnées
     notes = Column(Text, nullable=True)  # Notes admin
@@ -54,5 +58,36 @@ class License(Base):
     activations = relationship("Activation", back_populates="license", cascade="all, delete-orphan")
     heartbeats = relationship("Heartbeat", back_populates="license", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Licences bloquées non expirées: chargement initial du cache de révocation des workers
+        Index(
+            "ix_licenses_blocked", "id",
+            postgresql_where=text("is_revoked OR (NOT is_active AND expired_at IS NULL)"),
+            sqlite_where=text("is_revoked = 1 OR (is_active = 0 AND expired_at IS NULL)"),
+        ),
+        # Validation d'une clé d'avant rotation (app.jobs.rekey_licenses): seules les lignes re-chiffrées
+        Index(
+            "ix_licenses_previous_license_key", "previous_license_key", unique=True,
+            postgresql_where=text("previous_license_key IS NOT NULL"),
+            sqlite_where=text("previous_license_key IS NOT NULL"),
+        ),
+        # Pagination par clé de la recherche admin: ORDER BY created_at DESC, id DESC
+        Index("ix_licenses_created_at_id", "created_at", "id"),
+        # Licences actives à expirer: seul index lu par le balayeur, il rétrécit à chaque passage
+        Index(
+            "ix_licenses_expiry_pending", "expires_at",
+            postgresql_where=text("is_active AND expires_at IS NOT NULL"),
+            sqlite_where=text("is_active = 1 AND expires_at IS NOT NULL"),
+        ),
+        # Webhook Stripe (app.services.customer_identity): email normalisé, plus ancienne licence d'abord
+        Index("ix_licenses_email_lower", text("lower(email)"), "id"),
+        # Achats landing page pas encore liés à une machine (~3 % des lifetime), par email normalisé
+        Index(
+            "ix_licenses_pending_link_email", text("lower(email)"), "id",
+            postgresql_where=text("machine_id LIKE 'PENDING_LINK_%'"),
+            sqlite_where=text("machine_id LIKE 'PENDING_LINK_%'"),
+        ),
+    )
+
     def __repr__(self):
         return f"<License(id={self.id}, email={self.email}, type={self.license_type})>"
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèle LicenseCounter - Compteurs de licences et de revenus maintenus en continu
+Chaque compteur est réparti sur plusieurs lignes (shards) pour limiter la
+contention des écritures concurrentes; sa valeur est la somme des shards.
+"""
+
+from sqlalchemy import Column, String, SmallInteger, BigInteger, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class LicenseCounter(Base):
+    """Table des compteurs (ex. type:trial, stripe:paid, revenue:EUR, status:active)"""
+    __tablename__ = "license_counters"
+
+    name = Column(String(64), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<LicenseCounter(name={self.name}, shard={self.shard}, value={self.value})>"
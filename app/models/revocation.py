@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèles de révocation
+- RevocationAudit: trace de chaque révocation en masse (qui, quoi, combien)
+- LicenseInvalidation: flux ordonné des clés révoquées, lu par les workers
+  (caches de validation, émetteurs de baux signés)
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from datetime import datetime
+from app.database import Base
+
+
+class RevocationAudit(Base):
+    """Table d'audit des révocations en masse"""
+    __tablename__ = "revocation_audits"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    actor = Column(String(255), nullable=False)  # Admin (API) ou utilisateur système (CLI)
+    reason = Column(Text, nullable=False)
+    criteria = Column(Text, nullable=False)  # JSON des critères de sélection
+    dry_run = Column(Boolean, default=False, nullable=False)
+
+    # Résultat
+    matched = Column(Integer, default=0, nullable=False)  # Licences correspondant aux critères
+    revoked = Column(Integer, default=0, nullable=False)  # Licences effectivement révoquées
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)  # NULL = en cours ou interrompue
+
+    def __repr__(self):
+        return f"<RevocationAudit(id={self.id}, actor={self.actor}, revoked={self.revoked})>"
+
+
+class LicenseInvalidation(Base):
+    """Flux des invalidations: l'id croissant sert de position de lecture"""
+    __tablename__ = "license_invalidations"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    license_id = Column(Integer, ForeignKey("licenses.id", ondelete="CASCADE"), nullable=False)
+    key_digest = Column(String(64), nullable=False)  # SHA-256 de la clé (jamais la clé elle-même)
+    reason = Column(Text, nullable=True)
+    audit_id = Column(Integer, ForeignKey("revocation_audits.id"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<LicenseInvalidation(id={self.id}, license_id={self.license_id})>"
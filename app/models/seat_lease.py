@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèle SeatLease - Postes actifs des licences multi-postes
+Une ligne par (licence, machine), last_seen avancé à chaque validation ou
+heartbeat; partagée entre les workers (app.services.seat_tracker), qui
+décident en mémoire.
+"""
+
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Sequence
+from datetime import datetime
+from app.database import Base
+
+
+class SeatLease(Base):
+    """Table des baux de postes (fenêtre glissante SEAT_WINDOW_SECONDS)"""
+    __tablename__ = "seat_leases"
+
+    license_id = Column(Integer, ForeignKey("licenses.id", ondelete="CASCADE"), primary_key=True)
+    machine_id = Column(String(64), primary_key=True)
+
+    first_seen = Column(DateTime, default=datetime.utcnow, nullable=False)  # Départage des dépassements
+    last_seen = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # Purge des baux expirés
+    # Numéro de modification (séquence), renouvelé à chaque publication: relecture incrémentale
+    change_id = Column(BigInteger, Sequence("seat_leases_change_id_seq"), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SeatLease(license_id={self.license_id}, machine_id={self.machine_id}, last_seen={self.last_seen})>"
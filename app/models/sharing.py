@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modèles de détection du partage de licences
+- SharingSketch: esquisses HyperLogLog (machines, IP, réseaux /24) d'une clé
+  par tranche de temps, fusionnées entre les workers
+- SharingAlert: clé utilisée depuis trop de machines ou de réseaux
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary, Index, text
+from datetime import datetime
+from app.database import Base
+
+
+class SharingSketch(Base):
+    """Table des esquisses (une ligne par clé et par tranche de la fenêtre glissante)"""
+    __tablename__ = "license_sharing_sketches"
+
+    key_digest = Column(String(64), primary_key=True)  # SHA-256 de la clé (jamais la clé elle-même)
+    bucket_start = Column(DateTime, primary_key=True, index=True)  # Début de tranche (purge par tranche)
+
+    machines = Column(LargeBinary, nullable=False)
+    ips = Column(LargeBinary, nullable=False)
+    subnets = Column(LargeBinary, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<SharingSketch(key_digest={self.key_digest[:12]}, bucket_start={self.bucket_start})>"
+
+
+class SharingAlert(Base):
+    """Table des alertes de partage (une alerte ouverte au plus par clé)"""
+    __tablename__ = "license_sharing_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    license_id = Column(Integer, ForeignKey("licenses.id", ondelete="CASCADE"), nullable=True, index=True)
+    key_digest = Column(String(64), nullable=False, index=True)
+
+    # Estimations sur la fenêtre (HyperLogLog: exactes jusqu'à quelques dizaines, ±3 % au-delà)
+    distinct_machines = Column(Integer, nullable=False)
+    distinct_ips = Column(Integer, nullable=False)
+    distinct_subnets = Column(Integer, nullable=False)
+    reasons = Column(String(100), nullable=False)  # Seuils franchis: machines, ips, subnets
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    acknowledged_at = Column(DateTime, nullable=True)
+    acknowledged_by = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        # Alerte ouverte d'une clé: mise à jour plutôt qu'une nouvelle alerte à chaque synchronisation
+        Index(
+            "ix_license_sharing_alerts_open", "key_digest", unique=True,
+            postgresql_where=text("acknowledged_at IS NULL"),
+            sqlite_where=text("acknowledged_at IS NULL"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<SharingAlert(id={self.id}, license_id={self.license_id}, reasons={self.reasons})>"
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Schémas Pydantic de l'API d'administration
+"""
+
+from pydantic import BaseModel, EmailStr, Field
+from datetime import date, datetime
+from typing import List, Optional
+
+
+# ============================================
+# RESPONSE SCHEMAS
+# ============================================
+
+class AdminLicense(BaseModel):
+    """Licence vue par le support (sans la clé de licence)"""
+    id: int
+    email: str
+    customer_name: Optional[str] = None
+    company_name: Optional[str] = None
+    machine_id: str
+    license_type: str
+    created_at: datetime
+    expires_at: Optional[datetime] = None
+    is_active: bool
+    is_revoked: bool
+    revoked_at: Optional[datetime] = None
+    expired_at: Optional[datetime] = None
+    stripe_customer_id: Optional[str] = None
+    stripe_session_id: Optional[str] = None
+    amount_paid: Optional[int] = None
+    currency: Optional[str] = None
+
+
+class AdminLicensePage(BaseModel):
+    """Page de résultats; next_cursor à renvoyer tel quel pour la page suivante"""
+    items: List[AdminLicense]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [{
+                    "id": 1042,
+                    "email": "user@example.com",
+                    "machine_id": "a1b2c3d4e5f6g7h8i9j0k1l2m3n4o5p6",
+                    "license_type": "lifetime",
+                    "created_at": "2024-02-15T10:30:00",
+                    "is_active": True,
+                    "is_revoked": False,
+                    "stripe_customer_id": "cus_...",
+                    "amount_paid": 19900,
+                    "currency": "EUR"
+                }],
+                "next_cursor": "MjAyNC0wMi0xNVQxMDozMDowMHwxMDQy"
+            }
+        }
+
+
+class ActivationEntry(BaseModel):
+    """Une vérification de licence"""
+    id: int
+    checked_at: datetime
+    machine_id: str
+    ip_address: Optional[str] = None
+    valid: bool
+    outcome: Optional[str] = None  # Code ValidationOutcome en minuscules (None: ligne historique)
+    message: Optional[str] = None
+
+
+class ActivationDay(BaseModel):
+    """Totaux d'un jour sur toute la période demandée"""
+    day: str
+    total: int
+    valid: int
+    invalid: int
+
+
+class ActivationTimeline(BaseModel):
+    """Timeline paginée des vérifications d'une licence"""
+    license_id: int
+    since: datetime
+    items: List[ActivationEntry]
+    days: List[ActivationDay]
+    next_cursor: Optional[str] = None
+
+
+# ============================================
+# RÉVOCATIONS
+# ============================================
+
+class RevocationRequest(BaseModel):
+    """Révocation en masse: critères combinés par ET, au moins un requis"""
+    reason: str = Field(..., min_length=3, max_length=500)
+    emails: List[EmailStr] = Field(default_factory=list, max_length=50000)
+    stripe_customer_id: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    batch_id: Optional[str] = None
+    license_ids: List[int] = Field(default_factory=list, max_length=50000)
+    dry_run: bool = False
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "reason": "Chargeback vague 2025-03",
+                "stripe_customer_id": "cus_...",
+                "dry_run": True
+            }
+        }
+
+
+class RevocationResult(BaseModel):
+    """Trace d'audit d'une révocation"""
+    id: int
+    actor: str
+    reason: str
+    criteria: dict
+    dry_run: bool
+    matched: int
+    revoked: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class InvalidationEntry(BaseModel):
+    """Clé révoquée publiée dans le flux (empreinte SHA-256, jamais la clé)"""
+    id: int
+    license_id: int
+    key_digest: str
+    reason: Optional[str] = None
+    created_at: datetime
+
+
+class InvalidationFeedPage(BaseModel):
+    """Lot du flux; renvoyer `position` dans `after` pour la suite"""
+    items: List[InvalidationEntry]
+    position: int
+
+
+# ============================================
+# PARTAGE DE LICENCES
+# ============================================
+
+class SharingAlertEntry(BaseModel):
+    """Clé validée depuis trop de machines ou de réseaux (estimations sur la fenêtre)"""
+    id: int
+    license_id: Optional[int] = None  # Absent: clé déchiffrable mais inconnue en base
+    key_digest: str
+    distinct_machines: int
+    distinct_ips: int
+    distinct_subnets: int
+    reasons: List[str]
+    created_at: datetime
+    updated_at: datetime
+    acknowledged_at: Optional[datetime] = None
+    acknowledged_by: Optional[str] = None
+
+
+class SharingAlertPage(BaseModel):
+    """Alertes les plus récemment mises à jour en premier"""
+    items: List[SharingAlertEntry]
+
+
+# ============================================
+# ANALYSE D'USAGE
+# ============================================
+
+class UsagePercentiles(BaseModel):
+    """Distribution d'un compteur pour une version (heartbeats où il est présent)"""
+    app_version: str
+    heartbeats: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+
+
+class FeatureAdoption(BaseModel):
+    """Licences ayant utilisé un compteur (> 0) au moins une fois sur la période"""
+    counter: str
+    licenses: int
+    share: float
+
+
+class UsageCohort(BaseModel):
+    """Licences actives pour la première fois la semaine `week_start`"""
+    week_start: date
+    licenses: int
+    retention: List[float]  # Part encore active chaque semaine suivante (la première vaut 1.0)
+
+
+class UsageReport(BaseModel):
+    """Rapport d'usage sur les jours d'envoi [since, until]"""
+    since: date
+    until: date
+    heartbeats: int
+    licenses: int
+    counter: Optional[str] = None
+    percentiles: List[UsagePercentiles]
+    adoption: List[FeatureAdoption]
+    cohorts: List[UsageCohort]
+    counters: List[str]  # Compteurs présents sur la période
+    built_until_id: int  # Dernier heartbeat intégré (app.jobs.build_usage_analytics)
+    elapsed_ms: float
@@ -5,8 +5,8 @@ Schémas Pydantic pour les licences
 Validation des requêtes/réponses API
 """
 
-from pydantic import BaseModel, EmailStr, Field
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from datetime import datetime, timezone
 from typing import Optional
 
 
@@ -32,6 +32,30 @@ class TrialRequest(BaseModel):
         }
 
 
+class LicenseImportRecord(TrialRequest):
+    """Licence d'une ancienne version d'EasyFacture ou d'un revendeur (app.jobs.import_licenses)"""
+    license_type: str = Field(..., min_length=1, max_length=50)
+    expiry: Optional[datetime] = None  # Absente: licence sans expiration (lifetime)
+    max_seats: Optional[int] = Field(None, ge=1)  # Licence multi-postes (absent: liée à machine_id)
+
+    @field_validator("expiry", mode="before")
+    @classmethod
+    def parse_expiry(cls, value):
+        """Accepte une date seule (2027-01-31) ou une date-heure ISO 8601; vide = sans expiration"""
+        if isinstance(value, str):
+            value = value.strip()
+            return datetime.fromisoformat(value) if value else None
+        return value
+
+    @field_validator("expiry")
+    @classmethod
+    def naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Dates stockées en UTC sans fuseau, comme le reste de la base"""
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
 class ActivateRequest(BaseModel):
     """Requête pour activer une licence"""
     activation_code: str = Field(..., min_length=10)
@@ -63,11 +87,11 @@ class ValidateRequest(BaseModel):
 
 
 class HeartbeatRequest(BaseModel):
-    """Requête heartbeat (Phase 3)"""
-    license_key: str
-    machine_id: str
-    app_version: Optional[str] = None
-    os_info: Optional[str] = None
+    """Requête heartbeat (Phase 3): garde le poste actif sur une licence multi-postes"""
+    license_key: str = Field(..., min_length=100)
+    machine_id: str = Field(..., min_length=32, max_length=64)
+    app_version: Optional[str] = Field(None, max_length=20)
+    os_info: Optional[str] = Field(None, max_length=255)
     usage_stats: Optional[dict] = None
 
 
@@ -140,6 +164,7 @@ class ValidationResponse(BaseModel):
     expires_at: Optional[datetime] = None
     days_remaining: Optional[int] = None
     license_type: Optional[str] = None
+    license_key: Optional[str] = None  # Clé présentée d'avant une rotation: nouvelle clé à enregistrer
 
     class Config:
         json_schema_extra = {
@@ -153,6 +178,27 @@ class ValidationResponse(BaseModel):
         }
 
 
+class HeartbeatResponse(BaseModel):
+    """Réponse heartbeat"""
+    valid: bool
+    message: str
+    seats_in_use: Optional[int] = None  # Licence multi-postes uniquement
+    max_seats: Optional[int] = None
+    next_heartbeat_seconds: Optional[int] = None  # Intervalle conseillé (le poste reste actif SEAT_WINDOW_SECONDS)
+    license_key: Optional[str] = None  # Clé présentée d'avant une rotation: nouvelle clé à enregistrer
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "valid": True,
+                "message": "Poste actif",
+                "seats_in_use": 3,
+                "max_seats": 10,
+                "next_heartbeat_seconds": 300
+            }
+        }
+
+
 class CheckoutSessionResponse(BaseModel):
     """Réponse contenant l'URL de la session Stripe Checkout"""
     success: bool
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archive froide des activations
+
+Un fichier par mois: <dir>/activations-YYYY-MM.ndjson.gz (ou .parquet si
+pyarrow est installé) + un manifeste JSON (nombre de lignes, sha256).
+Écriture dans un fichier temporaire puis renommage atomique: un archivage
+interrompu ne laisse jamais de fichier partiel sous le nom final.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+FORMATS = ("ndjson", "parquet")
+PARQUET_BATCH_SIZE = 50000
+
+
+def archive_path(archive_dir: str, month: date, fmt: str = "ndjson") -> Path:
+    suffix = ".ndjson.gz" if fmt == "ndjson" else ".parquet"
+    return Path(archive_dir) / f"activations-{month:%Y-%m}{suffix}"
+
+
+def manifest_path(path: Path) -> Path:
+    return path.with_name(path.name + ".manifest.json")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_ndjson(rows: Iterable[dict], path: Path) -> int:
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_json_default, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def _write_parquet(rows: Iterable[dict], path: Path) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Le format parquet nécessite pyarrow (pip install pyarrow)")
+
+    count = 0
+    writer = None
+    batch = []
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= PARQUET_BATCH_SIZE:
+                table = pa.Table.from_pylist(batch)
+                writer = writer or pq.ParquetWriter(path, table.schema, compression="zstd")
+                writer.write_table(table)
+                count += len(batch)
+                batch = []
+        if batch or writer is None:
+            table = pa.Table.from_pylist(batch)
+            writer = writer or pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_archive(rows: Iterable[dict], archive_dir: str, month: date, fmt: str = "ndjson") -> dict:
+    """
+    Écrit les lignes d'un mois dans l'archive (flux, mémoire constante)
+
+    Returns:
+        Manifeste: mois, format, fichier, nombre de lignes, taille, sha256
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format d'archive inconnu: {fmt} (attendu: {', '.join(FORMATS)})")
+
+    path = archive_path(archive_dir, month, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+
+    count = _write_ndjson(rows, tmp) if fmt == "ndjson" else _write_parquet(rows, tmp)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    manifest = {
+        "month": f"{month:%Y-%m}",
+        "format": fmt,
+        "file": path.name,
+        "rows": count,
+        "bytes": path.stat().st_size,
+        "sha256": _sha256(path),
+        "archived_at": datetime.utcnow().isoformat(),
+    }
+    manifest_path(path).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def find_archive(archive_dir: str, month: date) -> Optional[Path]:
+    """Archive existante du mois (quel que soit le format), None sinon"""
+    for fmt in FORMATS:
+        path = archive_path(archive_dir, month, fmt)
+        if path.exists() and manifest_path(path).exists():
+            return path
+    return None
+
+
+def list_archived_months(archive_dir: str) -> List[dict]:
+    """Manifestes des mois archivés, du plus ancien au plus récent"""
+    root = Path(archive_dir)
+    if not root.is_dir():
+        return []
+    return sorted(
+        (json.loads(p.read_text(encoding="utf-8")) for p in root.glob("activations-*.manifest.json")),
+        key=lambda m: m["month"],
+    )
+
+
+def read_archive(archive_dir: str, month: date, license_id: Optional[int] = None,
+                 machine_id: Optional[str] = None, ip_address: Optional[str] = None) -> Iterator[dict]:
+    """
+    Relit un mois archivé en filtrant à la volée (enquêtes support)
+
+    Le fichier est parcouru en flux: mémoire constante quelle que soit sa taille.
+    """
+    path = find_archive(archive_dir, month)
+    if path is None:
+        raise FileNotFoundError(f"Aucune archive pour {month:%Y-%m} dans {archive_dir}")
+
+    def matches(row: dict) -> bool:
+        return ((license_id is None or row.get("license_id") == license_id)
+                and (machine_id is None or row.get("machine_id") == machine_id)
+                and (ip_address is None or row.get("ip_address") == ip_address))
+
+    if path.name.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        filters = [(col, "==", val) for col, val in
+                   (("license_id", license_id), ("machine_id", machine_id), ("ip_address", ip_address))
+                   if val is not None]
+        table = pq.read_table(path, filters=filters or None)
+        for batch in table.to_batches():
+            yield from batch.to_pylist()
+        return
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if matches(row):
+                yield row
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Journalisation des vérifications de licence
+Mode complet (une ligne par appel) ou coalescé (compteurs journaliers)
+"""
+
+import random
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.activation import Activation
+from app.models.activation_summary import ActivationSummary
+from app.utils.validation_outcome import OUTCOMES_WITH_DETAIL, ValidationOutcome
+
+LOG_MODE_FULL = "full"
+LOG_MODE_COALESCED = "coalesced"
+
+_SUMMARY_KEY = ["license_id", "machine_id", "ip_address", "outcome", "day"]
+
+
+def _upsert_summary(db: Session, license_id: int, machine_id: str, ip_address: Optional[str],
+                    outcome: ValidationOutcome, now: datetime) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE sur la clé (licence, machine, IP, résultat, jour)"""
+    table = ActivationSummary.__table__
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+    stmt = insert(table).values(
+        license_id=license_id,
+        machine_id=machine_id,
+        ip_address=ip_address or "",
+        outcome=int(outcome),
+        day=now.date(),
+        hit_count=1,
+        first_seen=now,
+        last_seen=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=_SUMMARY_KEY,
+        set_={"hit_count": table.c.hit_count + 1, "last_seen": stmt.excluded.last_seen},
+    )
+    db.execute(stmt)
+
+
+def record_activation(
+    db: Session,
+    license_id: Optional[int],
+    machine_id: str,
+    ip_address: Optional[str],
+    outcome: ValidationOutcome,
+    detail: Optional[str] = None,
+    mode: Optional[str] = None,
+    sample_rate: Optional[float] = None,
+    now: Optional[datetime] = None,
+) -> None:
+    """
+    Enregistre une vérification de licence (sans commit)
+
+    Le message texte n'est pas stocké: il est reconstruit à la lecture à
+    partir du code (voir app.utils.validation_outcome).
+
+    Mode "full": une ligne Activation par appel (comportement historique).
+    Mode "coalesced": upsert d'un compteur journalier pour les licences connues;
+    la ligne brute n'est conservée que pour les échecs, les clés non rattachées
+    à une licence et un échantillon des succès.
+
+    Args:
+        db: Session SQLAlchemy (le commit reste à la charge de l'appelant)
+        license_id: Licence concernée ou None si introuvable
+        machine_id: Machine qui a fait la vérification
+        ip_address: IP du client (optionnelle)
+        outcome: Résultat de la vérification
+        detail: Texte libre (conservé uniquement pour CORRUPT / REJECTED)
+        mode: Force le mode (défaut: settings.ACTIVATION_LOG_MODE)
+        sample_rate: Force le taux d'échantillonnage des succès
+        now: Horodatage de la vérification (défaut: maintenant)
+    """
+    mode = mode or settings.ACTIVATION_LOG_MODE
+    is_valid = outcome == ValidationOutcome.VALID
+    keep_raw = True
+    now = now or datetime.utcnow()
+
+    if mode == LOG_MODE_COALESCED and license_id is not None:
+        _upsert_summary(db, license_id, machine_id, ip_address, outcome, now)
+        if is_valid:
+            rate = settings.ACTIVATION_SUCCESS_SAMPLE_RATE if sample_rate is None else sample_rate
+            keep_raw = random.random() < rate
+
+    if keep_raw:
+        db.add(Activation(
+            license_id=license_id,
+            machine_id=machine_id,
+            ip_address=ip_address,
+            is_valid=is_valid,
+            outcome=int(outcome),
+            validation_message=detail if outcome in OUTCOMES_WITH_DETAIL else None,
+            checked_at=now
+        ))
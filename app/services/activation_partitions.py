@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Partitionnement mensuel de la table activations
+
+- PostgreSQL (après migrations/004): partitions natives RANGE (checked_at),
+  une table activations_YYYY_MM par mois, détachées puis supprimées.
+  Les mois de activations_legacy (historique d'avant migration, mois de la
+  migration compris) sont archivés et purgés comme en émulation; la table
+  est supprimée quand son dernier mois sort de la rétention.
+- SQLite / PostgreSQL non partitionné: émulation, un "mois" est une plage
+  de checked_at (index ix_activations_checked_at), purgée par petits lots
+"""
+
+import re
+from datetime import date, datetime
+from typing import Iterator, List
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Engine
+
+from app.models.activation import Activation
+
+PARTITION_PREFIX = "activations_"
+LEGACY_PARTITION = "activations_legacy"
+DELETE_BATCH_SIZE = 5000
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> tuple:
+    """Bornes [début, fin) d'un mois en datetime"""
+    start = datetime(month.year, month.month, 1)
+    end = datetime.combine(add_months(month, 1), datetime.min.time())
+    return start, end
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+
+def parse_month(value: str) -> date:
+    """'2025-01' -> date(2025, 1, 1)"""
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+class EmulatedPartitions:
+    """Partitions logiques: plages mensuelles d'une table unique"""
+
+    native = False
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def ensure_future(self, months_ahead: int) -> List[str]:
+        return []  # Rien à créer: la table unique accepte toutes les dates
+
+    def months(self) -> List[date]:
+        """Mois présents dans la table (du plus ancien au mois courant)"""
+        with self.engine.connect() as conn:
+            oldest = conn.execute(select(func.min(Activation.checked_at))).scalar()
+        if oldest is None:
+            return []
+        if isinstance(oldest, str):  # SQLite sans conversion de type sur un agrégat
+            oldest = datetime.fromisoformat(oldest)
+        current, last = month_start(oldest), month_start(datetime.utcnow())
+        months = []
+        while current <= last:
+            months.append(current)
+            current = add_months(current, 1)
+        return months
+
+    def count(self, month: date) -> int:
+        """Lignes encore présentes en base pour ce mois"""
+        start, end = month_bounds(month)
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(func.count()).select_from(Activation)
+                .where(Activation.checked_at >= start, Activation.checked_at < end)
+            ).scalar()
+
+    def detach(self, month: date) -> None:
+        pass  # Les lignes restent en place jusqu'à drop()
+
+    def stream(self, month: date, batch_size: int = 5000) -> Iterator[dict]:
+        start, end = month_bounds(month)
+        table = Activation.__table__
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                select(table).where(table.c.checked_at >= start, table.c.checked_at < end).order_by(table.c.id)
+            )
+            for row in result.mappings():
+                yield dict(row)
+
+    def drop(self, month: date) -> int:
+        """Supprime le mois par lots courts (pas de verrou long, pas de transaction géante)"""
+        start, end = month_bounds(month)
+        table = Activation.__table__
+        deleted = 0
+        while True:
+            with self.engine.begin() as conn:
+                ids = select(table.c.id).where(
+                    table.c.checked_at >= start, table.c.checked_at < end
+                ).limit(DELETE_BATCH_SIZE).scalar_subquery()
+                count = conn.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+            deleted += count
+            if count < DELETE_BATCH_SIZE:
+                return deleted
+
+
+class NativePartitions(EmulatedPartitions):
+    """Partitions natives PostgreSQL (table activations PARTITION BY RANGE)"""
+
+    native = True
+
+    def ensure_future(self, months_ahead: int) -> List[str]:
+        """Crée les partitions du mois courant et des `months_ahead` mois suivants"""
+        created = []
+        current = month_start(datetime.utcnow())
+        with self.engine.begin() as conn:
+            existing = set(self._attached(conn))
+            legacy_end = self._legacy_upper_bound(conn)
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                name = partition_name(month)
+                if name in existing or (legacy_end and month < legacy_end):
+                    continue
+                start, end = month_bounds(month)
+                conn.exec_driver_sql(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF activations "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+                created.append(name)
+        return created
+
+    def _attached(self, conn) -> List[str]:
+        return list(conn.exec_driver_sql(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'activations'"
+        ).scalars())
+
+    def _legacy_upper_bound(self, conn):
+        """Premier mois non couvert par activations_legacy (historique d'avant migration)"""
+        bound = conn.exec_driver_sql(
+            "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_class c "
+            f"WHERE c.relname = '{LEGACY_PARTITION}' AND c.relispartition"
+        ).scalar()
+        match = re.search(r"TO \('(\d{4}-\d{2})-01", bound or "")
+        return parse_month(match.group(1)) if match else None
+
+    def _legacy_months(self, conn) -> List[date]:
+        """Mois couverts par activations_legacy, du plus ancien présent au dernier de sa plage"""
+        legacy_end = self._legacy_upper_bound(conn)
+        if legacy_end is None:
+            return []
+        last = add_months(legacy_end, -1)
+        oldest = conn.exec_driver_sql(f"SELECT min(checked_at) FROM {LEGACY_PARTITION}").scalar()
+        current = min(month_start(oldest), last) if oldest is not None else last
+        months = []
+        while current <= last:
+            months.append(current)
+            current = add_months(current, 1)
+        return months
+
+    def _in_legacy(self, month: date) -> bool:
+        with self.engine.connect() as conn:
+            legacy_end = self._legacy_upper_bound(conn)
+        return legacy_end is not None and month < legacy_end
+
+    def _detached(self, conn) -> List[str]:
+        """Partitions détachées mais pas encore supprimées (archivage interrompu)"""
+        attached = set(self._attached(conn))
+        tables = conn.exec_driver_sql(
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() "
+            "AND tablename ~ '^activations_[0-9]{4}_[0-9]{2}$'"
+        ).scalars()
+        return [t for t in tables if t not in attached]
+
+    def months(self) -> List[date]:
+        with self.engine.connect() as conn:
+            names = self._attached(conn) + self._detached(conn)
+            months = set(self._legacy_months(conn))
+        for name in names:
+            suffix = name[len(PARTITION_PREFIX):]
+            try:
+                months.add(datetime.strptime(suffix, "%Y_%m").date())
+            except ValueError:
+                continue  # activations_legacy / activations_default
+        return sorted(months)
+
+    def count(self, month: date) -> int:
+        if self._in_legacy(month):
+            return super().count(month)
+        name = partition_name(month)
+        with self.engine.connect() as conn:
+            exists = conn.exec_driver_sql("SELECT to_regclass(%(name)s) IS NOT NULL", {"name": name}).scalar()
+            return conn.exec_driver_sql(f"SELECT count(*) FROM {name}").scalar() if exists else 0
+
+    def detach(self, month: date) -> None:
+        if self._in_legacy(month):
+            return  # Mois de activations_legacy: purgé par lots dans drop()
+        name = partition_name(month)
+        with self.engine.begin() as conn:
+            if name in self._attached(conn):
+                conn.exec_driver_sql(f"ALTER TABLE activations DETACH PARTITION {name}")
+
+    def stream(self, month: date, batch_size: int = 5000) -> Iterator[dict]:
+        if self._in_legacy(month):
+            yield from super().stream(month, batch_size)  # Élagage: seule activations_legacy est lue
+            return
+        name = partition_name(month)
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).exec_driver_sql(
+                f"SELECT * FROM {name} ORDER BY id"
+            )
+            for row in result.mappings():
+                yield dict(row)
+
+    def drop(self, month: date) -> int:
+        if self._in_legacy(month):
+            deleted = super().drop(month)
+            self._drop_legacy_if_done(month)
+            return deleted
+        name = partition_name(month)
+        with self.engine.begin() as conn:
+            count = conn.exec_driver_sql(f"SELECT count(*) FROM {name}").scalar()
+            conn.exec_driver_sql(f"DROP TABLE {name}")
+        return count
+
+    def _drop_legacy_if_done(self, month: date) -> None:
+        """Dernier mois de activations_legacy purgé: la table vide est détachée puis supprimée"""
+        with self.engine.begin() as conn:
+            if add_months(month, 1) != self._legacy_upper_bound(conn):
+                return
+            remaining = conn.exec_driver_sql(f"SELECT count(*) FROM {LEGACY_PARTITION}").scalar()
+            if remaining:
+                raise RuntimeError(f"{LEGACY_PARTITION}: {remaining} lignes hors des mois archivés, table conservée")
+            conn.exec_driver_sql(f"ALTER TABLE activations DETACH PARTITION {LEGACY_PARTITION}")
+            conn.exec_driver_sql(f"DROP TABLE {LEGACY_PARTITION}")
+
+
+def partitions_for(engine: Engine) -> EmulatedPartitions:
+    """Stratégie native si la table est partitionnée, émulation sinon"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            relkind = conn.exec_driver_sql(
+                "SELECT relkind FROM pg_class WHERE relname = 'activations' "
+                "AND relnamespace = current_schema()::regnamespace"
+            ).scalar()
+        if relkind == "p":
+            return NativePartitions(engine)
+    return EmulatedPartitions(engine)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File d'attente locale des vérifications (validateurs edge)
+
+Sans base de données, chaque vérification est ajoutée en mémoire puis écrite
+chaque seconde dans un segment NDJSON du répertoire ACTIVATION_SPOOL_DIR.
+Le segment en cours porte l'extension .part; il est scellé (renommé en
+.ndjson) au bout de SEGMENT_SECONDS ou à l'arrêt. Seuls les segments
+scellés sont envoyés vers la base principale (upload_spool, lancé par
+python -m app.jobs.edge_snapshot upload-activations).
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.activation_log import record_activation
+from app.utils.validation_outcome import ValidationOutcome
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = 1.0
+SEGMENT_SECONDS = 60
+
+
+class ActivationSpool:
+    """Tampon des vérifications d'un worker edge (un segment .part par processus)"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.ACTIVATION_SPOOL_DIR
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+        self._segment: Optional[str] = None
+        self._segment_started = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, license_id: Optional[int], machine_id: str, ip_address: Optional[str],
+               outcome: ValidationOutcome, detail: Optional[str] = None) -> None:
+        """Ajoute une vérification (aucune entrée/sortie: écrite au prochain flush)"""
+        self._pending.append({
+            "license_id": license_id,
+            "machine_id": machine_id,
+            "ip_address": ip_address,
+            "outcome": int(outcome),
+            "detail": detail,
+            "checked_at": datetime.utcnow().isoformat(),
+        })
+
+    def flush(self, seal: bool = False) -> int:
+        """Écrit les vérifications en attente; scelle le segment s'il est assez ancien"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                if self._segment is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._segment_started = time.time()
+                    self._segment = os.path.join(
+                        self.directory, f"activations-{os.getpid()}-{int(self._segment_started * 1000)}.part")
+                with open(self._segment, "a", encoding="utf-8") as handle:
+                    handle.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in pending))
+            if self._segment and (seal or time.time() - self._segment_started >= SEGMENT_SECONDS):
+                os.replace(self._segment, self._segment[:-len(".part")] + ".ndjson")
+                self._segment = None
+            return len(pending)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(FLUSH_SECONDS)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception:
+                logger.exception("Écriture de la file des vérifications en échec")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush(seal=True)
+
+
+def sealed_segments(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "activations-*.ndjson")))
+
+
+def upload_spool(db: Session, directory: Optional[str] = None) -> dict:
+    """
+    Enregistre les segments scellés dans la base principale puis les supprime
+
+    Un segment = une transaction. Si le processus s'arrête entre le commit et
+    la suppression, ce segment sera rejoué (doublons limités à un segment).
+    """
+    directory = directory or settings.ACTIVATION_SPOOL_DIR
+    segments, rows = 0, 0
+    for path in sealed_segments(directory):
+        with open(path, encoding="utf-8") as handle:
+            entries = [json.loads(line) for line in handle if line.strip()]
+        for entry in entries:
+            record_activation(
+                db,
+                license_id=entry["license_id"],
+                machine_id=entry["machine_id"],
+                ip_address=entry["ip_address"],
+                outcome=ValidationOutcome(entry["outcome"]),
+                detail=entry["detail"],
+                now=datetime.fromisoformat(entry["checked_at"]),
+            )
+        db.commit()
+        os.remove(path)
+        segments += 1
+        rows += len(entries)
+    return {"segments": segments, "activations": rows}
+
+
+# Instance globale (mode edge)
+activation_spool = ActivationSpool()
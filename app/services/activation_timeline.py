@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Timeline des vérifications d'une licence (enquêtes support)
+
+Deux requêtes sur l'index ix_activations_license_checked:
+- la page: les vérifications de la période, du plus récent au plus ancien,
+  parcourues par curseur (limit + 1 lignes lues, quel que soit le volume de
+  la licence)
+- les totaux par jour des seuls jours présents dans la page, bornés par le
+  premier et le dernier checked_at de la page (jours complets, dans la
+  période): ils portent sur toute la journée, pas seulement sur la page
+"""
+
+from datetime import datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.activation import Activation
+from app.services.license_search import decode_cursor, encode_cursor
+from app.utils.validation_outcome import ValidationOutcome, outcome_message
+
+
+def timeline_statement(license_id: int, since: datetime, cursor: Optional[str] = None,
+                       limit: Optional[int] = None):
+    stmt = (
+        select(Activation.id, Activation.checked_at, Activation.machine_id, Activation.ip_address,
+               Activation.is_valid, Activation.outcome, Activation.validation_message)
+        .where(Activation.license_id == license_id, Activation.checked_at >= since)
+    )
+    if cursor:
+        stmt = stmt.where(tuple_(Activation.checked_at, Activation.id) < tuple_(*decode_cursor(cursor)))
+    stmt = stmt.order_by(Activation.checked_at.desc(), Activation.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def day_totals_statement(license_id: int, since: datetime, oldest: datetime, newest: datetime):
+    """Totaux des jours de `oldest` à `newest` (jours entiers, sans remonter avant `since`)"""
+    day = func.date(Activation.checked_at)
+    start = max(since, datetime.combine(oldest.date(), time.min))
+    end = datetime.combine(newest.date(), time.min) + timedelta(days=1)
+    return (
+        select(
+            day.label("day"),
+            func.count().label("total"),
+            func.sum(case((Activation.is_valid == True, 1), else_=0)).label("valid"),  # noqa: E712
+        )
+        .where(Activation.license_id == license_id, Activation.checked_at >= start, Activation.checked_at < end)
+        .group_by(day)
+    )
+
+
+def timeline_page(db: Session, license_id: int, since: datetime, cursor: Optional[str] = None,
+                  limit: int = 50, revoked_reason: Optional[str] = None) -> Tuple[List[dict], List[dict], Optional[str]]:
+    """
+    Page de la timeline
+
+    Returns:
+        (vérifications, totaux par jour des jours présents dans la page, curseur suivant)
+    """
+    rows = db.execute(timeline_statement(license_id, since, cursor, limit + 1)).mappings().all()
+    page = rows[:limit]
+
+    totals = {}
+    if page:
+        totals = {
+            str(row.day): row
+            for row in db.execute(day_totals_statement(license_id, since, page[-1]["checked_at"],
+                                                       page[0]["checked_at"]))
+        }
+
+    items, days = [], {}
+    for row in page:
+        if row["outcome"] is None:
+            outcome, message = None, row["validation_message"]  # Ligne historique non convertie
+        else:
+            outcome = ValidationOutcome(row["outcome"])
+            message = outcome_message(outcome, row["validation_message"], revoked_reason)
+        items.append({
+            "id": row["id"],
+            "checked_at": row["checked_at"],
+            "machine_id": row["machine_id"],
+            "ip_address": row["ip_address"],
+            "valid": row["is_valid"],
+            "outcome": outcome.name.lower() if outcome else None,
+            "message": message,
+        })
+        day = str(row["checked_at"].date())
+        if day not in days:
+            total = totals[day]
+            days[day] = {"day": day, "total": total.total, "valid": int(total.valid),
+                         "invalid": total.total - int(total.valid)}
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last["checked_at"], last["id"])
+    return items, list(days.values()), next_cursor
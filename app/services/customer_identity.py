@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Licence existante d'un client payé (webhook Stripe checkout.session.completed)
+
+Un OR sur machine_id et email ne peut servir qu'un seul index à la fois:
+PostgreSQL le résout souvent en Seq Scan sur licenses, la comparaison
+d'email est sensible à la casse, et .first() retient une ligne arbitraire
+quand la machine et l'email désignent deux licences différentes.
+
+Ici, une recherche indexée par règle, dans l'ordre de priorité:
+1. même machine_id (ix_licenses_machine_id): achat depuis l'app, ou webhook
+   rejoué d'un achat landing page (même machine_id provisoire)
+2. machine réelle: achat landing page du même email pas encore lié à une
+   machine (ix_licenses_pending_link_email, index partiel sur les
+   PENDING_LINK_): la licence payée est rattachée à cette machine
+3. même email, sans tenir compte de la casse (ix_licenses_email_lower)
+
+Chaque règle retient la plus ancienne licence (id), et la première règle
+qui trouve l'emporte. Les règles sont des sous-requêtes LIMIT 1 réunies
+par UNION ALL: un seul aller-retour, comme l'ancien OR.
+"""
+
+from typing import Optional
+
+from sqlalchemy import bindparam, func, literal, select, text, union_all
+from sqlalchemy.orm import Session
+
+from app.models.license import License
+
+licenses = License.__table__
+
+PENDING_LINK_PREFIX = "PENDING_LINK_"
+# Texte identique au prédicat de l'index partiel: un paramètre lié empêcherait son usage
+PENDING_LINK_FILTER = text("machine_id LIKE 'PENDING_LINK_%'")
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def is_pending_link(machine_id: str) -> bool:
+    return machine_id.startswith(PENDING_LINK_PREFIX)
+
+
+def by_machine_statement():
+    return select(licenses.c.id).where(licenses.c.machine_id == bindparam("machine_id")) \
+        .order_by(licenses.c.id).limit(1)
+
+
+def pending_link_by_email_statement():
+    return select(licenses.c.id).where(func.lower(licenses.c.email) == bindparam("email"), PENDING_LINK_FILTER) \
+        .order_by(licenses.c.id).limit(1)
+
+
+def by_email_statement():
+    return select(licenses.c.id).where(func.lower(licenses.c.email) == bindparam("email")) \
+        .order_by(licenses.c.id).limit(1)
+
+
+def resolve_statement(link_pending: bool):
+    """Règles applicables réunies en une instruction (colonne rank = priorité), licence relue par son id"""
+    rules = [by_machine_statement(), by_email_statement()]
+    if link_pending:
+        rules.insert(1, pending_link_by_email_statement())
+    candidates = union_all(*(
+        select(rule.subquery().c.id, literal(rank).label("rank")) for rank, rule in enumerate(rules)
+    )).subquery()
+    return select(License).join(candidates, License.id == candidates.c.id).order_by(candidates.c.rank).limit(1)
+
+
+RESOLVE = resolve_statement(link_pending=False)
+RESOLVE_WITH_PENDING_LINK = resolve_statement(link_pending=True)
+
+
+def resolve_customer_license(db: Session, machine_id: str, email: str) -> Optional[License]:
+    """Licence à mettre à jour pour ce paiement (None: nouvelle licence)"""
+    statement = RESOLVE if is_pending_link(machine_id) else RESOLVE_WITH_PENDING_LINK
+    return db.execute(statement, {"machine_id": machine_id, "email": normalize_email(email)}).scalars().first()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Balayeur d'expiration des licences
+
+Passe is_active à False (et renseigne expired_at) pour les licences dont
+expires_at est dépassé, par lots bornés via l'index partiel
+ix_licenses_expiry_pending. Un tas en mémoire des prochaines échéances
+permet de ne se réveiller qu'au moment utile; la base est relue au moins
+toutes les EXPIRY_SWEEP_MAX_SLEEP_SECONDS (licences créées par d'autres
+processus). L'UPDATE est idempotent: plusieurs balayeurs concurrents
+ne font que des lots vides.
+"""
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.license import License
+from app.services.stats import bump
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'échéances à venir gardées en mémoire (les suivantes sont relues plus tard)
+HEAP_PRELOAD = 1000
+
+
+def pending_expiry_filter(now: datetime):
+    """Critère du balayage, aligné sur le prédicat de ix_licenses_expiry_pending"""
+    return (License.is_active == True,  # noqa: E712 (doit correspondre au prédicat de l'index)
+            License.expires_at.is_not(None),
+            License.expires_at <= now)
+
+
+def sweep_expired(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+    """
+    Désactive les licences expirées par lots (une transaction par lot)
+
+    Returns:
+        Nombre de licences passées à l'état expiré
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.EXPIRY_SWEEP_BATCH_SIZE
+    swept = 0
+    while True:
+        ids = db.execute(
+            select(License.id).where(*pending_expiry_filter(now)).order_by(License.expires_at).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        revoked_flags = db.execute(
+            update(License)
+            .where(License.id.in_(ids), License.is_active == True)  # noqa: E712
+            .values(is_active=False, expired_at=now, updated_at=now)
+            .returning(License.is_revoked)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        # Une licence révoquée reste comptée "revoked": seules les autres changent de statut
+        expired = sum(1 for revoked in revoked_flags if not revoked)
+        bump(db, {"status:active": -expired, "status:expired": expired})
+        db.commit()
+        swept += len(revoked_flags)
+        if len(ids) < batch_size:
+            break
+    return swept
+
+
+def upcoming_expiries(db: Session, limit: int = HEAP_PRELOAD) -> List[Tuple[datetime, int]]:
+    """Prochaines échéances des licences encore actives (lecture d'index)"""
+    rows = db.execute(
+        select(License.expires_at, License.id)
+        .where(License.is_active == True, License.expires_at.is_not(None))  # noqa: E712
+        .order_by(License.expires_at)
+        .limit(limit)
+    ).all()
+    return [(row.expires_at, row.id) for row in rows]
+
+
+def license_status_counts(db: Session) -> dict:
+    """Répartition active / expirée / révoquée (lecture de l'état matérialisé)"""
+    rows = db.execute(
+        select(License.is_active, License.is_revoked, (License.expired_at.is_not(None)).label("expired"),
+               func.count())
+        .group_by(License.is_active, License.is_revoked, "expired")
+    ).all()
+    counts = {"active": 0, "expired": 0, "revoked": 0, "inactive": 0}
+    for is_active, is_revoked, expired, count in rows:
+        if is_revoked:
+            counts["revoked"] += count
+        elif is_active:
+            counts["active"] += count
+        elif expired:
+            counts["expired"] += count
+        else:
+            counts["inactive"] += count
+    return counts
+
+
+class ExpirySweeper:
+    """Tâche de fond: dort jusqu'à la prochaine échéance connue puis balaie"""
+
+    def __init__(self, max_sleep: Optional[float] = None):
+        self.max_sleep = max_sleep or settings.EXPIRY_SWEEP_MAX_SLEEP_SECONDS
+        self._heap: List[Tuple[datetime, int]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, license_id: int, expires_at: Optional[datetime]) -> None:
+        """Signale une nouvelle échéance (licence créée dans ce processus); ignorée si la tâche ne tourne pas"""
+        if expires_at is None or self._task is None:
+            return  # Sans tâche, rien ne viderait le tas (balayage par app.jobs.sweep_expired)
+        heapq.heappush(self._heap, (expires_at, license_id))
+        if self._wakeup is not None and self._heap[0][0] == expires_at:
+            self._wakeup.set()  # Plus proche que l'échéance attendue: recalculer le sommeil
+
+    def next_expiry(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def _reload(self) -> None:
+        db = SessionLocal()
+        try:
+            self._heap = upcoming_expiries(db)
+        finally:
+            db.close()
+        heapq.heapify(self._heap)
+
+    def _sweep(self) -> int:
+        db = SessionLocal()
+        try:
+            return sweep_expired(db)
+        finally:
+            db.close()
+
+    def _sleep_seconds(self, now: datetime) -> float:
+        upcoming = self.next_expiry()
+        if upcoming is None:
+            return self.max_sleep
+        return min(self.max_sleep, max(0.0, (upcoming - now).total_seconds()))
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                # Accès base hors de la boucle d'événements
+                swept = await loop.run_in_executor(None, self._sweep)
+                if swept:
+                    logger.info("Balayeur d'expiration: %d licence(s) expirée(s)", swept)
+                await loop.run_in_executor(None, self._reload)
+            except Exception:
+                logger.exception("Balayeur d'expiration: passage en échec, nouvel essai plus tard")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._sleep_seconds(datetime.utcnow()))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instance globale
+expiry_sweeper = ExpirySweeper()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Requêtes rejouables: en-tête Idempotency-Key
+
+Un client sur une connexion instable renvoie la même requête (même clé,
+même corps) quand il n'a pas reçu la réponse. Avec Idempotency-Key, la
+première exécution réserve la clé, puis enregistre sa réponse (statut et
+corps JSON): les nouvelles tentatives la reçoivent telle quelle (en-tête
+Idempotent-Replayed), sans chiffrement, sans écriture en base, sans appel
+Stripe.
+
+- clé réservée pour (endpoint, Idempotency-Key), condensée en BLAKE2b
+- corps de la requête condensé: une clé réutilisée pour une autre requête
+  est refusée (422), comme chez Stripe
+- réponses 2xx et 4xx enregistrées (un essai déjà existant reste refusé
+  pareil); 5xx et exceptions libèrent la clé, la tentative suivante
+  réexécute
+- doublons simultanés: sur le même worker, ils attendent l'exécution en
+  cours (Future partagée); sur un autre worker, ils relisent la clé jusqu'à
+  IDEMPOTENCY_WAIT_SECONDS, puis 409 avec Retry-After
+- une réservation sans réponse depuis CLAIM_TIMEOUT_SECONDS (worker arrêté
+  pendant l'exécution) est reprise par la tentative suivante
+- entrées purgées IDEMPOTENCY_TTL_SECONDS après leur création
+- rate limit des endpoints appliqué dans le handler (après la relecture):
+  une réponse rejouée n'est pas décomptée
+
+Stockage (IdempotencyStore): table idempotency_keys partagée entre workers,
+ou LocalIdempotencyStore en mémoire pour un seul processus et les tests.
+
+Mesure: python -m benchmarks.idempotency
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+import orjson
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyRecord
+from app.utils.responses import JSON_MEDIA_TYPE, encode_model
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+CLAIM_TIMEOUT_SECONDS = 120.0  # Au-delà d'un appel Stripe (80 s au plus) et de la génération d'une licence
+PURGE_INTERVAL_SECONDS = 60.0
+POLL_MIN_SECONDS = 0.05
+POLL_MAX_SECONDS = 0.5
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+idempotency_keys = IdempotencyRecord.__table__
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: bytes
+
+
+class Claim(NamedTuple):
+    """Résultat d'une réservation: exécuter (owner), rejouer (response), ou attendre (ni l'un ni l'autre)"""
+    owner: bool
+    response: Optional[StoredResponse] = None
+
+
+class IdempotencyKeyReused(Exception):
+    """Clé déjà utilisée pour une requête au corps différent"""
+
+
+def idempotency_digest(scope: str, key: str) -> str:
+    return hashlib.blake2b(f"{scope}\x00{key}".encode(), digest_size=16).hexdigest()
+
+
+def request_fingerprint(model: BaseModel) -> str:
+    """Condensé du corps validé (JSON canonique du modèle: espaces et ordre des champs du client ignorés)"""
+    return hashlib.blake2b(encode_model(model), digest_size=16).hexdigest()
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.utcfromtimestamp(timestamp)
+
+
+# ============================================
+# STOCKAGE DES RÉPONSES
+# ============================================
+
+class IdempotencyStore(ABC):
+    """Clés réservées et réponses enregistrées, partagées entre workers"""
+
+    @abstractmethod
+    def claim(self, digest: str, request_hash: str, now: float) -> Claim:
+        """Réserve la clé, ou retourne sa réponse enregistrée (IdempotencyKeyReused si le corps diffère)"""
+
+    @abstractmethod
+    def complete(self, digest: str, response: StoredResponse) -> None:
+        """Enregistre la réponse de l'exécution"""
+
+    @abstractmethod
+    def release(self, digest: str) -> None:
+        """Libère une réservation sans réponse (échec: la tentative suivante réexécute)"""
+
+    @abstractmethod
+    def purge(self, now: float) -> int:
+        """Supprime les entrées expirées"""
+
+
+class _Entry:
+    __slots__ = ("request_hash", "response", "claimed_at", "expires_at")
+
+    def __init__(self, request_hash: str, claimed_at: float, expires_at: float):
+        self.request_hash = request_hash
+        self.response: Optional[StoredResponse] = None
+        self.claimed_at = claimed_at
+        self.expires_at = expires_at
+
+
+class LocalIdempotencyStore(IdempotencyStore):
+    """Réponses en mémoire du processus (un seul worker, tests, benchmarks)"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl or settings.IDEMPOTENCY_TTL_SECONDS
+        # Ordre de création = ordre d'expiration (durée fixe): la purge s'arrête à la première entrée valide
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def claim(self, digest: str, request_hash: str, now: float) -> Claim:
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(digest)
+            if entry is None:
+                self._entries[digest] = _Entry(request_hash, now, now + self.ttl)
+                return Claim(True)
+            if entry.request_hash != request_hash:
+                raise IdempotencyKeyReused()
+            if entry.response is not None:
+                return Claim(False, entry.response)
+            if entry.claimed_at <= now - CLAIM_TIMEOUT_SECONDS:
+                entry.claimed_at = now
+                return Claim(True)
+            return Claim(False)
+
+    def complete(self, digest: str, response: StoredResponse) -> None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.response = response
+
+    def release(self, digest: str) -> None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry.response is None:
+                del self._entries[digest]
+
+    def purge(self, now: float) -> int:
+        with self._lock:
+            return self._purge(now)
+
+    def _purge(self, now: float) -> int:
+        entries = self._entries
+        count = 0
+        while entries:
+            digest = next(iter(entries))
+            if entries[digest].expires_at > now:
+                break
+            del entries[digest]
+            count += 1
+        return count
+
+
+def record_statement(digest: str):
+    """Entrée d'une clé (clé primaire)"""
+    return (select(idempotency_keys.c.request_hash, idempotency_keys.c.status_code, idempotency_keys.c.body,
+                   idempotency_keys.c.claimed_at, idempotency_keys.c.expires_at)
+            .where(idempotency_keys.c.key_digest == digest))
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """Réponses dans la table idempotency_keys (INSERT ... ON CONFLICT DO NOTHING pour réserver)"""
+
+    def __init__(self, session_factory=SessionLocal, ttl: Optional[float] = None):
+        self.session_factory = session_factory
+        self.ttl = ttl or settings.IDEMPOTENCY_TTL_SECONDS
+
+    def claim(self, digest: str, request_hash: str, now: float) -> Claim:
+        claimed_at, expires_at = _to_datetime(now), _to_datetime(now + self.ttl)
+        db = self.session_factory()
+        try:
+            postgresql = db.get_bind().dialect.name == "postgresql"
+            stmt = (postgresql_insert if postgresql else sqlite_insert)(idempotency_keys).values(
+                key_digest=digest, request_hash=request_hash, claimed_at=claimed_at, expires_at=expires_at,
+            ).on_conflict_do_nothing(index_elements=["key_digest"])
+            if db.execute(stmt).rowcount == 1:
+                db.commit()
+                return Claim(True)
+            row = db.execute(record_statement(digest)).first()
+            if row is None:  # Purgée entre les deux instructions: la tentative suivante la réserve
+                db.rollback()
+                return Claim(False)
+            if row.expires_at <= claimed_at:
+                # Expirée, pas encore purgée: réservée à nouveau pour cette requête
+                taken = db.execute(
+                    update(idempotency_keys)
+                    .where(idempotency_keys.c.key_digest == digest, idempotency_keys.c.expires_at == row.expires_at)
+                    .values(request_hash=request_hash, status_code=None, body=None,
+                            claimed_at=claimed_at, expires_at=expires_at)
+                ).rowcount == 1
+                db.commit()
+                return Claim(taken)
+            if row.request_hash != request_hash:
+                raise IdempotencyKeyReused()
+            if row.status_code is not None:
+                return Claim(False, StoredResponse(row.status_code, row.body))
+            if row.claimed_at <= _to_datetime(now - CLAIM_TIMEOUT_SECONDS):
+                # Exécution abandonnée (worker arrêté): reprise par un seul des candidats
+                taken = db.execute(
+                    update(idempotency_keys)
+                    .where(idempotency_keys.c.key_digest == digest, idempotency_keys.c.status_code.is_(None),
+                           idempotency_keys.c.claimed_at == row.claimed_at)
+                    .values(claimed_at=claimed_at)
+                ).rowcount == 1
+                db.commit()
+                return Claim(taken)
+            return Claim(False)
+        finally:
+            db.close()
+
+    def complete(self, digest: str, response: StoredResponse) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(update(idempotency_keys).where(idempotency_keys.c.key_digest == digest)
+                       .values(status_code=response.status_code, body=response.body))
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, digest: str) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(delete(idempotency_keys).where(idempotency_keys.c.key_digest == digest,
+                                                      idempotency_keys.c.status_code.is_(None)))
+            db.commit()
+        finally:
+            db.close()
+
+    def purge(self, now: float) -> int:
+        db = self.session_factory()
+        try:
+            count = db.execute(delete(idempotency_keys)
+                               .where(idempotency_keys.c.expires_at <= _to_datetime(now))).rowcount
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+
+# ============================================
+# EXÉCUTION UNIQUE
+# ============================================
+
+def _error_response(status_code: int, code: str, message: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=orjson.dumps({"detail": {"code": code, "message": message}}),
+                    status_code=status_code, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def replay(stored: StoredResponse) -> Response:
+    return Response(content=stored.body, status_code=stored.status_code, media_type=JSON_MEDIA_TYPE,
+                    headers={REPLAYED_HEADER: "true"})
+
+
+class Idempotency:
+    """Exécution unique des requêtes portant un Idempotency-Key"""
+
+    def __init__(self, store: IdempotencyStore, wait: Optional[float] = None):
+        self.store = store
+        self.wait = wait or settings.IDEMPOTENCY_WAIT_SECONDS
+        # Exécutions en cours sur ce worker: les doublons attendent leur réponse
+        self._inflight: Dict[str, "asyncio.Future[Optional[StoredResponse]]"] = {}
+        self._purged_at = 0.0
+
+    async def execute(self, scope: str, key: str, request_hash: str,
+                      handler: Callable[[], Awaitable[Response]]) -> Response:
+        """Réponse de la première exécution de (scope, key), `handler` n'est appelé qu'une fois"""
+        digest = idempotency_digest(scope, key)
+        deadline = time.monotonic() + self.wait
+        delay = POLL_MIN_SECONDS
+        while True:
+            inflight = self._inflight.get(digest)
+            if inflight is not None:
+                stored = await asyncio.shield(inflight)
+                if stored is not None:
+                    return replay(stored)
+                continue  # Première exécution en échec: ce doublon tente à son tour
+
+            now = time.time()
+            self._maybe_purge(now)
+            try:
+                claim = self.store.claim(digest, request_hash, now)
+            except IdempotencyKeyReused:
+                return _error_response(
+                    422, "IDEMPOTENCY_KEY_REUSED",
+                    "Idempotency-Key déjà utilisée pour une requête différente",
+                )
+            if claim.owner:
+                return await self._run(digest, handler)
+            if claim.response is not None:
+                return replay(claim.response)
+
+            # Exécution en cours sur un autre worker
+            if time.monotonic() >= deadline:
+                return _error_response(
+                    409, "IDEMPOTENCY_IN_PROGRESS",
+                    "Requête identique en cours de traitement, réessayez plus tard",
+                    headers={"Retry-After": "1"},
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_SECONDS)
+
+    async def _run(self, digest: str, handler: Callable[[], Awaitable[Response]]) -> Response:
+        future: "asyncio.Future[Optional[StoredResponse]]" = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        stored = None
+        try:
+            try:
+                response = await handler()
+            except HTTPException as e:
+                # RateLimitExceeded (starlette, pas fastapi) n'est pas capturée: la clé est libérée
+                if e.status_code >= 500:
+                    raise
+                # Même corps que le gestionnaire par défaut de FastAPI
+                response = Response(content=orjson.dumps({"detail": e.detail}), status_code=e.status_code,
+                                    media_type=JSON_MEDIA_TYPE, headers=e.headers)
+            if response.status_code < 500:
+                stored = StoredResponse(response.status_code, bytes(response.body))
+                try:
+                    self.store.complete(digest, stored)
+                except Exception:
+                    # Réponse servie quand même; les tentatives suivantes attendent CLAIM_TIMEOUT_SECONDS
+                    logger.exception("Enregistrement de la réponse idempotente en échec")
+            return response
+        finally:
+            del self._inflight[digest]
+            future.set_result(stored)
+            if stored is None:
+                try:
+                    self.store.release(digest)
+                except Exception:
+                    # Réservation reprise après CLAIM_TIMEOUT_SECONDS
+                    logger.exception("Libération de la clé d'idempotence en échec")
+
+    def _maybe_purge(self, now: float) -> None:
+        if now - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = now
+        try:
+            self.store.purge(now)
+        except Exception:
+            logger.exception("Purge des clés d'idempotence en échec")
+
+
+def build_store() -> IdempotencyStore:
+    return LocalIdempotencyStore() if settings.IDEMPOTENCY_STORE == "local" else DatabaseIdempotencyStore()
+
+
+# Instance globale
+idempotency = Idempotency(build_store())
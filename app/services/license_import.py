@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import en masse de licences existantes (anciennes versions, revendeurs)
+
+Fichier CSV (en-tête email, machine_id, license_type, expiry, colonnes
+customer_name / company_name / max_seats facultatives) ou NDJSON (un objet
+par ligne), éventuellement compressé en .gz.
+
+Pipeline:
+- lecture en flux par lots (mémoire constante quelle que soit la taille du
+  fichier), validation de chaque enregistrement par LicenseImportRecord
+- dédoublonnage par lot: une requête IN sur machine_id (index
+  ix_licenses_machine_id) pour les couples (email, machine_id) déjà en base,
+  plus les doublons internes au fichier
+- génération des clés (LicenseGenerator.generate_license) dans un pool de
+  processus, plusieurs lots en vol
+- écriture dans l'ordre des lots: INSERT groupé (executemany), compteurs
+  (app.services.stats) et commit par lot
+
+Les rejets (enregistrement invalide ou déjà présent) sont écrits en NDJSON
+dans le fichier d'erreurs avec leur numéro de ligne: corriger puis relancer
+sur ce fichier. Relancer sur le même fichier est sans effet (tout est doublon).
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+from app.database import SessionLocal
+from app.models.license import License
+from app.schemas.license import LicenseImportRecord
+from app.services.stats import bump, contributions
+from app.utils.license_crypto import license_generator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+BATCHES_IN_FLIGHT_PER_WORKER = 2
+FORMATS = ("csv", "ndjson")
+
+licenses = License.__table__
+
+LICENSE_INSERT = insert(licenses)
+
+
+def existing_pairs_statement(machine_ids):
+    """Couples (email, machine_id) déjà en base pour ces machines"""
+    return select(licenses.c.email, licenses.c.machine_id).where(licenses.c.machine_id.in_(machine_ids))
+
+
+# ============================================
+# LECTURE
+# ============================================
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    raise ValueError(f"Format de {path} inconnu: préciser csv ou ndjson")
+
+
+def read_records(path: str, file_format: str) -> Iterator[Tuple[int, object]]:
+    """(numéro de ligne, enregistrement brut) en flux; une ligne NDJSON illisible est renvoyée telle quelle"""
+    raw = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+    with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as handle:
+        if file_format == "csv":
+            reader = csv.DictReader(handle)
+            for row in reader:
+                # Colonnes vides = absentes (champs optionnels)
+                yield reader.line_num, {key: value for key, value in row.items() if key and value not in (None, "")}
+        else:
+            for line_no, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, line.rstrip("\n")
+
+
+# ============================================
+# PROCESSUS DE CALCUL
+# ============================================
+
+def generate_keys(rows: List[dict]) -> List[dict]:
+    """Ajoute la clé de licence à chaque ligne (dans un processus du pool)"""
+    for row in rows:
+        row["license_key"], _ = license_generator.generate_license(
+            email=row["email"],
+            machine_id=row["machine_id"],
+            license_type=row["license_type"],
+            customer_name=row["customer_name"],
+            company_name=row["company_name"],
+            expires_at=row["expires_at"],
+            seats=row["max_seats"],
+        )
+    return rows
+
+
+# ============================================
+# PIPELINE
+# ============================================
+
+@dataclass
+class ImportProgress:
+    read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    elapsed_s: float = 0.0
+    rows_per_s: float = 0.0
+
+
+class RejectWriter:
+    """Fichier NDJSON des enregistrements rejetés (ouvert au premier rejet)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = None
+        self.count = 0
+
+    def write(self, line_no: int, record, errors) -> None:
+        if self._handle is None:
+            self._handle = open(self.path, "w", encoding="utf-8")
+        self._handle.write(json.dumps({"line": line_no, "record": record, "errors": errors},
+                                      ensure_ascii=False, default=str) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+
+
+def to_row(record: LicenseImportRecord, now: datetime) -> dict:
+    """Ligne de la table licenses (clé ajoutée par generate_keys); une licence déjà expirée est importée inactive"""
+    expired = record.expiry is not None and record.expiry <= now
+    return {
+        "email": record.email,
+        "customer_name": record.customer_name,
+        "company_name": record.company_name,
+        "machine_id": record.machine_id,
+        "license_type": record.license_type,
+        "max_seats": record.max_seats,
+        "expires_at": record.expiry,
+        "is_active": not expired,
+        "is_revoked": False,
+        "expired_at": record.expiry if expired else None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def existing_pairs(db, rows: List[dict]) -> Set[Tuple[str, str]]:
+    machine_ids = {row["machine_id"] for row in rows}
+    if not machine_ids:
+        return set()
+    return {(email, machine_id) for email, machine_id in db.execute(existing_pairs_statement(machine_ids))}
+
+
+def import_licenses(
+    path: str,
+    file_format: Optional[str] = None,
+    errors_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_progress: Optional[Callable[[ImportProgress], None]] = None,
+    session_factory=SessionLocal,
+) -> ImportProgress:
+    """
+    Importe les licences du fichier `path`
+
+    Args:
+        file_format: csv ou ndjson (défaut: d'après l'extension)
+        errors_path: Fichier des rejets (défaut: <path>.rejects.ndjson)
+        workers: Processus de génération des clés (défaut: nombre de cœurs)
+        batch_size: Enregistrements par lot (une requête de dédoublonnage, un INSERT groupé, un commit)
+        on_progress: Appelé après chaque lot écrit
+    """
+    file_format = file_format or detect_format(path)
+    if file_format not in FORMATS:
+        raise ValueError(f"Format {file_format} inconnu (attendu: {', '.join(FORMATS)})")
+    rejects = RejectWriter(errors_path or f"{path}.rejects.ndjson")
+    workers = workers or os.cpu_count() or 1
+    progress = ImportProgress()
+    started = time.monotonic()
+    # (machine_id, email) par lot en vol: doublons internes au fichier d'un lot à l'autre
+    seen: Dict[Tuple[str, str], int] = {}
+    pending = deque()  # (lignes d'origine par (email, machine_id), future) dans l'ordre du fichier
+
+    def reject_duplicate(line_no, record):
+        progress.duplicates += 1
+        rejects.write(line_no, record, [{"msg": "Licence déjà présente pour cet email et cette machine"}])
+
+    def write_batch(db):
+        lines, future = pending.popleft()
+        rows = future.result()
+        # Recontrôle à l'écriture: un lot précédent du même fichier a pu insérer le même couple
+        present = existing_pairs(db, rows)
+        fresh = []
+        for row in rows:
+            pair = (row["email"], row["machine_id"])
+            if pair in present:
+                line_no, record = lines[pair]
+                reject_duplicate(line_no, record)
+            else:
+                fresh.append(row)
+        if fresh:
+            db.execute(LICENSE_INSERT, fresh)
+            deltas = Counter()
+            for row in fresh:
+                deltas.update(contributions({**row, "stripe_payment_intent_id": None,
+                                             "amount_paid": None, "currency": "EUR"}))
+            bump(db, deltas)
+        db.commit()
+        for row in rows:
+            pair = (row["email"], row["machine_id"])
+            if seen.get(pair) == id(lines):
+                del seen[pair]
+
+        progress.imported += len(fresh)
+        progress.elapsed_s = round(time.monotonic() - started, 1)
+        progress.rows_per_s = round(progress.read / max(progress.elapsed_s, 0.1))
+        if on_progress:
+            on_progress(progress)
+
+    def submit_batch(db, pool, batch):
+        now = datetime.utcnow()
+        present = existing_pairs(db, [{"machine_id": record.machine_id} for _, record, _ in batch])
+        db.commit()  # Transaction de lecture courte
+        lines, rows = {}, []
+        for line_no, record, raw in batch:
+            pair = (record.email, record.machine_id)
+            if pair in present or pair in seen or pair in lines:
+                reject_duplicate(line_no, raw)
+                continue
+            lines[pair] = (line_no, raw)
+            rows.append(to_row(record, now))
+        for pair in lines:
+            seen[pair] = id(lines)
+        if rows:
+            pending.append((lines, pool.submit(generate_keys, rows)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        db = session_factory()
+        try:
+            batch = []
+            for line_no, raw in read_records(path, file_format):
+                progress.read += 1
+                try:
+                    if not isinstance(raw, dict):
+                        raise ValueError("Ligne JSON invalide")
+                    batch.append((line_no, LicenseImportRecord.model_validate(raw), raw))
+                except ValidationError as exc:
+                    progress.invalid += 1
+                    rejects.write(line_no, raw, exc.errors(include_url=False, include_context=False))
+                except ValueError as exc:
+                    progress.invalid += 1
+                    rejects.write(line_no, raw, [{"msg": str(exc)}])
+                if len(batch) >= batch_size:
+                    submit_batch(db, pool, batch)
+                    batch = []
+                    # Garder tous les processus occupés, mémoire bornée par les lots en vol
+                    while len(pending) >= workers * BATCHES_IN_FLIGHT_PER_WORKER:
+                        write_batch(db)
+            if batch:
+                submit_batch(db, pool, batch)
+            while pending:
+                write_batch(db)
+        finally:
+            db.close()
+            rejects.close()
+
+    progress.elapsed_s = round(time.monotonic() - started, 1)
+    progress.rows_per_s = round(progress.read / max(progress.elapsed_s, 0.1))
+    if rejects.count:
+        logger.warning("%s enregistrements rejetés: %s", rejects.count, rejects.path)
+    return progress
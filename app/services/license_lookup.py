@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lectures légères de licences sur les chemins chauds
+
+Les endpoints de validation, de page de succès et de checkout ne lisent que
+quelques colonnes: plutôt qu'une instance ORM `License` (identity map, état
+d'instance, descripteurs des relations, colonnes Stripe et notes chargées),
+un select() Core des seules colonnes utiles, exécuté sur la connexion de la
+session et renvoyé sous forme d'enregistrement à __slots__.
+
+Les instructions sont construites une fois à l'import avec des bindparam():
+même clé de cache à chaque exécution, la forme compilée est réutilisée
+depuis le cache de compilation du moteur.
+
+Mesure: python -m benchmarks.license_lookup
+"""
+
+from typing import Optional
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.license import License
+
+licenses = License.__table__
+
+
+class LicenseStatus:
+    """Colonnes lues par la validation d'une clé"""
+
+    __slots__ = ("id", "license_type", "is_active", "is_revoked", "revoked_reason", "expires_at", "expired_at",
+                 "max_seats", "replacement_key")
+
+    def __init__(self, id, license_type, is_active, is_revoked, revoked_reason, expires_at, expired_at, max_seats,
+                 replacement_key=None):
+        self.id = id
+        self.license_type = license_type
+        self.is_active = is_active
+        self.is_revoked = is_revoked
+        self.revoked_reason = revoked_reason
+        self.expires_at = expires_at
+        self.expired_at = expired_at
+        self.max_seats = max_seats
+        # Clé re-chiffrée, à renvoyer au client qui présente encore sa clé d'avant rotation
+        self.replacement_key = replacement_key
+
+
+class SessionLicense:
+    """Colonnes renvoyées à la page de succès après paiement"""
+
+    __slots__ = ("license_key", "email", "license_type")
+
+    def __init__(self, license_key, email, license_type):
+        self.license_key = license_key
+        self.email = email
+        self.license_type = license_type
+
+
+STATUS_BY_KEY = select(
+    licenses.c.id, licenses.c.license_type, licenses.c.is_active, licenses.c.is_revoked,
+    licenses.c.revoked_reason, licenses.c.expires_at, licenses.c.expired_at, licenses.c.max_seats,
+).where(licenses.c.license_key == bindparam("license_key"))
+
+# Clé émise avant une rotation de LICENSE_SECRET_KEY (re-chiffrée en base, conservée par le client):
+# la clé courante est renvoyée au client pour qu'il la remplace
+STATUS_BY_PREVIOUS_KEY = select(*STATUS_BY_KEY.selected_columns, licenses.c.license_key).where(
+    licenses.c.previous_license_key == bindparam("license_key")
+)
+
+LICENSE_BY_SESSION = select(
+    licenses.c.license_key, licenses.c.email, licenses.c.license_type,
+).where(licenses.c.stripe_session_id == bindparam("session_id")).limit(1)
+
+ACTIVE_LIFETIME_BY_MACHINE = select(licenses.c.id).where(
+    licenses.c.machine_id == bindparam("machine_id"),
+    licenses.c.license_type == "lifetime",
+    licenses.c.is_active == True,
+).limit(1)
+
+
+def license_status(db: Session, license_key: str) -> Optional[LicenseStatus]:
+    """
+    Statut d'une licence par sa clé (None si absente)
+
+    Pendant une rotation (LICENSE_SECRET_KEYS_OLD renseigné), une clé absente
+    est recherchée parmi les clés d'avant re-chiffrement; le statut porte
+    alors la clé courante (replacement_key).
+    """
+    connection = db.connection()
+    row = connection.execute(STATUS_BY_KEY, {"license_key": license_key}).first()
+    if row is None and settings.LICENSE_SECRET_KEYS_OLD:
+        row = connection.execute(STATUS_BY_PREVIOUS_KEY, {"license_key": license_key}).first()
+    return LicenseStatus(*row) if row is not None else None
+
+
+def license_for_session(db: Session, session_id: str) -> Optional[SessionLicense]:
+    """Licence créée par une session Stripe Checkout (None si le webhook n'est pas encore passé)"""
+    row = db.connection().execute(LICENSE_BY_SESSION, {"session_id": session_id}).first()
+    return SessionLicense(*row) if row is not None else None
+
+
+def has_active_lifetime(db: Session, machine_id: str) -> bool:
+    """Vrai si la machine a déjà une licence lifetime active"""
+    return db.connection().execute(ACTIVE_LIFETIME_BY_MACHINE, {"machine_id": machine_id}).first() is not None
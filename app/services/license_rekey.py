@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Re-chiffrement des clés de licence après rotation de LICENSE_SECRET_KEY
+
+Procédure: nouvelle clé dans LICENSE_SECRET_KEY, ancienne(s) dans
+LICENSE_SECRET_KEYS_OLD (les workers déchiffrent avec toutes, chiffrent avec
+la nouvelle), puis python -m app.jobs.rekey_licenses.
+
+Pipeline:
+- lecture des licences par tranches d'id croissants (pagination par clé,
+  une transaction courte par tranche, pas de verrou de table)
+- déchiffrement / re-chiffrement (MultiFernet.rotate, horodatage d'origine
+  conservé) dans un pool de processus, plusieurs tranches en vol
+- écriture par UPDATE groupés (executemany), dans l'ordre des tranches,
+  puis point de reprise (dernier id écrit) dans un fichier JSON
+
+Idempotent: une clé déjà chiffrée avec la clé principale est ignorée (seule
+sa signature est vérifiée), une ligne modifiée entre lecture et écriture
+n'est pas écrasée (UPDATE conditionné à l'ancienne clé). L'ancienne clé est
+conservée dans previous_license_key: le client la présente encore et la
+validation la retrouve (app.services.license_lookup), puis lui renvoie la
+nouvelle clé. La clé d'origine reste chiffrée avec l'ancienne
+LICENSE_SECRET_KEY: celle-ci ne quitte LICENSE_SECRET_KEYS_OLD qu'une fois
+les clients passés à leur nouvelle clé.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import bindparam, func, select, update
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.license import License
+from app.utils.license_crypto import build_cipher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+licenses = License.__table__
+
+REKEY_UPDATE = (
+    update(licenses)
+    .where(licenses.c.id == bindparam("license_id"), licenses.c.license_key == bindparam("old_key"))
+    .values(
+        license_key=bindparam("new_key"),
+        # Première rotation: la clé détenue par le client est celle d'origine
+        previous_license_key=func.coalesce(licenses.c.previous_license_key, licenses.c.license_key),
+        updated_at=bindparam("now"),
+    )
+)
+
+
+def chunk_statement(last_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Tranche suivante de licences à examiner (pagination par clé sur l'id)"""
+    return (select(licenses.c.id, licenses.c.license_key)
+            .where(licenses.c.id > last_id).order_by(licenses.c.id).limit(chunk_size))
+
+
+def key_fingerprint(key: str) -> str:
+    """Identifie une clé principale dans le point de reprise sans la divulguer"""
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+# ============================================
+# PROCESSUS DE CALCUL
+# ============================================
+
+_primary: Optional[Fernet] = None
+_cipher = None
+
+
+def _init_worker(primary_key: str, old_keys: Sequence[str]) -> None:
+    global _primary, _cipher
+    _primary = Fernet(primary_key.encode())
+    _cipher = build_cipher(primary_key, old_keys)
+
+
+def rekey_rows(rows: List[Tuple[int, str]]) -> Tuple[List[Tuple[int, str, str]], int, int]:
+    """
+    Re-chiffre une tranche (dans un processus du pool)
+
+    Returns:
+        tuple: (changed, current, invalid)
+            - changed: (id, ancienne clé, nouvelle clé) des lignes à écrire
+            - current: clés déjà chiffrées avec la clé principale
+            - invalid: clés qu'aucune clé ne déchiffre (laissées telles quelles)
+    """
+    changed, current, invalid = [], 0, 0
+    for license_id, license_key in rows:
+        try:
+            token = bytes.fromhex(license_key)
+        except ValueError:
+            invalid += 1
+            continue
+        try:
+            _primary.extract_timestamp(token)  # Signature seule, sans déchiffrement
+            current += 1
+            continue
+        except InvalidToken:
+            pass
+        try:
+            changed.append((license_id, license_key, _cipher.rotate(token).hex()))
+        except InvalidToken:
+            invalid += 1
+    return changed, current, invalid
+
+
+# ============================================
+# PIPELINE
+# ============================================
+
+@dataclass
+class RekeyProgress:
+    """Avancement (cumulé sur les reprises, sauf la durée et le débit de ce lancement)"""
+    last_id: int = 0
+    scanned: int = 0
+    rekeyed: int = 0
+    current: int = 0
+    invalid: int = 0
+    elapsed_s: float = 0.0
+    rows_per_s: float = 0.0
+    resumed_from: int = 0
+
+
+def load_checkpoint(path: str, fingerprint: str) -> RekeyProgress:
+    """Point de reprise du fichier `path`, ou départ à zéro (absent ou autre clé principale)"""
+    if not path or not os.path.exists(path):
+        return RekeyProgress()
+    with open(path, "r", encoding="utf-8") as handle:
+        saved = json.load(handle)
+    if saved.get("fingerprint") != fingerprint:
+        logger.warning("Point de reprise %s écrit pour une autre clé principale: reprise depuis le début", path)
+        return RekeyProgress()
+    progress = RekeyProgress(**{key: saved[key] for key in ("last_id", "scanned", "rekeyed", "current", "invalid")})
+    progress.resumed_from = progress.last_id
+    return progress
+
+
+def save_checkpoint(path: str, fingerprint: str, progress: RekeyProgress) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump({"fingerprint": fingerprint, **asdict(progress),
+                   "saved_at": datetime.utcnow().isoformat(timespec="seconds")}, handle)
+    os.replace(tmp_path, path)
+
+
+def rekey_licenses(
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    checkpoint_path: Optional[str] = None,
+    restart: bool = False,
+    on_progress: Optional[Callable[[RekeyProgress], None]] = None,
+    session_factory=SessionLocal,
+) -> RekeyProgress:
+    """
+    Re-chiffre toutes les clés avec LICENSE_SECRET_KEY
+
+    Args:
+        workers: Processus de calcul (défaut: nombre de cœurs)
+        chunk_size: Licences par tranche (un SELECT, un UPDATE groupé, un commit)
+        checkpoint_path: Fichier de reprise (relancer reprend après le dernier id écrit)
+        restart: Ignorer le point de reprise existant
+        on_progress: Appelé après chaque tranche écrite
+    """
+    old_keys = settings.license_secret_keys_old
+    if not old_keys:
+        raise ValueError("LICENSE_SECRET_KEYS_OLD est vide: aucune ancienne clé à remplacer")
+    fingerprint = key_fingerprint(settings.LICENSE_SECRET_KEY)
+    progress = RekeyProgress() if restart else load_checkpoint(checkpoint_path, fingerprint)
+    workers = workers or os.cpu_count() or 1
+
+    started = time.monotonic()
+    scanned_at_start = progress.scanned
+    pending = deque()  # (dernier id de la tranche, taille, future) dans l'ordre des ids
+    last_read = progress.last_id
+    exhausted = False
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(settings.LICENSE_SECRET_KEY, old_keys)) as pool:
+        db = session_factory()
+        try:
+            while pending or not exhausted:
+                # Garder tous les processus occupés pendant l'écriture des tranches précédentes
+                while not exhausted and len(pending) < workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    rows = db.execute(chunk_statement(last_read, chunk_size)).all()
+                    db.commit()  # Transaction de lecture courte
+                    if not rows:
+                        exhausted = True
+                        break
+                    last_read = rows[-1][0]
+                    pending.append((last_read, len(rows), pool.submit(rekey_rows, [tuple(row) for row in rows])))
+                if not pending:
+                    break
+
+                chunk_last_id, count, future = pending.popleft()
+                changed, current, invalid = future.result()
+                if changed:
+                    now = datetime.utcnow()
+                    db.execute(REKEY_UPDATE, [
+                        {"license_id": license_id, "old_key": old_key, "new_key": new_key, "now": now}
+                        for license_id, old_key, new_key in changed
+                    ])
+                db.commit()
+
+                progress.last_id = chunk_last_id
+                progress.scanned += count
+                progress.rekeyed += len(changed)
+                progress.current += current
+                progress.invalid += invalid
+                progress.elapsed_s = round(time.monotonic() - started, 1)
+                progress.rows_per_s = round((progress.scanned - scanned_at_start) / max(progress.elapsed_s, 0.1))
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, fingerprint, progress)
+                if on_progress:
+                    on_progress(progress)
+        finally:
+            db.close()
+
+    return progress
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage des licences des endpoints publics (trial, validate, heartbeat, checkout, webhook Stripe, page de succès)
+
+Les endpoints de app/api/licenses.py et app/api/payment.py ne lisent et
+n'écrivent plus les licences par la session SQLAlchemy mais par un
+LicenseRepository:
+- DatabaseLicenseRepository: la session de la requête, mêmes instructions
+  (license_lookup, customer_identity) et même nombre de requêtes SQL
+- LocalLicenseRepository: licences en mémoire avec index par hachage
+  (condensé de la clé, email, machine_id, stripe_session_id), activations,
+  heartbeats et compteurs gardés dans le processus
+
+LICENSE_STORE=local sert aux benchmarks (`python -m benchmarks run --store memory`)
+et au serveur de démonstration: un seul processus, rien n'est conservé au
+redémarrage. Les endpoints publics n'ouvrent alors aucune session et main.py
+ne démarre pas les tâches de fond qui lisent la base (expiration, révocations,
+réconciliation des compteurs); l'admin et les jobs lisent toujours la base.
+"""
+
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from fastapi import Depends
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db, get_read_db, read_with_fallback
+from app.models.heartbeat import Heartbeat
+from app.models.license import License
+from app.services.activation_log import record_activation
+from app.services.customer_identity import is_pending_link, normalize_email, resolve_customer_license
+from app.services.license_lookup import (
+    LicenseStatus, SessionLicense, has_active_lifetime, license_for_session, license_status,
+)
+from app.services.stats import diff, license_snapshot, track_change
+from app.utils.license_crypto import key_digest
+from app.utils.validation_outcome import ValidationOutcome
+
+licenses = License.__table__
+
+# Activations et heartbeats conservés par le stockage en mémoire (les plus récents)
+LOCAL_HISTORY_SIZE = 10000
+
+TRIAL_BY_EMAIL = select(licenses.c.id).where(
+    licenses.c.email == bindparam("email"), licenses.c.license_type == "trial",
+).limit(1)
+
+TRIAL_BY_MACHINE = select(licenses.c.id).where(
+    licenses.c.machine_id == bindparam("machine_id"), licenses.c.license_type == "trial",
+).limit(1)
+
+
+class LicenseRepository(ABC):
+    """Lectures et écritures de licences des endpoints publics (chaque écriture est validée)"""
+
+    @abstractmethod
+    def has_trial_for_email(self, email: str) -> bool:
+        """Une licence d'essai existe déjà pour cet email"""
+
+    @abstractmethod
+    def has_trial_for_machine(self, machine_id: str) -> bool:
+        """Une licence d'essai existe déjà pour cette machine"""
+
+    @abstractmethod
+    def status_by_key(self, license_key: str) -> Optional[LicenseStatus]:
+        """État d'une licence par sa clé (actuelle ou d'avant rotation), None si inconnue"""
+
+    @abstractmethod
+    def license_for_session(self, session_id: str) -> Optional[SessionLicense]:
+        """Licence créée par une session Stripe Checkout"""
+
+    @abstractmethod
+    def has_active_lifetime(self, machine_id: str) -> bool:
+        """Licence lifetime active sur cette machine"""
+
+    @abstractmethod
+    def resolve_customer(self, machine_id: str, email: str) -> Optional[License]:
+        """Licence à mettre à jour pour un paiement (règles de app.services.customer_identity)"""
+
+    @abstractmethod
+    def add(self, license: License) -> None:
+        """Enregistre une nouvelle licence (son id est renseigné)"""
+
+    @abstractmethod
+    def save(self, before: dict, license: License) -> None:
+        """Enregistre une licence modifiée (`before`: license_snapshot d'avant modification)"""
+
+    @abstractmethod
+    def record_activation(self, license_id: Optional[int], machine_id: str, ip_address: Optional[str],
+                          outcome: ValidationOutcome, detail: Optional[str] = None) -> None:
+        """Journalise une vérification de licence"""
+
+    @abstractmethod
+    def record_heartbeat(self, heartbeat: Heartbeat) -> None:
+        """Enregistre un heartbeat"""
+
+
+class DatabaseLicenseRepository(LicenseRepository):
+    """Licences en base, par la session de la requête (compteurs et journal dans la même transaction)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def has_trial_for_email(self, email: str) -> bool:
+        return self.db.connection().execute(TRIAL_BY_EMAIL, {"email": email}).first() is not None
+
+    def has_trial_for_machine(self, machine_id: str) -> bool:
+        return self.db.connection().execute(TRIAL_BY_MACHINE, {"machine_id": machine_id}).first() is not None
+
+    def status_by_key(self, license_key: str) -> Optional[LicenseStatus]:
+        # Réplique, puis primaire si absente: licence tout juste créée
+        return read_with_fallback(self.db, lambda session: license_status(session, license_key))
+
+    def license_for_session(self, session_id: str) -> Optional[SessionLicense]:
+        # Le webhook vient peut-être d'écrire la licence sur le primaire
+        return read_with_fallback(self.db, lambda session: license_for_session(session, session_id))
+
+    def has_active_lifetime(self, machine_id: str) -> bool:
+        return has_active_lifetime(self.db, machine_id)
+
+    def resolve_customer(self, machine_id: str, email: str) -> Optional[License]:
+        return resolve_customer_license(self.db, machine_id, email)
+
+    def add(self, license: License) -> None:
+        self.db.add(license)
+        track_change(self.db, None, license)
+        self.db.commit()
+
+    def save(self, before: dict, license: License) -> None:
+        track_change(self.db, before, license)
+        self.db.commit()
+
+    def record_activation(self, license_id: Optional[int], machine_id: str, ip_address: Optional[str],
+                          outcome: ValidationOutcome, detail: Optional[str] = None) -> None:
+        record_activation(self.db, license_id=license_id, machine_id=machine_id, ip_address=ip_address,
+                          outcome=outcome, detail=detail)
+        self.db.commit()
+
+    def record_heartbeat(self, heartbeat: Heartbeat) -> None:
+        self.db.add(heartbeat)
+        self.db.commit()
+
+
+class LocalLicenseRepository(LicenseRepository):
+    """
+    Licences en mémoire (un seul processus)
+
+    Clés indexées par leur empreinte (license_crypto.key_digest): taille fixe,
+    une clé de licence dépasse 400 caractères.
+    Chaque index associe une valeur aux id des licences qui la portent; une
+    règle qui peut trouver plusieurs licences retient la plus ancienne (plus
+    petit id), comme les instructions SQL. `save` réindexe la licence: les
+    champs indexés peuvent avoir changé (clé régénérée, machine rattachée).
+    """
+
+    def __init__(self, history_size: int = LOCAL_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._licenses: Dict[int, License] = {}
+        self._indexed: Dict[int, tuple] = {}  # id -> valeurs indexées (retrait des anciennes entrées)
+        self._by_key: Dict[str, int] = {}
+        self._by_previous_key: Dict[str, int] = {}
+        self._by_email: Dict[str, Set[int]] = {}
+        self._by_machine: Dict[str, Set[int]] = {}
+        self._by_session: Dict[str, int] = {}
+        self.counters = Counter()  # Mêmes noms que license_counters (app.services.stats)
+        self.outcomes = Counter()  # Vérifications par ValidationOutcome
+        self.activations = deque(maxlen=history_size)
+        self.heartbeats = deque(maxlen=history_size)
+
+    def __len__(self) -> int:
+        return len(self._licenses)
+
+    # ---- index ----
+
+    def _index(self, license: License) -> None:
+        values = (
+            key_digest(license.license_key),
+            key_digest(license.previous_license_key) if license.previous_license_key else None,
+            license.email.lower(),  # Comme lower(email) de ix_licenses_email_lower
+            license.machine_id,
+            license.stripe_session_id,
+        )
+        old = self._indexed.get(license.id)
+        if old == values:
+            return
+        if old is not None:
+            self._unindex(license.id, old)
+        digest, previous, email, machine_id, session_id = values
+        self._by_key[digest] = license.id
+        if previous is not None:
+            self._by_previous_key[previous] = license.id
+        self._by_email.setdefault(email, set()).add(license.id)
+        self._by_machine.setdefault(machine_id, set()).add(license.id)
+        if session_id is not None:
+            self._by_session.setdefault(session_id, license.id)
+        self._indexed[license.id] = values
+
+    def _unindex(self, license_id: int, values: tuple) -> None:
+        digest, previous, email, machine_id, session_id = values
+        if self._by_key.get(digest) == license_id:
+            del self._by_key[digest]
+        if previous is not None and self._by_previous_key.get(previous) == license_id:
+            del self._by_previous_key[previous]
+        self._by_email[email].discard(license_id)
+        if not self._by_email[email]:
+            del self._by_email[email]
+        self._by_machine[machine_id].discard(license_id)
+        if not self._by_machine[machine_id]:
+            del self._by_machine[machine_id]
+        if session_id is not None and self._by_session.get(session_id) == license_id:
+            del self._by_session[session_id]
+
+    def _oldest(self, ids) -> Optional[License]:
+        return self._licenses[min(ids)] if ids else None
+
+    # ---- lectures ----
+
+    def has_trial_for_email(self, email: str) -> bool:
+        with self._lock:
+            return any(
+                self._licenses[license_id].email == email and self._licenses[license_id].license_type == "trial"
+                for license_id in self._by_email.get(email.lower(), ())
+            )
+
+    def has_trial_for_machine(self, machine_id: str) -> bool:
+        with self._lock:
+            return any(self._licenses[license_id].license_type == "trial"
+                       for license_id in self._by_machine.get(machine_id, ()))
+
+    def status_by_key(self, license_key: str) -> Optional[LicenseStatus]:
+        digest = key_digest(license_key)
+        with self._lock:
+            license_id = self._by_key.get(digest)
+            previous = license_id is None and settings.LICENSE_SECRET_KEYS_OLD
+            if previous:
+                license_id = self._by_previous_key.get(digest)
+            if license_id is None:
+                return None
+            license = self._licenses[license_id]
+            return LicenseStatus(license.id, license.license_type, license.is_active, license.is_revoked,
+                                 license.revoked_reason, license.expires_at, license.expired_at, license.max_seats,
+                                 license.license_key if previous else None)
+
+    def license_for_session(self, session_id: str) -> Optional[SessionLicense]:
+        with self._lock:
+            license_id = self._by_session.get(session_id)
+            if license_id is None:
+                return None
+            license = self._licenses[license_id]
+            return SessionLicense(license.license_key, license.email, license.license_type)
+
+    def has_active_lifetime(self, machine_id: str) -> bool:
+        with self._lock:
+            return any(
+                self._licenses[license_id].license_type == "lifetime" and self._licenses[license_id].is_active
+                for license_id in self._by_machine.get(machine_id, ())
+            )
+
+    def resolve_customer(self, machine_id: str, email: str) -> Optional[License]:
+        with self._lock:
+            found = self._oldest(self._by_machine.get(machine_id))
+            if found is not None:
+                return found
+            same_email = self._by_email.get(normalize_email(email), ())
+            if not is_pending_link(machine_id):
+                found = self._oldest([license_id for license_id in same_email
+                                      if is_pending_link(self._licenses[license_id].machine_id)])
+                if found is not None:
+                    return found
+            return self._oldest(same_email)
+
+    # ---- écritures ----
+
+    def add(self, license: License) -> None:
+        now = datetime.utcnow()
+        for column in licenses.columns:
+            # Défauts de colonne appliqués par l'INSERT en base (created_at, is_active, currency...)
+            if column.default is not None and getattr(license, column.key) is None:
+                default = column.default.arg
+                setattr(license, column.key, default(None) if column.default.is_callable else default)
+        license.updated_at = now
+        with self._lock:
+            license.id = next(self._ids)
+            self._licenses[license.id] = license
+            self._index(license)
+            self.counters.update(diff(None, license_snapshot(license)))
+
+    def save(self, before: dict, license: License) -> None:
+        license.updated_at = datetime.utcnow()
+        with self._lock:
+            self._index(license)
+            self.counters.update(diff(before, license_snapshot(license)))
+
+    def record_activation(self, license_id: Optional[int], machine_id: str, ip_address: Optional[str],
+                          outcome: ValidationOutcome, detail: Optional[str] = None) -> None:
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.activations.append((license_id, machine_id, ip_address, outcome, datetime.utcnow()))
+
+    def record_heartbeat(self, heartbeat: Heartbeat) -> None:
+        heartbeat.sent_at = heartbeat.sent_at or datetime.utcnow()
+        with self._lock:
+            self.heartbeats.append(heartbeat)
+
+
+def build_local_repository() -> Optional[LocalLicenseRepository]:
+    return LocalLicenseRepository() if settings.LICENSE_STORE == "local" else None
+
+
+def get_database_licenses(db: Session = Depends(get_db)) -> LicenseRepository:
+    """Licences de la session de la requête (primaire)"""
+    return DatabaseLicenseRepository(db)
+
+
+def get_read_database_licenses(db: Session = Depends(get_read_db)) -> LicenseRepository:
+    """Licences en lecture seule (réplique si disponible, voir get_read_db)"""
+    return DatabaseLicenseRepository(db)
+
+
+def get_local_licenses() -> LicenseRepository:
+    """Licences en mémoire: aucune session SQLAlchemy ouverte"""
+    return local_licenses
+
+
+# Instance globale (None: licences en base)
+local_licenses = build_local_repository()
+
+# Dépendances FastAPI, choisies au chargement selon LICENSE_STORE
+# Usage: repository: LicenseRepository = Depends(get_licenses)
+get_licenses = get_database_licenses if local_licenses is None else get_local_licenses
+get_read_licenses = get_read_database_licenses if local_licenses is None else get_local_licenses
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recherche admin des licences
+
+Filtres limités aux colonnes indexées, pagination par clé (keyset) sur
+(created_at, id) décroissants: chaque page est une descente d'index, quelle
+que soit sa profondeur (pas d'OFFSET). L'export parcourt le même ordre avec
+un curseur côté serveur (yield_per): mémoire constante.
+"""
+
+import base64
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.database import read_session
+from app.models.license import License
+
+# Colonnes exposées (jamais la clé de licence)
+LISTING_COLUMNS = (
+    License.id, License.email, License.customer_name, License.company_name, License.machine_id,
+    License.license_type, License.created_at, License.expires_at, License.is_active, License.is_revoked,
+    License.revoked_at, License.expired_at, License.stripe_customer_id, License.stripe_session_id,
+    License.amount_paid, License.currency,
+)
+COLUMN_NAMES = [column.key for column in LISTING_COLUMNS]
+EXPORT_BATCH_SIZE = 2000
+
+
+@dataclass
+class LicenseFilters:
+    """Filtres de recherche (paramètres de requête de l'API admin)"""
+    email: Optional[str] = None
+    machine_id: Optional[str] = None
+    stripe_customer_id: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    expires_from: Optional[datetime] = None
+    expires_to: Optional[datetime] = None
+
+    def clauses(self) -> list:
+        clauses = []
+        if self.email is not None:
+            clauses.append(License.email == self.email)
+        if self.machine_id is not None:
+            clauses.append(License.machine_id == self.machine_id)
+        if self.stripe_customer_id is not None:
+            clauses.append(License.stripe_customer_id == self.stripe_customer_id)
+        if self.is_active is not None:
+            clauses.append(License.is_active == self.is_active)
+        if self.created_from is not None:
+            clauses.append(License.created_at >= self.created_from)
+        if self.created_to is not None:
+            clauses.append(License.created_at < self.created_to)
+        if self.expires_from is not None:
+            clauses.append(License.expires_at >= self.expires_from)
+        if self.expires_to is not None:
+            clauses.append(License.expires_at < self.expires_to)
+        return clauses
+
+
+def encode_cursor(created_at: datetime, license_id: int) -> str:
+    """Curseur opaque: position (created_at, id) de la dernière ligne servie"""
+    raw = f"{created_at.isoformat()}|{license_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Lève ValueError si le curseur est illisible"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, license_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(license_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Curseur invalide: {cursor}") from exc
+
+
+def search_statement(filters: LicenseFilters, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """SELECT trié (created_at, id) DESC, repris après `cursor`"""
+    stmt = select(*LISTING_COLUMNS).where(*filters.clauses())
+    if cursor:
+        position = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(License.created_at, License.id) < tuple_(*position))
+    stmt = stmt.order_by(License.created_at.desc(), License.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def search_page(db: Session, filters: LicenseFilters, cursor: Optional[str] = None,
+                limit: int = 50) -> Tuple[List[dict], Optional[str]]:
+    """
+    Une page de résultats et le curseur de la suivante (None en fin de liste)
+
+    Une ligne de plus que demandé est lue pour savoir s'il reste une page.
+    """
+    rows = db.execute(search_statement(filters, cursor, limit + 1)).mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return items, next_cursor
+
+
+def _iter_rows(filters: LicenseFilters) -> Iterator[dict]:
+    """
+    Parcours complet en flux (curseur serveur, lots de EXPORT_BATCH_SIZE)
+
+    Session propre au générateur (sur la réplique si configurée): la session
+    de la requête est déjà fermée quand la réponse en streaming est émise.
+    """
+    db = read_session()
+    try:
+        result = db.execute(
+            search_statement(filters),
+            execution_options={"stream_results": True, "yield_per": EXPORT_BATCH_SIZE},
+        )
+        for row in result.mappings():
+            yield row
+    finally:
+        db.close()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def export_ndjson(filters: LicenseFilters) -> Iterator[str]:
+    buffer = []
+    for row in _iter_rows(filters):
+        buffer.append(json.dumps(dict(row), default=_json_default, ensure_ascii=False))
+        if len(buffer) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def export_csv(filters: LicenseFilters) -> Iterator[str]:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(COLUMN_NAMES)
+    count = 0
+    for row in _iter_rows(filters):
+        writer.writerow([row[name].isoformat() if isinstance(row[name], datetime) else row[name]
+                         for name in COLUMN_NAMES])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Révocation en masse des licences
+
+Sélection par critères (emails, client Stripe, période de création, lot de
+codes d'activation, ids), UPDATE ensemblistes par tranches d'id bornées
+(une transaction courte par tranche), trace d'audit et publication de
+chaque clé révoquée dans le flux license_invalidations.
+
+Les workers suivent ce flux (InvalidationFeed), abonnés au démarrage de
+l'API (main.py): cache de révocation, postes des licences multi-postes et
+détecteur de partage cessent d'honorer les clés révoquées en quelques
+secondes. Le flux est une table interrogée sur son id (index primaire):
+aucune dépendance à un bus de messages, fonctionne aussi sous SQLite. Les
+validateurs edge, sans base, voient les révocations au snapshot suivant.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.activation_code import ActivationCode
+from app.models.license import License
+from app.models.revocation import LicenseInvalidation, RevocationAudit
+from app.services.stats import bump, license_status
+from app.utils.license_crypto import key_digest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+FEED_LOOKBACK_IDS = 500
+
+
+@dataclass
+class RevocationCriteria:
+    """Critères de sélection (combinés par ET); au moins un est obligatoire"""
+    emails: List[str] = field(default_factory=list)
+    stripe_customer_id: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    batch_id: Optional[str] = None  # Lot de codes d'activation (licences des machines qui les ont utilisés)
+    license_ids: List[int] = field(default_factory=list)
+
+    def clauses(self) -> list:
+        clauses = []
+        if self.emails:
+            clauses.append(License.email.in_(sorted(set(self.emails))))
+        if self.stripe_customer_id:
+            clauses.append(License.stripe_customer_id == self.stripe_customer_id)
+        if self.created_from:
+            clauses.append(License.created_at >= self.created_from)
+        if self.created_to:
+            clauses.append(License.created_at < self.created_to)
+        if self.batch_id:
+            clauses.append(License.machine_id.in_(
+                select(ActivationCode.used_by_machine_id).where(
+                    ActivationCode.batch_id == self.batch_id,
+                    ActivationCode.is_used == True,  # noqa: E712
+                )
+            ))
+        if self.license_ids:
+            clauses.append(License.id.in_(sorted(set(self.license_ids))))
+        if not clauses:
+            raise ValueError("Au moins un critère de sélection est requis")
+        return clauses
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=lambda v: v.isoformat(), sort_keys=True)
+
+
+def chunk_statement(criteria: RevocationCriteria, last_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Tranche suivante d'ids à révoquer (pagination par clé sur l'id)"""
+    return (select(License.id).where(*criteria.clauses(), License.id > last_id)
+            .order_by(License.id).limit(chunk_size))
+
+
+def revoke_licenses(db: Session, criteria: RevocationCriteria, reason: str, actor: str,
+                    dry_run: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> RevocationAudit:
+    """
+    Révoque toutes les licences correspondant aux critères
+
+    Parcours par tranches d'id croissants (pagination par clé): chaque tranche
+    est un SELECT borné + un UPDATE ... RETURNING + l'écriture du flux
+    d'invalidations et des compteurs, commités ensemble. Interrompue, la
+    révocation peut être relancée: les licences déjà révoquées sont ignorées.
+
+    Returns:
+        Ligne d'audit (matched = licences sélectionnées, revoked = licences modifiées)
+    """
+    clauses = criteria.clauses()
+    audit = RevocationAudit(actor=actor, reason=reason, criteria=criteria.to_json(), dry_run=dry_run)
+    db.add(audit)
+    db.commit()
+
+    if dry_run:
+        audit.matched = db.execute(select(func.count()).select_from(License).where(*clauses)).scalar()
+        audit.finished_at = datetime.utcnow()
+        db.commit()
+        return audit
+
+    last_id, matched, revoked = 0, 0, 0
+    while True:
+        ids = db.execute(chunk_statement(criteria, last_id, chunk_size)).scalars().all()
+        if not ids:
+            break
+        last_id = ids[-1]
+        matched += len(ids)
+
+        now = datetime.utcnow()
+        rows = db.execute(
+            update(License)
+            .where(License.id.in_(ids), License.is_revoked == False)  # noqa: E712
+            .values(is_revoked=True, revoked_at=now, revoked_reason=reason, updated_at=now)
+            .returning(License.id, License.license_key, License.is_active, License.expired_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        if rows:
+            db.execute(LicenseInvalidation.__table__.insert(), [
+                {"license_id": row.id, "key_digest": key_digest(row.license_key), "reason": reason,
+                 "audit_id": audit.id, "created_at": now}
+                for row in rows
+            ])
+            deltas = {"status:revoked": len(rows)}
+            for row in rows:
+                status = "status:" + license_status(row.is_active, False, row.expired_at)
+                deltas[status] = deltas.get(status, 0) - 1
+            bump(db, deltas)
+
+        revoked += len(rows)
+        audit.matched, audit.revoked = matched, revoked
+        db.commit()
+
+        if len(ids) < chunk_size:
+            break
+
+    audit.finished_at = datetime.utcnow()
+    db.commit()
+    logger.info("Révocation #%s par %s: %d licence(s) révoquée(s) sur %d", audit.id, actor, revoked, matched)
+    return audit
+
+
+def invalidations_statement(after_id: int, limit: int = 1000):
+    """Invalidations publiées après la position `after_id` (ordre du flux, index primaire)"""
+    return (select(LicenseInvalidation).where(LicenseInvalidation.id > after_id)
+            .order_by(LicenseInvalidation.id).limit(limit))
+
+
+def invalidations_after(db: Session, after_id: int, limit: int = 1000) -> List[LicenseInvalidation]:
+    """Invalidations publiées après la position `after_id` (ordre du flux)"""
+    return db.execute(invalidations_statement(after_id, limit)).scalars().all()
+
+
+def prune_invalidations(db: Session, older_than: datetime) -> int:
+    """Purge le flux (les licences restent révoquées: seul l'historique de diffusion disparaît)"""
+    count = db.execute(
+        delete(LicenseInvalidation).where(LicenseInvalidation.created_at < older_than)
+    ).rowcount
+    db.commit()
+    return count
+
+
+class InvalidationFeed:
+    """
+    Suivi du flux d'invalidations dans un worker
+
+    Les abonnés (cache de révocation, postes, détecteur de partage) reçoivent
+    chaque lot de nouvelles invalidations, dans l'ordre du flux.
+
+    Deux révocations concurrentes peuvent commiter leurs ids dans le désordre:
+    chaque lecture repart FEED_LOOKBACK_IDS avant la position et ignore les ids
+    déjà diffusés, pour ne pas sauter un id commité en retard. Les abonnés
+    doivent être idempotents (au démarrage, ce recouvrement est rediffusé).
+    """
+
+    def __init__(self, poll_interval: Optional[float] = None):
+        self.poll_interval = poll_interval or settings.INVALIDATION_POLL_SECONDS
+        self.position = 0
+        self._delivered: deque = deque(maxlen=FEED_LOOKBACK_IDS * 4)
+        self._delivered_ids: set = set()
+        self._subscribers: List[Callable[[List[LicenseInvalidation]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Callable[[List[LicenseInvalidation]], None]) -> None:
+        if callback not in self._subscribers:  # lifespan rejoué (tests): pas de double abonnement
+            self._subscribers.append(callback)
+
+    def poll(self) -> int:
+        """Lit et diffuse les nouvelles invalidations; retourne leur nombre"""
+        db = SessionLocal()
+        try:
+            total = 0
+            after = max(0, self.position - FEED_LOOKBACK_IDS)
+            while True:
+                rows = invalidations_after(db, after)
+                if not rows:
+                    return total
+                after = rows[-1].id
+                batch = [row for row in rows if row.id not in self._delivered_ids]
+                if batch:
+                    for callback in self._subscribers:
+                        try:
+                            callback(batch)
+                        except Exception:
+                            logger.exception("Abonné au flux d'invalidations en échec")
+                    self._remember(batch)
+                    total += len(batch)
+                self.position = max(self.position, after)
+        finally:
+            db.close()
+
+    def _remember(self, batch: List[LicenseInvalidation]) -> None:
+        for row in batch:
+            if len(self._delivered) == self._delivered.maxlen:
+                self._delivered_ids.discard(self._delivered[0])
+            self._delivered.append(row.id)
+            self._delivered_ids.add(row.id)
+
+    def skip_to_end(self) -> None:
+        """Démarre après la dernière invalidation (l'état initial vient de la table licenses)"""
+        db = SessionLocal()
+        try:
+            self.position = db.execute(select(func.coalesce(func.max(LicenseInvalidation.id), 0))).scalar()
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.poll)
+            except Exception:
+                logger.exception("Lecture du flux d'invalidations en échec, nouvel essai plus tard")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instance globale (abonnés enregistrés et lecture démarrée avec l'API)
+invalidation_feed = InvalidationFeed()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ensemble en mémoire des licences bloquées (révoquées ou désactivées)
+
+Chaque worker garde l'empreinte des clés bloquées pour que /licenses/validate
+réponde à une clé révoquée sans lire la ligne License. Les licences
+expirées n'y figurent pas: leur clé porte sa date d'expiration et est
+refusée avant tout accès base.
+
+Structure (≈ 20 octets par licence bloquée):
+- préfixe 64 bits du SHA-256 de la clé, trié (array 'Q', recherche par bisection)
+- tableaux parallèles: id de licence, statut, index de la raison de révocation
+- filtre de Bloom devant le tout: une clé non bloquée (cas courant) est
+  écartée sans bisection
+- petit dictionnaire de modifications récentes, fusionné par reconstruction
+  au-delà de MERGE_THRESHOLD entrées
+
+Chargé au démarrage (index partiel ix_licenses_blocked), puis tenu à jour
+par le flux d'invalidations (app.services.revocation), lu dans l'ordre de
+son id: une clé révoquée est bloquée dès sa diffusion, sans relire la
+licence (l'empreinte SHA-256 du flux donne le préfixe). La position du
+flux est prise avant le chargement: une révocation commitée pendant le
+chargement est rediffusée, aucune horloge applicative n'intervient.
+Les clés qui cessent d'être bloquées (réactivation par paiement) changent
+de clé: l'ancienne reste bloquée, la nouvelle est lue en base.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.license import License
+from app.utils.validation_outcome import ValidationOutcome
+
+logger = logging.getLogger(__name__)
+
+STATUS_REVOKED = 1
+STATUS_INACTIVE = 2
+STATUS_OUTCOMES = {STATUS_REVOKED: ValidationOutcome.REVOKED, STATUS_INACTIVE: ValidationOutcome.INACTIVE}
+
+MERGE_THRESHOLD = 4096
+SYNC_BATCH_SIZE = 5000
+
+SYNC_COLUMNS = (License.id, License.license_key, License.is_revoked, License.is_active,
+                License.expired_at, License.revoked_reason)
+
+
+class BlockedLicense(NamedTuple):
+    license_id: int
+    outcome: ValidationOutcome
+    revoked_reason: Optional[str]
+
+
+def key_prefix(license_key: str) -> int:
+    """Préfixe 64 bits du SHA-256 de la clé (collision: ~n / 2^64 par recherche)"""
+    return int.from_bytes(hashlib.sha256(license_key.encode("ascii")).digest()[:8], "big")
+
+
+def digest_prefix(digest: str) -> int:
+    """Même préfixe, depuis l'empreinte SHA-256 hex (app.utils.license_crypto.key_digest)"""
+    return int(digest[:16], 16)
+
+
+class BloomFilter:
+    """
+    Filtre de Bloom sur des empreintes déjà uniformes (double hachage des deux moitiés)
+
+    10 bits par entrée et 3 positions: ~1,7 % de faux positifs, qui ne
+    coûtent qu'une bisection.
+    """
+
+    def __init__(self, capacity: int, bits_per_item: int = 10, hashes: int = 3):
+        self.size = max(64, capacity * bits_per_item)
+        self.hashes = hashes
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, prefix: int) -> None:
+        h1, h2, size, bits = prefix >> 32, (prefix & 0xFFFFFFFF) | 1, self.size, self.bits
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, prefix: int) -> bool:
+        h1, h2, size, bits = prefix >> 32, (prefix & 0xFFFFFFFF) | 1, self.size, self.bits
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class _Snapshot(NamedTuple):
+    """État trié immuable (remplacé d'un bloc à chaque fusion)"""
+    prefixes: array
+    license_ids: array
+    statuses: array
+    reason_ids: array
+    reasons: Tuple[Optional[str], ...]
+    bloom: BloomFilter
+
+
+def _build(entries: Dict[int, Tuple[int, int, Optional[str]]]) -> _Snapshot:
+    """entries: préfixe -> (license_id, statut, raison)"""
+    reasons: Dict[Optional[str], int] = {None: 0}
+    ordered = sorted(entries)
+    bloom = BloomFilter(len(ordered))
+    add = bloom.add
+    for prefix in ordered:
+        add(prefix)
+    rows = [entries[prefix] for prefix in ordered]
+    reason_ids = array("H", [
+        reasons.setdefault(reason, len(reasons)) if reason in reasons or len(reasons) < 65535 else 0
+        for _, _, reason in rows
+    ])
+    return _Snapshot(array("Q", ordered), array("q", [row[0] for row in rows]),
+                     array("b", [row[1] for row in rows]), reason_ids, tuple(reasons), bloom)
+
+
+def entry_for(row) -> Optional[Tuple[int, int, Optional[str]]]:
+    """(license_id, statut, raison) si la licence est bloquée, None sinon"""
+    if row.is_revoked:
+        return row.id, STATUS_REVOKED, row.revoked_reason
+    if not row.is_active and row.expired_at is None:
+        return row.id, STATUS_INACTIVE, None
+    return None
+
+
+def blocked_filter():
+    """Licences bloquées non expirées (prédicat de ix_licenses_blocked)"""
+    return or_(License.is_revoked == True,  # noqa: E712
+               and_(License.is_active == False, License.expired_at.is_(None)))  # noqa: E712
+
+
+class RevocationSet:
+    """Ensemble des licences bloquées d'un worker (lecture sans verrou, un seul écrivain)"""
+
+    def __init__(self):
+        self._snapshot = _build({})
+        self._delta: Dict[int, Optional[Tuple[int, int, Optional[str]]]] = {}
+        self._write_lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        # Approximatif tant que les modifications récentes ne sont pas fusionnées
+        return len(self._snapshot.prefixes) + sum(1 for entry in self._delta.values() if entry)
+
+    def lookup(self, license_key: str) -> Optional[BlockedLicense]:
+        """Licence bloquée correspondant à la clé, None si la clé n'est pas bloquée"""
+        prefix = key_prefix(license_key)
+        delta = self._delta
+        if prefix in delta:
+            entry = delta[prefix]
+            return BlockedLicense(entry[0], STATUS_OUTCOMES[entry[1]], entry[2]) if entry else None
+
+        snap = self._snapshot
+        if not snap.bloom.might_contain(prefix):
+            return None
+        index = bisect.bisect_left(snap.prefixes, prefix)
+        if index == len(snap.prefixes) or snap.prefixes[index] != prefix:
+            return None
+        return BlockedLicense(snap.license_ids[index], STATUS_OUTCOMES[snap.statuses[index]],
+                              snap.reasons[snap.reason_ids[index]])
+
+    def apply_invalidations(self, invalidations: Iterable) -> int:
+        """Abonné au flux d'invalidations: bloque les clés révoquées; idempotent"""
+        with self._write_lock:
+            count = 0
+            for invalidation in invalidations:
+                prefix = digest_prefix(invalidation.key_digest)
+                self._snapshot.bloom.add(prefix)
+                self._delta[prefix] = (invalidation.license_id, STATUS_REVOKED, invalidation.reason)
+                count += 1
+            if len(self._delta) > MERGE_THRESHOLD:
+                self._merge()
+            return count
+
+    def _merge(self) -> None:
+        snap = self._snapshot
+        entries = {
+            prefix: (snap.license_ids[i], snap.statuses[i], snap.reasons[snap.reason_ids[i]])
+            for i, prefix in enumerate(snap.prefixes)
+        }
+        for prefix, entry in self._delta.items():
+            if entry is None:
+                entries.pop(prefix, None)
+            else:
+                entries[prefix] = entry
+        self._snapshot = _build(entries)
+        self._delta = {}
+
+    def load(self, db: Session) -> int:
+        """
+        Chargement complet (démarrage); retourne le nombre de licences bloquées
+
+        Les invalidations diffusées pendant le chargement restent dans les
+        modifications récentes (le flux ne fait que bloquer des clés).
+        """
+        entries = {}
+        result = db.execute(select(*SYNC_COLUMNS).where(blocked_filter()),
+                            execution_options={"stream_results": True, "yield_per": SYNC_BATCH_SIZE})
+        for row in result:
+            entries[key_prefix(row.license_key)] = entry_for(row)
+        db.rollback()
+        with self._write_lock:
+            snapshot = _build(entries)
+            for prefix in self._delta:
+                snapshot.bloom.add(prefix)
+            self._snapshot = snapshot
+            self.loaded = True
+        return len(entries)
+
+    def memory_bytes(self) -> int:
+        """Empreinte mémoire approximative (tableaux + filtre + modifications récentes)"""
+        snap = self._snapshot
+        arrays = sum(a.buffer_info()[1] * a.itemsize for a in
+                     (snap.prefixes, snap.license_ids, snap.statuses, snap.reason_ids))
+        reasons = sum(sys.getsizeof(r) for r in snap.reasons if r)
+        return arrays + len(snap.bloom.bits) + reasons + sys.getsizeof(self._delta)
+
+
+class RevocationSetSync:
+    """Tâche de fond: chargement au démarrage (nouvel essai en cas d'échec); le flux d'invalidations fait le reste"""
+
+    def __init__(self, revocation_set: RevocationSet, interval: Optional[float] = None):
+        self.revocation_set = revocation_set
+        self.interval = interval or settings.INVALIDATION_POLL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    def _load(self) -> int:
+        db = SessionLocal()
+        try:
+            count = self.revocation_set.load(db)
+            logger.info("Cache de révocation chargé: %d licence(s) bloquée(s)", count)
+            return count
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self.revocation_set.loaded:
+            try:
+                await loop.run_in_executor(None, self._load)
+            except Exception:
+                logger.exception("Chargement du cache de révocation en échec, nouvel essai plus tard")
+                await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instances globales
+revocation_set = RevocationSet()
+revocation_set_sync = RevocationSetSync(revocation_set)
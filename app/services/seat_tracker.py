@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Licences multi-postes: postes actifs par licence en fenêtre glissante
+
+Une licence multi-postes (licenses.max_seats) s'utilise sur n'importe quelle
+machine tant qu'au plus max_seats machines ont validé la licence ou envoyé
+un heartbeat dans les SEAT_WINDOW_SECONDS dernières secondes.
+
+Décision en mémoire, O(1) par requête (aucune agrégation sur activations):
+- par licence, OrderedDict machine -> dernier passage, dans l'ordre des
+  passages: les postes expirés sont en tête et sortent au fil des requêtes
+  (coût amorti constant), le nombre de postes actifs est len()
+- un poste déjà actif est toujours accepté (replacé en fin), un nouveau
+  poste seulement s'il reste une place
+
+Partage entre workers (SeatStore): chaque worker publie ses passages
+toutes les SEAT_SYNC_SECONDS et relit ceux des autres (table seat_leases,
+ou LocalSeatStore en mémoire pour un seul processus et les tests). Chaque
+publication d'un bail lui attribue un numéro de modification croissant
+(séquence seat_leases_change_id_seq côté base): un worker relit les baux
+modifiés après le dernier numéro lu, moins SYNC_LOOKBACK_CHANGES pour les
+publications commitées dans le désordre, sans dépendre des horloges. Deux
+workers peuvent admettre en même temps un poste sur la dernière place: à
+la synchronisation suivante, chacun garde les max_seats postes arrivés en
+premier (first_seen, même règle partout) et refuse les autres jusqu'à
+l'expiration de leur bail. Une licence révoquée (flux d'invalidations)
+libère aussitôt ses postes dans chaque worker.
+
+Mesure: python -m benchmarks.seats
+"""
+
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Sequence, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.seat_lease import SeatLease
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL_SECONDS = 60.0  # Licences sans poste actif libérées, baux expirés purgés
+# Numéros relus à chaque synchronisation: publications concurrentes commitées dans le désordre
+SYNC_LOOKBACK_CHANGES = 500
+
+seat_leases = SeatLease.__table__
+seat_lease_changes = Sequence("seat_leases_change_id_seq")
+
+
+class Lease(NamedTuple):
+    """Bail d'un poste (horodatages epoch en secondes)"""
+    license_id: int
+    machine_id: str
+    first_seen: float
+    last_seen: float
+
+
+class SeatDecision(NamedTuple):
+    allowed: bool
+    in_use: int  # Postes actifs après la décision
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _to_timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+# ============================================
+# STOCKAGE PARTAGÉ DES BAUX
+# ============================================
+
+class SeatStore(ABC):
+    """Baux partagés entre workers (fusion: first_seen le plus ancien, last_seen le plus récent)"""
+
+    @abstractmethod
+    def publish(self, leases: List[Lease]) -> None:
+        """Fusionne les baux de ce worker dans le stockage"""
+
+    @abstractmethod
+    def changes_after(self, position: int) -> Tuple[List[Lease], int]:
+        """Baux publiés après le numéro de modification `position`, et dernier numéro lu"""
+
+    @abstractmethod
+    def purge(self, before: float) -> int:
+        """Supprime les baux expirés avant `before`"""
+
+
+class LocalSeatStore(SeatStore):
+    """Baux en mémoire du processus (un seul worker, tests, benchmarks)"""
+
+    def __init__(self):
+        self._leases: Dict[Tuple[int, str], Lease] = {}
+        self._change_ids: Dict[Tuple[int, str], int] = {}
+        # (numéro, clé) dans l'ordre des publications: relecture par bisection;
+        # les entrées remplacées par une publication plus récente sont ignorées à la lecture
+        self._changes: List[Tuple[int, Tuple[int, str]]] = []
+        self._last_change = 0
+        self._lock = threading.Lock()
+
+    def publish(self, leases: List[Lease]) -> None:
+        with self._lock:
+            for lease in leases:
+                key = (lease.license_id, lease.machine_id)
+                current = self._leases.get(key)
+                if current is not None:
+                    lease = lease._replace(first_seen=min(current.first_seen, lease.first_seen),
+                                           last_seen=max(current.last_seen, lease.last_seen))
+                self._leases[key] = lease
+                self._last_change += 1
+                self._change_ids[key] = self._last_change
+                self._changes.append((self._last_change, key))
+
+    def changes_after(self, position: int) -> Tuple[List[Lease], int]:
+        with self._lock:
+            start = bisect.bisect_right(self._changes, (position, (sys.maxsize, "")))
+            changes = [self._leases[key] for change_id, key in self._changes[start:]
+                       if self._change_ids.get(key) == change_id]
+            return changes, max(position, self._last_change)
+
+    def purge(self, before: float) -> int:
+        with self._lock:
+            expired = [key for key, lease in self._leases.items() if lease.last_seen <= before]
+            for key in expired:
+                del self._leases[key]
+                del self._change_ids[key]
+            # Entrées remplacées ou purgées: retirées au passage
+            self._changes = [(change_id, key) for change_id, key in self._changes
+                             if self._change_ids.get(key) == change_id]
+            return len(expired)
+
+
+def changes_statement(position: int):
+    """Baux publiés après le numéro `position` (index ix_seat_leases_change_id)"""
+    return (select(seat_leases.c.license_id, seat_leases.c.machine_id,
+                   seat_leases.c.first_seen, seat_leases.c.last_seen, seat_leases.c.change_id)
+            .where(seat_leases.c.change_id > position))
+
+
+class DatabaseSeatStore(SeatStore):
+    """
+    Baux dans la table seat_leases (un upsert groupé par synchronisation)
+
+    Chaque ligne insérée ou mise à jour reçoit un nouveau change_id: séquence
+    sous PostgreSQL, max + 1 sous SQLite (écritures sérialisées).
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def publish(self, leases: List[Lease]) -> None:
+        if not leases:
+            return
+        db = self.session_factory()
+        try:
+            postgresql = db.get_bind().dialect.name == "postgresql"
+            if postgresql:
+                next_change = seat_lease_changes.next_value()
+            else:
+                next_change = select(func.coalesce(func.max(seat_leases.c.change_id), 0) + 1).scalar_subquery()
+            stmt = (postgresql_insert if postgresql else sqlite_insert)(seat_leases).values(
+                license_id=bindparam("license_id"), machine_id=bindparam("machine_id"),
+                first_seen=bindparam("first_seen"), last_seen=bindparam("last_seen"), change_id=next_change,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["license_id", "machine_id"],
+                set_={
+                    "first_seen": (func.least if postgresql else func.min)(seat_leases.c.first_seen,
+                                                                         stmt.excluded.first_seen),
+                    "last_seen": (func.greatest if postgresql else func.max)(seat_leases.c.last_seen,
+                                                                           stmt.excluded.last_seen),
+                    "change_id": stmt.excluded.change_id,
+                },
+            )
+            db.execute(stmt, [
+                {"license_id": lease.license_id, "machine_id": lease.machine_id,
+                 "first_seen": _to_datetime(lease.first_seen), "last_seen": _to_datetime(lease.last_seen)}
+                for lease in sorted(leases)  # Ordre stable: pas d'interblocage entre workers
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+    def changes_after(self, position: int) -> Tuple[List[Lease], int]:
+        db = self.session_factory()
+        try:
+            leases, last = [], position
+            for license_id, machine_id, first_seen, last_seen, change_id in db.execute(changes_statement(position)):
+                leases.append(Lease(license_id, machine_id, _to_timestamp(first_seen), _to_timestamp(last_seen)))
+                last = max(last, change_id)
+            return leases, last
+        finally:
+            db.close()
+
+    def purge(self, before: float) -> int:
+        db = self.session_factory()
+        try:
+            count = db.execute(delete(seat_leases).where(seat_leases.c.last_seen <= _to_datetime(before))).rowcount
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+
+# ============================================
+# POSTES ACTIFS D'UN WORKER
+# ============================================
+
+class LicenseSeats:
+    """Postes d'une licence, du passage le plus ancien au plus récent"""
+
+    __slots__ = ("max_seats", "machines", "first_seen", "bumped")
+
+    def __init__(self, max_seats: Optional[int] = None):
+        self.max_seats = max_seats  # Inconnu tant qu'aucune requête de ce worker n'a lu la licence
+        self.machines: "OrderedDict[str, float]" = OrderedDict()
+        self.first_seen: Dict[str, float] = {}
+        self.bumped: Optional[Dict[str, float]] = None  # Postes en dépassement -> fin du refus
+
+    def expire(self, cutoff: float) -> None:
+        """Sort les postes dont le dernier passage précède `cutoff` (tous en tête)"""
+        machines = self.machines
+        while machines:
+            machine_id = next(iter(machines))
+            if machines[machine_id] > cutoff:
+                break
+            del machines[machine_id]
+            del self.first_seen[machine_id]
+
+    def is_bumped(self, machine_id: str, now: float) -> bool:
+        return self.bumped is not None and self.bumped.get(machine_id, 0.0) > now
+
+
+class SeatTracker:
+    """Postes actifs des licences multi-postes, vus par un worker"""
+
+    def __init__(self, store: SeatStore, window: Optional[float] = None):
+        self.store = store
+        self.window = window or settings.SEAT_WINDOW_SECONDS
+        self._licenses: Dict[int, LicenseSeats] = {}
+        self._dirty: Dict[Tuple[int, str], Tuple[float, float]] = {}  # Passages à publier: (first_seen, last_seen)
+        self._lock = threading.Lock()
+        self.position: Optional[int] = None  # Dernier numéro de modification lu dans le stockage partagé
+        self._swept_at = 0.0
+
+    def __len__(self) -> int:
+        """Postes suivis (actifs, ou expirés pas encore sortis)"""
+        return sum(len(seats.machines) for seats in self._licenses.values())
+
+    def acquire(self, license_id: int, max_seats: int, machine_id: str,
+                now: Optional[float] = None) -> SeatDecision:
+        """Enregistre le passage de `machine_id` si la licence lui laisse une place"""
+        now = time.time() if now is None else now
+        with self._lock:
+            seats = self._licenses.get(license_id)
+            if seats is None:
+                seats = self._licenses[license_id] = LicenseSeats()
+            seats.max_seats = max_seats
+            seats.expire(now - self.window)
+            machines = seats.machines
+            if machine_id in machines:
+                machines[machine_id] = now
+                machines.move_to_end(machine_id)
+            elif len(machines) >= max_seats or seats.is_bumped(machine_id, now):
+                return SeatDecision(False, len(machines))
+            else:
+                machines[machine_id] = now
+                seats.first_seen[machine_id] = now
+            self._dirty[(license_id, machine_id)] = (seats.first_seen[machine_id], now)
+            return SeatDecision(True, len(machines))
+
+    def merge(self, leases: Iterable[Lease], now: Optional[float] = None) -> int:
+        """Intègre les baux relus du stockage partagé; retourne le nombre de baux actifs lus"""
+        now = time.time() if now is None else now
+        cutoff = now - self.window
+        count = 0
+        touched = {}
+        with self._lock:
+            # Dans l'ordre des passages: les postes restent (à quelques secondes près) triés
+            for lease in sorted(leases, key=lambda lease: lease.last_seen):
+                if lease.last_seen <= cutoff:
+                    continue
+                count += 1
+                seats = self._licenses.get(lease.license_id)
+                if seats is None:
+                    seats = self._licenses[lease.license_id] = LicenseSeats()
+                if seats.is_bumped(lease.machine_id, now):
+                    continue
+                machines, machine_id = seats.machines, lease.machine_id
+                known = machines.get(machine_id)
+                if known is None:
+                    machines[machine_id] = lease.last_seen
+                    seats.first_seen[machine_id] = lease.first_seen
+                else:
+                    if lease.last_seen > known:
+                        machines[machine_id] = lease.last_seen
+                        machines.move_to_end(machine_id)
+                    if lease.first_seen < seats.first_seen[machine_id]:
+                        seats.first_seen[machine_id] = lease.first_seen
+                touched[lease.license_id] = seats
+            for seats in touched.values():
+                self._resolve_overflow(seats)
+        return count
+
+    def _resolve_overflow(self, seats: LicenseSeats) -> None:
+        """Au-delà de max_seats (admissions simultanées sur plusieurs workers): les premiers arrivés gardent leur place"""
+        if seats.max_seats is None or len(seats.machines) <= seats.max_seats:
+            return
+        ranked = sorted(seats.machines, key=lambda machine_id: (seats.first_seen[machine_id], machine_id))
+        if seats.bumped is None:
+            seats.bumped = {}
+        for machine_id in ranked[seats.max_seats:]:
+            seats.bumped[machine_id] = seats.machines.pop(machine_id) + self.window
+            del seats.first_seen[machine_id]
+
+    def release_revoked(self, invalidations: Iterable) -> int:
+        """Abonné au flux d'invalidations: oublie les postes des licences révoquées"""
+        license_ids = {invalidation.license_id for invalidation in invalidations}
+        with self._lock:
+            released = sum(1 for license_id in license_ids if self._licenses.pop(license_id, None) is not None)
+            self._dirty = {key: seen for key, seen in self._dirty.items() if key[0] not in license_ids}
+            return released
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Libère les licences sans poste actif; retourne le nombre de licences suivies"""
+        now = time.time() if now is None else now
+        cutoff = now - self.window
+        with self._lock:
+            for license_id in list(self._licenses):
+                seats = self._licenses[license_id]
+                seats.expire(cutoff)
+                if seats.bumped:
+                    seats.bumped = {machine_id: until for machine_id, until in seats.bumped.items()
+                                    if until > now} or None
+                if not seats.machines and not seats.bumped:
+                    del self._licenses[license_id]
+            return len(self._licenses)
+
+    def sync(self, now: Optional[float] = None) -> int:
+        """Publie les passages de ce worker puis relit ceux des autres; retourne le nombre de baux lus"""
+        now = time.time() if now is None else now
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        try:
+            self.store.publish([Lease(license_id, machine_id, first_seen, last_seen)
+                                for (license_id, machine_id), (first_seen, last_seen) in dirty.items()])
+        except Exception:
+            with self._lock:
+                for key, seen in dirty.items():
+                    self._dirty.setdefault(key, seen)
+            raise
+
+        # Démarrage: tous les baux (les expirés sont écartés par merge et purgés)
+        after = 0 if self.position is None else max(0, self.position - SYNC_LOOKBACK_CHANGES)
+        leases, position = self.store.changes_after(after)
+        count = self.merge(leases, now)
+        self.position = max(position, self.position or 0)
+
+        if now - self._swept_at >= SWEEP_INTERVAL_SECONDS:
+            self._swept_at = now
+            self.sweep(now)
+            self.store.purge(now - self.window)
+        return count
+
+    def seats_in_use(self, license_id: int, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            seats = self._licenses.get(license_id)
+            if seats is None:
+                return 0
+            seats.expire(now - self.window)
+            return len(seats.machines)
+
+
+class SeatTrackerSync:
+    """Tâche de fond: échange des baux avec les autres workers"""
+
+    def __init__(self, tracker: SeatTracker, interval: Optional[float] = None):
+        self.tracker = tracker
+        self.interval = interval or settings.SEAT_SYNC_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.tracker.sync)
+            except Exception:
+                logger.exception("Synchronisation des postes en échec, nouvel essai plus tard")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                # Derniers passages publiés avant l'arrêt du worker
+                await asyncio.get_running_loop().run_in_executor(None, self.tracker.sync)
+            except Exception:
+                logger.exception("Publication des postes à l'arrêt en échec")
+
+
+def build_store() -> SeatStore:
+    return LocalSeatStore() if settings.SEAT_STORE == "local" else DatabaseSeatStore()
+
+
+# Instances globales
+seat_tracker = SeatTracker(build_store())
+seat_tracker_sync = SeatTrackerSync(seat_tracker)
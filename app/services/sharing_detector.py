@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Détection du partage de clés de licence
+
+Une clé divulguée se reconnaît à sa dispersion: validée depuis beaucoup de
+machines (refus MACHINE_MISMATCH pour une licence liée à sa machine),
+d'adresses IP et de réseaux. Le détecteur est alimenté par /validate et
+ne lit jamais la table activations (aucun GROUP BY).
+
+Par clé et par tranche de la fenêtre glissante (SHARING_WINDOW_SECONDS
+découpée en SHARING_WINDOW_BUCKETS tranches), trois esquisses HyperLogLog:
+machines, adresses IP et réseaux (/24 en IPv4, /64 en IPv6) distincts.
+- mémoire bornée: une esquisse occupe au plus 1 Kio (1024 registres),
+  quelques dizaines d'octets tant qu'elle compte peu de valeurs (mode
+  creux, comptage exact); au plus SHARING_MAX_TRACKED_KEYS clés par
+  worker, les moins récemment vues sortent en premier
+- fusion sans double comptage: l'union de deux esquisses est le maximum
+  registre par registre (idempotent), ce qui permet de fusionner les
+  workers et les tranches de la fenêtre
+- précision: exacte jusqu'à 128 valeurs, erreur type ~3 % au-delà
+
+Toutes les SHARING_SYNC_SECONDS, chaque worker fusionne les esquisses des
+clés vues depuis la synchronisation précédente dans la table
+license_sharing_sketches, évalue l'union de la fenêtre (tous workers
+confondus) et ouvre ou met à jour une alerte (license_sharing_alerts,
+GET /admin/sharing-alerts) au-delà des seuils SHARING_MAX_*. Une clé
+révoquée (flux d'invalidations) n'ouvre plus d'alerte.
+
+Mesure: python -m benchmarks.sharing
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from ipaddress import ip_network
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.sharing import SharingAlert, SharingSketch
+from app.services.license_lookup import license_status
+from app.utils.license_crypto import key_digest
+
+logger = logging.getLogger(__name__)
+
+PRECISION = 10
+REGISTERS = 1 << PRECISION
+SPARSE_LIMIT = REGISTERS // 8  # Au-delà, les hachages (8 octets) occuperaient plus que les registres
+_RANK_BITS = 64 - PRECISION
+_RANK_MASK = (1 << _RANK_BITS) - 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+_INV_POW = [2.0 ** -rank for rank in range(_RANK_BITS + 2)]
+
+PURGE_INTERVAL_SECONDS = 300.0  # Tranches sorties de la fenêtre supprimées
+
+sketches_table = SharingSketch.__table__
+alerts_table = SharingAlert.__table__
+
+
+def value_hash(value: str) -> int:
+    """Hachage 64 bits (BLAKE2b) d'une valeur observée"""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+def subnet(ip_address: str) -> str:
+    """Réseau d'une adresse: /24 en IPv4, /64 en IPv6"""
+    if ":" not in ip_address:
+        return ip_address.rpartition(".")[0]
+    try:
+        return str(ip_network(f"{ip_address}/64", strict=False))
+    except ValueError:
+        return ip_address
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+# ============================================
+# ESQUISSE HYPERLOGLOG
+# ============================================
+
+class HyperLogLog:
+    """Nombre de valeurs distinctes en mémoire bornée (creux puis 1024 registres)"""
+
+    __slots__ = ("sparse", "registers")
+
+    def __init__(self):
+        self.sparse: Optional[array] = None  # Hachages distincts (comptage exact)
+        self.registers: Optional[bytearray] = None
+
+    def add(self, value_hash: int) -> bool:
+        """Ajoute une valeur hachée; retourne True si l'esquisse a changé"""
+        registers = self.registers
+        if registers is None:
+            sparse = self.sparse
+            if sparse is None:
+                self.sparse = array("Q", (value_hash,))
+                return True
+            if value_hash in sparse:
+                return False
+            if len(sparse) < SPARSE_LIMIT:
+                sparse.append(value_hash)
+                return True
+            registers = self._densify()
+        index = value_hash >> _RANK_BITS
+        rank = _RANK_BITS - (value_hash & _RANK_MASK).bit_length() + 1
+        if rank > registers[index]:
+            registers[index] = rank
+            return True
+        return False
+
+    def _densify(self) -> bytearray:
+        registers = self.registers = bytearray(REGISTERS)
+        for value_hash in self.sparse or ():
+            index = value_hash >> _RANK_BITS
+            rank = _RANK_BITS - (value_hash & _RANK_MASK).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+        self.sparse = None
+        return registers
+
+    def merge(self, other: "HyperLogLog") -> bool:
+        """Union (idempotente); retourne True si l'esquisse a changé"""
+        if other.registers is None:
+            changed = False
+            for value_hash in other.sparse or ():
+                changed |= self.add(value_hash)
+            return changed
+        registers = self.registers if self.registers is not None else self._densify()
+        merged = bytes(map(max, registers, other.registers))
+        if merged == registers:
+            return False
+        registers[:] = merged
+        return True
+
+    def estimate(self) -> float:
+        registers = self.registers
+        if registers is None:
+            return float(len(self.sparse or ()))
+        raw = _ALPHA * REGISTERS * REGISTERS / sum(_INV_POW[rank] for rank in registers)
+        zeros = registers.count(0)
+        if raw <= 2.5 * REGISTERS and zeros:
+            return REGISTERS * math.log(REGISTERS / zeros)  # Comptage linéaire (petites cardinalités)
+        return raw
+
+    def to_bytes(self) -> bytes:
+        if self.registers is not None:
+            return b"D" + bytes(self.registers)
+        sparse = array("Q", self.sparse or ())
+        if sys.byteorder == "big":
+            sparse.byteswap()
+        return b"S" + sparse.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls()
+        if data[:1] == b"D":
+            sketch.registers = bytearray(data[1:])
+        elif len(data) > 1:
+            sketch.sparse = array("Q")
+            sketch.sparse.frombytes(data[1:])
+            if sys.byteorder == "big":
+                sketch.sparse.byteswap()
+        return sketch
+
+
+class KeySketches:
+    """Esquisses d'une clé sur une tranche de la fenêtre"""
+
+    __slots__ = ("machines", "ips", "subnets", "bucket")
+
+    def __init__(self, machines=None, ips=None, subnets=None, bucket: Optional[int] = None):
+        self.machines = machines or HyperLogLog()
+        self.ips = ips or HyperLogLog()
+        self.subnets = subnets or HyperLogLog()
+        self.bucket = bucket  # Numéro de tranche (epoch // durée d'une tranche) dans un SharingDetector
+
+    def merge(self, other: "KeySketches") -> bool:
+        changed = self.machines.merge(other.machines)
+        changed |= self.ips.merge(other.ips)
+        changed |= self.subnets.merge(other.subnets)
+        return changed
+
+    def to_bytes(self) -> Tuple[bytes, bytes, bytes]:
+        return self.machines.to_bytes(), self.ips.to_bytes(), self.subnets.to_bytes()
+
+    @classmethod
+    def from_bytes(cls, machines: bytes, ips: bytes, subnets: bytes) -> "KeySketches":
+        return cls(HyperLogLog.from_bytes(machines), HyperLogLog.from_bytes(ips), HyperLogLog.from_bytes(subnets))
+
+
+class Dispersion(NamedTuple):
+    """Estimations sur la fenêtre pour une clé"""
+    machines: int
+    ips: int
+    subnets: int
+
+
+def window_dispersion(buckets: List[KeySketches]) -> Dispersion:
+    """Union des tranches de la fenêtre"""
+    window = KeySketches()
+    for sketches in buckets:
+        window.merge(sketches)
+    return Dispersion(round(window.machines.estimate()), round(window.ips.estimate()),
+                      round(window.subnets.estimate()))
+
+
+# ============================================
+# STOCKAGE PARTAGÉ DES ESQUISSES
+# ============================================
+
+class SketchStore(ABC):
+    """Esquisses partagées entre workers, par (empreinte de clé, début de tranche en epoch)"""
+
+    @abstractmethod
+    def merge(self, sketches: Dict[Tuple[str, float], KeySketches],
+              oldest: float) -> Dict[str, List[KeySketches]]:
+        """
+        Fusionne les esquisses de ce worker dans le stockage
+
+        Returns:
+            dict: empreinte -> esquisses fusionnées (tous workers) des tranches >= `oldest`
+        """
+
+    @abstractmethod
+    def purge(self, before: float) -> int:
+        """Supprime les tranches commencées avant `before`"""
+
+
+class LocalSketchStore(SketchStore):
+    """Esquisses en mémoire du processus (un seul worker, tests, benchmarks)"""
+
+    def __init__(self):
+        self._sketches: Dict[str, Dict[float, KeySketches]] = {}  # empreinte -> début de tranche -> esquisses
+        self._lock = threading.Lock()
+
+    def merge(self, sketches, oldest):
+        with self._lock:
+            for (digest, start), incoming in sketches.items():
+                buckets = self._sketches.setdefault(digest, {})
+                current = buckets.get(start)
+                if current is None:
+                    current = buckets[start] = KeySketches()
+                current.merge(incoming)
+            # Copies: l'appelant fusionne hors du verrou
+            return {digest: [KeySketches.from_bytes(*stored.to_bytes())
+                             for start, stored in sorted(self._sketches[digest].items()) if start >= oldest]
+                    for digest in {digest for digest, _ in sketches}}
+
+    def purge(self, before):
+        with self._lock:
+            count = 0
+            for digest in list(self._sketches):
+                buckets = self._sketches[digest]
+                for start in [start for start in buckets if start < before]:
+                    del buckets[start]
+                    count += 1
+                if not buckets:
+                    del self._sketches[digest]
+            return count
+
+
+def window_sketches_statement(digests, oldest: datetime):
+    """Tranches de la fenêtre des clés `digests`, verrouillées pour la fusion (clé primaire)"""
+    return (select(sketches_table.c.key_digest, sketches_table.c.bucket_start, sketches_table.c.machines,
+                   sketches_table.c.ips, sketches_table.c.subnets)
+            .where(sketches_table.c.key_digest.in_(digests), sketches_table.c.bucket_start >= oldest)
+            .order_by(sketches_table.c.key_digest, sketches_table.c.bucket_start)
+            .with_for_update())
+
+
+SKETCH_UPDATE = (
+    update(sketches_table)
+    .where(sketches_table.c.key_digest == bindparam("digest"), sketches_table.c.bucket_start == bindparam("start"))
+    .values(machines=bindparam("machines"), ips=bindparam("ips"), subnets=bindparam("subnets"),
+            updated_at=bindparam("now"))
+)
+
+
+class DatabaseSketchStore(SketchStore):
+    """
+    Esquisses dans la table license_sharing_sketches
+
+    Une transaction par synchronisation: INSERT des tranches nouvelles (sans
+    effet si un autre worker l'a créée entre-temps), lecture verrouillée des
+    tranches de la fenêtre, fusion registre par registre en Python, UPDATE
+    groupé des seules tranches modifiées.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def merge(self, sketches, oldest):
+        if not sketches:
+            return {}
+        now = datetime.utcnow()
+        # Ordre stable des verrous: pas d'interblocage entre workers
+        incoming_by_key = {(digest, _to_datetime(start)): incoming for (digest, start), incoming in sketches.items()}
+        rows = [{"key_digest": digest, "bucket_start": bucket_start,
+                 **dict(zip(("machines", "ips", "subnets"), incoming.to_bytes())), "updated_at": now}
+                for (digest, bucket_start), incoming in sorted(incoming_by_key.items(), key=lambda item: item[0])]
+        db = self.session_factory()
+        try:
+            postgresql = db.get_bind().dialect.name == "postgresql"
+            insert = (postgresql_insert if postgresql else sqlite_insert)(sketches_table)
+            db.execute(insert.on_conflict_do_nothing(index_elements=["key_digest", "bucket_start"]), rows)
+
+            merged: Dict[str, List[KeySketches]] = {}
+            changed = []
+            digests = sorted({digest for digest, _ in sketches})
+            for digest, bucket_start, machines, ips, subnets in db.execute(
+                    window_sketches_statement(digests, _to_datetime(oldest))):
+                stored = KeySketches.from_bytes(machines, ips, subnets)
+                incoming = incoming_by_key.get((digest, bucket_start))
+                if incoming is not None and stored.merge(incoming):
+                    changed.append({"digest": digest, "start": bucket_start, "now": now,
+                                    **dict(zip(("machines", "ips", "subnets"), stored.to_bytes()))})
+                merged.setdefault(digest, []).append(stored)
+            if changed:
+                db.execute(SKETCH_UPDATE, changed)
+            db.commit()
+            return merged
+        finally:
+            db.close()
+
+    def purge(self, before):
+        db = self.session_factory()
+        try:
+            count = db.execute(delete(sketches_table)
+                               .where(sketches_table.c.bucket_start < _to_datetime(before))).rowcount
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+
+# ============================================
+# ALERTES
+# ============================================
+
+def latest_alert_statement(digest: str):
+    """Dernière alerte d'une clé (index ix_license_sharing_alerts_key_digest)"""
+    return (select(alerts_table.c.id, alerts_table.c.acknowledged_at)
+            .where(alerts_table.c.key_digest == digest)
+            .order_by(alerts_table.c.id.desc()).limit(1))
+
+
+def alerts_statement(open_only: bool = True, limit: int = 100):
+    """Alertes les plus récemment mises à jour en premier"""
+    stmt = select(SharingAlert).order_by(SharingAlert.updated_at.desc(), SharingAlert.id.desc()).limit(limit)
+    if open_only:
+        stmt = stmt.where(SharingAlert.acknowledged_at.is_(None))
+    return stmt
+
+
+def exceeded(dispersion: Dispersion, max_seats: Optional[int] = None) -> List[str]:
+    """Seuils franchis par une clé (les machines autorisées croissent avec le nombre de postes)"""
+    reasons = []
+    if dispersion.machines > settings.SHARING_MAX_MACHINES * (max_seats or 1):
+        reasons.append("machines")
+    if dispersion.ips > settings.SHARING_MAX_IPS:
+        reasons.append("ips")
+    if dispersion.subnets > settings.SHARING_MAX_SUBNETS:
+        reasons.append("subnets")
+    return reasons
+
+
+def record_alerts(candidates: List[Tuple[str, str, Dispersion]], session_factory=SessionLocal) -> int:
+    """
+    Ouvre ou met à jour l'alerte des clés candidates (seuils franchis sans
+    tenir compte des postes); retourne le nombre d'alertes écrites
+
+    Une alerte acquittée n'est pas rouverte avant la fin de la fenêtre: les
+    esquisses comptent encore les validations d'avant l'acquittement.
+    """
+    db = session_factory()
+    try:
+        written = 0
+        now = datetime.utcnow()
+        quiet_since = now - timedelta(seconds=settings.SHARING_WINDOW_SECONDS)
+        for digest, license_key, dispersion in candidates:
+            status = license_status(db, license_key)
+            reasons = exceeded(dispersion, status.max_seats if status else None)
+            if not reasons:
+                continue
+            values = {"distinct_machines": dispersion.machines, "distinct_ips": dispersion.ips,
+                      "distinct_subnets": dispersion.subnets, "reasons": ",".join(reasons), "updated_at": now}
+            latest = db.execute(latest_alert_statement(digest)).first()
+            if latest is not None and latest.acknowledged_at is not None and latest.acknowledged_at > quiet_since:
+                continue
+            if latest is None or latest.acknowledged_at is not None:
+                db.execute(alerts_table.insert().values(
+                    license_id=status.id if status else None, key_digest=digest, created_at=now, **values))
+                logger.warning("Partage probable de la licence %s (%s): %s machines, %s IP, %s réseaux",
+                               status.id if status else "inconnue", values["reasons"],
+                               dispersion.machines, dispersion.ips, dispersion.subnets)
+            else:
+                db.execute(update(alerts_table).where(alerts_table.c.id == latest.id).values(**values))
+            written += 1
+        db.commit()
+        return written
+    finally:
+        db.close()
+
+
+# ============================================
+# DÉTECTEUR (UN PAR WORKER)
+# ============================================
+
+class SharingDetector:
+    """Esquisses des clés vues par un worker, fenêtre glissante par tranches"""
+
+    def __init__(self, store: SketchStore, window: Optional[float] = None, buckets: Optional[int] = None,
+                 max_keys: Optional[int] = None, alert_sink=record_alerts):
+        self.store = store
+        self.window = window or settings.SHARING_WINDOW_SECONDS
+        self.buckets = buckets or settings.SHARING_WINDOW_BUCKETS
+        self.bucket_seconds = self.window / self.buckets
+        self.max_keys = max_keys or settings.SHARING_MAX_TRACKED_KEYS
+        self.alert_sink = alert_sink
+        # Hachage 64 bits de la clé -> esquisses par tranche (la plus récente en dernier),
+        # de la clé la moins récemment vue à la plus récente
+        self._keys: "OrderedDict[int, List[KeySketches]]" = OrderedDict()
+        # Clés modifiées depuis la dernière synchronisation: hachage -> clé (empreinte SHA-256, licence)
+        self._dirty: Dict[int, str] = {}
+        # Empreintes des clés révoquées (pas d'alerte), au plus max_keys
+        self._revoked: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self._purged_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def observe(self, license_key: str, machine_id: str, ip_address: Optional[str] = None,
+                now: Optional[float] = None) -> None:
+        """Compte une validation de `license_key` (coût constant, hors base de données)"""
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_seconds)
+        key_hash = value_hash(license_key)  # SHA-256 calculé à la synchronisation seulement
+        machine_hash = value_hash(machine_id)
+        ip_hash = subnet_hash = None
+        if ip_address:
+            ip_hash = value_hash(ip_address)
+            subnet_hash = value_hash(subnet(ip_address))
+        with self._lock:
+            buckets = self._keys.get(key_hash)
+            if buckets is None:
+                buckets = self._keys[key_hash] = []
+                if len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._keys.move_to_end(key_hash)
+            if buckets and buckets[-1].bucket >= bucket:
+                sketches = buckets[-1]
+            else:
+                while buckets and buckets[0].bucket <= bucket - self.buckets:
+                    del buckets[0]
+                sketches = KeySketches(bucket=bucket)
+                buckets.append(sketches)
+            changed = sketches.machines.add(machine_hash)
+            if ip_hash is not None:
+                changed |= sketches.ips.add(ip_hash)
+                changed |= sketches.subnets.add(subnet_hash)
+            if changed:
+                self._dirty[key_hash] = license_key
+
+    def ignore_revoked(self, invalidations: Iterable) -> int:
+        """Abonné au flux d'invalidations: plus d'alerte pour les clés révoquées"""
+        with self._lock:
+            count = 0
+            for invalidation in invalidations:
+                self._revoked[invalidation.key_digest] = None
+                self._revoked.move_to_end(invalidation.key_digest)
+                count += 1
+            while len(self._revoked) > self.max_keys:
+                self._revoked.popitem(last=False)
+            return count
+
+    def sync(self, now: Optional[float] = None) -> int:
+        """
+        Fusionne les esquisses modifiées dans le stockage partagé et évalue
+        les seuils sur la fenêtre; retourne le nombre de clés candidates
+        """
+        now = time.time() if now is None else now
+        oldest = int(now // self.bucket_seconds) - self.buckets + 1
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            # Copies sous verrou: observe() continue de modifier les esquisses
+            snapshot = [(license_key, [(sketches.bucket, sketches.to_bytes())
+                                       for sketches in self._keys.get(key_hash, ()) if sketches.bucket >= oldest])
+                        for key_hash, license_key in dirty.items()]
+        keys_by_digest, local = {}, {}
+        for license_key, buckets in snapshot:
+            digest = key_digest(license_key)
+            keys_by_digest[digest] = license_key
+            for bucket, data in buckets:
+                local[(digest, bucket * self.bucket_seconds)] = KeySketches.from_bytes(*data)
+        try:
+            merged = self.store.merge(local, oldest * self.bucket_seconds)
+        except Exception:
+            with self._lock:
+                for key_hash, license_key in dirty.items():
+                    self._dirty.setdefault(key_hash, license_key)
+            raise
+
+        with self._lock:
+            revoked = {digest for digest in merged if digest in self._revoked}
+        candidates = []
+        for digest, buckets in merged.items():
+            if digest in revoked:
+                continue
+            dispersion = window_dispersion(buckets)
+            # Seuil le plus bas (sans postes): la licence n'est lue que pour les candidates
+            if exceeded(dispersion, max_seats=None):
+                candidates.append((digest, keys_by_digest[digest], dispersion))
+        if candidates:
+            self.alert_sink(candidates)
+
+        if now - self._purged_at >= PURGE_INTERVAL_SECONDS:
+            self._purged_at = now
+            self.store.purge(oldest * self.bucket_seconds)
+        return len(candidates)
+
+    def dispersion(self, license_key: str, now: Optional[float] = None) -> Dispersion:
+        """Estimations de ce worker seul sur la fenêtre (diagnostic)"""
+        now = time.time() if now is None else now
+        oldest = int(now // self.bucket_seconds) - self.buckets + 1
+        with self._lock:
+            return window_dispersion([sketches for sketches in self._keys.get(value_hash(license_key), ())
+                                      if sketches.bucket >= oldest])
+
+
+class SharingDetectorSync:
+    """Tâche de fond: fusion des esquisses entre workers et ouverture des alertes"""
+
+    def __init__(self, detector: SharingDetector, interval: Optional[float] = None):
+        self.detector = detector
+        self.interval = interval or settings.SHARING_SYNC_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.detector.sync)
+            except Exception:
+                logger.exception("Synchronisation des esquisses de partage en échec, nouvel essai plus tard")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                # Dernières observations fusionnées avant l'arrêt du worker
+                await asyncio.get_running_loop().run_in_executor(None, self.detector.sync)
+            except Exception:
+                logger.exception("Fusion des esquisses de partage à l'arrêt en échec")
+
+
+# Instances globales
+sharing_detector = SharingDetector(LocalSketchStore() if settings.SHARING_STORE == "local" else DatabaseSketchStore())
+sharing_detector_sync = SharingDetectorSync(sharing_detector)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Statistiques des licences maintenues de façon incrémentale
+
+Chaque changement de licence (essai, achat/upgrade Stripe, révocation,
+expiration) applique la différence de ses contributions aux compteurs, dans
+la même transaction que le changement lui-même. La lecture ne somme que
+quelques dizaines de lignes, quelle que soit la taille de la table licenses.
+
+Une réconciliation périodique (app.jobs.reconcile_stats, un seul processus)
+recalcule les agrégats complets et corrige l'écart éventuel (modifications
+SQL manuelles, code historique).
+"""
+
+import asyncio
+import logging
+import random
+from collections import Counter
+from datetime import datetime
+from typing import Mapping, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.license import License
+from app.models.license_counter import LicenseCounter
+
+logger = logging.getLogger(__name__)
+
+# Lignes par compteur: deux transactions concurrentes touchent rarement la même
+COUNTER_SHARDS = 8
+
+
+def license_status(is_active: bool, is_revoked: bool, expired_at: Optional[datetime]) -> str:
+    if is_revoked:
+        return "revoked"
+    if is_active:
+        return "active"
+    return "expired" if expired_at is not None else "inactive"
+
+
+def license_snapshot(license: License) -> dict:
+    """Champs d'une licence qui contribuent aux compteurs (à prendre avant modification)"""
+    return {
+        "license_type": license.license_type,
+        "is_active": bool(license.is_active) if license.is_active is not None else True,
+        "is_revoked": bool(license.is_revoked),
+        "expired_at": license.expired_at,
+        "stripe_payment_intent_id": license.stripe_payment_intent_id,
+        "amount_paid": license.amount_paid,
+        "currency": license.currency,
+    }
+
+
+def contributions(snapshot: Optional[Mapping]) -> Counter:
+    """Compteurs auxquels contribue une licence dans l'état `snapshot`"""
+    if snapshot is None:
+        return Counter()
+    paid = snapshot["stripe_payment_intent_id"] is not None
+    counts = Counter({
+        "licenses": 1,
+        f"type:{snapshot['license_type']}": 1,
+        "stripe:paid" if paid else "stripe:unpaid": 1,
+        "status:" + license_status(snapshot["is_active"], snapshot["is_revoked"], snapshot["expired_at"]): 1,
+    })
+    if snapshot["amount_paid"]:
+        counts[f"revenue:{(snapshot['currency'] or 'EUR').upper()}"] += snapshot["amount_paid"]
+    return counts
+
+
+def diff(before: Optional[Mapping], after: Optional[Mapping]) -> dict:
+    """Différence de contributions entre deux états (None = licence inexistante)"""
+    delta = Counter(contributions(after))
+    delta.subtract(contributions(before))
+    return {name: value for name, value in delta.items() if value}
+
+
+def bump(db: Session, deltas: Mapping[str, int]) -> None:
+    """
+    Applique des deltas aux compteurs (un seul upsert multi-lignes, sans commit)
+
+    Un shard est tiré au hasard par appel pour répartir les verrous de ligne.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    table = LicenseCounter.__table__
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    shard = random.randrange(COUNTER_SHARDS)
+    now = datetime.utcnow()
+
+    stmt = insert(table).values([
+        {"name": name, "shard": shard, "value": value, "updated_at": now}
+        for name, value in sorted(deltas.items())  # Ordre stable: pas d'interblocage entre upserts
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name", "shard"],
+        set_={"value": table.c.value + stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt)
+
+
+def track_change(db: Session, before: Optional[Mapping], license: License) -> None:
+    """Répercute sur les compteurs le passage de `before` à l'état courant de `license`"""
+    bump(db, diff(before, license_snapshot(license)))
+
+
+def read_counters(db: Session) -> dict:
+    """Valeur de chaque compteur (somme des shards)"""
+    rows = db.execute(
+        select(LicenseCounter.name, func.sum(LicenseCounter.value)).group_by(LicenseCounter.name)
+    ).all()
+    return {name: int(value) for name, value in rows}
+
+
+def read_stats(db: Session) -> dict:
+    """Statistiques structurées pour l'endpoint admin"""
+    counters = read_counters(db)
+
+    def prefixed(prefix: str) -> dict:
+        return {name[len(prefix):]: value for name, value in sorted(counters.items())
+                if name.startswith(prefix) and value}
+
+    return {
+        "total": counters.get("licenses", 0),
+        "by_type": prefixed("type:"),
+        "by_status": prefixed("status:"),
+        "stripe": {"paid": counters.get("stripe:paid", 0), "unpaid": counters.get("stripe:unpaid", 0)},
+        "revenue_cents": prefixed("revenue:"),
+    }
+
+
+def compute_counters(db: Session) -> Counter:
+    """Agrégats complets sur licenses (parcours de table: réservé à la réconciliation)"""
+    status = case(
+        (License.is_revoked == True, "revoked"),  # noqa: E712
+        (License.is_active == True, "active"),  # noqa: E712
+        (License.expired_at.is_not(None), "expired"),
+        else_="inactive",
+    )
+    paid = License.stripe_payment_intent_id.is_not(None)
+    rows = db.execute(
+        select(License.license_type, paid.label("paid"), License.currency, status.label("status"),
+               func.count(), func.coalesce(func.sum(License.amount_paid), 0))
+        .group_by(License.license_type, paid, License.currency, status)
+    ).all()
+
+    counts = Counter()
+    for license_type, is_paid, currency, license_status_, count, revenue in rows:
+        counts["licenses"] += count
+        counts[f"type:{license_type}"] += count
+        counts["stripe:paid" if is_paid else "stripe:unpaid"] += count
+        counts[f"status:{license_status_}"] += count
+        if revenue:
+            counts[f"revenue:{(currency or 'EUR').upper()}"] += int(revenue)
+    return counts
+
+
+def reconcile(db: Session) -> dict:
+    """
+    Recalcule les agrégats et corrige l'écart des compteurs
+
+    Agrégats et compteurs sont lus dans le même instantané (REPEATABLE READ):
+    les incréments étant commités avec la licence, l'écart mesuré est exact.
+    Il est ensuite appliqué comme un incrément ordinaire, sans jamais écraser
+    les écritures concurrentes: une seule réconciliation à la fois (deux
+    processus appliqueraient chacun le même écart).
+
+    Returns:
+        Écart corrigé par compteur (vide si tout était juste)
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    truth = compute_counters(db)
+    current = read_counters(db)
+    db.rollback()  # Fin de l'instantané
+
+    drift = {name: truth.get(name, 0) - current.get(name, 0) for name in set(truth) | set(current)}
+    drift = {name: value for name, value in drift.items() if value}
+    if drift:
+        bump(db, drift)
+        db.commit()
+    return drift
+
+
+class StatsReconciler:
+    """Tâche de fond: réconciliation périodique des compteurs (worker unique, STATS_RECONCILE_INTERVAL_SECONDS)"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval if interval is not None else settings.STATS_RECONCILE_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    def _reconcile(self) -> dict:
+        db = SessionLocal()
+        try:
+            return reconcile(db)
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                drift = await loop.run_in_executor(None, self._reconcile)
+                if drift:
+                    logger.warning("Compteurs de licences corrigés: %s", drift)
+            except Exception:
+                logger.exception("Réconciliation des compteurs en échec, nouvel essai plus tard")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instance globale
+stats_reconciler = StatsReconciler()
@@ -0,0 +1,641 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analyse des statistiques d'usage (heartbeats.usage_stats)
+
+Les usage_stats (JSON stringifié) sont aplatis une seule fois, de façon
+incrémentale (python -m app.jobs.build_usage_analytics), en colonnes typées
+NumPy sur disque, partitionnées par jour d'envoi:
+
+    <USAGE_ANALYTICS_DIR>/
+        state.json                          point de reprise (dernier heartbeat intégré), compteurs connus
+        day=2026-10-19/manifest.json        segments du jour (lignes, ids, compteurs, versions)
+        day=2026-10-19/seg-<min>-<max>/     colonnes brutes: license_id.npy (int32), sent_at.npy
+                                            (int64, epoch), app_version.npy (int16, code dans les
+                                            versions du segment), counters/<nom>.npy (float32, NaN
+                                            si absent)
+                                            résumés: summary/licenses*.npy, summary/<nom>.*.npy
+
+Compteurs: valeurs numériques et booléennes de usage_stats, clés imbriquées
+jointes par un point (features.pdf_export). Au plus
+USAGE_ANALYTICS_MAX_COUNTERS (63) compteurs distincts, numérotés dans l'ordre
+d'apparition: le contenu est choisi par le client, les suivants sont ignorés.
+
+Résumés calculés à l'écriture de chaque segment (opérations vectorisées):
+- licences distinctes par version, avec un masque 64 bits des compteurs
+  utilisés (> 0) au moins une fois ce jour-là (bit = numéro du compteur,
+  bit 63 = licence active), et les mêmes toutes versions confondues
+- histogramme exact de chaque compteur par version (valeurs distinctes
+  triées et nombre de heartbeats)
+
+Les requêtes (GET /admin/analytics/usage) projettent en mémoire (mmap) les
+seuls résumés utiles des jours demandés: leur coût suit le nombre de
+licences actives par jour et de valeurs distinctes, pas le nombre de
+heartbeats (un client en envoie plusieurs par jour).
+- percentiles exacts d'un compteur par version (histogrammes fusionnés)
+- adoption des fonctionnalités: OU des masques dans un tableau indexé par
+  license_id (pas de tri, pas de GROUP BY)
+- cohortes hebdomadaires d'usage actif (masque des semaines par license_id)
+
+Les colonnes brutes servent au compactage des jours (segments fusionnés,
+résumés recalculés) et aux analyses ponctuelles.
+
+Reprise: le point de reprise n'avance qu'en fin de passe; au démarrage, les
+segments d'une passe interrompue (ids au-delà du point de reprise) sont
+supprimés puis réintégrés.
+
+Nécessite numpy. Mesure: python -m benchmarks.usage_analytics
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.heartbeat import Heartbeat
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 20000
+MAX_BUFFERED_ROWS = 2_000_000  # Au-delà, les plus gros jours en mémoire sont écrits
+MAX_SEGMENTS_PER_DAY = 8  # Au-delà, le jour (même en cours) est compacté en un segment
+MAX_COUNTERS = 63  # Un bit par compteur dans les masques par licence
+ACTIVE_FLAG = 1 << 63  # Licence vue (heartbeat) dans le bloc
+MAX_REPORT_WEEKS = 16  # Un bit par semaine dans les masques de cohortes (uint16: 2 octets par licence)
+MAX_APP_VERSIONS = 1000  # Par segment; les suivantes sont comptées sous OTHER_VERSION
+OTHER_VERSION = "autre"
+INGEST_LAG_SECONDS = 60  # Heartbeats plus récents laissés à la passe suivante (transactions en cours)
+COUNTER_NAME = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.\-]{0,99}$")
+
+heartbeats = Heartbeat.__table__
+
+
+def chunk_statement(last_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Heartbeats suivants à intégrer (pagination par clé sur l'id)"""
+    return (select(heartbeats.c.id, heartbeats.c.license_id, heartbeats.c.app_version,
+                   heartbeats.c.usage_stats, heartbeats.c.sent_at)
+            .where(heartbeats.c.id > last_id).order_by(heartbeats.c.id).limit(chunk_size))
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("L'analyse d'usage nécessite numpy (pip install numpy)")
+    return numpy
+
+
+def _epoch(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def flatten(stats: dict, prefix: str = "", out: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Compteurs d'un usage_stats: {"features": {"qr_bill": true}} -> {"features.qr_bill": 1.0}"""
+    out = {} if out is None else out
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flatten(value, name + ".", out)
+        elif isinstance(value, bool):
+            out[name] = 1.0 if value else 0.0
+        elif isinstance(value, (int, float)):
+            out[name] = float(value)
+    return out
+
+
+def parse_usage_stats(usage_stats: Optional[str]) -> Dict[str, float]:
+    """Compteurs d'un heartbeat (JSON illisible ou absent: aucun compteur)"""
+    if not usage_stats:
+        return {}
+    try:
+        stats = json.loads(usage_stats)
+    except ValueError:
+        return {}
+    return flatten(stats) if isinstance(stats, dict) else {}
+
+
+# ============================================
+# FICHIERS
+# ============================================
+
+def day_dir(root: Path, day: date) -> Path:
+    return root / f"day={day.isoformat()}"
+
+
+def _write_json(path: Path, document) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(document), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def read_manifest(directory: Path) -> dict:
+    path = directory / "manifest.json"
+    if not path.exists():
+        return {"segments": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def load_state(root: Path) -> dict:
+    path = root / "state.json"
+    if not path.exists():
+        return {"last_id": 0, "counters": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def partition_days(root: Path) -> List[date]:
+    if not root.exists():
+        return []
+    return sorted(date.fromisoformat(entry.name[4:]) for entry in root.iterdir()
+                  if entry.is_dir() and entry.name.startswith("day="))
+
+
+def discard_uncommitted(root: Path, last_id: int) -> int:
+    """
+    Supprime les segments d'une passe interrompue (ids au-delà du point de
+    reprise) et les répertoires absents des manifestes; retourne le nombre de
+    segments supprimés
+    """
+    removed = 0
+    for day in partition_days(root):
+        directory = day_dir(root, day)
+        manifest = read_manifest(directory)
+        kept = [segment for segment in manifest["segments"] if segment["min_id"] <= last_id]
+        removed += len(manifest["segments"]) - len(kept)
+        if len(kept) != len(manifest["segments"]):
+            _write_json(directory / "manifest.json", {"segments": kept})
+        names = {segment["name"] for segment in kept}
+        for entry in directory.iterdir():
+            if entry.is_dir() and entry.name not in names:
+                shutil.rmtree(entry)
+    return removed
+
+
+class SegmentBuffer:
+    """Heartbeats d'un jour en attente d'écriture, en colonnes"""
+
+    __slots__ = ("license_ids", "sent_at", "version_codes", "versions", "counters", "min_id", "max_id")
+
+    def __init__(self):
+        self.license_ids = array("i")
+        self.sent_at = array("q")
+        self.version_codes = array("h")
+        self.versions: Dict[str, int] = {}
+        self.counters: Dict[str, array] = {}
+        self.min_id: Optional[int] = None
+        self.max_id = 0
+
+    def __len__(self) -> int:
+        return len(self.license_ids)
+
+    def append(self, heartbeat_id: int, license_id: int, sent_at: int, app_version: Optional[str],
+               values: Dict[str, float]) -> None:
+        rows = len(self.license_ids)
+        version = app_version or ""
+        code = self.versions.get(version)
+        if code is None:
+            if len(self.versions) >= MAX_APP_VERSIONS:
+                version = OTHER_VERSION
+            code = self.versions.setdefault(version, len(self.versions))
+        self.license_ids.append(license_id)
+        self.sent_at.append(sent_at)
+        self.version_codes.append(code)
+        counters = self.counters
+        for name, value in values.items():
+            column = counters.get(name)
+            if column is None:
+                column = counters[name] = array("f", [float("nan")]) * rows
+            column.append(value)
+        if len(values) != len(counters):
+            for column in counters.values():
+                if len(column) == rows:
+                    column.append(float("nan"))
+        if self.min_id is None:
+            self.min_id = heartbeat_id
+        self.max_id = heartbeat_id
+
+
+def _group_starts(np, *keys):
+    """Début de chaque groupe de valeurs égales dans des clés triées"""
+    if not len(keys[0]):
+        return np.empty(0, dtype=np.int64)
+    changed = np.zeros(len(keys[0]), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(changed)
+
+
+def _or_groups(np, flags, starts):
+    """OU des masques de chaque groupe"""
+    return np.bitwise_or.reduceat(flags, starts) if len(starts) else np.empty(0, dtype=np.uint64)
+
+
+def save_segment(directory: Path, license_ids, sent_at, app_versions, counters: Dict[str, object],
+                 versions: List[str], counter_bits: Dict[str, int], min_id: int, max_id: int,
+                 replace: bool = False) -> dict:
+    """
+    Écrit un segment et ses résumés (répertoire temporaire puis renommage) et
+    l'ajoute au manifeste du jour (`replace`: le manifeste ne liste plus que ce segment)
+    """
+    np = _numpy()
+    license_ids = np.asarray(license_ids, dtype=np.int32)
+    app_versions = np.asarray(app_versions, dtype=np.int16)
+    counters = {counter: np.asarray(column, dtype=np.float32) for counter, column in counters.items()}
+    name = f"seg-{min_id}-{max_id}"
+    tmp = directory / f".{name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    (tmp / "counters").mkdir(parents=True)
+    (tmp / "summary").mkdir()
+    np.save(tmp / "license_id.npy", license_ids)
+    np.save(tmp / "sent_at.npy", np.asarray(sent_at, dtype=np.int64))
+    np.save(tmp / "app_version.npy", app_versions)
+    for counter, column in counters.items():
+        np.save(tmp / "counters" / f"{counter}.npy", column)
+
+    # Licences distinctes par version et masque des compteurs utilisés
+    order = np.lexsort((license_ids, app_versions))
+    ids, codes = license_ids[order], app_versions[order]
+    flags = np.full(len(ids), ACTIVE_FLAG, dtype=np.uint64)
+    for counter, column in counters.items():
+        flags |= (column[order] > 0).astype(np.uint64) << np.uint64(counter_bits[counter])
+    starts = _group_starts(np, codes, ids)
+    ids, codes, flags = ids[starts], codes[starts], _or_groups(np, flags, starts)
+    np.save(tmp / "summary" / "licenses.npy", ids)
+    np.save(tmp / "summary" / "license_flags.npy", flags)
+    np.save(tmp / "summary" / "license_offsets.npy", np.searchsorted(codes, np.arange(len(versions) + 1)))
+    # Toutes versions confondues (requêtes sans filtre de version)
+    order = np.argsort(ids, kind="stable")
+    ids, flags = ids[order], flags[order]
+    starts = _group_starts(np, ids)
+    np.save(tmp / "summary" / "day_licenses.npy", ids[starts])
+    np.save(tmp / "summary" / "day_license_flags.npy", _or_groups(np, flags, starts))
+
+    # Histogramme exact de chaque compteur par version
+    for counter, column in counters.items():
+        present = ~np.isnan(column)
+        values, codes = column[present], app_versions[present]
+        order = np.lexsort((values, codes))
+        values, codes = values[order], codes[order]
+        starts = _group_starts(np, codes, values)
+        np.save(tmp / "summary" / f"{counter}.values.npy", values[starts])
+        np.save(tmp / "summary" / f"{counter}.counts.npy", np.diff(np.append(starts, len(values))))
+        np.save(tmp / "summary" / f"{counter}.offsets.npy", np.searchsorted(codes[starts], np.arange(len(versions) + 1)))
+    os.rename(tmp, directory / name)
+
+    segment = {"name": name, "rows": len(license_ids), "min_id": min_id, "max_id": max_id,
+               "max_license_id": int(license_ids.max()) if len(license_ids) else 0,
+               "counters": sorted(counters), "counter_bits": {counter: counter_bits[counter] for counter in counters},
+               "app_versions": list(versions),
+               "version_rows": np.bincount(app_versions, minlength=len(versions)).tolist()}
+    # Manifeste remplacé d'un bloc: une requête voit les anciens segments ou le nouveau, jamais les deux
+    manifest = {"segments": []} if replace else read_manifest(directory)
+    manifest["segments"].append(segment)
+    _write_json(directory / "manifest.json", manifest)
+    return segment
+
+
+def write_segment(directory: Path, buffer: SegmentBuffer, counter_bits: Dict[str, int]) -> dict:
+    np = _numpy()
+    return save_segment(
+        directory,
+        np.frombuffer(buffer.license_ids, dtype=np.int32),
+        np.frombuffer(buffer.sent_at, dtype=np.int64),
+        np.frombuffer(buffer.version_codes, dtype=np.int16),
+        {counter: np.frombuffer(column, dtype=np.float32) for counter, column in buffer.counters.items()},
+        list(buffer.versions), counter_bits, buffer.min_id, buffer.max_id,
+    )
+
+
+def compact_day(directory: Path) -> bool:
+    """Fusionne les segments d'un jour en un seul; retourne True si le jour a été compacté"""
+    np = _numpy()
+    segments = read_manifest(directory)["segments"]
+    if len(segments) < 2:
+        return False
+    versions: Dict[str, int] = {}
+    counter_bits = {counter: bit for segment in segments for counter, bit in segment["counter_bits"].items()}
+    counters = sorted(counter_bits)
+    license_ids, sent_at, codes, columns = [], [], [], {counter: [] for counter in counters}
+    for segment in segments:
+        path = directory / segment["name"]
+        license_ids.append(np.load(path / "license_id.npy"))
+        sent_at.append(np.load(path / "sent_at.npy"))
+        mapping = np.array([versions.setdefault(version, len(versions))
+                            for version in segment["app_versions"]] or [0], dtype=np.int16)
+        codes.append(mapping[np.load(path / "app_version.npy")])
+        for counter in counters:
+            if counter in segment["counters"]:
+                columns[counter].append(np.load(path / "counters" / f"{counter}.npy"))
+            else:
+                columns[counter].append(np.full(segment["rows"], np.nan, dtype=np.float32))
+
+    save_segment(directory, np.concatenate(license_ids), np.concatenate(sent_at), np.concatenate(codes),
+                 {counter: np.concatenate(parts) for counter, parts in columns.items()}, list(versions), counter_bits,
+                 min(segment["min_id"] for segment in segments), max(segment["max_id"] for segment in segments),
+                 replace=True)
+    for segment in segments:
+        shutil.rmtree(directory / segment["name"], ignore_errors=True)
+    return True
+
+
+# ============================================
+# CONSTRUCTION INCRÉMENTALE
+# ============================================
+
+@dataclass
+class UsageBuildProgress:
+    last_id: int = 0
+    scanned: int = 0
+    segments: int = 0
+    compacted_days: int = 0
+    discarded_segments: int = 0
+    elapsed_s: float = 0.0
+    rows_per_s: float = 0.0
+
+
+def build_usage_analytics(
+    directory: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    rebuild: bool = False,
+    on_progress: Optional[Callable[[UsageBuildProgress], None]] = None,
+    session_factory=SessionLocal,
+) -> UsageBuildProgress:
+    """
+    Intègre les heartbeats reçus depuis la passe précédente
+
+    Args:
+        directory: Répertoire des colonnes (défaut: USAGE_ANALYTICS_DIR)
+        chunk_size: Heartbeats lus par requête (pagination par id)
+        rebuild: Repartir de zéro (répertoire vidé)
+        on_progress: Appelé après chaque tranche lue
+    """
+    _numpy()
+    root = Path(directory or settings.USAGE_ANALYTICS_DIR)
+    if rebuild and root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+    state = load_state(root)
+    progress = UsageBuildProgress(last_id=state["last_id"])
+    progress.discarded_segments = discard_uncommitted(root, state["last_id"])
+    known = {counter: bit for bit, counter in enumerate(state["counters"])}  # Numéro = bit des masques
+    max_counters = min(settings.USAGE_ANALYTICS_MAX_COUNTERS, MAX_COUNTERS)
+    started = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(seconds=INGEST_LAG_SECONDS)
+    buffers: Dict[date, SegmentBuffer] = {}
+    touched = set()
+
+    def flush(day: date) -> None:
+        directory = day_dir(root, day)
+        directory.mkdir(exist_ok=True)
+        write_segment(directory, buffers.pop(day), known)
+        touched.add(day)
+        progress.segments += 1
+
+    db = session_factory()
+    try:
+        last_id = state["last_id"]
+        while True:
+            rows = db.execute(chunk_statement(last_id, chunk_size)).all()
+            db.commit()  # Transaction de lecture courte
+            recent = False
+            for heartbeat_id, license_id, app_version, usage_stats, sent_at in rows:
+                if sent_at >= cutoff:
+                    recent = True
+                    break
+                values = parse_usage_stats(usage_stats)
+                for name in [name for name in values if name not in known]:
+                    if len(known) < max_counters and COUNTER_NAME.match(name):
+                        known[name] = len(known)
+                    else:
+                        del values[name]
+                day = sent_at.date()
+                buffer = buffers.get(day)
+                if buffer is None:
+                    buffer = buffers[day] = SegmentBuffer()
+                buffer.append(heartbeat_id, license_id, _epoch(sent_at), app_version, values)
+                last_id = heartbeat_id
+                progress.scanned += 1
+            # Mémoire bornée: les jours les plus remplis sont écrits
+            if sum(len(buffer) for buffer in buffers.values()) > MAX_BUFFERED_ROWS:
+                for day in sorted(buffers, key=lambda day: len(buffers[day]), reverse=True)[:max(1, len(buffers) // 2)]:
+                    flush(day)
+            progress.last_id = last_id
+            progress.elapsed_s = round(time.monotonic() - started, 1)
+            progress.rows_per_s = round(progress.scanned / max(progress.elapsed_s, 0.1))
+            if on_progress:
+                on_progress(progress)
+            if recent or len(rows) < chunk_size:
+                break
+    finally:
+        db.close()
+
+    for day in list(buffers):
+        flush(day)
+    # Point de reprise: les segments de cette passe sont désormais validés
+    _write_json(root / "state.json", {"last_id": last_id, "counters": list(known),
+                                      "built_at": datetime.utcnow().isoformat(timespec="seconds")})
+    progress.last_id = last_id
+
+    today = datetime.utcnow().date()
+    for day in sorted(touched):
+        if day < today or len(read_manifest(day_dir(root, day))["segments"]) > MAX_SEGMENTS_PER_DAY:
+            progress.compacted_days += compact_day(day_dir(root, day))
+
+    progress.elapsed_s = round(time.monotonic() - started, 1)
+    progress.rows_per_s = round(progress.scanned / max(progress.elapsed_s, 0.1))
+    return progress
+
+
+# ============================================
+# REQUÊTES
+# ============================================
+
+class UsageSummaries:
+    """Résumés des segments des jours demandés"""
+
+    def __init__(self, root: Path, since: date, until: date, app_version: Optional[str] = None):
+        self.since = since
+        self.app_version = app_version
+        self.segments: List[Tuple[date, Path, dict]] = []
+        self.counter_bits: Dict[str, int] = {}
+        self.heartbeats = 0
+        self.max_license_id = 0
+        day = since
+        while day <= until:
+            directory = day_dir(root, day)
+            for segment in read_manifest(directory)["segments"]:
+                self.segments.append((day, directory / segment["name"], segment))
+                self.counter_bits.update(segment["counter_bits"])
+                self.max_license_id = max(self.max_license_id, segment["max_license_id"])
+                if app_version is None:
+                    self.heartbeats += segment["rows"]
+                elif app_version in segment["app_versions"]:
+                    self.heartbeats += segment["version_rows"][segment["app_versions"].index(app_version)]
+            day += timedelta(days=1)
+        self.counters = sorted(self.counter_bits)
+
+    def _codes(self, segment: dict) -> List[int]:
+        """Versions du segment retenues (une seule avec le filtre de version)"""
+        if self.app_version is None:
+            return list(range(len(segment["app_versions"])))
+        if self.app_version in segment["app_versions"]:
+            return [segment["app_versions"].index(self.app_version)]
+        return []
+
+    def license_blocks(self):
+        """(jour, licences distinctes, masques) par segment, et par version avec le filtre de version"""
+        np = _numpy()
+        for day, path, segment in self.segments:
+            if self.app_version is None:
+                yield (day, np.load(path / "summary" / "day_licenses.npy", mmap_mode="r"),
+                       np.load(path / "summary" / "day_license_flags.npy", mmap_mode="r"))
+                continue
+            codes = self._codes(segment)
+            if not codes:
+                continue
+            licenses = np.load(path / "summary" / "licenses.npy", mmap_mode="r")
+            flags = np.load(path / "summary" / "license_flags.npy", mmap_mode="r")
+            offsets = np.load(path / "summary" / "license_offsets.npy")
+            for code in codes:
+                start, end = offsets[code], offsets[code + 1]
+                if end > start:
+                    yield day, licenses[start:end], flags[start:end]
+
+    def histograms(self, counter: str) -> Dict[str, Tuple[list, list]]:
+        """Version -> (valeurs, nombres de heartbeats) de chaque segment"""
+        np = _numpy()
+        results: Dict[str, Tuple[list, list]] = {}
+        for _, path, segment in self.segments:
+            codes = self._codes(segment) if counter in segment["counters"] else []
+            if not codes:
+                continue
+            values = np.load(path / "summary" / f"{counter}.values.npy", mmap_mode="r")
+            counts = np.load(path / "summary" / f"{counter}.counts.npy", mmap_mode="r")
+            offsets = np.load(path / "summary" / f"{counter}.offsets.npy")
+            for code in codes:
+                start, end = offsets[code], offsets[code + 1]
+                if end > start:
+                    parts = results.setdefault(segment["app_versions"][code], ([], []))
+                    parts[0].append(values[start:end])
+                    parts[1].append(counts[start:end])
+        return results
+
+
+def weighted_percentiles(values, counts, quantiles: Tuple[int, ...]) -> List[float]:
+    """Percentiles (interpolation linéaire, comme numpy.percentile) d'un histogramme de valeurs"""
+    np = _numpy()
+    order = np.argsort(values, kind="stable")
+    values, cumulative = values[order], np.cumsum(counts[order])
+    total = int(cumulative[-1])
+    results = []
+    for quantile in quantiles:
+        rank = quantile / 100 * (total - 1)
+        low, high = int(np.floor(rank)), int(np.ceil(rank))
+        # Valeur du k-ième heartbeat (0-indexé) dans l'ordre croissant
+        value_low = values[np.searchsorted(cumulative, low, side="right")]
+        value_high = values[np.searchsorted(cumulative, high, side="right")]
+        results.append(float(value_low + (value_high - value_low) * (rank - low)))
+    return results
+
+
+def percentiles_by_version(summaries: UsageSummaries, counter: str,
+                           quantiles: Tuple[int, ...] = (50, 90, 99)) -> List[dict]:
+    """Moyenne et percentiles de `counter` par version (heartbeats où le compteur est présent)"""
+    np = _numpy()
+    results = []
+    for version, (values, counts) in summaries.histograms(counter).items():
+        values = np.concatenate(values).astype(np.float64)
+        counts = np.concatenate(counts)
+        total = int(counts.sum())
+        stats = weighted_percentiles(values, counts, quantiles)
+        results.append({"app_version": version, "heartbeats": total,
+                        "mean": round(float((values * counts).sum() / total), 3),
+                        **{f"p{q}": round(v, 3) for q, v in zip(quantiles, stats)}})
+    results.sort(key=lambda row: row["heartbeats"], reverse=True)
+    return results
+
+
+def feature_adoption(summaries: UsageSummaries) -> Tuple[int, List[dict]]:
+    """Licences actives et, par compteur, licences l'ayant utilisé (> 0) au moins une fois"""
+    np = _numpy()
+    if not summaries.segments:
+        return 0, []
+    flags = np.zeros(summaries.max_license_id + 1, dtype=np.uint64)
+    for _, licenses, license_flags in summaries.license_blocks():
+        flags[licenses] |= license_flags  # Licences distinctes dans un bloc: pas d'écriture perdue
+    active = int(np.count_nonzero(flags))  # ACTIVE_FLAG posé pour toute licence vue
+    results = []
+    for counter, bit in summaries.counter_bits.items():
+        count = int(np.count_nonzero(flags & np.uint64(1 << bit)))
+        results.append({"counter": counter, "licenses": count, "share": round(count / active, 4) if active else 0.0})
+    results.sort(key=lambda row: row["share"], reverse=True)
+    return active, results
+
+
+def weekly_cohorts(summaries: UsageSummaries, until: date, counter: Optional[str] = None) -> List[dict]:
+    """
+    Cohortes par semaine de premier usage actif dans la période (heartbeat,
+    ou `counter` > 0): part de la cohorte encore active chaque semaine suivante
+    """
+    np = _numpy()
+    if not summaries.segments:
+        return []
+    since = summaries.since
+    weeks = (until - since).days // 7 + 1
+    if weeks > MAX_REPORT_WEEKS:
+        raise ValueError(f"Période limitée à {MAX_REPORT_WEEKS} semaines pour les cohortes")
+    flag = np.uint64(1 << summaries.counter_bits[counter] if counter else ACTIVE_FLAG)
+    # Bit w: licence active la semaine w de la période
+    activity = np.zeros(summaries.max_license_id + 1, dtype=np.uint16)
+    for day, licenses, license_flags in summaries.license_blocks():
+        if counter:
+            licenses = licenses[(license_flags & flag) != 0]
+        activity[licenses] |= np.uint16(1 << (day - since).days // 7)
+    activity = activity[activity != 0]
+    first_week = np.full(len(activity), -1, dtype=np.int8)
+    for week in reversed(range(weeks)):
+        first_week[(activity & np.uint16(1 << week)) != 0] = week
+    results = []
+    for cohort in range(weeks):
+        members = activity[first_week == cohort]
+        if not len(members):
+            continue
+        results.append({"week_start": since + timedelta(days=7 * cohort), "licenses": len(members),
+                        "retention": [round(np.count_nonzero(members & np.uint16(1 << week)) / len(members), 4)
+                                      for week in range(cohort, weeks)]})
+    return results
+
+
+def usage_report(since: date, until: date, counter: Optional[str] = None, app_version: Optional[str] = None,
+                 directory: Optional[str] = None) -> dict:
+    """Rapport d'usage sur [since, until] (jours d'envoi), éventuellement limité à une version"""
+    started = time.perf_counter()
+    root = Path(directory or settings.USAGE_ANALYTICS_DIR)
+    summaries = UsageSummaries(root, since, until, app_version)
+    if counter and summaries.segments and counter not in summaries.counter_bits:
+        raise ValueError(f"Compteur inconnu sur la période: {counter}")
+    active, adoption = feature_adoption(summaries)
+    return {
+        "since": since,
+        "until": until,
+        "heartbeats": summaries.heartbeats,
+        "licenses": active,
+        "counter": counter,
+        "percentiles": percentiles_by_version(summaries, counter) if counter else [],
+        "adoption": adoption,
+        "cohorts": weekly_cohorts(summaries, until, counter),
+        "counters": summaries.counters,
+        "built_until_id": load_state(root)["last_id"],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
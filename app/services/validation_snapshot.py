@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Snapshot de validation signé pour les validateurs edge (sans base de données)
+
+Fichier immuable, projeté en mémoire (mmap) et interrogé par bisection:
+
+    en-tête (40 octets)   magic, version, taille d'enregistrement, taille des
+                          métadonnées, nombre d'enregistrements, date de génération,
+                          marque haute licenses.updated_at
+    métadonnées (JSON)    tables des types de licence et des raisons de révocation
+    enregistrements       34 octets chacun, triés par empreinte:
+                          SHA-256 de la clé (16 premiers octets), id de licence,
+                          expiration (secondes epoch, 0 = illimitée), statut,
+                          index du type, index de la raison, postes (0 = licence
+                          liée à sa machine)
+    signature             HMAC-SHA256 de tout ce qui précède (32 octets)
+
+La clé de signature est dérivée de LICENSE_SECRET_KEY, que le validateur edge
+possède déjà pour déchiffrer les clés. Un nouveau snapshot est écrit à côté
+puis renommé (os.replace): un lecteur voit l'ancien fichier ou le nouveau,
+jamais un fichier partiel, et SnapshotWatcher bascule dès qu'il change.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import mmap
+import os
+import struct
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.license import License
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LICSNAP\x00"
+FORMAT_VERSION = 2  # 2: max_seats dans chaque enregistrement
+HEADER = struct.Struct(">8sHHIQqq")
+RECORD = struct.Struct(">16sIqBBHH")
+DIGEST_SIZE = 16
+SIGNATURE_SIZE = 32
+EXPORT_BATCH_SIZE = 5000
+
+STATUS_ACTIVE = 0
+STATUS_REVOKED = 1
+STATUS_INACTIVE = 2
+STATUS_EXPIRED = 3
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class SnapshotError(ValueError):
+    """Snapshot illisible, tronqué ou dont la signature ne correspond pas"""
+
+
+class SnapshotEntry(NamedTuple):
+    license_id: int
+    status: int
+    license_type: str
+    expires_at: Optional[datetime]
+    revoked_reason: Optional[str]
+    max_seats: Optional[int]
+
+
+def signing_key() -> bytes:
+    return hashlib.sha256(b"validation-snapshot:" + settings.LICENSE_SECRET_KEY.encode()).digest()
+
+
+def snapshot_digest(license_key: str) -> bytes:
+    return hashlib.sha256(license_key.encode("ascii")).digest()[:DIGEST_SIZE]
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1) if value else 0
+
+
+def _from_micros(value: int) -> Optional[datetime]:
+    return EPOCH + timedelta(microseconds=value) if value else None
+
+
+def snapshot_status(is_active: bool, is_revoked: bool, expired_at: Optional[datetime]) -> int:
+    if is_revoked:
+        return STATUS_REVOKED
+    if expired_at is not None:
+        return STATUS_EXPIRED
+    return STATUS_ACTIVE if is_active else STATUS_INACTIVE
+
+
+def export_snapshot(db: Session, path: str) -> dict:
+    """
+    Écrit le snapshot de toutes les licences dans `path` (remplacement atomique)
+
+    Returns:
+        Résumé: nombre de licences, taille, date de génération, marque haute
+    """
+    generated_at = datetime.utcnow()
+    high_water = db.execute(select(func.max(License.updated_at))).scalar()
+
+    types, reasons = {}, {None: 0}
+    records = []
+    result = db.execute(
+        select(License.id, License.license_key, License.license_type, License.expires_at,
+               License.is_active, License.is_revoked, License.expired_at, License.revoked_reason,
+               License.previous_license_key, License.max_seats),
+        execution_options={"stream_results": True, "yield_per": EXPORT_BATCH_SIZE},
+    )
+    for row in result:
+        type_index = types.setdefault(row.license_type, len(types))
+        reason = row.revoked_reason if row.is_revoked else None
+        if reason not in reasons and len(reasons) < 65535:
+            reasons[reason] = len(reasons)
+        expires = int((row.expires_at - EPOCH).total_seconds()) if row.expires_at else 0
+        status = snapshot_status(row.is_active, row.is_revoked, row.expired_at)
+        # Clé d'avant rotation: même entrée sous son empreinte (le client la présente encore)
+        for key in (row.license_key, row.previous_license_key) if row.previous_license_key else (row.license_key,):
+            records.append(RECORD.pack(
+                snapshot_digest(key), row.id, expires, status, type_index, reasons.get(reason, 0),
+                min(row.max_seats or 0, 65535),
+            ))
+    db.rollback()
+    if len(types) > 255:
+        raise SnapshotError(f"Trop de types de licence pour le format ({len(types)})")
+    records.sort()  # Ordre des octets = ordre des empreintes (en tête d'enregistrement)
+
+    meta = json.dumps({"license_types": list(types), "revoked_reasons": list(reasons)},
+                      ensure_ascii=False).encode("utf-8")
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size, len(meta), len(records),
+                         _to_micros(generated_at), _to_micros(high_water))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    signature = hmac.new(signing_key(), digestmod=hashlib.sha256)
+    try:
+        with open(tmp_path, "wb") as handle:
+            for chunk in (header, meta):
+                handle.write(chunk)
+                signature.update(chunk)
+            for start in range(0, len(records), EXPORT_BATCH_SIZE):
+                chunk = b"".join(records[start:start + EXPORT_BATCH_SIZE])
+                handle.write(chunk)
+                signature.update(chunk)
+            handle.write(signature.digest())
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "path": path,
+        "licenses": len(records),
+        "bytes": os.path.getsize(path),
+        "generated_at": generated_at.isoformat(),
+        "high_water": high_water.isoformat() if high_water else None,
+    }
+
+
+class ValidationSnapshot:
+    """Snapshot ouvert en lecture (mmap); vérifie la signature à l'ouverture"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            stat = os.fstat(handle.fileno())
+            self.identity: Tuple[int, int, int] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if stat.st_size < HEADER.size + SIGNATURE_SIZE:
+                raise SnapshotError(f"Snapshot tronqué: {path}")
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._parse()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _parse(self) -> None:
+        view = self._map
+        magic, version, record_size, meta_size, count, generated, high_water = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+            raise SnapshotError(f"Format de snapshot inconnu: {self.path}")
+        self.base = HEADER.size + meta_size
+        if self.base + count * RECORD.size + SIGNATURE_SIZE != len(view):
+            raise SnapshotError(f"Taille de snapshot incohérente: {self.path}")
+
+        expected = hmac.new(signing_key(), memoryview(view)[:-SIGNATURE_SIZE], hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, view[-SIGNATURE_SIZE:]):
+            raise SnapshotError(f"Signature du snapshot invalide: {self.path}")
+
+        meta = json.loads(view[HEADER.size:self.base].decode("utf-8"))
+        self.license_types = meta["license_types"]
+        self.revoked_reasons = meta["revoked_reasons"]
+        self.count = count
+        self.generated_at = _from_micros(generated)
+        self.high_water = _from_micros(high_water)
+
+    def lookup(self, license_key: str) -> Optional[SnapshotEntry]:
+        """Licence correspondant à la clé (bisection sur les empreintes), None si absente"""
+        target = snapshot_digest(license_key)
+        view, base, size = self._map, self.base, RECORD.size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = base + mid * size
+            if view[offset:offset + DIGEST_SIZE] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        offset = base + lo * size
+        if lo == self.count or view[offset:offset + DIGEST_SIZE] != target:
+            return None
+        _, license_id, expires, status, type_index, reason_index, max_seats = RECORD.unpack_from(view, offset)
+        return SnapshotEntry(
+            license_id, status, self.license_types[type_index],
+            EPOCH + timedelta(seconds=expires) if expires else None,
+            self.revoked_reasons[reason_index], max_seats or None,
+        )
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class SnapshotWatcher:
+    """
+    Snapshot courant d'un validateur edge, rechargé quand le fichier change
+
+    Le nouveau snapshot est ouvert et vérifié avant de remplacer l'ancien
+    (simple affectation: les requêtes en cours finissent sur l'ancien mmap,
+    libéré quand plus rien ne le référence). Un fichier invalide est ignoré
+    et l'ancien snapshot reste servi.
+    """
+
+    def __init__(self, path: Optional[str] = None, interval: Optional[float] = None,
+                 max_age: Optional[float] = None):
+        self.path = path or settings.VALIDATION_SNAPSHOT_PATH
+        self.interval = interval or settings.VALIDATION_SNAPSHOT_POLL_SECONDS
+        self.max_age = settings.VALIDATION_SNAPSHOT_MAX_AGE_SECONDS if max_age is None else max_age
+        self.current: Optional[ValidationSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def is_stale(self, snapshot: ValidationSnapshot, now: datetime) -> bool:
+        """Snapshot généré il y a plus de max_age secondes (export arrêté ou copie bloquée)"""
+        if not self.max_age or snapshot.generated_at is None:
+            return False
+        return (now - snapshot.generated_at).total_seconds() > self.max_age
+
+    def reload_if_changed(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        current = self.current
+        if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return False
+        try:
+            snapshot = ValidationSnapshot(self.path)
+        except (OSError, SnapshotError, ValueError):
+            logger.exception("Snapshot de validation ignoré: %s", self.path)
+            return False
+        self.current = snapshot
+        logger.info("Snapshot de validation chargé: %d licence(s), généré le %s",
+                    snapshot.count, snapshot.generated_at)
+        return True
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.reload_if_changed)
+            except Exception:
+                logger.exception("Surveillance du snapshot de validation en échec")
+            current = self.current
+            if current is not None and self.is_stale(current, datetime.utcnow()):
+                logger.warning("Snapshot de validation périmé (généré le %s): validations refusées",
+                               current.generated_at)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instance globale (mode edge)
+snapshot_watcher = SnapshotWatcher()
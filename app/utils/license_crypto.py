@@ -5,10 +5,30 @@ Utilitaires de cryptographie pour les licences
 Doit être IDENTIQUE au système utilisé dans EasyFacture client
 """
 
+import hashlib
 import json
 from datetime import datetime, timedelta
-from cryptography.fernet import Fernet
+from typing import Optional, Union
+from cryptography.fernet import Fernet, MultiFernet
 from app.config import settings
+from app.utils.validation_outcome import ValidationOutcome, outcome_message
+
+
+def key_digest(license_key: str) -> str:
+    """
+    Empreinte SHA-256 (hex) d'une clé de licence
+
+    Identifie une clé sans la divulguer (flux d'invalidations, caches de révocation).
+    """
+    return hashlib.sha256(license_key.encode("ascii")).hexdigest()
+
+
+def build_cipher(primary_key: str, old_keys=()) -> Union[Fernet, MultiFernet]:
+    """Fernet de la clé principale, ou MultiFernet (clé principale en tête) si d'anciennes clés sont fournies"""
+    primary = Fernet(primary_key.encode())
+    if not old_keys:
+        return primary
+    return MultiFernet([primary] + [Fernet(key.encode()) for key in old_keys])
 
 
 class LicenseGenerator:
@@ -18,8 +38,28 @@ class LicenseGenerator:
     """
 
     def __init__(self):
-        """Initialise le générateur avec la clé secrète"""
-        self.cipher = Fernet(settings.LICENSE_SECRET_KEY.encode())
+        """Le chiffreur est créé à la première utilisation (import sans effet de bord)"""
+        self._cipher: Optional[Union[Fernet, MultiFernet]] = None
+
+    @property
+    def cipher(self) -> Union[Fernet, MultiFernet]:
+        """
+        Chiffre avec LICENSE_SECRET_KEY; pendant une rotation, déchiffre aussi
+        avec LICENSE_SECRET_KEYS_OLD (MultiFernet essaie les clés dans l'ordre)
+        """
+        if self._cipher is None:
+            self._cipher = build_cipher(settings.LICENSE_SECRET_KEY, settings.license_secret_keys_old)
+        return self._cipher
+
+    def warm_up(self) -> None:
+        """
+        Crée le chiffreur et fait un aller-retour chiffrement/déchiffrement
+
+        Appelé au démarrage du worker (main.lifespan): une clé LICENSE_SECRET_KEY
+        invalide fait échouer le démarrage au lieu de la première requête, et
+        le backend OpenSSL est initialisé avant la première validation.
+        """
+        self.cipher.decrypt(self.cipher.encrypt(b"warm-up"))
 
     def generate_license(
         self,
@@ -28,7 +68,9 @@ class LicenseGenerator:
         license_type: str,
         duration_days: int = None,
         customer_name: str = None,
-        company_name: str = None
+        company_name: str = None,
+        expires_at: datetime = None,
+        seats: int = None
     ) -> tuple[str, datetime]:
         """
         Génère une clé de licence chiffrée
@@ -40,6 +82,8 @@ class LicenseGenerator:
             duration_days: Durée en jours (None pour lifetime)
             customer_name: Nom du client (optionnel)
             company_name: Nom de l'entreprise (optionnel)
+            expires_at: Date d'expiration imposée (import de licences existantes), prioritaire sur duration_days
+            seats: Licence multi-postes: utilisable sur toute machine, postes simultanés limités par le serveur
 
         Returns:
             tuple: (license_key, expires_at)
@@ -47,8 +91,7 @@ class LicenseGenerator:
                 - expires_at: Date d'expiration (datetime) ou None pour lifetime
         """
         # Calculer la date d'expiration
-        expires_at = None
-        if duration_days is not None:
+        if expires_at is None and duration_days is not None:
             expires_at = datetime.utcnow() + timedelta(days=duration_days)
 
         # Créer le payload de la licence
@@ -57,9 +100,12 @@ class LicenseGenerator:
             "machine_id": machine_id,
             "email": email,
             "expiry": expires_at.isoformat() if expires_at else None,  # 'expiry' pour compatibilité!
+            "license_type": license_type,  # Lu par les validateurs edge (clé émise après leur snapshot)
             "version": "1.7.0",
             "generated": datetime.utcnow().isoformat()
         }
+        if seats:
+            license_data["seats"] = seats  # Absent des licences mono-poste: payload historique inchangé
 
         # Convertir en JSON et chiffrer
         json_data = json.dumps(license_data, ensure_ascii=False)
@@ -70,19 +116,19 @@ class LicenseGenerator:
 
         return license_key, expires_at
 
-    def validate_license(self, license_key: str, machine_id: str) -> tuple[bool, str, dict]:
+    def check_license(self, license_key: str, machine_id: str) -> tuple[ValidationOutcome, Optional[str], dict]:
         """
-        Valide une clé de licence
+        Vérifie une clé de licence et retourne un code de résultat
 
         Args:
             license_key: Clé de licence chiffrée
             machine_id: Identifiant de la machine courante
 
         Returns:
-            tuple: (is_valid, message, license_data)
-                - is_valid: True si licence valide
-                - message: Message descriptif
-                - license_data: Données déchiffrées (dict) ou None
+            tuple: (outcome, detail, license_data)
+                - outcome: ValidationOutcome
+                - detail: Texte libre (uniquement pour CORRUPT) ou None
+                - license_data: Données déchiffrées (dict) si VALID, sinon None
         """
         try:
             # Déchiffrer la licence depuis HEX (compatibilité license.py ligne 138)
@@ -90,23 +136,43 @@ class LicenseGenerator:
             decrypted = self.cipher.decrypt(encrypted_bytes)
             license_data = json.loads(decrypted.decode('utf-8'))
 
-            # Vérifier le Machine ID
-            if license_data.get("machine_id") != machine_id:
-                return False, "Licence invalide pour cette machine", None
+            # Vérifier le Machine ID (licence multi-postes: toute machine, places contrôlées par le serveur)
+            if license_data.get("machine_id") != machine_id and not license_data.get("seats"):
+                return ValidationOutcome.MACHINE_MISMATCH, None, None
 
             # Vérifier l'expiration (utiliser 'expiry' pour compatibilité avec EasyFacture)
             expiry_str = license_data.get("expiry")
             if expiry_str:
                 expiry = datetime.fromisoformat(expiry_str)
                 if datetime.utcnow() > expiry:
-                    return False, "Licence expirée", None
+                    return ValidationOutcome.EXPIRED, None, None
 
-            # Licence valide
-            license_type = license_data.get("license_type", "unknown")
-            return True, f"Licence valide ({license_type})", license_data
+            return ValidationOutcome.VALID, None, license_data
 
         except Exception as e:
-            return False, f"Licence invalide ou corrompue: {str(e)}", None
+            return ValidationOutcome.CORRUPT, str(e), None
+
+    def validate_license(self, license_key: str, machine_id: str) -> tuple[bool, str, dict]:
+        """
+        Valide une clé de licence
+
+        Args:
+            license_key: Clé de licence chiffrée
+            machine_id: Identifiant de la machine courante
+
+        Returns:
+            tuple: (is_valid, message, license_data)
+                - is_valid: True si licence valide
+                - message: Message descriptif
+                - license_data: Données déchiffrées (dict) ou None
+        """
+        outcome, detail, license_data = self.check_license(license_key, machine_id)
+        if outcome != ValidationOutcome.VALID:
+            return False, outcome_message(outcome, detail), None
+
+        # Licence valide
+        license_type = license_data.get("license_type", "unknown")
+        return True, f"Licence valide ({license_type})", license_data
 
 
 # Instance globale
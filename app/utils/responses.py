@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Encodage des réponses JSON des endpoints chauds
+
+Chemin par défaut de FastAPI pour un modèle renvoyé: revalidation contre
+response_model, conversion en dict "JSON-compatible", puis encodage du dict.
+Ici le modèle est encodé directement en bytes par pydantic-core (une passe,
+contenu identique), et les corps d'échec constants de la validation sont
+encodés une seule fois à l'import.
+
+Les autres routes (dicts, admin) passent par ORJSONResponse, classe de
+réponse par défaut de l'application (main.py).
+
+Mesure: python -m benchmarks.responses
+"""
+
+from typing import Dict
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.schemas.license import ValidationResponse
+from app.utils.validation_outcome import ValidationOutcome, outcome_message
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def encode_model(model: BaseModel) -> bytes:
+    """JSON du modèle (mêmes règles que le mode "json" de pydantic: dates ISO 8601, None -> null)"""
+    return model.__pydantic_serializer__.to_json(model)
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Réponse JSON d'un modèle, sans dict intermédiaire
+
+    Une Response renvoyée par l'endpoint n'est pas revalidée par FastAPI:
+    le modèle doit être celui déclaré dans response_model (documentation).
+    """
+    return Response(content=encode_model(model), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+# Échecs de validation sans partie variable (la révocation porte une raison, la corruption un détail)
+CONSTANT_FAILURES = (
+    "Licence introuvable",
+    "Licence inactive",
+    outcome_message(ValidationOutcome.EXPIRED),
+    outcome_message(ValidationOutcome.MACHINE_MISMATCH),
+    outcome_message(ValidationOutcome.SEATS_EXHAUSTED),
+)
+
+_FAILURE_BODIES: Dict[str, bytes] = {
+    message: encode_model(ValidationResponse(valid=False, message=message))
+    for message in CONSTANT_FAILURES
+}
+
+
+def validation_failure(message: str) -> Response:
+    """Réponse {"valid": false, ...}: corps pré-encodé pour les messages constants"""
+    body = _FAILURE_BODIES.get(message)
+    if body is None:
+        body = encode_model(ValidationResponse(valid=False, message=message))
+    return Response(content=body, media_type=JSON_MEDIA_TYPE)
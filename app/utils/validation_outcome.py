@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Codes de résultat de validation de licence
+Stockés en petit entier; le texte est dérivé à la lecture
+"""
+
+import enum
+from typing import Optional
+
+
+class ValidationOutcome(enum.IntEnum):
+    """Résultat d'une vérification de licence (stocké en petit entier)"""
+    VALID = 1
+    REJECTED = 2          # Refus non classé (lignes historiques non reconnues)
+    NOT_FOUND = 3         # Clé valide mais absente de la base
+    REVOKED = 4
+    INACTIVE = 5
+    MACHINE_MISMATCH = 6
+    EXPIRED = 7
+    CORRUPT = 8           # Déchiffrement impossible (détail libre conservé)
+    SEATS_EXHAUSTED = 9   # Licence multi-postes: toutes les places sont occupées
+
+
+# Messages journalisés (identiques aux textes historiques de la colonne validation_message)
+OUTCOME_MESSAGES = {
+    ValidationOutcome.VALID: "Licence valide",
+    ValidationOutcome.NOT_FOUND: "Licence introuvable dans la base de données",
+    ValidationOutcome.REVOKED: "Licence révoquée: {reason}",
+    ValidationOutcome.INACTIVE: "Licence inactive",
+    ValidationOutcome.MACHINE_MISMATCH: "Licence invalide pour cette machine",
+    ValidationOutcome.EXPIRED: "Licence expirée",
+    ValidationOutcome.CORRUPT: "Licence invalide ou corrompue: {detail}",
+    ValidationOutcome.SEATS_EXHAUSTED: "Nombre maximal de postes atteint pour cette licence",
+    ValidationOutcome.REJECTED: "{detail}",
+}
+
+# Seuls ces résultats portent un texte libre qui mérite d'être stocké
+# (REVOKED: raison au moment de la vérification, la licence peut être re-révoquée ou rétablie depuis)
+OUTCOMES_WITH_DETAIL = frozenset({ValidationOutcome.CORRUPT, ValidationOutcome.REJECTED, ValidationOutcome.REVOKED})
+
+
+def outcome_message(outcome: ValidationOutcome, detail: Optional[str] = None,
+                    revoked_reason: Optional[str] = None) -> str:
+    """
+    Reconstruit le message texte d'un résultat de validation
+
+    Args:
+        outcome: Code de résultat
+        detail: Texte libre stocké (CORRUPT / REJECTED, raison historique pour REVOKED)
+        revoked_reason: Raison de révocation lue sur la licence (REVOKED sans raison stockée)
+    """
+    return OUTCOME_MESSAGES[ValidationOutcome(outcome)].format(
+        detail=detail or "",
+        reason=detail or revoked_reason or "Raison non spécifiée",
+    )
@@ -0,0 +1,9 @@
+# Benchmarks package
+"""
+Suite de benchmarks et de tests de charge du License Server
+
+Usage:
+    python -m benchmarks run --target inprocess --db sqlite --output results.json
+    python -m benchmarks run --target uvicorn --database-url postgresql://.../license_bench
+    python -m benchmarks compare results.json --baseline benchmarks/baseline.json
+"""
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Point d'entrée CLI des benchmarks
+
+    python -m benchmarks run [--target inprocess|uvicorn] [--db sqlite|postgres] [--store database|memory]
+                             [--startup-runs 3]
+    python -m benchmarks compare results.json [--baseline benchmarks/baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+from datetime import datetime
+
+from benchmarks import harness
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+async def run_scenarios(args) -> dict:
+    """Exécute les scénarios demandés et construit le rapport JSON"""
+    from benchmarks.scenarios import SCENARIOS, ScenarioContext
+
+    app, engine = harness.load_app()
+    client_factory = harness.uvicorn_client if args.target == "uvicorn" else harness.inprocess_client
+    rng = random.Random(args.seed)
+
+    report = {
+        "meta": {
+            "generated_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "target": args.target,
+            "database": engine.dialect.name,
+            "store": args.store,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "scenarios": {},
+    }
+
+    with harness.QueryCounter(engine) as counter:
+        async with client_factory(app) as client:
+            for name in args.scenarios:
+                ctx = ScenarioContext(
+                    client=client,
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                    rng=rng,
+                    counter=counter,
+                )
+                result = await SCENARIOS[name](ctx)
+                report["scenarios"][name] = result.summary()
+                print(f"  {name:<18} {report['scenarios'][name]['throughput_rps']:>8} req/s  "
+                      f"p95={report['scenarios'][name]['latency_ms']['p95']} ms", file=sys.stderr)
+
+    return report
+
+
+def cmd_run(args) -> int:
+    if args.database_url:
+        database_url = args.database_url
+    elif args.db == "postgres":
+        database_url = os.environ.get("BENCH_DATABASE_URL")
+        if not database_url:
+            print("--db postgres nécessite --database-url ou BENCH_DATABASE_URL", file=sys.stderr)
+            return 2
+    else:
+        database_url = harness.default_sqlite_url()
+
+    harness.configure_environment(database_url, args.store)
+    report = asyncio.run(run_scenarios(args))
+
+    if args.startup_runs > 0:
+        from benchmarks.startup import measure_startup
+
+        # Base SQLite dédiée: la base des scénarios est peut-être PostgreSQL (schéma recréé)
+        report["startup"] = measure_startup(args.startup_runs)
+        print(f"  {'startup':<18} {report['startup']['first_response_ms']:>8} ms jusqu'à la première réponse",
+              file=sys.stderr)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def cmd_compare(args) -> int:
+    from benchmarks.compare import compare_reports, load_report
+
+    lines, regressions = compare_reports(
+        load_report(args.current),
+        load_report(args.baseline),
+        latency_tolerance=args.latency_tolerance,
+        query_tolerance=args.query_tolerance,
+        throughput_tolerance=args.throughput_tolerance,
+        startup_tolerance=args.startup_tolerance,
+    )
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} régression(s):")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print("\nAucune régression.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from benchmarks.scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Exécuter les scénarios de charge")
+    run.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess",
+                     help="inprocess: transport ASGI httpx; uvicorn: vrai serveur sur socket locale")
+    run.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite")
+    run.add_argument("--database-url", help="Base DÉDIÉE au benchmark (le schéma est recréé)")
+    run.add_argument("--store", choices=("database", "memory"), default="database",
+                     help="memory: licences en mémoire (LICENSE_STORE=local), débit de l'application sans base")
+    run.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    run.add_argument("--requests", type=int, default=500, help="Requêtes par scénario")
+    run.add_argument("--concurrency", type=int, default=8,
+                     help="Clients simultanés (au-delà de la taille du pool SQLAlchemy, les requêtes attendent une connexion)")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--startup-runs", type=int, default=3,
+                     help="Processus neufs mesurés de l'import à la première réponse (0 = ne pas mesurer)")
+    run.add_argument("--output", "-o", help="Fichier JSON de sortie (stdout par défaut)")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="Comparer un run à la baseline")
+    compare.add_argument("current")
+    compare.add_argument("--baseline", default=DEFAULT_BASELINE)
+    compare.add_argument("--latency-tolerance", type=float, default=0.25)
+    compare.add_argument("--query-tolerance", type=float, default=0.05,
+                         help="Requêtes SQL par requête HTTP si --requests/--seed diffèrent de la baseline "
+                              "(sinon comparaison exacte des totaux)")
+    compare.add_argument("--throughput-tolerance", type=float, default=0.25)
+    compare.add_argument("--startup-tolerance", type=float, default=0.5)
+    compare.set_defaults(func=cmd_compare)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
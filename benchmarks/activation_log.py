@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du journal des activations: mode complet vs mode coalescé
+
+Rejoue le même flux de vérifications (clients qui vérifient leur licence
+plusieurs fois par jour) dans les deux modes et rapporte le volume
+d'écriture (lignes, requêtes SQL) et la taille des tables.
+
+Usage:
+    python -m benchmarks.activation_log --validations 20000 --licenses 100 --days 14
+    python -m benchmarks.activation_log --database-url postgresql://.../license_bench
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def simulated_checks(licenses: int, validations: int, days: int, seed: int):
+    """Flux (license_id, machine_id, ip, outcome, checked_at) ordonné dans le temps"""
+    from app.models.activation import ValidationOutcome
+
+    rng = random.Random(seed)
+    clients = []
+    for license_id in range(1, licenses + 1):
+        ips = [f"192.0.{rng.randrange(256)}.{rng.randrange(1, 255)}" for _ in range(rng.randint(1, 2))]
+        clients.append((license_id, f"{rng.getrandbits(128):032x}", ips, rng.random() < 0.03))
+
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / validations
+    for i in range(validations):
+        license_id, machine_id, ips, inactive = rng.choice(clients)
+        outcome = ValidationOutcome.INACTIVE if inactive else ValidationOutcome.VALID
+        yield license_id, machine_id, rng.choice(ips), outcome, start + step * i
+
+
+def table_bytes(engine, tables) -> dict:
+    """Taille des tables (index compris)"""
+    sizes = {}
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            for table in tables:
+                sizes[table] = conn.exec_driver_sql(f"SELECT pg_total_relation_size('{table}')").scalar()
+        else:
+            # dbstat n'est pas toujours compilé: on mesure le fichier entier après VACUUM
+            conn.exec_driver_sql("VACUUM")
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            sizes["database_file"] = conn.exec_driver_sql("PRAGMA page_count").scalar() * page_size
+    return sizes
+
+
+def run_mode(database_url: str, mode: str, args) -> dict:
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import Activation, ActivationSummary, License
+    from app.services import activation_log
+    from benchmarks.harness import QueryCounter
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    # Licences minimales pour satisfaire les clés étrangères
+    with engine.begin() as conn:
+        conn.execute(License.__table__.insert(), [
+            {"id": i, "email": f"c{i}@bench.example.com", "machine_id": f"{i:032x}", "license_type": "trial",
+             "license_key": f"{i:0440x}", "created_at": datetime.utcnow(), "is_active": True, "is_revoked": False}
+            for i in range(1, args.licenses + 1)
+        ])
+    base_size = table_bytes(engine, ["activations", "activation_summaries"])
+
+    db = Session()
+    started = time.perf_counter()
+    with QueryCounter(engine) as counter:
+        for n, (license_id, machine_id, ip, outcome, checked_at) in enumerate(
+                simulated_checks(args.licenses, args.validations, args.days, args.seed), 1):
+            activation_log.record_activation(
+                db, license_id, machine_id, ip, outcome,
+                mode=mode, sample_rate=args.sample_rate, now=checked_at,
+            )
+            if n % args.commit_every == 0:
+                db.commit()
+        db.commit()
+    elapsed = time.perf_counter() - started
+    db.close()
+
+    with engine.connect() as conn:
+        raw_rows = conn.execute(select(func.count()).select_from(Activation)).scalar()
+        summary_rows = conn.execute(select(func.count()).select_from(ActivationSummary)).scalar()
+    sizes = table_bytes(engine, ["activations", "activation_summaries"])
+    engine.dispose()
+
+    return {
+        "mode": mode,
+        "validations": args.validations,
+        "raw_rows": raw_rows,
+        "summary_rows": summary_rows,
+        "rows_written": raw_rows + summary_rows,
+        "sql_statements": counter.count,
+        "elapsed_s": round(elapsed, 2),
+        "bytes": {k: sizes[k] - base_size.get(k, 0) for k in sizes},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.activation_log", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Base DÉDIÉE (défaut: un fichier SQLite temporaire par mode)")
+    parser.add_argument("--validations", type=int, default=20000)
+    parser.add_argument("--licenses", type=int, default=100)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--commit-every", type=int, default=1,
+                        help="1 = un commit par vérification, comme l'endpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url or "sqlite://")
+
+    results = {}
+    for mode in ("full", "coalesced"):
+        if args.database_url:
+            url = args.database_url
+        else:
+            path = os.path.join(tempfile.gettempdir(), f"activation_log_{mode}_{os.getpid()}.db")
+            if os.path.exists(path):
+                os.remove(path)
+            url = f"sqlite:///{path}"
+        results[mode] = run_mode(url, mode, args)
+        print(f"  {mode:<10} {results[mode]['rows_written']:>10} lignes  "
+              f"{results[mode]['sql_statements']:>10} requêtes  {results[mode]['elapsed_s']} s", file=sys.stderr)
+
+    full, coalesced = results["full"], results["coalesced"]
+    results["reduction"] = {
+        "rows_written": round(1 - coalesced["rows_written"] / full["rows_written"], 4),
+        "bytes": {
+            k: round(1 - coalesced["bytes"][k] / full["bytes"][k], 4)
+            for k in full["bytes"] if full["bytes"][k]
+        },
+    }
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
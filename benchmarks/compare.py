@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparaison d'un run de benchmark avec une baseline stockée
+"""
+
+import json
+from typing import List, Tuple
+
+# Métriques de latence surveillées (plus haut = pire)
+LATENCY_METRICS = ("p50", "p95", "p99")
+
+# Démarrage d'un worker (benchmarks.startup): plus haut = pire
+STARTUP_METRICS = ("ready_ms", "first_response_ms", "first_db_response_ms")
+
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _mix(report: dict) -> tuple:
+    meta = report.get("meta", {})
+    return meta.get("requests"), meta.get("seed")
+
+
+def compare_reports(
+    current: dict,
+    baseline: dict,
+    latency_tolerance: float = 0.25,
+    query_tolerance: float = 0.05,
+    throughput_tolerance: float = 0.25,
+    startup_tolerance: float = 0.5,
+) -> Tuple[List[str], List[str]]:
+    """
+    Compare deux rapports scénario par scénario
+
+    Les latences et le débit dépendent de la machine: ils sont comparés avec
+    une tolérance relative. Le nombre de requêtes SQL sert de garde-fou
+    principal en revue: il n'est déterministe qu'à nombre de requêtes et
+    graine identiques (le mélange de chaque scénario en dépend). Dans ce cas,
+    le total par scénario est comparé exactement; sinon, la moyenne par
+    requête HTTP l'est avec `query_tolerance`. Les temps de démarrage
+    (section "startup") sont comparés si les deux rapports en ont.
+
+    Returns:
+        tuple: (lines, regressions) - lignes du tableau et liste des régressions
+    """
+    lines = [f"{'scenario':<18} {'metric':<24} {'baseline':>12} {'current':>12} {'delta':>9}"]
+    regressions = []
+    same_mix = _mix(current) == _mix(baseline)
+    if not same_mix:
+        lines.append(f"(requêtes/graine différentes de la baseline: requêtes SQL par requête HTTP à "
+                     f"{query_tolerance:.0%} près)")
+
+    for name, base in baseline.get("scenarios", {}).items():
+        cur = current.get("scenarios", {}).get(name)
+        if cur is None:
+            lines.append(f"{name:<18} (non exécuté dans ce run)")
+            continue
+
+        checks = [
+            (f"latency_ms.{metric}", base["latency_ms"][metric], cur["latency_ms"][metric], latency_tolerance, True)
+            for metric in LATENCY_METRICS
+        ]
+        if same_mix:
+            checks.append(("db_queries", base["db_queries"], cur["db_queries"], 0.0, True))
+        else:
+            checks.append(("db_queries_per_request", base["db_queries_per_request"], cur["db_queries_per_request"],
+                           query_tolerance, True))
+        checks.append(("throughput_rps", base["throughput_rps"], cur["throughput_rps"], throughput_tolerance, False))
+        checks.append(("errors", base["errors"], cur["errors"], 0.0, True))
+
+        for metric, old, new, tolerance, higher_is_worse in checks:
+            delta = (new - old) / old if old else (1.0 if new else 0.0)
+            worse = delta > tolerance if higher_is_worse else -delta > tolerance
+            flag = "  REGRESSION" if worse else ""
+            lines.append(f"{name:<18} {metric:<24} {old:>12} {new:>12} {delta:>+8.1%}{flag}")
+            if worse:
+                regressions.append(f"{name}: {metric} {old} -> {new} ({delta:+.1%})")
+
+    base_startup, cur_startup = baseline.get("startup"), current.get("startup")
+    if base_startup and cur_startup:
+        for metric in STARTUP_METRICS:
+            old, new = base_startup[metric], cur_startup[metric]
+            delta = (new - old) / old if old else 0.0
+            worse = delta > startup_tolerance
+            flag = "  REGRESSION" if worse else ""
+            lines.append(f"{'startup':<18} {metric:<24} {old:>12} {new:>12} {delta:>+8.1%}{flag}")
+            if worse:
+                regressions.append(f"startup: {metric} {old} -> {new} ({delta:+.1%})")
+    elif base_startup:
+        lines.append(f"{'startup':<18} (non mesuré dans ce run)")
+
+    return lines, regressions
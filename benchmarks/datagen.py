@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Générateur de données synthétiques à l'échelle de la production
+
+Remplit licenses / activations / heartbeats avec des distributions réalistes,
+par lots de taille constante (mémoire plate quel que soit le volume):
+- PostgreSQL: COPY FROM STDIN (psycopg2)
+- SQLite: INSERT par lots (executemany)
+
+Usage:
+    python -m benchmarks.datagen --database-url postgresql://.../license_bench \\
+        --licenses 1000000 --activations-per-license 40 --heartbeats-per-license 20
+"""
+
+import argparse
+import csv
+import io
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.utils.validation_outcome import ValidationOutcome, outcome_message
+
+# Domaines email: quelques gros fournisseurs + une longue traîne de domaines d'entreprise
+EMAIL_PROVIDERS = [
+    ("gmail.com", 38), ("outlook.com", 14), ("hotmail.fr", 9), ("yahoo.fr", 6),
+    ("orange.fr", 6), ("bluewin.ch", 4), ("icloud.com", 3), ("free.fr", 3),
+]
+APP_VERSIONS = [("1.7.0", 50), ("1.6.2", 25), ("1.6.0", 12), ("1.5.4", 8), ("1.8.0-beta", 5)]
+OS_INFOS = ["Windows 11 22H2", "Windows 10 22H2", "Windows 10 21H2", "Windows 11 23H2"]
+CURRENCIES = [("EUR", 19900, 60), ("CHF", 19900, 25), ("USD", 21900, 10), ("GBP", 17900, 5)]
+
+LICENSE_COLUMNS = [
+    "id", "email", "customer_name", "company_name", "machine_id", "license_type",
+    "license_key", "created_at", "updated_at", "expires_at", "is_active", "is_revoked", "revoked_at",
+    "revoked_reason", "expired_at", "notes", "stripe_customer_id", "stripe_session_id",
+    "stripe_payment_intent_id", "amount_paid", "currency",
+]
+ACTIVATION_COLUMNS = [
+    "license_id", "machine_id", "ip_address", "is_valid", "outcome", "validation_message", "checked_at",
+]
+HEARTBEAT_COLUMNS = [
+    "license_id", "machine_id", "app_version", "os_info", "usage_stats", "sent_at",
+]
+
+
+def weighted(rng: random.Random, choices):
+    """Tirage pondéré dans une liste de tuples (valeur, ..., poids)"""
+    return rng.choices(choices, weights=[c[-1] for c in choices])[0]
+
+
+class DatasetGenerator:
+    """
+    Produit des lignes réalistes pour les trois tables volumineuses
+
+    Les identifiants de licences sont attribués par le générateur (à partir de
+    `first_id`) pour pouvoir charger activations et heartbeats par COPY sans
+    relire la base.
+    """
+
+    def __init__(self, seed: int, first_id: int, days: int, lifetime_ratio: float,
+                 activations_per_license: int, heartbeats_per_license: int, real_keys: bool,
+                 legacy_activations: bool = False):
+        self.rng = random.Random(seed)
+        self.next_id = first_id
+        self.days = days
+        self.lifetime_ratio = lifetime_ratio
+        self.activations_per_license = activations_per_license
+        self.heartbeats_per_license = heartbeats_per_license
+        self.real_keys = real_keys
+        self.legacy_activations = legacy_activations
+        self.now = datetime.utcnow()
+        self._recent_emails = []
+
+    def _email(self) -> str:
+        rng = self.rng
+        # ~6% des clients possèdent plusieurs postes (même email, machine différente)
+        if self._recent_emails and rng.random() < 0.06:
+            return rng.choice(self._recent_emails)
+        local = f"{rng.choice(['jean', 'marie', 'luc', 'anne', 'paul', 'sophie', 'contact', 'compta'])}" \
+                f".{uuid.UUID(int=rng.getrandbits(128)).hex[:8]}"
+        if rng.random() < 0.2:
+            domain = f"entreprise-{rng.randrange(200000)}.ch"
+        else:
+            domain = weighted(rng, EMAIL_PROVIDERS)[0]
+        email = f"{local}@{domain}"
+        self._recent_emails.append(email)
+        if len(self._recent_emails) > 1000:
+            self._recent_emails.pop(0)
+        return email
+
+    def _machine_id(self) -> str:
+        # Clients récents: SHA-256 (64 caractères), anciens: 32 caractères
+        bits = self.rng.getrandbits(256)
+        return f"{bits:064x}" if self.rng.random() < 0.7 else f"{bits:064x}"[:32]
+
+    def _license_key(self, machine_id: str, email: str, license_type: str, expires_at) -> str:
+        if self.real_keys:
+            from app.utils.license_crypto import license_generator
+            duration = None if expires_at is None else max(1, (expires_at - self.now).days)
+            key, _ = license_generator.generate_license(machine_id, email, license_type, duration)
+            return key
+        # Même longueur qu'une vraie clé Fernet hexadécimale (~440 caractères)
+        return f"{self.rng.getrandbits(1760):0440x}"
+
+    def license_batch(self, count: int):
+        """Génère `count` licences et leurs activations/heartbeats associés"""
+        rng = self.rng
+        licenses, activations, heartbeats = [], [], []
+
+        for _ in range(count):
+            license_id = self.next_id
+            self.next_id += 1
+
+            created_at = self.now - timedelta(seconds=rng.randrange(self.days * 86400))
+            lifetime = rng.random() < self.lifetime_ratio
+            license_type = "lifetime" if lifetime else "trial"
+            expires_at = None if lifetime else created_at + timedelta(days=30)
+            email = self._email()
+
+            # ~3% des achats landing page ne sont pas encore liés à une machine
+            if lifetime and rng.random() < 0.03:
+                machine_id = f"PENDING_LINK_cs_{uuid.UUID(int=rng.getrandbits(128)).hex[:7]}"
+            else:
+                machine_id = self._machine_id()
+
+            is_revoked = rng.random() < 0.005
+            stripe = lifetime and rng.random() < 0.9
+            currency, amount, _ = weighted(rng, CURRENCIES) if stripe else (None, None, None)
+            token = uuid.UUID(int=rng.getrandbits(128)).hex
+            # État matérialisé par le balayeur d'expiration
+            expired = expires_at is not None and expires_at <= self.now
+            is_active = rng.random() > 0.02 and not expired
+
+            licenses.append({
+                "id": license_id,
+                "email": email,
+                "customer_name": None if rng.random() < 0.4 else f"Client {license_id}",
+                "company_name": None if rng.random() < 0.6 else f"Société {license_id % 50000}",
+                "machine_id": machine_id,
+                "license_type": license_type,
+                "license_key": self._license_key(machine_id, email, license_type, expires_at),
+                "created_at": created_at,
+                "updated_at": created_at,
+                "expires_at": expires_at,
+                "is_active": is_active,
+                "is_revoked": is_revoked,
+                "revoked_at": created_at + timedelta(days=rng.randrange(1, 30)) if is_revoked else None,
+                "revoked_reason": "Chargeback" if is_revoked else None,
+                "expired_at": expires_at if expired else None,
+                "notes": None,
+                "stripe_customer_id": f"cus_{token[:14]}" if stripe else None,
+                "stripe_session_id": f"cs_live_{token}" if stripe else None,
+                "stripe_payment_intent_id": f"pi_{token[:24]}" if stripe else None,
+                "amount_paid": amount,
+                "currency": currency,
+            })
+
+            # Série temporelle d'activations: un poste vérifie sa licence plusieurs fois par jour
+            span = max(1, int((self.now - created_at).total_seconds()))
+            ips = [f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+                   for _ in range(rng.randint(1, 3))]
+            n_activations = int(rng.expovariate(1.0 / self.activations_per_license)) if self.activations_per_license else 0
+            for _ in range(n_activations):
+                if is_revoked:
+                    outcome = ValidationOutcome.REVOKED
+                elif rng.random() > 0.03:
+                    outcome = ValidationOutcome.VALID
+                else:
+                    outcome = rng.choice([ValidationOutcome.INACTIVE, ValidationOutcome.EXPIRED])
+                activations.append({
+                    "license_id": license_id,
+                    "machine_id": machine_id,
+                    "ip_address": rng.choice(ips),
+                    "is_valid": outcome == ValidationOutcome.VALID,
+                    # Format historique (texte complet, sans code) pour exercer compact_activations
+                    "outcome": None if self.legacy_activations else int(outcome),
+                    "validation_message": outcome_message(outcome, revoked_reason="Chargeback")
+                    if self.legacy_activations else None,
+                    "checked_at": created_at + timedelta(seconds=rng.randrange(span)),
+                })
+
+            n_heartbeats = int(rng.expovariate(1.0 / self.heartbeats_per_license)) if self.heartbeats_per_license else 0
+            version = weighted(rng, APP_VERSIONS)[0]
+            for _ in range(n_heartbeats):
+                heartbeats.append({
+                    "license_id": license_id,
+                    "machine_id": machine_id,
+                    "app_version": version,
+                    "os_info": rng.choice(OS_INFOS),
+                    "usage_stats": json.dumps({
+                        "invoices_created": int(rng.paretovariate(1.5)),
+                        "quotes_created": int(rng.paretovariate(2.0)) - 1,
+                        "clients_count": rng.randrange(1, 400),
+                        "features": {
+                            "pdf_export": rng.random() < 0.8,
+                            "qr_bill": rng.random() < 0.35,
+                            "multi_currency": rng.random() < 0.1,
+                        },
+                    }),
+                    "sent_at": created_at + timedelta(seconds=rng.randrange(span)),
+                })
+
+        return licenses, activations, heartbeats
+
+
+# ============================================
+# CHARGEMENT
+# ============================================
+
+def _copy_rows(raw_connection, table: str, columns: list, rows: list) -> None:
+    """COPY FROM STDIN au format CSV (chemin rapide PostgreSQL)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    with raw_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+
+
+def load(engine, generator: DatasetGenerator, total: int, batch_size: int) -> dict:
+    """Charge `total` licences (et leurs séries) par lots de `batch_size`"""
+    from app.models import Activation, Heartbeat, License
+
+    counts = {"licenses": 0, "activations": 0, "heartbeats": 0}
+    started = time.perf_counter()
+    use_copy = engine.dialect.name == "postgresql"
+
+    while counts["licenses"] < total:
+        licenses, activations, heartbeats = generator.license_batch(min(batch_size, total - counts["licenses"]))
+
+        if use_copy:
+            raw = engine.raw_connection()
+            try:
+                _copy_rows(raw, "licenses", LICENSE_COLUMNS, licenses)
+                _copy_rows(raw, "activations", ACTIVATION_COLUMNS, activations)
+                _copy_rows(raw, "heartbeats", HEARTBEAT_COLUMNS, heartbeats)
+                raw.commit()
+            finally:
+                raw.close()
+        else:
+            with engine.begin() as conn:
+                conn.execute(License.__table__.insert(), licenses)
+                if activations:
+                    conn.execute(Activation.__table__.insert(), activations)
+                if heartbeats:
+                    conn.execute(Heartbeat.__table__.insert(), heartbeats)
+
+        counts["licenses"] += len(licenses)
+        counts["activations"] += len(activations)
+        counts["heartbeats"] += len(heartbeats)
+        elapsed = time.perf_counter() - started
+        print(f"  {counts['licenses']:>10} licences  {counts['activations']:>12} activations  "
+              f"{counts['heartbeats']:>12} heartbeats  ({counts['licenses'] / elapsed:,.0f} licences/s)",
+              file=sys.stderr)
+
+    return counts
+
+
+def finalize(engine) -> None:
+    """Réaligne la séquence des ids et met à jour les statistiques du planificateur"""
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql(
+                "SELECT setval(pg_get_serial_sequence('licenses', 'id'), (SELECT max(id) FROM licenses))"
+            )
+    # ANALYZE hors transaction pour couvrir les trois tables
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.datagen", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Base DÉDIÉE (les données sont ajoutées)")
+    parser.add_argument("--licenses", type=int, default=100000)
+    parser.add_argument("--activations-per-license", type=int, default=40, help="Moyenne (loi exponentielle)")
+    parser.add_argument("--heartbeats-per-license", type=int, default=20, help="Moyenne (loi exponentielle)")
+    parser.add_argument("--lifetime-ratio", type=float, default=0.15)
+    parser.add_argument("--days", type=int, default=730, help="Profondeur d'historique")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--real-keys", action="store_true",
+                        help="Chiffrer de vraies clés Fernet (plus lent, nécessaire pour /validate)")
+    parser.add_argument("--legacy-activations", action="store_true",
+                        help="Activations au format texte historique (outcome NULL)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url)
+
+    from sqlalchemy import func, select
+    from app.database import Base, engine
+    from app.models import License
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        first_id = (conn.execute(select(func.max(License.id))).scalar() or 0) + 1
+
+    generator = DatasetGenerator(
+        seed=args.seed,
+        first_id=first_id,
+        days=args.days,
+        lifetime_ratio=args.lifetime_ratio,
+        activations_per_license=args.activations_per_license,
+        heartbeats_per_license=args.heartbeats_per_license,
+        real_keys=args.real_keys,
+        legacy_activations=args.legacy_activations,
+    )
+    counts = load(engine, generator, args.licenses, args.batch_size)
+    finalize(engine)
+    print(json.dumps(counts))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
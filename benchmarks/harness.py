@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Infrastructure commune des benchmarks
+Préparation de l'environnement, cibles HTTP, mesure de latence et comptage SQL
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Clé Fernet de test (jamais utilisée en production)
+BENCH_LICENSE_SECRET_KEY = "QvS9Dy6SjhpVPFf-nsu2NZ-xPfS3-Xaom--vwvdeH6w="
+BENCH_WEBHOOK_SECRET = "whsec_benchmark"
+
+# Stockages basculés en mémoire par --store memory
+MEMORY_STORES = ("LICENSE_STORE", "SEAT_STORE", "SHARING_STORE", "IDEMPOTENCY_STORE")
+
+# Limites assez hautes pour ne jamais déclencher SlowAPI pendant une mesure
+UNLIMITED_RATE = "1000000/hour"
+
+
+def default_sqlite_url() -> str:
+    """Retourne l'URL d'une base SQLite temporaire (fichier neuf à chaque run)"""
+    path = os.path.join(tempfile.gettempdir(), f"license_bench_{os.getpid()}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    return f"sqlite:///{path}"
+
+
+def configure_environment(database_url: str, store: str = "database") -> None:
+    """
+    Prépare les variables d'environnement AVANT l'import de l'application
+
+    app.config, app.api.licenses (rate limits) et app.api.payment (secrets Stripe)
+    lisent leur configuration à l'import: cette fonction doit donc être appelée
+    avant tout import de `main` ou d'un module `app.*`.
+
+    store="memory": licences, postes, esquisses de partage et clés
+    d'idempotence en mémoire (app.services.license_repository): les
+    scénarios ne touchent pas la base.
+    """
+    if store == "memory":
+        for name in MEMORY_STORES:
+            os.environ[name] = "local"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("LICENSE_SECRET_KEY", BENCH_LICENSE_SECRET_KEY)
+    os.environ["ENVIRONMENT"] = "benchmark"  # Pas d'echo SQL
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ["TRIAL_RATE_LIMIT"] = UNLIMITED_RATE
+    os.environ["VALIDATE_RATE_LIMIT"] = UNLIMITED_RATE
+    os.environ["STRIPE_WEBHOOK_SECRET"] = BENCH_WEBHOOK_SECRET
+
+
+def load_app():
+    """
+    Importe l'application et remet le schéma à zéro
+
+    L'envoi d'email du webhook est neutralisé: un test de charge ne doit
+    jamais contacter le fournisseur d'emails.
+    """
+    import main
+    from app.api import payment
+    from app.database import Base, engine
+
+    payment.send_license_email = lambda email, license_key: None
+    # Le client in-process ne lance pas le lifespan: SDK Stripe chargé ici, comme un worker prêt
+    payment.stripe_api()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return main.app, engine
+
+
+# ============================================
+# MESURES
+# ============================================
+
+class QueryCounter:
+    """Compte les requêtes SQL émises par un moteur SQLAlchemy"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentile par interpolation linéaire sur une liste déjà triée"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+@dataclass
+class ScenarioResult:
+    """Résultats bruts d'un scénario"""
+    name: str
+    latencies_ms: List[float] = field(default_factory=list)
+    status_codes: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    elapsed_s: float = 0.0
+    db_queries: int = 0
+
+    def record(self, status_code: int, latency_ms: float, expected=(200,)) -> None:
+        self.latencies_ms.append(latency_ms)
+        key = str(status_code)
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if status_code not in expected:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        values = sorted(self.latencies_ms)
+        requests = len(values)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "elapsed_s": round(self.elapsed_s, 3),
+            "throughput_rps": round(requests / self.elapsed_s, 1) if self.elapsed_s else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "p99": round(percentile(values, 99), 3),
+                "mean": round(sum(values) / requests, 3) if requests else 0.0,
+                "max": round(values[-1], 3) if values else 0.0,
+            },
+            "db_queries": self.db_queries,
+            "db_queries_per_request": round(self.db_queries / requests, 2) if requests else 0.0,
+        }
+
+
+# ============================================
+# CIBLES HTTP
+# ============================================
+
+@asynccontextmanager
+async def inprocess_client(app):
+    """Client httpx branché directement sur l'application ASGI (sans réseau)"""
+    import httpx
+
+    # raise_app_exceptions=False: une exception serveur compte comme un 500, pas un crash du harness
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False, client=("10.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        yield client
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_client(app, port: Optional[int] = None):
+    """
+    Démarre un vrai serveur uvicorn (thread dédié, socket TCP locale)
+
+    Le serveur tourne dans le même processus que le harness, ce qui permet
+    de continuer à compter les requêtes SQL via les événements du moteur.
+    """
+    import httpx
+    import uvicorn
+
+    port = port or _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn n'a pas démarré en 10 secondes")
+        time.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=256, max_keepalive_connections=256)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark des requêtes rejouables (app/services/idempotency.py)
+
+- POST /licenses/trial avec Idempotency-Key (client in-process, SQLite):
+  première exécution puis nouvelles tentatives (réponse rejouée)
+- doublons simultanés: --duplicates requêtes identiques réparties sur
+  --workers workers (une instance Idempotency chacun, stockage commun),
+  traitement simulé de --handler-ms (appel Stripe): une seule exécution,
+  même réponse pour tous
+- mémoire par clé du LocalIdempotencyStore (réponse de 800 octets)
+
+Usage:
+    python -m benchmarks.idempotency [--requests 200 --duplicates 50 --workers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+
+def trial_replays(args) -> dict:
+    from fastapi.testclient import TestClient
+
+    from benchmarks.harness import load_app
+
+    app, engine = load_app()
+    client = TestClient(app)
+    first, replayed = [], []
+    for index in range(args.requests):
+        body = {"email": f"bench{index}@example.com", "machine_id": f"{index:032d}", "customer_name": "Bench"}
+        headers = {"Idempotency-Key": f"trial-{index}"}
+        started = time.perf_counter()
+        response = client.post("/api/v1/licenses/trial", json=body, headers=headers)
+        first.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+        for _ in range(args.retries):
+            started = time.perf_counter()
+            retry = client.post("/api/v1/licenses/trial", json=body, headers=headers)
+            replayed.append((time.perf_counter() - started) * 1000)
+            assert retry.content == response.content and retry.headers.get("Idempotent-Replayed") == "true"
+    engine.dispose()
+    return {
+        "requests": args.requests,
+        "first_ms_p50": round(statistics.median(first), 3),
+        "replay_ms_p50": round(statistics.median(replayed), 3),
+    }
+
+
+async def _duplicates(args, store) -> dict:
+    from fastapi import Response
+
+    from app.services.idempotency import Idempotency
+
+    workers = [Idempotency(store, wait=30.0) for _ in range(args.workers)]
+    calls = []
+
+    async def handler():
+        calls.append(time.perf_counter())
+        await asyncio.sleep(args.handler_ms / 1000)
+        return Response(content=b'{"session_id":"cs_bench"}', media_type="application/json")
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(
+        workers[index % args.workers].execute("checkout", "duplicate", "0" * 32, handler)
+        for index in range(args.duplicates)
+    ))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return {
+        "duplicates": args.duplicates,
+        "workers": args.workers,
+        "handler_calls": len(calls),
+        "same_response": len({response.body for response in responses}) == 1,
+        "statuses": sorted({response.status_code for response in responses}),
+        "all_done_ms": round(elapsed_ms, 1),
+    }
+
+
+def duplicates(args) -> dict:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.services.idempotency import DatabaseIdempotencyStore, LocalIdempotencyStore, idempotency_keys
+
+    results = {"local_store": asyncio.run(_duplicates(args, LocalIdempotencyStore()))}
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[idempotency_keys])
+    results["database_store"] = asyncio.run(_duplicates(args, DatabaseIdempotencyStore(sessionmaker(bind=engine))))
+    engine.dispose()
+    return results
+
+
+def memory(args) -> dict:
+    from app.services.idempotency import LocalIdempotencyStore, StoredResponse, idempotency_digest
+
+    store = LocalIdempotencyStore()
+    size = 800
+    tracemalloc.start()
+    for index in range(args.keys):
+        digest = idempotency_digest("trial", f"key-{index}")
+        store.claim(digest, "0" * 32, 1_000_000.0)
+        store.complete(digest, StoredResponse(200, str(index).encode().ljust(size, b"x")))
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    started = time.perf_counter()
+    purged = store.purge(1_000_000.0 + store.ttl)
+    purge_ms = (time.perf_counter() - started) * 1000
+    return {"keys": args.keys, "bytes_per_key": round(used / args.keys, 1),
+            "overhead_bytes_per_key": round(used / args.keys - size, 1),
+            "purged": purged, "purge_ms": round(purge_ms, 2)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.idempotency", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=2, help="Nouvelles tentatives par requête")
+    parser.add_argument("--duplicates", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--handler-ms", type=float, default=300.0, help="Durée simulée d'une création de session Stripe")
+    parser.add_argument("--keys", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment, default_sqlite_url
+    configure_environment(default_sqlite_url())
+
+    results = {"trial": trial_replays(args), "duplicates": duplicates(args), "memory": memory(args)}
+    print(f"  trial: {results['trial']['first_ms_p50']} ms, rejouée {results['trial']['replay_ms_p50']} ms; "
+          f"{args.duplicates} doublons simultanés: "
+          f"{results['duplicates']['database_store']['handler_calls']} exécution", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark des lectures légères (app/services/license_lookup.py)
+
+Compare, pour la recherche de la validation par clé et celle de la page de
+succès par session Stripe, le chemin ORM (session.query(License)...first())
+et le chemin Core à __slots__: temps CPU par appel et allocations par appel
+(pic tracemalloc, passe séparée pour ne pas fausser les temps).
+
+Base remplie par benchmarks.datagen (SQLite ou PostgreSQL dédiée):
+
+Usage:
+    python -m benchmarks.license_lookup --database-url sqlite:////tmp/bench.db [--lookups 5000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+
+def measure(func, values, db) -> dict:
+    """CPU et durée (µs) puis pic d'allocation par appel; transaction close entre deux appels comme par requête"""
+    for value in values[:100]:  # Chauffe: compilation, cache de statements
+        func(db, value)
+        db.rollback()
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for value in values:
+        func(db, value)
+        db.rollback()
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+
+    return {
+        "cpu_us_per_call": round(cpu / len(values) * 1e6, 1),
+        "wall_us_per_call": round(wall / len(values) * 1e6, 1),
+        "peak_bytes_per_call": peak_allocation(func, values, db),
+    }
+
+
+def peak_allocation(func, values, db) -> float:
+    """Pic d'allocation moyen d'un appel (octets), objets temporaires compris"""
+    total = 0
+    sample = values[:500]
+    tracemalloc.start()
+    for value in sample:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func(db, value)
+        total += tracemalloc.get_traced_memory()[1] - base
+        db.rollback()
+    tracemalloc.stop()
+    return round(total / len(sample), 1)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.license_lookup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Base remplie par benchmarks.datagen")
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url)
+
+    from sqlalchemy import select
+    from app.database import SessionLocal
+    from app.models.license import License
+    from app.services.license_lookup import license_for_session, license_status
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        keys = db.execute(select(License.license_key)).scalars().all()
+        sessions = db.execute(
+            select(License.stripe_session_id).where(License.stripe_session_id.is_not(None))
+        ).scalars().all()
+        db.rollback()
+        if not keys:
+            print("Table licenses vide: lancer d'abord python -m benchmarks.datagen", file=sys.stderr)
+            return 2
+
+        key_sample = [rng.choice(keys) for _ in range(args.lookups)]
+        session_sample = [rng.choice(sessions) for _ in range(args.lookups)] if sessions else []
+
+        def orm_by_key(session, key):
+            return session.query(License).filter(License.license_key == key).first()
+
+        def orm_by_session(session, session_id):
+            return session.query(License).filter(License.stripe_session_id == session_id).first()
+
+        cases = [("validate.by_license_key", orm_by_key, license_status, key_sample)]
+        if session_sample:
+            cases.append(("session.by_stripe_session", orm_by_session, license_for_session, session_sample))
+
+        report = {"licenses": len(keys), "lookups": args.lookups, "queries": {}}
+        for name, orm, lean, values in cases:
+            orm_result = measure(orm, values, db)
+            lean_result = measure(lean, values, db)
+            report["queries"][name] = {
+                "orm": orm_result,
+                "core": lean_result,
+                "cpu_speedup": round(orm_result["cpu_us_per_call"] / lean_result["cpu_us_per_call"], 2),
+            }
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de non-régression des plans de requêtes
+
+Rejoue chaque requête émise par les endpoints avec EXPLAIN sur une base
+remplie par `benchmarks.datagen`, puis vérifie:
+- qu'aucun Seq Scan / SCAN n'apparaît sur les tables volumineuses
+- que l'index attendu est bien utilisé
+- (PostgreSQL) que l'estimation de lignes reste sous une borne
+
+Usage:
+    python -m benchmarks.plans --database-url postgresql://.../license_bench
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+# Tables dont un parcours séquentiel est toujours une régression
+LARGE_TABLES = ("licenses", "activations", "heartbeats")
+
+
+class Explain(Executable, ClauseElement):
+    """Construct `EXPLAIN <statement>` compilé selon le dialecte"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+def _plan_sql(element, compiler, **kw) -> str:
+    sql = compiler.process(element.statement, **kw)
+    # Lignes de plan: pas les colonnes (ni les conversions de type) de l'instruction expliquée
+    compiler._result_columns = []
+    return sql
+
+
+@compiles(Explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + _plan_sql(element, compiler, **kw)
+
+
+@compiles(Explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + _plan_sql(element, compiler, **kw)
+
+
+@dataclass
+class PlanCheck:
+    """
+    Une requête d'endpoint et ses attentes de plan
+
+    `build` reçoit un échantillon de licence existante (dict) et retourne
+    l'instruction SQLAlchemy, construite exactement comme dans l'endpoint.
+    """
+    name: str
+    build: Callable[[dict], object]
+    indexes: Tuple[str, ...]  # Au moins un de ces index doit apparaître
+    max_rows: Optional[int] = None
+    known_issue: Optional[str] = None  # Rapporté mais non bloquant
+
+
+@dataclass
+class PlanResult:
+    name: str
+    ok: bool
+    indexes_used: List[str] = field(default_factory=list)
+    seq_scans: List[str] = field(default_factory=list)
+    estimated_rows: Optional[float] = None
+    problems: List[str] = field(default_factory=list)
+    known_issue: Optional[str] = None
+
+
+def endpoint_checks() -> List[PlanCheck]:
+    """Requêtes émises par app/api et app/services (à compléter à chaque nouvelle requête d'endpoint)"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import select
+    from app.models.license import License
+    from app.services.customer_identity import (
+        RESOLVE_WITH_PENDING_LINK, by_email_statement, pending_link_by_email_statement,
+    )
+    from app.services.expiry_sweeper import pending_expiry_filter
+    from app.services.idempotency import idempotency_digest, record_statement
+    from app.services.license_import import existing_pairs_statement
+    from app.services.activation_timeline import day_totals_statement, timeline_statement
+    from app.services.license_lookup import (
+        ACTIVE_LIFETIME_BY_MACHINE, LICENSE_BY_SESSION, STATUS_BY_KEY, STATUS_BY_PREVIOUS_KEY,
+    )
+    from app.services.license_repository import TRIAL_BY_EMAIL, TRIAL_BY_MACHINE
+    from app.services.license_search import LicenseFilters, encode_cursor, search_statement
+    from app.services.revocation import RevocationCriteria, chunk_statement, invalidations_statement
+    from app.services.revocation_set import SYNC_COLUMNS, blocked_filter
+    from app.services.seat_tracker import changes_statement as seat_changes_statement
+    from app.services.sharing_detector import latest_alert_statement, window_sketches_statement
+    from app.services.usage_analytics import chunk_statement as usage_chunk_statement
+
+    unique_key = ("licenses_license_key_key", "sqlite_autoindex_licenses_1")
+
+    return [
+        PlanCheck(
+            "trial.existing_email",
+            lambda s: TRIAL_BY_EMAIL.params(email=s["email"]),
+            ("ix_licenses_email",), max_rows=50,
+        ),
+        PlanCheck(
+            "trial.existing_machine",
+            lambda s: TRIAL_BY_MACHINE.params(machine_id=s["machine_id"]),
+            ("ix_licenses_machine_id",), max_rows=50,
+        ),
+        PlanCheck(
+            "validate.by_license_key",
+            lambda s: STATUS_BY_KEY.params(license_key=s["license_key"]),
+            unique_key, max_rows=1,
+        ),
+        PlanCheck(
+            "validate.by_previous_license_key",
+            lambda s: STATUS_BY_PREVIOUS_KEY.params(license_key=s["license_key"]),
+            ("ix_licenses_previous_license_key",), max_rows=1,
+        ),
+        PlanCheck(
+            "checkout.existing_lifetime",
+            lambda s: ACTIVE_LIFETIME_BY_MACHINE.params(machine_id=s["machine_id"]),
+            ("ix_licenses_machine_id",), max_rows=50,
+        ),
+        PlanCheck(
+            "webhook.resolve_customer",
+            lambda s: RESOLVE_WITH_PENDING_LINK.params(machine_id=s["machine_id"], email=s["email"].lower()),
+            ("ix_licenses_machine_id",), max_rows=100,
+        ),
+        PlanCheck(
+            "webhook.pending_link_by_email",
+            lambda s: pending_link_by_email_statement().params(email=s["email"].lower()),
+            ("ix_licenses_pending_link_email",), max_rows=10,
+        ),
+        PlanCheck(
+            "webhook.by_email",
+            lambda s: by_email_statement().params(email=s["email"].lower()),
+            ("ix_licenses_email_lower",), max_rows=10,
+        ),
+        PlanCheck(
+            "session.by_stripe_session",
+            lambda s: LICENSE_BY_SESSION.params(session_id=s["stripe_session_id"]),
+            ("ix_licenses_stripe_session_id",), max_rows=1,
+        ),
+        PlanCheck(
+            "expiry.sweep_batch",
+            lambda s: select(License.id).where(*pending_expiry_filter(datetime.utcnow()))
+            .order_by(License.expires_at).limit(500),
+            ("ix_licenses_expiry_pending",), max_rows=5000,
+        ),
+        PlanCheck(
+            "admin.search_recent_page",
+            lambda s: search_statement(
+                LicenseFilters(), encode_cursor(s["created_at"], s["id"]), limit=51
+            ),
+            # SQLite: ix_licenses_created_at porte déjà le rowid (= id), équivalent au composite
+            ("ix_licenses_created_at_id", "ix_licenses_created_at"), max_rows=5000,
+        ),
+        PlanCheck(
+            "admin.search_by_email",
+            lambda s: search_statement(LicenseFilters(email=s["email"]), limit=51),
+            ("ix_licenses_email",), max_rows=50,
+        ),
+        PlanCheck(
+            "admin.search_by_stripe_customer",
+            lambda s: search_statement(LicenseFilters(stripe_customer_id=s["stripe_customer_id"]), limit=51),
+            ("ix_licenses_stripe_customer_id", "idx_licenses_stripe_customer"), max_rows=50,
+        ),
+        PlanCheck(
+            "admin.activation_timeline",
+            lambda s: timeline_statement(s["id"], datetime.utcnow() - timedelta(days=30), limit=51),
+            ("ix_activations_license_checked",), max_rows=5000,
+        ),
+        PlanCheck(
+            "admin.activation_timeline_days",
+            lambda s: day_totals_statement(s["id"], datetime.utcnow() - timedelta(days=30),
+                                           datetime.utcnow() - timedelta(days=2), datetime.utcnow()),
+            ("ix_activations_license_checked",), max_rows=5000,
+        ),
+        PlanCheck(
+            "revocation.chunk_by_stripe_customer",
+            lambda s: chunk_statement(RevocationCriteria(stripe_customer_id=s["stripe_customer_id"]), 0),
+            ("ix_licenses_stripe_customer_id", "idx_licenses_stripe_customer"), max_rows=50,
+        ),
+        PlanCheck(
+            "revocation.chunk_by_emails",
+            lambda s: chunk_statement(RevocationCriteria(emails=[s["email"], "absent@example.com"]), 0),
+            ("ix_licenses_email",), max_rows=100,
+        ),
+        PlanCheck(
+            "import.existing_pairs",
+            lambda s: existing_pairs_statement([s["machine_id"], "absent-machine"]),
+            ("ix_licenses_machine_id",), max_rows=100,
+        ),
+        PlanCheck(
+            "revocation_set.load",
+            lambda s: select(*SYNC_COLUMNS).where(blocked_filter()),
+            ("ix_licenses_blocked",), max_rows=50000,
+        ),
+        PlanCheck(
+            "invalidation_feed.poll",
+            lambda s: invalidations_statement(0),
+            ("license_invalidations_pkey", "rowid"), max_rows=1000,
+        ),
+        PlanCheck(
+            "seats.changes_after",
+            lambda s: seat_changes_statement(2 ** 62),
+            ("ix_seat_leases_change_id",), max_rows=50000,
+        ),
+        PlanCheck(
+            "sharing.window_sketches",
+            lambda s: window_sketches_statement(["0" * 64, "f" * 64], datetime.utcnow() - timedelta(days=1)),
+            ("license_sharing_sketches_pkey", "sqlite_autoindex_license_sharing_sketches_1"), max_rows=100,
+        ),
+        PlanCheck(
+            "sharing.latest_alert",
+            lambda s: latest_alert_statement("0" * 64),
+            ("ix_license_sharing_alerts_key_digest",), max_rows=10,
+        ),
+        PlanCheck(
+            "idempotency.record",
+            lambda s: record_statement(idempotency_digest("trial", s["machine_id"])),
+            ("idempotency_keys_pkey", "sqlite_autoindex_idempotency_keys_1"), max_rows=1,
+        ),
+        PlanCheck(
+            "usage_analytics.heartbeat_chunk",
+            lambda s: usage_chunk_statement(0),
+            ("heartbeats_pkey", "rowid"), max_rows=20000,
+        ),
+    ]
+
+
+def sample_license(conn) -> dict:
+    """Choisit une licence payée au milieu de la table comme valeurs de paramètres"""
+    from sqlalchemy import func, select
+    from app.models.license import License
+
+    max_id = conn.execute(select(func.max(License.id))).scalar()
+    if not max_id:
+        raise RuntimeError("Table licenses vide: lancer d'abord python -m benchmarks.datagen")
+    row = conn.execute(
+        select(License.__table__)
+        .where(License.id >= max_id // 2, License.stripe_session_id.is_not(None))
+        .order_by(License.id)
+        .limit(1)
+    ).mappings().first()
+    if row is None:
+        row = conn.execute(select(License.__table__).where(License.id >= max_id // 2).limit(1)).mappings().first()
+    return dict(row)
+
+
+def _walk_postgresql(node: dict, result: PlanResult) -> None:
+    relation = node.get("Relation Name")
+    if node.get("Node Type") == "Seq Scan" and relation in LARGE_TABLES:
+        result.seq_scans.append(relation)
+    if "Index Name" in node:
+        result.indexes_used.append(node["Index Name"])
+    # L'estimation utile est celle des nœuds de parcours (un LIMIT plafonne la racine)
+    if relation or "Index Name" in node:
+        result.estimated_rows = max(result.estimated_rows or 0, node.get("Plan Rows", 0))
+    for child in node.get("Plans", []):
+        _walk_postgresql(child, result)
+
+
+def analyze_plan(dialect: str, rows: list, check: PlanCheck) -> PlanResult:
+    """Interprète la sortie d'EXPLAIN et applique les attentes de `check`"""
+    result = PlanResult(check.name, ok=True, known_issue=check.known_issue)
+
+    if dialect == "postgresql":
+        document = rows[0][0]
+        plan = (json.loads(document) if isinstance(document, str) else document)[0]["Plan"]
+        _walk_postgresql(plan, result)
+    else:
+        # SQLite: (id, parent, notused, detail) - ex. "SEARCH licenses USING INDEX ix_licenses_email (email=?)"
+        for row in rows:
+            detail = row[-1]
+            words = detail.split()
+            if words and words[0] == "SCAN" and len(words) > 1 and words[1] in LARGE_TABLES \
+                    and "USING" not in words:
+                result.seq_scans.append(words[1])
+            if "USING" in words and "INDEX" in words:
+                result.indexes_used.append(words[words.index("INDEX") + 1])
+            elif "USING" in words and "PRIMARY" in words and "INTEGER" in words:
+                result.indexes_used.append("rowid")  # "SEARCH heartbeats USING INTEGER PRIMARY KEY (rowid>?)"
+
+    if result.seq_scans:
+        result.problems.append(f"parcours séquentiel sur {', '.join(sorted(set(result.seq_scans)))}")
+    if not set(check.indexes) & set(result.indexes_used):
+        result.problems.append(f"index attendu absent ({' | '.join(check.indexes)})")
+    if check.max_rows is not None and result.estimated_rows is not None and result.estimated_rows > check.max_rows:
+        result.problems.append(f"estimation {result.estimated_rows:.0f} lignes > {check.max_rows}")
+
+    result.ok = not result.problems
+    return result
+
+
+def run_checks(engine, checks: List[PlanCheck]) -> List[PlanResult]:
+    results = []
+    with engine.connect() as conn:
+        sample = sample_license(conn)
+        for check in checks:
+            rows = conn.execute(Explain(check.build(sample))).fetchall()
+            results.append(analyze_plan(engine.dialect.name, rows, check))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.plans", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Base remplie par benchmarks.datagen")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url)
+    from app.database import engine
+
+    results = run_checks(engine, endpoint_checks())
+    failures = [r for r in results if not r.ok and not r.known_issue]
+
+    if args.json:
+        print(json.dumps([r.__dict__ for r in results], indent=2, ensure_ascii=False))
+    else:
+        for r in results:
+            status = "OK  " if r.ok else ("KNOWN" if r.known_issue else "FAIL")
+            used = ", ".join(sorted(set(r.indexes_used))) or "-"
+            print(f"{status:<5} {r.name:<32} index: {used}")
+            for problem in r.problems:
+                print(f"        - {problem}")
+            if r.known_issue and not r.ok:
+                print(f"        (connu: {r.known_issue})")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
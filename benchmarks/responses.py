@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark de l'encodage des réponses (app/utils/responses.py)
+
+Pour chaque type de réponse des endpoints licences et paiement, compare le
+chemin par défaut de FastAPI (serialize_response: revalidation contre
+response_model puis dict JSON-compatible, encodé par JSONResponse / json)
+et le chemin actuel (modèle encodé par pydantic-core, corps d'échec
+pré-encodés, ORJSONResponse pour les dicts). Vérifie aussi que les deux
+corps décodent vers le même JSON.
+
+Usage:
+    python -m benchmarks.responses [--iterations 20000]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+
+async def per_call_us(func, iterations: int, is_async: bool) -> float:
+    """Durée moyenne d'un appel (µs), mesurée dans une seule coroutine"""
+    for _ in range(min(1000, iterations)):
+        await func() if is_async else func()
+    started = time.perf_counter()
+    if is_async:
+        for _ in range(iterations):
+            await func()
+    else:
+        for _ in range(iterations):
+            func()
+    return round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+
+def cases():
+    """(nom, modèle de response_model ou None, contenu renvoyé par l'endpoint, réponse actuelle)"""
+    from fastapi.responses import ORJSONResponse
+    from app.schemas.license import CheckoutSessionResponse, LicenseResponse, ValidationResponse
+    from app.utils.responses import model_response, validation_failure
+
+    expires_at = datetime.utcnow().replace(microsecond=0) + timedelta(days=30)
+    valid = ValidationResponse(valid=True, message="Licence valide", expires_at=expires_at,
+                               days_remaining=30, license_type="trial")
+    not_found = ValidationResponse(valid=False, message="Licence introuvable")
+    revoked = ValidationResponse(valid=False, message="Licence révoquée: Remboursement")
+    trial = LicenseResponse(success=True, message="Licence d'essai générée avec succès",
+                            license_key="gAAAAAB" + "x" * 300, expires_at=expires_at, license_type="trial")
+    checkout = CheckoutSessionResponse(success=True, checkout_url="https://checkout.stripe.com/c/pay/cs_test_" + "a" * 60,
+                                       session_id="cs_test_" + "a" * 58)
+    session = {"success": True, "license_key": "gAAAAAB" + "x" * 300,
+               "email": "client@example.com", "license_type": "lifetime"}
+
+    return [
+        ("validate.valid", ValidationResponse, valid, lambda: model_response(valid)),
+        ("validate.not_found", ValidationResponse, not_found, lambda: validation_failure("Licence introuvable")),
+        ("validate.revoked", ValidationResponse, revoked, lambda: validation_failure("Licence révoquée: Remboursement")),
+        ("trial", LicenseResponse, trial, lambda: model_response(trial)),
+        ("checkout", CheckoutSessionResponse, checkout, lambda: model_response(checkout)),
+        ("session.dict", None, session, lambda: ORJSONResponse(session)),
+    ]
+
+
+async def fastapi_default(field, content):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    return JSONResponse(await serialize_response(field=field, response_content=content))
+
+
+async def run(iterations: int) -> dict:
+    from fastapi.utils import create_response_field
+
+    report = {"iterations": iterations, "responses": {}}
+    for name, model, content, current in cases():
+        field = create_response_field(name=f"Response_{name}", type_=model, mode="serialization") if model else None
+
+        def default(field=field, content=content):
+            return fastapi_default(field, content)
+
+        expected = (await default()).body
+        if json.loads(expected) != json.loads(current().body):
+            raise SystemExit(f"{name}: corps différents\n  {expected}\n  {current().body}")
+
+        before = await per_call_us(default, iterations, is_async=True)
+        after = await per_call_us(current, iterations, is_async=False)
+        report["responses"][name] = {
+            "fastapi_default_us": before,
+            "optimized_us": after,
+            "speedup": round(before / after, 2),
+            "body_bytes": len(current().body),
+        }
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.responses", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment, default_sqlite_url
+    configure_environment(default_sqlite_url())
+
+    print(json.dumps(asyncio.run(run(args.iterations)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du cache de révocation (app/services/revocation_set.py)
+
+Mesure sur un ensemble synthétique: mémoire occupée, coût d'une recherche
+(clé non bloquée = cas courant, clé bloquée), coût d'une fusion des
+modifications récentes. Avec --database-url (jeu généré par
+benchmarks.datagen), mesure aussi le chargement initial et la lecture
+du flux d'invalidations.
+
+Usage:
+    python -m benchmarks.revocation_set --entries 1000000
+    python -m benchmarks.revocation_set --entries 100000 --database-url sqlite:////tmp/bench.db
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+
+def synthetic_keys(count: int, rng: random.Random) -> list:
+    return [f"{rng.getrandbits(160):040x}" for _ in range(count)]
+
+
+def per_call_ns(func, keys) -> float:
+    started = time.perf_counter()
+    for key in keys:
+        func(key)
+    return round((time.perf_counter() - started) / len(keys) * 1e9, 1)
+
+
+def in_memory(args) -> dict:
+    from app.services.revocation_set import (
+        MERGE_THRESHOLD, STATUS_REVOKED, RevocationSet, _build, key_prefix,
+    )
+    from app.utils.license_crypto import key_digest
+
+    rng = random.Random(args.seed)
+    blocked = synthetic_keys(args.entries, rng)
+    reasons = ["Chargeback", "Fraude", "Remboursement", None]
+
+    started = time.perf_counter()
+    revocations = RevocationSet()
+    revocations._snapshot = _build({
+        key_prefix(key): (i, STATUS_REVOKED, reasons[i % len(reasons)]) for i, key in enumerate(blocked, 1)
+    })
+    build_s = time.perf_counter() - started
+
+    probes = min(args.lookups, args.entries)
+    misses = synthetic_keys(probes, rng)
+    hits = rng.sample(blocked, probes)
+    assert all(revocations.lookup(key) is None for key in misses[:1000])
+    assert all(revocations.lookup(key) is not None for key in hits[:1000])
+
+    class Invalidation:
+        __slots__ = ("license_id", "key_digest", "reason")
+
+        def __init__(self, license_id, key):
+            self.license_id, self.key_digest, self.reason = license_id, key_digest(key), "Fraude"
+
+    updates = [Invalidation(args.entries + i, key)
+               for i, key in enumerate(synthetic_keys(MERGE_THRESHOLD + 1, rng), 1)]
+    started = time.perf_counter()
+    revocations.apply_invalidations(updates)  # Dépasse le seuil: reconstruction complète
+    merge_s = time.perf_counter() - started
+
+    return {
+        "entries": args.entries,
+        "memory_bytes": revocations.memory_bytes(),
+        "bytes_per_entry": round(revocations.memory_bytes() / len(revocations), 1),
+        "build_s": round(build_s, 2),
+        "lookup_ns": {
+            "miss": per_call_ns(revocations.lookup, misses),
+            "hit": per_call_ns(revocations.lookup, hits),
+            "sha256_only": per_call_ns(key_prefix, misses),
+        },
+        "merge_s": round(merge_s, 2),
+    }
+
+
+def from_database(database_url: str) -> dict:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.services.revocation import invalidations_after
+    from app.services.revocation_set import RevocationSet
+
+    engine = create_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    revocations = RevocationSet()
+    try:
+        started = time.perf_counter()
+        loaded = revocations.load(db)
+        load_s = time.perf_counter() - started
+        started = time.perf_counter()
+        invalidations = invalidations_after(db, 0)
+        fed = revocations.apply_invalidations(invalidations)
+        feed_ms = (time.perf_counter() - started) * 1000
+    finally:
+        db.close()
+        engine.dispose()
+    return {
+        "blocked_licenses": loaded,
+        "load_s": round(load_s, 3),
+        "feed_rows": fed,
+        "feed_ms": round(feed_ms, 2),
+        "memory_bytes": revocations.memory_bytes(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.revocation_set", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--database-url", help="Base peuplée par benchmarks.datagen (lecture seule)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url or "sqlite://")
+
+    results = {"in_memory": in_memory(args)}
+    print(f"  {args.entries} entrées: {results['in_memory']['bytes_per_entry']} octets/entrée, "
+          f"recherche {results['in_memory']['lookup_ns']['miss']} ns", file=sys.stderr)
+    if args.database_url:
+        results["database"] = from_database(args.database_url)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
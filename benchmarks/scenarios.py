@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scénarios de charge scriptés
+Chaque scénario prépare ses propres données puis rejoue un mélange de requêtes
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from benchmarks.harness import BENCH_WEBHOOK_SECRET, QueryCounter, ScenarioResult
+
+API_V1 = "/api/v1"
+
+
+def new_machine_id() -> str:
+    """machine_id réaliste (32 caractères hexadécimaux)"""
+    return uuid.uuid4().hex
+
+
+def sign_stripe_payload(payload: bytes, secret: str = BENCH_WEBHOOK_SECRET) -> str:
+    """Construit un header `stripe-signature` valide (schéma v1 de Stripe)"""
+    timestamp = int(time.time())
+    signed = f"{timestamp}.{payload.decode('utf-8')}".encode("utf-8")
+    signature = hmac.new(secret.encode("utf-8"), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_completed_event(session_id: str, machine_id: str, email: str) -> bytes:
+    """Événement `checkout.session.completed` minimal accepté par le webhook"""
+    event = {
+        "id": f"evt_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "data": {
+            "object": {
+                "id": session_id,
+                "object": "checkout.session",
+                "customer": f"cus_{uuid.uuid4().hex[:14]}",
+                "payment_intent": f"pi_{uuid.uuid4().hex[:24]}",
+                "amount_total": 19900,
+                "currency": "eur",
+                "customer_details": {"email": email},
+                "metadata": {"machine_id": machine_id, "email": email},
+            }
+        },
+    }
+    return json.dumps(event).encode("utf-8")
+
+
+def seed_licenses(count: int, with_stripe_session: bool = False, **overrides) -> list:
+    """
+    Insère `count` licences directement en base et retourne leurs attributs
+
+    Passe par le même générateur que l'API pour que les clés soient valides.
+    Avec --store memory, les licences sont ajoutées au stockage en mémoire.
+    """
+    from app.database import SessionLocal
+    from app.models.license import License
+    from app.services.license_repository import local_licenses
+    from app.utils.license_crypto import license_generator
+
+    license_type = overrides.pop("license_type", "trial")
+    duration_days = overrides.pop("duration_days", 30)
+    seeded = []
+    db = SessionLocal()
+    try:
+        for _ in range(count):
+            machine_id = new_machine_id()
+            email = f"{machine_id[:12]}@bench.example.com"
+            license_key, expires_at = license_generator.generate_license(
+                machine_id=machine_id,
+                email=email,
+                license_type=license_type,
+                duration_days=duration_days,
+            )
+            row = dict(
+                email=email,
+                machine_id=machine_id,
+                license_type=license_type,
+                license_key=license_key,
+                expires_at=expires_at,
+                is_active=True,
+                is_revoked=False,
+            )
+            if with_stripe_session:
+                row["stripe_session_id"] = f"cs_bench_{uuid.uuid4().hex}"
+            row.update(overrides)
+            if local_licenses is not None:
+                local_licenses.add(License(**row))
+            else:
+                db.add(License(**row))
+            seeded.append(row)
+        db.commit()
+    finally:
+        db.close()
+    return seeded
+
+
+async def drive(ctx, result: ScenarioResult, requests: list, expected=(200,)) -> None:
+    """
+    Exécute une liste de requêtes avec `ctx.concurrency` clients simultanés
+
+    Chaque élément de `requests` est une fabrique de coroutine retournant
+    une réponse httpx. Seules les requêtes SQL émises pendant cette phase
+    sont attribuées au scénario (la préparation des données est exclue).
+    """
+    queue = iter(requests)
+
+    async def worker():
+        for make_request in queue:
+            started = time.perf_counter()
+            try:
+                response = await make_request()
+                status_code = response.status_code
+            except Exception:
+                status_code = 599  # Erreur transport
+            result.record(status_code, (time.perf_counter() - started) * 1000.0, expected)
+
+    queries_before = ctx.counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(ctx.concurrency)))
+    result.elapsed_s += time.perf_counter() - started
+    result.db_queries += ctx.counter.count - queries_before
+
+
+# ============================================
+# SCÉNARIOS
+# ============================================
+
+@dataclass
+class ScenarioContext:
+    """Paramètres partagés par tous les scénarios d'un run"""
+    client: object
+    requests: int
+    concurrency: int
+    rng: random.Random
+    counter: QueryCounter
+
+
+async def trial_burst(ctx: ScenarioContext) -> ScenarioResult:
+    """
+    Rafale de demandes trial
+
+    ~90% de nouveaux clients, ~10% de doublons (réponse 400 attendue).
+    """
+    result = ScenarioResult("trial_burst")
+    issued = []
+    batch = []
+    for i in range(ctx.requests):
+        if issued and ctx.rng.random() < 0.1:
+            payload = ctx.rng.choice(issued)
+        else:
+            machine_id = new_machine_id()
+            payload = {
+                "email": f"trial-{machine_id[:12]}@bench.example.com",
+                "machine_id": machine_id,
+                "customer_name": f"Client {i}",
+            }
+            issued.append(payload)
+        batch.append(lambda payload=payload: ctx.client.post(f"{API_V1}/licenses/trial", json=payload))
+
+    await drive(ctx, result, batch, expected=(200, 400))
+    return result
+
+
+async def validate_mix(ctx: ScenarioContext) -> ScenarioResult:
+    """
+    Trafic de validation régulier
+
+    Mélange: 80% clés valides en base (hit), 10% clés cryptographiquement
+    valides mais absentes de la base (miss), 10% clés révoquées.
+    """
+    from app.utils.license_crypto import license_generator
+
+    result = ScenarioResult("validate_mix")
+    hits = seed_licenses(max(10, ctx.requests // 20))
+    revoked = seed_licenses(
+        max(5, ctx.requests // 100),
+        is_revoked=True,
+        revoked_at=datetime.utcnow() - timedelta(days=1),
+        revoked_reason="Benchmark",
+    )
+    misses = []
+    for _ in range(max(5, ctx.requests // 100)):
+        machine_id = new_machine_id()
+        license_key, _ = license_generator.generate_license(
+            machine_id=machine_id,
+            email=f"{machine_id[:12]}@bench.example.com",
+            license_type="trial",
+            duration_days=30,
+        )
+        misses.append({"license_key": license_key, "machine_id": machine_id})
+
+    batch = []
+    for _ in range(ctx.requests):
+        draw = ctx.rng.random()
+        pool = hits if draw < 0.8 else (misses if draw < 0.9 else revoked)
+        row = ctx.rng.choice(pool)
+        payload = {"license_key": row["license_key"], "machine_id": row["machine_id"]}
+        batch.append(lambda payload=payload: ctx.client.post(f"{API_V1}/licenses/validate", json=payload))
+
+    await drive(ctx, result, batch)
+    return result
+
+
+async def webhook_storm(ctx: ScenarioContext) -> ScenarioResult:
+    """
+    Tempête de webhooks Stripe signés
+
+    Moitié upgrades trial -> lifetime depuis l'app (machine_id connu),
+    moitié achats depuis la landing page (machine_id PENDING).
+    """
+    result = ScenarioResult("webhook_storm")
+    trials = seed_licenses(max(1, ctx.requests // 2))
+
+    batch = []
+    for i in range(ctx.requests):
+        session_id = f"cs_bench_{uuid.uuid4().hex}"
+        if i % 2 == 0 and trials:
+            row = trials.pop()
+            machine_id, email = row["machine_id"], row["email"]
+        else:
+            machine_id, email = "PENDING", f"landing-{uuid.uuid4().hex[:12]}@bench.example.com"
+        payload = checkout_completed_event(session_id, machine_id, email)
+        headers = {"stripe-signature": sign_stripe_payload(payload), "content-type": "application/json"}
+        batch.append(
+            lambda payload=payload, headers=headers: ctx.client.post(
+                "/api/stripe/webhook", content=payload, headers=headers
+            )
+        )
+
+    await drive(ctx, result, batch)
+    return result
+
+
+async def session_polling(ctx: ScenarioContext) -> ScenarioResult:
+    """
+    Polling de la page de succès Stripe
+
+    90% de sessions connues (200), 10% de sessions pas encore traitées (404).
+    """
+    result = ScenarioResult("session_polling")
+    paid = seed_licenses(
+        max(10, ctx.requests // 20),
+        with_stripe_session=True,
+        license_type="lifetime",
+        duration_days=None,
+    )
+    session_ids = [row["stripe_session_id"] for row in paid]
+
+    batch = []
+    for _ in range(ctx.requests):
+        if ctx.rng.random() < 0.9:
+            session_id = ctx.rng.choice(session_ids)
+        else:
+            session_id = f"cs_bench_unknown_{uuid.uuid4().hex}"
+        batch.append(lambda session_id=session_id: ctx.client.get(f"/api/get-license-by-session/{session_id}"))
+
+    await drive(ctx, result, batch, expected=(200, 404))
+    return result
+
+
+SCENARIOS = {
+    "trial_burst": trial_burst,
+    "validate_mix": validate_mix,
+    "webhook_storm": webhook_storm,
+    "session_polling": session_polling,
+}
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark des licences multi-postes (app/services/seat_tracker.py)
+
+Simule plusieurs workers (un SeatTracker chacun, baux partagés par un
+LocalSeatStore) qui reçoivent les validations et heartbeats de
+--licenses x --seats postes actifs simultanés (100 000 par défaut):
+- coût d'une décision (poste actif renouvelé, nouveau poste admis, refus)
+- mémoire par poste suivi
+- coût d'une synchronisation (publication + relecture + fusion)
+- admissions simultanées sur la dernière place: aucun dépassement après
+  synchronisation, même vue sur tous les workers
+
+Avec --database-url, mesure aussi DatabaseSeatStore (table seat_leases):
+publication, chargement au démarrage d'un worker, synchronisation courante.
+
+Usage:
+    python -m benchmarks.seats [--licenses 10000 --seats 10 --workers 4]
+    python -m benchmarks.seats --licenses 1000 --database-url sqlite:////tmp/bench.db
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+
+def machine(license_id: int, seat: int) -> str:
+    return f"{license_id:012d}{seat:020d}"
+
+
+def per_call_ns(calls) -> float:
+    started = time.perf_counter()
+    for func, args in calls:
+        func(*args)
+    return round((time.perf_counter() - started) / len(calls) * 1e9, 1)
+
+
+def in_memory(args) -> dict:
+    from app.services.seat_tracker import LocalSeatStore, SeatTracker
+
+    rng = random.Random(args.seed)
+    window = 900.0
+    now = 1_000_000.0
+    store = LocalSeatStore()
+    workers = [SeatTracker(store, window=window) for _ in range(args.workers)]
+    total_seats = args.licenses * args.seats
+
+    # Remplissage sur une demi-fenêtre: chaque poste passe par un worker au hasard,
+    # chaque worker se synchronise toutes les 2 s (horloge simulée)
+    tracemalloc.start()
+    order = [(license_id, seat) for license_id in range(1, args.licenses + 1) for seat in range(args.seats)]
+    rng.shuffle(order)
+    tick = (window / 2) / len(order)
+    next_sync = now + 2.0
+    for index, (license_id, seat) in enumerate(order):
+        clock = now + index * tick
+        if clock >= next_sync:
+            for tracker in workers:
+                tracker.sync(clock)
+            next_sync += 2.0
+        workers[rng.randrange(args.workers)].acquire(license_id, args.seats, machine(license_id, seat), clock)
+    now += window / 2
+    for _ in range(2):  # Deux tours: chaque worker relit les dernières publications des autres
+        for tracker in workers:
+            tracker.sync(now)
+    tracked = workers[0]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(tracked) == total_seats, (len(tracked), total_seats)
+
+    # Synchronisation en régime établi: un intervalle de heartbeats (1/150e des postes en 2 s)
+    batch = rng.sample(order, max(1, total_seats // 150))
+    other = workers[1 % args.workers]
+    for license_id, seat in batch:
+        other.acquire(license_id, args.seats, machine(license_id, seat), now + 1)
+    started = time.perf_counter()
+    other.sync(now + 2)
+    publish_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    merged = tracked.sync(now + 2)
+    merge_ms = (time.perf_counter() - started) * 1000
+    now += 2
+
+    # Décisions (un worker): renouvellements, refus (licence pleine), admissions après libération
+    probes = min(args.decisions, total_seats)
+    renew = [(tracked.acquire, (license_id, args.seats, machine(license_id, seat), now))
+             for license_id, seat in rng.sample(order, probes)]
+    deny = [(tracked.acquire, (license_id, args.seats, machine(license_id, args.seats + n), now))
+            for n, license_id in enumerate(rng.choices(range(1, args.licenses + 1), k=probes))]
+    renew_ns = per_call_ns(renew)
+    deny_ns = per_call_ns(deny)
+    # Fenêtre écoulée pour une licence sur deux: ses postes sortent à la décision suivante
+    later = now + window + 1
+    admit = [(tracked.acquire, (license_id, args.seats, machine(license_id, args.seats + 1000 + n), later))
+             for n, license_id in enumerate(rng.sample(range(1, args.licenses + 1, 2), min(probes, args.licenses // 2)))]
+    admit_ns = per_call_ns(admit)
+
+    return {
+        "active_seats": total_seats,
+        "licenses": args.licenses,
+        "workers": args.workers,
+        "memory_bytes_workers_and_store": memory,
+        "bytes_per_seat_per_worker": round(memory / total_seats / (args.workers + 1), 1),  # Store local compris
+        "decision_ns": {"renew": renew_ns, "deny_full": deny_ns, "admit_after_expiry": admit_ns},
+        "sync_ms": {"publish_and_merge": round(publish_ms, 2), "merge_other_worker": round(merge_ms, 2),
+                    "leases": len(batch), "merged": merged},
+    }
+
+
+def contention(args) -> dict:
+    """Tous les workers admettent des postes sur la dernière place avant de se synchroniser"""
+    from app.services.seat_tracker import LocalSeatStore, SeatTracker
+
+    rng = random.Random(args.seed + 1)
+    store = LocalSeatStore()
+    workers = [SeatTracker(store, window=900.0) for _ in range(max(2, args.workers))]
+    licenses = min(args.licenses, 2000)
+    now = 1_000_000.0
+    admitted = 0
+    for license_id in range(1, licenses + 1):
+        for seat in range(args.seats - 1):
+            workers[0].acquire(license_id, args.seats, machine(license_id, seat), now)
+    for tracker in workers:
+        tracker.sync(now)
+    for license_id in range(1, licenses + 1):
+        for index, tracker in enumerate(workers):
+            admitted += tracker.acquire(license_id, args.seats, machine(license_id, 100 + index),
+                                        now + 1 + rng.random()).allowed
+    for _ in range(2):
+        for tracker in workers:
+            tracker.sync(now + 3)
+    in_use = [[tracker.seats_in_use(license_id, now + 3) for tracker in workers]
+              for license_id in range(1, licenses + 1)]
+    return {
+        "licenses": licenses,
+        "admitted_before_sync": admitted,
+        "over_capacity_after_sync": sum(1 for counts in in_use if max(counts) > args.seats),
+        "workers_disagreeing": sum(1 for counts in in_use if len(set(counts)) > 1),
+    }
+
+
+def from_database(args) -> dict:
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models.license import License
+    from app.services.seat_tracker import DatabaseSeatStore, Lease, SeatTracker
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables["seat_leases"]])
+    session_factory = sessionmaker(bind=engine)
+    store = DatabaseSeatStore(session_factory)
+    db = session_factory()
+    try:
+        license_ids = db.execute(select(License.id).order_by(License.id).limit(args.licenses)).scalars().all()
+        rng = random.Random(args.seed)
+        now = time.time()
+        # Derniers passages étalés sur une demi-fenêtre, comme en régime établi
+        leases = []
+        for license_id in license_ids:
+            for seat in range(args.seats):
+                last_seen = now - rng.random() * 450
+                leases.append(Lease(license_id, machine(license_id, seat), last_seen - 3600, last_seen))
+
+        started = time.perf_counter()
+        store.publish(leases)
+        publish_s = time.perf_counter() - started
+        started = time.perf_counter()
+        interval = [lease._replace(last_seen=now + 1) for lease in rng.sample(leases, max(1, len(leases) // 150))]
+        store.publish(interval)  # Un intervalle de heartbeats
+        republish_ms = (time.perf_counter() - started) * 1000
+
+        tracker = SeatTracker(store, window=900.0)
+        started = time.perf_counter()
+        loaded = tracker.sync(now)  # Démarrage d'un worker: tous les baux actifs
+        load_s = time.perf_counter() - started
+        started = time.perf_counter()
+        incremental = tracker.sync(now + 2)
+        incremental_ms = (time.perf_counter() - started) * 1000
+        store.purge(now + 3600)
+    finally:
+        db.close()
+        engine.dispose()
+    return {
+        "leases": len(leases),
+        "publish_all_s": round(publish_s, 2),
+        "publish_interval_ms": round(republish_ms, 2),
+        "worker_load_s": round(load_s, 2),
+        "worker_load_leases": loaded,
+        "incremental_sync_ms": round(incremental_ms, 2),
+        "incremental_sync_leases": incremental,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.seats", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--licenses", type=int, default=10_000)
+    parser.add_argument("--seats", type=int, default=10, help="Postes par licence (tous actifs)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--decisions", type=int, default=100_000)
+    parser.add_argument("--database-url", help="Base peuplée par benchmarks.datagen (seat_leases créée puis vidée)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url or "sqlite://")
+
+    results = {"in_memory": in_memory(args), "contention": contention(args)}
+    print(f"  {results['in_memory']['active_seats']} postes actifs: "
+          f"{results['in_memory']['decision_ns']['renew']} ns par décision, "
+          f"{results['in_memory']['bytes_per_seat_per_worker']} octets/poste/worker", file=sys.stderr)
+    if args.database_url:
+        results["database"] = from_database(args)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la détection du partage de clés (app/services/sharing_detector.py)
+
+- précision des esquisses HyperLogLog (erreur relative par cardinalité)
+- coût d'une observation (clé déjà suivie, nouvelle clé)
+- mémoire par clé suivie (usage normal: une machine, quelques adresses)
+- détection: --keys clés normales et --leaked clés partagées réparties sur
+  plusieurs workers (un SharingDetector chacun, LocalSketchStore), alertes
+  attendues et fausses alertes après synchronisation
+
+Avec --database-url, mesure aussi DatabaseSketchStore (table
+license_sharing_sketches): fusion de --keys clés modifiées, puis d'un
+intervalle de synchronisation courant.
+
+Usage:
+    python -m benchmarks.sharing [--keys 50000 --leaked 200 --workers 4]
+    python -m benchmarks.sharing --database-url sqlite:////tmp/bench.db
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+
+def license_key(index: int) -> str:
+    return f"{index:0120x}"
+
+
+def machine(index: int) -> str:
+    return f"{index:040d}"
+
+
+def address(rng: random.Random, network: int) -> str:
+    return f"10.{network >> 8 & 255}.{network & 255}.{rng.randrange(1, 255)}"
+
+
+def accuracy(args) -> dict:
+    from app.services.sharing_detector import HyperLogLog, value_hash
+
+    errors = {}
+    for cardinality in (10, 100, 1000, 10_000, 100_000):
+        relative = []
+        for trial in range(args.trials):
+            sketch = HyperLogLog()
+            for value in range(cardinality):
+                sketch.add(value_hash(f"{trial}:{value}"))
+            relative.append(abs(sketch.estimate() - cardinality) / cardinality)
+        errors[cardinality] = {"mean_error_pct": round(sum(relative) / len(relative) * 100, 2),
+                               "max_error_pct": round(max(relative) * 100, 2)}
+    return errors
+
+
+def in_memory(args) -> dict:
+    from app.services.sharing_detector import LocalSketchStore, SharingDetector
+
+    rng = random.Random(args.seed)
+    now = 1_000_000.0
+    detector = SharingDetector(LocalSketchStore(), window=86400, buckets=4, max_keys=args.keys,
+                               alert_sink=lambda candidates: None)
+    tracemalloc.start()
+    # Usage normal: chaque clé sur sa machine, depuis une à trois adresses de son réseau
+    for index in range(args.keys):
+        network = rng.randrange(65536)
+        for _ in range(rng.randint(1, 3)):
+            detector.observe(license_key(index), machine(index), address(rng, network), now)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    calls = [(license_key(index), machine(index), address(rng, index & 65535), now + 1)
+             for index in rng.choices(range(args.keys), k=args.observations)]
+    started = time.perf_counter()
+    for call in calls:
+        detector.observe(*call)
+    tracked_ns = (time.perf_counter() - started) / len(calls) * 1e9
+
+    calls = [(license_key(args.keys + index), machine(index), "10.0.0.1", now + 1)
+             for index in range(args.observations)]
+    started = time.perf_counter()
+    for call in calls:
+        detector.observe(*call)
+    new_ns = (time.perf_counter() - started) / len(calls) * 1e9
+    return {
+        "tracked_keys": args.keys,
+        "bytes_per_key": round(memory / args.keys, 1),
+        "observe_ns": {"tracked_key": round(tracked_ns, 1), "new_key_with_eviction": round(new_ns, 1)},
+        "evicted": detector.evicted,
+    }
+
+
+def detection(args) -> dict:
+    """Clés normales (IP changeantes d'un même réseau) et clés partagées, réparties sur les workers"""
+    from app.services.sharing_detector import LocalSketchStore, SharingDetector
+
+    rng = random.Random(args.seed + 1)
+    store = LocalSketchStore()
+    alerts = {}
+
+    def sink(candidates):
+        for digest, key, dispersion in candidates:
+            alerts[key] = dispersion
+
+    workers = [SharingDetector(store, window=86400, buckets=4, max_keys=args.keys + args.leaked, alert_sink=sink)
+               for _ in range(args.workers)]
+    now = 1_000_000.0
+    events = []
+    for index in range(args.keys):
+        network = rng.randrange(65536)
+        for _ in range(rng.randint(1, 8)):  # Une journée: DHCP, redémarrages
+            events.append((license_key(index), machine(index), address(rng, network)))
+    leaked = {}
+    for index in range(args.keys, args.keys + args.leaked):
+        spread = rng.choice((5, 10, 50, 500))  # Machines utilisant la clé divulguée
+        leaked[license_key(index)] = spread
+        for copy in range(spread):
+            events.append((license_key(index), machine(index * 1000 + copy), address(rng, rng.randrange(65536))))
+    rng.shuffle(events)
+
+    started = time.perf_counter()
+    for position, (key, machine_id, ip) in enumerate(events):
+        clock = now + position * 43200 / len(events)  # Sur une demi-journée
+        workers[rng.randrange(args.workers)].observe(key, machine_id, ip, clock)
+    observe_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for detector in workers:
+        detector.sync(now + 43200)
+    sync_s = time.perf_counter() - started
+
+    detected = [key for key in leaked if key in alerts]
+    machine_errors = [abs(alerts[key].machines - leaked[key]) / leaked[key] for key in detected]
+    return {
+        "events": len(events),
+        "normal_keys": args.keys,
+        "leaked_keys": args.leaked,
+        "workers": args.workers,
+        "observe_s": round(observe_s, 2),
+        "sync_all_workers_s": round(sync_s, 2),
+        "detected": len(detected),
+        "false_alerts": sum(1 for key in alerts if key not in leaked),
+        "machines_mean_error_pct": round(sum(machine_errors) / max(len(machine_errors), 1) * 100, 2),
+    }
+
+
+def from_database(args) -> dict:
+    from sqlalchemy import create_engine, delete
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.services.sharing_detector import DatabaseSketchStore, SharingDetector, sketches_table
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine, tables=[sketches_table])
+    session_factory = sessionmaker(bind=engine)
+    rng = random.Random(args.seed + 2)
+    detector = SharingDetector(DatabaseSketchStore(session_factory), window=86400, buckets=4,
+                               max_keys=args.keys, alert_sink=lambda candidates: None)
+    now = time.time()
+    try:
+        for index in range(args.keys):
+            detector.observe(license_key(index), machine(index), address(rng, index & 65535), now)
+        started = time.perf_counter()
+        detector.sync(now)  # Démarrage: toutes les clés nouvelles
+        first_s = time.perf_counter() - started
+        # Intervalle courant: 1/100e des clés revues depuis une nouvelle adresse
+        for index in rng.sample(range(args.keys), max(1, args.keys // 100)):
+            detector.observe(license_key(index), machine(index), address(rng, index & 65535), now + 5)
+        started = time.perf_counter()
+        detector.sync(now + 10)
+        interval_ms = (time.perf_counter() - started) * 1000
+    finally:
+        with engine.begin() as connection:
+            connection.execute(delete(sketches_table))
+        engine.dispose()
+    return {
+        "keys": args.keys,
+        "first_sync_s": round(first_s, 2),
+        "interval_sync_ms": round(interval_ms, 2),
+        "interval_keys": max(1, args.keys // 100),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.sharing", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=50_000)
+    parser.add_argument("--leaked", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--observations", type=int, default=100_000)
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--database-url", help="Base créée par app.jobs.init_schema (license_sharing_sketches vidée)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url or "sqlite://")
+
+    results = {"accuracy": accuracy(args), "in_memory": in_memory(args), "detection": detection(args)}
+    print(f"  {results['in_memory']['tracked_keys']} clés suivies: "
+          f"{results['in_memory']['observe_ns']['tracked_key']} ns par observation, "
+          f"{results['in_memory']['bytes_per_key']} octets/clé; "
+          f"{results['detection']['detected']}/{args.leaked} clés partagées détectées, "
+          f"{results['detection']['false_alerts']} fausses alertes", file=sys.stderr)
+    if args.database_url:
+        results["database"] = from_database(args)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
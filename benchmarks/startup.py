@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Temps de démarrage d'un worker: de l'import de `main` à la première réponse
+
+Chaque mesure lance un interpréteur neuf (modules non importés, comme un
+worker uvicorn) sur une base dont le schéma a été créé au préalable par
+app.jobs.init_schema, comme en déploiement. Le processus mesure:
+- import_ms: import de `main`
+- ready_ms: import + lifespan (pool et chiffreur préparés, tâches démarrées)
+- first_response_ms: ready + première réponse (GET /health)
+- first_db_response_ms: première réponse + première requête avec base et
+  chiffrement (POST /licenses/trial)
+
+Le rapport donne la médiane de chaque mesure sur --runs processus; il est
+inclus dans `python -m benchmarks run` (section "startup") et comparé à la
+baseline par `python -m benchmarks compare`.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--database-url sqlite:////tmp/startup.db]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+METRICS = ("import_ms", "ready_ms", "first_response_ms", "first_db_response_ms")
+
+
+def child() -> None:
+    """Mesure dans le processus neuf (aucun module `app.*` importé avant t0)"""
+    started = time.perf_counter()
+    import asyncio
+    import uuid
+
+    import httpx
+
+    import main
+
+    imported = time.perf_counter()
+
+    async def first_requests():
+        transport = httpx.ASGITransport(app=main.app, client=("10.0.0.1", 50000))
+        async with main.app.router.lifespan_context(main.app):
+            ready = time.perf_counter()
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                health = await client.get("/health")
+                responded = time.perf_counter()
+                machine_id = uuid.uuid4().hex * 2
+                trial = await client.post(f"{main.settings.API_V1_PREFIX}/licenses/trial", json={
+                    "email": f"startup-{machine_id[:12]}@bench.example.com",
+                    "machine_id": machine_id,
+                })
+                db_responded = time.perf_counter()
+        if health.status_code != 200 or trial.status_code != 200:
+            raise SystemExit(f"réponses inattendues: /health {health.status_code}, /trial {trial.status_code}")
+        return ready, responded, db_responded
+
+    ready, responded, db_responded = asyncio.run(first_requests())
+    print(json.dumps({
+        "import_ms": round((imported - started) * 1000, 1),
+        "ready_ms": round((ready - started) * 1000, 1),
+        "first_response_ms": round((responded - started) * 1000, 1),
+        "first_db_response_ms": round((db_responded - started) * 1000, 1),
+    }))
+
+
+def measure_startup(runs: int = 5, database_url: str = None) -> dict:
+    """
+    Lance `runs` processus de mesure et retourne les médianes
+
+    Les variables d'environnement du processus courant sont transmises
+    (harness.configure_environment doit avoir été appelé).
+    """
+    if database_url is None:
+        path = os.path.join(tempfile.gettempdir(), f"license_startup_{os.getpid()}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        database_url = f"sqlite:///{path}"
+
+    env = dict(os.environ, DATABASE_URL=database_url)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (root, env.get("PYTHONPATH"))))
+
+    subprocess.run([sys.executable, "-m", "app.jobs.init_schema"], env=env, cwd=root,
+                   check=True, stdout=subprocess.DEVNULL)
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child"], env=env, cwd=root,
+                                check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        "runs": runs,
+        **{metric: round(statistics.median(sample[metric] for sample in samples), 1) for metric in METRICS},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="Base DÉDIÉE (SQLite temporaire par défaut)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child()
+        return 0
+
+    from benchmarks import harness
+
+    harness.configure_environment(args.database_url or harness.default_sqlite_url())
+    print(json.dumps(measure_startup(args.runs, args.database_url), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
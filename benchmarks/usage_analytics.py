@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de l'analyse d'usage (app/services/usage_analytics.py)
+
+Écrit --heartbeats heartbeats synthétiques (distributions de
+benchmarks.datagen: versions pondérées, compteurs de Pareto, fonctionnalités
+booléennes) répartis sur --days jours directement en colonnes, puis mesure
+usage_report (ce que sert GET /admin/analytics/usage) sur 7, 30 et 90 jours,
+avec et sans filtre de version. Par défaut (1 000 000 de licences), chaque
+licence active envoie environ un heartbeat par jour: cas le moins favorable
+aux résumés par licence et par jour.
+
+Avec --database-url (base peuplée par benchmarks.datagen avec
+--heartbeats-per-license), mesure aussi l'intégration incrémentale depuis la
+table heartbeats (app.jobs.build_usage_analytics).
+
+Usage:
+    python -m benchmarks.usage_analytics [--heartbeats 20000000 --days 90 --licenses 1000000]
+    python -m benchmarks.usage_analytics --heartbeats 0 --database-url sqlite:////tmp/bench.db
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+COUNTER_BITS = {counter: bit for bit, counter in enumerate((
+    "invoices_created", "quotes_created", "clients_count",
+    "features.pdf_export", "features.qr_bill", "features.multi_currency",
+))}
+
+
+def synthetic(args, root: Path) -> dict:
+    import numpy as np
+
+    from benchmarks.datagen import APP_VERSIONS
+    from app.services.usage_analytics import day_dir, save_segment
+
+    rng = np.random.default_rng(args.seed)
+    versions = [version[0] for version in APP_VERSIONS]
+    weights = np.array([version[-1] for version in APP_VERSIONS], dtype=float)
+    until = date(2026, 10, 19)
+    per_day = args.heartbeats // args.days
+    started = time.perf_counter()
+    next_id = 1
+    for offset in range(args.days):
+        day = until - timedelta(days=offset)
+        start = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+        # Licences actives: les plus anciennes (petits ids) décrochent peu à peu
+        license_ids = rng.integers(1 + offset * args.licenses // (4 * args.days), args.licenses, per_day)
+        directory = day_dir(root, day)
+        directory.mkdir(parents=True)
+        save_segment(
+            directory, license_ids, start + rng.integers(0, 86400, per_day),
+            rng.choice(len(versions), per_day, p=weights / weights.sum()),
+            {
+                "invoices_created": np.floor(rng.pareto(1.5, per_day) + 1),
+                "quotes_created": np.floor(rng.pareto(2.0, per_day)),
+                "clients_count": rng.integers(1, 400, per_day),
+                "features.pdf_export": rng.random(per_day) < 0.8,
+                "features.qr_bill": rng.random(per_day) < 0.35,
+                "features.multi_currency": rng.random(per_day) < 0.1,
+            },
+            versions, COUNTER_BITS, next_id, next_id + per_day - 1,
+        )
+        next_id += per_day
+    (root / "state.json").write_text(json.dumps({"last_id": next_id - 1, "counters": list(COUNTER_BITS)}),
+                                     encoding="utf-8")
+    return {
+        "heartbeats": per_day * args.days,
+        "days": args.days,
+        "write_s": round(time.perf_counter() - started, 1),
+        "bytes_per_heartbeat": round(sum(path.stat().st_size for path in root.rglob("*.npy")) / (per_day * args.days), 1),
+    }
+
+
+def queries(args, root: Path) -> dict:
+    from app.services.usage_analytics import usage_report
+
+    until = date(2026, 10, 19)
+    results = {}
+    for days in (7, 30, 90):
+        if days > args.days:
+            continue
+        for label, kwargs in (("all_versions", {}), ("one_version", {"app_version": "1.7.0"})):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                report = usage_report(until - timedelta(days=days - 1), until, counter="invoices_created",
+                                      directory=str(root), **kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[f"{days}d_{label}"] = {"heartbeats": report["heartbeats"], "licenses": report["licenses"],
+                                           "best_ms": round(min(timings), 1),
+                                           "median_ms": round(sorted(timings)[len(timings) // 2], 1)}
+    return results
+
+
+def from_database(args, root: Path) -> dict:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.services.usage_analytics import build_usage_analytics
+
+    engine = create_engine(args.database_url)
+    try:
+        progress = build_usage_analytics(directory=str(root), rebuild=True,
+                                         session_factory=sessionmaker(bind=engine))
+    finally:
+        engine.dispose()
+    return {"heartbeats": progress.scanned, "segments": progress.segments, "elapsed_s": progress.elapsed_s,
+            "rows_per_s": progress.rows_per_s}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.usage_analytics", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heartbeats", type=int, default=20_000_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--licenses", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", help="Base peuplée par benchmarks.datagen (--heartbeats-per-license)")
+    parser.add_argument("--directory", help="Répertoire de travail (défaut: temporaire, supprimé à la fin)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from benchmarks.harness import configure_environment
+    configure_environment(args.database_url or "sqlite://")
+
+    work = Path(args.directory or tempfile.mkdtemp(prefix="usage-analytics-"))
+    results = {}
+    try:
+        if args.heartbeats:
+            shutil.rmtree(work / "synthetic", ignore_errors=True)
+            results["synthetic"] = synthetic(args, work / "synthetic")
+            results["queries"] = queries(args, work / "synthetic")
+            print(f"  {results['synthetic']['heartbeats']} heartbeats sur {args.days} jours: " + ", ".join(
+                f"{name} {timing['best_ms']} ms" for name, timing in results["queries"].items()), file=sys.stderr)
+        if args.database_url:
+            results["database"] = from_database(args, work / "database")
+    finally:
+        if not args.directory:
+            shutil.rmtree(work, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,22 +2,123 @@
 # -*- coding: utf-8 -*-
 """
 Point d'entrée principal de l'API License Server
+
+L'import est sans effet de bord (ni création de tables, ni connexion, ni SDK
+Stripe): le schéma est créé par `python -m app.jobs.init_schema` avant
+uvicorn, et `lifespan` prépare le worker (pool, chiffreur) avant qu'il ne
+se déclare prêt.
 """
 
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, warm_pool
 from app.api.licenses import router as licenses_router, limiter
-from app.api.payment import router as payment_router
-
-# Créer les tables (en production, utiliser Alembic)
-Base.metadata.create_all(bind=engine)
+from app.api.payment import router as payment_router, stripe_api
+from app.api.admin import router as admin_router
+from app.api.edge import edge_seats_sync, router as edge_router
+from app.middleware.admission import AdmissionMiddleware
+from app.services.activation_spool import activation_spool
+from app.services.expiry_sweeper import expiry_sweeper
+from app.services.revocation import invalidation_feed
+from app.services.revocation_set import revocation_set, revocation_set_sync
+from app.services.seat_tracker import seat_tracker, seat_tracker_sync
+from app.services.sharing_detector import sharing_detector, sharing_detector_sync
+from app.services.stats import stats_reconciler
+from app.services.validation_snapshot import snapshot_watcher
+from app.utils.license_crypto import license_generator
+
+logger = logging.getLogger(__name__)
+
+EDGE_MODE = settings.SERVER_MODE == "edge"
+LOCAL_STORE = settings.LICENSE_STORE == "local"  # Licences en mémoire: ni pool, ni tâche lisant la base
+
+
+async def start_background_tasks():
+    """Démarre le balayeur d'expiration, la réconciliation des compteurs, le suivi des révocations, des postes et du partage"""
+    if EDGE_MODE:
+        # Premier chargement avant de servir, puis surveillance du fichier
+        snapshot_watcher.reload_if_changed()
+        snapshot_watcher.start()
+        activation_spool.start()
+        edge_seats_sync.start()
+        return
+    if LOCAL_STORE:
+        # Postes: purge des baux en mémoire seulement; révocations, partage, expiration et
+        # compteurs lisent la base (le cache de révocation vide renvoie au stockage local)
+        if settings.SEAT_STORE == "local":
+            seat_tracker_sync.start()
+        return
+    # Abonnés au flux d'invalidations; sa position est prise avant le chargement
+    # du cache de révocation: une révocation commitée entre les deux est rediffusée
+    if settings.REVOCATION_SET_ENABLED:
+        invalidation_feed.subscribe(revocation_set.apply_invalidations)
+    invalidation_feed.subscribe(seat_tracker.release_revoked)
+    if settings.SHARING_DETECTION_ENABLED:
+        invalidation_feed.subscribe(sharing_detector.ignore_revoked)
+    invalidation_feed.skip_to_end()
+    invalidation_feed.start()
+
+    if settings.REVOCATION_SET_ENABLED:
+        revocation_set_sync.start()
+    seat_tracker_sync.start()
+    if settings.SHARING_DETECTION_ENABLED:
+        sharing_detector_sync.start()
+    if settings.EXPIRY_SWEEPER_ENABLED:
+        expiry_sweeper.start()
+    if settings.STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        stats_reconciler.start()
+
+
+async def stop_background_tasks():
+    await expiry_sweeper.stop()
+    await stats_reconciler.stop()
+    await invalidation_feed.stop()
+    await revocation_set_sync.stop()
+    await seat_tracker_sync.stop()
+    await sharing_detector_sync.stop()
+    await snapshot_watcher.stop()
+    await activation_spool.stop()
+    await edge_seats_sync.stop()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage du worker: uvicorn n'accepte les connexions qu'après le yield
+
+    1. Développement: tables manquantes créées (sinon: app.jobs.init_schema)
+    2. Chiffreur Fernet et pool de connexions préparés (échec = worker non démarré);
+       ni tables ni pool en mode edge ou avec LICENSE_STORE=local
+    3. Tâches de fond démarrées
+    4. SDK Stripe importé en arrière-plan, après le démarrage
+    """
+    started = time.monotonic()
+    if not settings.admin_enabled:
+        logger.warning("ADMIN_PASSWORD par défaut: routes /admin désactivées (503)")
+    license_generator.warm_up()
+    if not EDGE_MODE and not LOCAL_STORE:
+        if settings.ENVIRONMENT == "development":
+            Base.metadata.create_all(bind=engine)
+        warm_pool()
+    await start_background_tasks()
+    if not EDGE_MODE:
+        asyncio.get_running_loop().run_in_executor(None, stripe_api)
+    logger.info("Worker prêt en %.0f ms", (time.monotonic() - started) * 1000)
+    try:
+        yield
+    finally:
+        await stop_background_tasks()
 
 # Initialiser FastAPI
 app = FastAPI(
@@ -26,8 +127,14 @@ app = FastAPI(
     description="API de gestion des licences pour EasyFacture",
     docs_url="/docs" if settings.ENVIRONMENT == "development" else None,
     redoc_url="/redoc" if settings.ENVIRONMENT == "development" else None,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # Routes renvoyant des dicts ou des modèles (orjson)
 )
 
+# Contrôle d'admission (ajouté en premier: s'exécute à l'intérieur de CORS et du rate limiting)
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -43,8 +150,12 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 
 # Inclure les routers
-app.include_router(licenses_router, prefix=settings.API_V1_PREFIX)
-app.include_router(payment_router)  # Payment router a son propre prefix /api
+if EDGE_MODE:
+    app.include_router(edge_router, prefix=settings.API_V1_PREFIX)  # Validation seule
+else:
+    app.include_router(licenses_router, prefix=settings.API_V1_PREFIX)
+    app.include_router(payment_router)  # Payment router a son propre prefix /api
+    app.include_router(admin_router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/")
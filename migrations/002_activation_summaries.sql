@@ -0,0 +1,58 @@
+-- Migration: Compteurs journaliers d'activations (mode coalescé)
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: Ajoute la table activation_summaries et rend activations.license_id nullable
+--              (les clés introuvables sont journalisées sans licence)
+
+-- ==============================================
+-- 1. CORRECTION DE activations.license_id
+-- ==============================================
+
+-- L'endpoint /validate journalise les clés non rattachées avec license_id = NULL
+ALTER TABLE activations ALTER COLUMN license_id DROP NOT NULL;
+
+-- ==============================================
+-- 2. TABLE DES RÉSUMÉS
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS activation_summaries (
+    id SERIAL PRIMARY KEY,
+    license_id INTEGER NOT NULL REFERENCES licenses(id) ON DELETE CASCADE,
+    machine_id VARCHAR(64) NOT NULL,
+    ip_address VARCHAR(45) NOT NULL DEFAULT '',
+    outcome SMALLINT NOT NULL,
+    day DATE NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 1,
+    first_seen TIMESTAMP NOT NULL,
+    last_seen TIMESTAMP NOT NULL,
+    CONSTRAINT uq_activation_summaries_key UNIQUE (license_id, machine_id, ip_address, outcome, day)
+);
+
+-- ==============================================
+-- 3. CRÉATION DES INDEX
+-- ==============================================
+
+CREATE INDEX IF NOT EXISTS ix_activation_summaries_id ON activation_summaries(id);
+CREATE INDEX IF NOT EXISTS ix_activation_summaries_license_id ON activation_summaries(license_id);
+CREATE INDEX IF NOT EXISTS ix_activation_summaries_day ON activation_summaries(day);
+
+-- ==============================================
+-- 4. VÉRIFICATION
+-- ==============================================
+
+\d activation_summaries
+
+-- Activer ensuite le mode coalescé dans .env:
+--   ACTIVATION_LOG_MODE=coalesced
+--   ACTIVATION_SUCCESS_SAMPLE_RATE=0.01
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP TABLE IF EXISTS activation_summaries;
+-- Nécessite de supprimer d'abord les lignes sans licence:
+-- DELETE FROM activations WHERE license_id IS NULL;
+ALTER TABLE activations ALTER COLUMN license_id SET NOT NULL;
+*/
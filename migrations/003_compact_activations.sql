@@ -0,0 +1,47 @@
+-- Migration: Schéma compact des activations (codes de résultat)
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: Ajoute activations.outcome (SMALLINT) et supprime user_agent (jamais renseigné).
+--              Le texte de validation est dérivé du code à la lecture; validation_message ne
+--              conserve plus que le texte libre non dérivable (ex. erreur de déchiffrement,
+--              raison de révocation au moment de la vérification).
+
+-- ==============================================
+-- 1. AJOUT / SUPPRESSION DE COLONNES
+-- ==============================================
+
+-- Colonne nullable sans défaut: opération instantanée (métadonnées seulement)
+ALTER TABLE activations ADD COLUMN IF NOT EXISTS outcome SMALLINT;
+
+-- Colonne jamais alimentée par l'API
+ALTER TABLE activations DROP COLUMN IF EXISTS user_agent;
+
+-- ==============================================
+-- 2. CONVERSION DES LIGNES EXISTANTES (EN LIGNE)
+-- ==============================================
+
+-- Ne PAS faire un UPDATE global (verrou long, WAL massif). Lancer le job par tranches:
+--   python -m app.jobs.compact_activations --chunk-size 10000 --sleep 0.05
+-- Il affiche un rapport de taille avant/après (pg_relation_size, volume du texte).
+-- Les lignes non converties (outcome NULL) restent lisibles: leur message texte est conservé.
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT outcome, COUNT(*) AS count
+FROM activations
+GROUP BY outcome
+ORDER BY outcome;
+
+SELECT pg_size_pretty(pg_total_relation_size('activations')) AS activations_size;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+ALTER TABLE activations ADD COLUMN IF NOT EXISTS user_agent VARCHAR(255);
+-- Les messages des lignes converties ne sont pas restaurés (dérivables de outcome)
+ALTER TABLE activations DROP COLUMN IF EXISTS outcome;
+*/
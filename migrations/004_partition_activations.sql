@@ -0,0 +1,159 @@
+-- Migration: Partitionnement mensuel de la table activations
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: Transforme activations en table partitionnée RANGE (checked_at), une partition
+--              par mois (activations_YYYY_MM). L'historique existant devient la partition
+--              activations_legacy (tout ce qui précède le mois prochain) sans recopie.
+--              Les mois hors rétention sont ensuite détachés, archivés et supprimés par:
+--                python -m app.jobs.archive_activations archive
+-- Prérequis: PostgreSQL >= 12. À exécuter avec psql en autocommit (CREATE INDEX CONCURRENTLY),
+--            pas dans les dernières 24 h du mois (la contrainte de plage refuserait les écritures
+--            du mois suivant avant le rattachement).
+-- Verrous: les parcours de l'historique (validation de la contrainte, index (id, checked_at))
+--          se font sans verrou exclusif, lectures et écritures continuent. Seule l'étape 4
+--          (renommages, rattachement sans parcours) prend un verrou exclusif, bref.
+
+-- ==============================================
+-- 1. CONTRAINTE DE PLAGE, SANS PARCOURS (NOT VALID)
+-- ==============================================
+
+-- activations_legacy couvrira tout ce qui précède le mois prochain: le mois courant y reste
+-- (écritures en cours); app.jobs.archive_activations l'archive ensuite mois par mois et
+-- supprime la table quand son dernier mois sort de la rétention.
+DO $$
+DECLARE
+    boundary TIMESTAMP := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '1 month';
+BEGIN
+    IF (now() AT TIME ZONE 'UTC') + interval '1 day' > boundary THEN
+        RAISE EXCEPTION 'Fin de mois: relancer la migration après le %', boundary;
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE activations ADD CONSTRAINT activations_legacy_range CHECK (checked_at < %L) NOT VALID',
+        boundary
+    );
+END $$;
+
+-- ==============================================
+-- 2. VALIDATION (transaction propre, SHARE UPDATE EXCLUSIVE)
+-- ==============================================
+
+-- Parcourt tout l'historique sans bloquer lectures ni écritures; ATTACH PARTITION s'appuie
+-- ensuite sur la contrainte validée et ne reparcourt pas la table
+ALTER TABLE activations VALIDATE CONSTRAINT activations_legacy_range;
+
+-- ==============================================
+-- 3. INDEX DE LA CLÉ PRIMAIRE PARTITIONNÉE, SANS VERROU
+-- ==============================================
+
+-- Repris tel quel par ATTACH PARTITION au lieu d'être construit sous verrou exclusif
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_activations_legacy_id_checked_at
+    ON activations(id, checked_at);
+
+-- ==============================================
+-- 4. TABLE PARTITIONNÉE ET RATTACHEMENT (verrou exclusif bref, sans parcours)
+-- ==============================================
+
+BEGIN;
+
+ALTER TABLE activations RENAME TO activations_legacy;
+ALTER TABLE activations_legacy RENAME CONSTRAINT activations_pkey TO activations_legacy_pkey;
+ALTER INDEX IF EXISTS ix_activations_id RENAME TO ix_activations_legacy_id;
+ALTER INDEX IF EXISTS ix_activations_license_id RENAME TO ix_activations_legacy_license_id;
+ALTER INDEX IF EXISTS ix_activations_machine_id RENAME TO ix_activations_legacy_machine_id;
+ALTER INDEX IF EXISTS ix_activations_checked_at RENAME TO ix_activations_legacy_checked_at;
+
+-- INCLUDING DEFAULTS conserve nextval('activations_id_seq'): les id continuent sans trou
+CREATE TABLE activations (LIKE activations_legacy INCLUDING DEFAULTS)
+    PARTITION BY RANGE (checked_at);
+
+-- La clé primaire d'une table partitionnée doit contenir la clé de partition
+ALTER TABLE activations ADD PRIMARY KEY (id, checked_at);
+ALTER TABLE activations ADD CONSTRAINT activations_license_id_fkey
+    FOREIGN KEY (license_id) REFERENCES licenses(id);
+ALTER SEQUENCE activations_id_seq OWNED BY activations.id;
+
+-- Index équivalents déjà présents sur activations_legacy: rattachés, pas reconstruits
+CREATE INDEX ix_activations_license_id ON activations(license_id);
+CREATE INDEX ix_activations_machine_id ON activations(machine_id);
+CREATE INDEX ix_activations_checked_at ON activations(checked_at);
+
+-- Borne relue dans la contrainte validée (celle de l'étape 1, même si le jour a changé)
+DO $$
+DECLARE
+    boundary TIMESTAMP;
+BEGIN
+    SELECT substring(pg_get_constraintdef(oid) FROM '\d{4}-\d{2}-\d{2}')::timestamp INTO boundary
+    FROM pg_constraint
+    WHERE conrelid = 'activations_legacy'::regclass AND conname = 'activations_legacy_range';
+    EXECUTE format(
+        'ALTER TABLE activations ATTACH PARTITION activations_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+        boundary
+    );
+END $$;
+
+-- ==============================================
+-- 5. PARTITIONS DES 3 MOIS SUIVANTS
+-- ==============================================
+
+DO $$
+DECLARE
+    month_start TIMESTAMP;
+BEGIN
+    FOR i IN 1..3 LOOP
+        month_start := date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => i);
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF activations FOR VALUES FROM (%L) TO (%L)',
+            'activations_' || to_char(month_start, 'YYYY_MM'),
+            month_start,
+            month_start + interval '1 month'
+        );
+    END LOOP;
+END $$;
+
+-- Filet de sécurité: si le job "ensure" n'a pas tourné, les insertions n'échouent pas.
+-- Doit rester vide; une ligne ici bloque la création de la partition du mois correspondant.
+CREATE TABLE IF NOT EXISTS activations_default PARTITION OF activations DEFAULT;
+
+COMMIT;
+
+-- ==============================================
+-- 6. VÉRIFICATION
+-- ==============================================
+
+SELECT c.relname AS partition, pg_get_expr(c.relpartbound, c.oid) AS bounds
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'activations'::regclass
+ORDER BY c.relname;
+
+-- Planifier ensuite (cron mensuel):
+--   python -m app.jobs.archive_activations ensure --months-ahead 3
+--   python -m app.jobs.archive_activations archive
+-- "archive" traite aussi les mois de activations_legacy (archive par mois, suppression par
+-- lots) puis détache et supprime la table quand son dernier mois sort de la rétention.
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+-- Avant l'étape 4 (table pas encore partitionnée):
+ALTER TABLE activations DROP CONSTRAINT IF EXISTS activations_legacy_range;
+DROP INDEX CONCURRENTLY IF EXISTS ix_activations_legacy_id_checked_at;
+
+-- Après l'étape 4:
+BEGIN;
+ALTER SEQUENCE activations_id_seq OWNED BY NONE;
+CREATE TABLE activations_flat (LIKE activations INCLUDING DEFAULTS);
+INSERT INTO activations_flat SELECT * FROM activations;
+DROP TABLE activations;  -- Supprime aussi toutes les partitions
+ALTER TABLE activations_flat RENAME TO activations;
+ALTER TABLE activations ADD PRIMARY KEY (id);
+ALTER TABLE activations ADD CONSTRAINT activations_license_id_fkey
+    FOREIGN KEY (license_id) REFERENCES licenses(id);
+ALTER SEQUENCE activations_id_seq OWNED BY activations.id;
+CREATE INDEX ix_activations_license_id ON activations(license_id);
+CREATE INDEX ix_activations_machine_id ON activations(machine_id);
+CREATE INDEX ix_activations_checked_at ON activations(checked_at);
+COMMIT;
+*/
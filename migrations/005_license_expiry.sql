@@ -0,0 +1,47 @@
+-- Migration: État d'expiration matérialisé des licences
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: Ajoute licenses.expired_at (date de passage à inactive par le balayeur
+--              d'expiration) et un index partiel sur les licences actives à échéance.
+--              Le balayeur (intégré à l'API ou python -m app.jobs.sweep_expired) ne lit
+--              que cet index, qui ne contient que les licences encore à expirer.
+
+-- ==============================================
+-- 1. AJOUT DE COLONNE
+-- ==============================================
+
+ALTER TABLE licenses ADD COLUMN IF NOT EXISTS expired_at TIMESTAMP;
+
+-- ==============================================
+-- 2. INDEX PARTIEL (sans verrouiller les écritures)
+-- ==============================================
+
+-- CONCURRENTLY: ne peut pas s'exécuter dans une transaction
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_licenses_expiry_pending
+    ON licenses(expires_at)
+    WHERE is_active AND expires_at IS NOT NULL;
+
+-- ==============================================
+-- 3. RATTRAPAGE
+-- ==============================================
+
+-- Ne PAS faire un UPDATE global: lancer le balayage par lots
+--   python -m app.jobs.sweep_expired --batch-size 500
+
+-- ==============================================
+-- 4. VÉRIFICATION
+-- ==============================================
+
+SELECT
+    COUNT(*) FILTER (WHERE is_active AND expires_at <= now() AT TIME ZONE 'UTC') AS expired_pending,
+    COUNT(*) FILTER (WHERE expired_at IS NOT NULL) AS expired
+FROM licenses;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP INDEX CONCURRENTLY IF EXISTS ix_licenses_expiry_pending;
+ALTER TABLE licenses DROP COLUMN IF EXISTS expired_at;
+*/
@@ -0,0 +1,44 @@
+-- Migration: Compteurs de licences et de revenus maintenus en continu
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: Remplace les agrégats complets de 001 (COUNT(*) GROUP BY license_type,
+--              paiements Stripe, revenus par devise) par des compteurs incrémentés dans la
+--              même transaction que chaque changement de licence. Chaque compteur est réparti
+--              sur 8 lignes (shard) pour limiter la contention; sa valeur est leur somme.
+
+-- ==============================================
+-- 1. CRÉATION DE LA TABLE
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS license_counters (
+    name VARCHAR(64) NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    PRIMARY KEY (name, shard)
+);
+
+-- ==============================================
+-- 2. INITIALISATION
+-- ==============================================
+
+-- Après déploiement du code qui maintient les compteurs (sinon l'écart des licences
+-- créées entre-temps sera corrigé à la prochaine réconciliation):
+--   python -m app.jobs.reconcile_stats
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT name, SUM(value) AS value
+FROM license_counters
+GROUP BY name
+ORDER BY name;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP TABLE IF EXISTS license_counters;
+*/
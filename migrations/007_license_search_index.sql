@@ -0,0 +1,33 @@
+-- Migration: Index de pagination de la recherche admin
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: Index composite (created_at, id) pour la pagination par clé de
+--              GET /api/v1/admin/licenses (ORDER BY created_at DESC, id DESC) et son export:
+--              chaque page reprend une descente d'index au lieu d'un OFFSET.
+
+-- ==============================================
+-- 1. CRÉATION DE L'INDEX (sans verrouiller les écritures)
+-- ==============================================
+
+-- CONCURRENTLY: ne peut pas s'exécuter dans une transaction
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_licenses_created_at_id
+    ON licenses(created_at, id);
+
+-- ==============================================
+-- 2. VÉRIFICATION
+-- ==============================================
+
+EXPLAIN
+SELECT id, email, created_at
+FROM licenses
+WHERE (created_at, id) < (now(), 2147483647)
+ORDER BY created_at DESC, id DESC
+LIMIT 51;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP INDEX CONCURRENTLY IF EXISTS ix_licenses_created_at_id;
+*/
@@ -0,0 +1,65 @@
+-- Migration: Index composite de la timeline des activations
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: Index (license_id, checked_at DESC, id DESC) couvrant les colonnes affichées
+--              par GET /api/v1/admin/licenses/{id}/activations: les N dernières vérifications
+--              d'une licence se lisent dans l'ordre de l'index, sans tri ni accès à la table.
+-- Exécution: psql (utilise \gexec). Fonctionne que activations soit partitionnée (004) ou non.
+
+-- ==============================================
+-- 1. TABLE NON PARTITIONNÉE: INDEX CONCURRENT
+-- ==============================================
+
+SELECT 'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_activations_license_checked
+            ON activations (license_id, checked_at DESC, id DESC)
+            INCLUDE (machine_id, ip_address, is_valid, outcome, validation_message)'
+WHERE (SELECT relkind FROM pg_class WHERE oid = 'activations'::regclass) = 'r'
+\gexec
+
+-- ==============================================
+-- 2. TABLE PARTITIONNÉE: PARENT, PUIS CHAQUE PARTITION SANS VERROU, PUIS RATTACHEMENT
+-- ==============================================
+
+-- Index du parent seul (invalide tant que toutes les partitions ne sont pas rattachées).
+-- Les partitions créées ensuite (archive_activations ensure) en héritent automatiquement.
+SELECT 'CREATE INDEX IF NOT EXISTS ix_activations_license_checked
+            ON ONLY activations (license_id, checked_at DESC, id DESC)
+            INCLUDE (machine_id, ip_address, is_valid, outcome, validation_message)'
+WHERE (SELECT relkind FROM pg_class WHERE oid = 'activations'::regclass) = 'p'
+\gexec
+
+SELECT format(
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS %I ON %I (license_id, checked_at DESC, id DESC) '
+    'INCLUDE (machine_id, ip_address, is_valid, outcome, validation_message)',
+    c.relname || '_license_checked', c.relname
+)
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'activations'::regclass
+\gexec
+
+SELECT format('ALTER INDEX ix_activations_license_checked ATTACH PARTITION %I', c.relname || '_license_checked')
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'activations'::regclass
+  AND NOT EXISTS (
+      SELECT 1 FROM pg_inherits ii
+      WHERE ii.inhrelid = (c.relname || '_license_checked')::regclass
+  )
+\gexec
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT indexrelid::regclass AS index, indisvalid AS valid
+FROM pg_index
+WHERE indexrelid = 'ix_activations_license_checked'::regclass;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP INDEX IF EXISTS ix_activations_license_checked;  -- Supprime aussi les index des partitions
+*/
@@ -0,0 +1,66 @@
+-- Migration: Révocation en masse, audit et flux d'invalidations
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: revocation_audits trace chaque révocation en masse (API admin ou
+--              python -m app.jobs.revoke_licenses). license_invalidations publie l'empreinte
+--              SHA-256 de chaque clé révoquée; les workers la lisent par id croissant.
+
+-- ==============================================
+-- 1. CRÉATION DES TABLES
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS revocation_audits (
+    id SERIAL PRIMARY KEY,
+    actor VARCHAR(255) NOT NULL,
+    reason TEXT NOT NULL,
+    criteria TEXT NOT NULL,
+    dry_run BOOLEAN NOT NULL DEFAULT FALSE,
+    matched INTEGER NOT NULL DEFAULT 0,
+    revoked INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_revocation_audits_created_at ON revocation_audits(created_at);
+
+CREATE TABLE IF NOT EXISTS license_invalidations (
+    id SERIAL PRIMARY KEY,
+    license_id INTEGER NOT NULL REFERENCES licenses(id) ON DELETE CASCADE,
+    key_digest VARCHAR(64) NOT NULL,
+    reason TEXT,
+    audit_id INTEGER REFERENCES revocation_audits(id),
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC')
+);
+
+CREATE INDEX IF NOT EXISTS ix_license_invalidations_created_at ON license_invalidations(created_at);
+
+-- ==============================================
+-- 2. INDEX DE SÉLECTION (sans verrouiller les écritures)
+-- ==============================================
+
+-- Révocation par lot de codes: machines ayant utilisé un code du lot
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_activation_codes_batch_machine
+    ON activation_codes(batch_id, used_by_machine_id)
+    WHERE is_used;
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT id, actor, reason, matched, revoked, created_at, finished_at
+FROM revocation_audits
+ORDER BY id DESC
+LIMIT 10;
+
+-- Purge périodique du flux (les licences restent révoquées):
+--   python -m app.jobs.revoke_licenses prune-feed --days 30
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP INDEX CONCURRENTLY IF EXISTS ix_activation_codes_batch_machine;
+DROP TABLE IF EXISTS license_invalidations;
+DROP TABLE IF EXISTS revocation_audits;
+*/
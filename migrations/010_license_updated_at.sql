@@ -0,0 +1,53 @@
+-- Migration: Date de modification des licences et index du cache de révocation
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: licenses.updated_at (mise à jour par l'ORM, le balayeur d'expiration et la
+--              révocation en masse) permet aux workers de relire uniquement les licences
+--              modifiées. ix_licenses_blocked couvre le chargement initial du cache
+--              (licences révoquées ou désactivées hors expiration).
+
+-- ==============================================
+-- 1. COLONNE updated_at
+-- ==============================================
+
+ALTER TABLE licenses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+-- Valeur initiale: dernière modification connue
+UPDATE licenses
+SET updated_at = GREATEST(created_at, COALESCE(revoked_at, created_at), COALESCE(expired_at, created_at))
+WHERE updated_at IS NULL;
+
+ALTER TABLE licenses ALTER COLUMN updated_at SET DEFAULT (now() AT TIME ZONE 'UTC');
+ALTER TABLE licenses ALTER COLUMN updated_at SET NOT NULL;
+
+-- ==============================================
+-- 2. INDEX (sans verrouiller les écritures)
+-- ==============================================
+
+-- Relecture incrémentale: (updated_at, id) > marque haute
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_licenses_updated_at ON licenses(updated_at);
+
+-- Chargement initial: licences bloquées, petite fraction de la table
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_licenses_blocked
+    ON licenses(id)
+    WHERE is_revoked OR (NOT is_active AND expired_at IS NULL);
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT COUNT(*) AS blocked_licenses
+FROM licenses
+WHERE is_revoked OR (NOT is_active AND expired_at IS NULL);
+
+SELECT MAX(updated_at) AS high_water FROM licenses;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP INDEX CONCURRENTLY IF EXISTS ix_licenses_blocked;
+DROP INDEX CONCURRENTLY IF EXISTS ix_licenses_updated_at;
+ALTER TABLE licenses DROP COLUMN IF EXISTS updated_at;
+*/
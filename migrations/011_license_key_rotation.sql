@@ -0,0 +1,39 @@
+-- Migration: Rotation de LICENSE_SECRET_KEY
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: licenses.previous_license_key conserve la clé d'avant re-chiffrement
+--              (python -m app.jobs.rekey_licenses): le client présente encore l'ancienne clé,
+--              la validation la retrouve par cet index (lignes re-chiffrées uniquement).
+
+-- ==============================================
+-- 1. COLONNE previous_license_key
+-- ==============================================
+
+-- Colonne nullable sans valeur par défaut: ajout instantané, pas de réécriture de la table
+ALTER TABLE licenses ADD COLUMN IF NOT EXISTS previous_license_key TEXT;
+
+-- ==============================================
+-- 2. INDEX (sans verrouiller les écritures)
+-- ==============================================
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_licenses_previous_license_key
+    ON licenses(previous_license_key)
+    WHERE previous_license_key IS NOT NULL;
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT COUNT(*) AS total_licenses,
+       COUNT(previous_license_key) AS rekeyed_licenses
+FROM licenses;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+-- Après une rotation, les clés d'avant re-chiffrement ne seraient plus reconnues
+DROP INDEX CONCURRENTLY IF EXISTS ix_licenses_previous_license_key;
+ALTER TABLE licenses DROP COLUMN IF EXISTS previous_license_key;
+*/
@@ -0,0 +1,51 @@
+-- Migration: Licences multi-postes
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: licenses.max_seats (NULL = licence liée à son machine_id, comportement historique)
+--              et table seat_leases des postes actifs, partagée entre les workers qui décident
+--              en mémoire (app.services.seat_tracker).
+
+-- ==============================================
+-- 1. COLONNE max_seats
+-- ==============================================
+
+-- Nullable sans valeur par défaut: ajout instantané, pas de réécriture de la table
+ALTER TABLE licenses ADD COLUMN IF NOT EXISTS max_seats INTEGER;
+
+-- ==============================================
+-- 2. TABLE seat_leases
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS seat_leases (
+    license_id INTEGER NOT NULL REFERENCES licenses(id) ON DELETE CASCADE,
+    machine_id VARCHAR(64) NOT NULL,
+    first_seen TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    last_seen TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    PRIMARY KEY (license_id, machine_id)
+);
+
+-- Relecture incrémentale par les workers et purge des baux expirés
+CREATE INDEX IF NOT EXISTS ix_seat_leases_last_seen ON seat_leases(last_seen);
+
+-- Lignes mises à jour en continu: autovacuum plus fréquent que le défaut (20 %)
+ALTER TABLE seat_leases SET (autovacuum_vacuum_scale_factor = 0.05);
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT COUNT(*) FILTER (WHERE max_seats IS NOT NULL) AS seat_licenses
+FROM licenses;
+
+SELECT COUNT(*) AS active_seats
+FROM seat_leases
+WHERE last_seen > (now() AT TIME ZONE 'UTC') - INTERVAL '15 minutes';
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP TABLE IF EXISTS seat_leases;
+ALTER TABLE licenses DROP COLUMN IF EXISTS max_seats;
+*/
@@ -0,0 +1,74 @@
+-- Migration: Détection du partage de licences
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: esquisses HyperLogLog par clé et par tranche de fenêtre (machines, IP, réseaux
+--              distincts), fusionnées par les workers (app.services.sharing_detector), et
+--              alertes des clés trop dispersées (GET /admin/sharing-alerts).
+
+-- ==============================================
+-- 1. TABLE license_sharing_sketches
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS license_sharing_sketches (
+    key_digest VARCHAR(64) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    machines BYTEA NOT NULL,
+    ips BYTEA NOT NULL,
+    subnets BYTEA NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    PRIMARY KEY (key_digest, bucket_start)
+);
+
+-- Purge des tranches sorties de la fenêtre
+CREATE INDEX IF NOT EXISTS ix_license_sharing_sketches_bucket_start ON license_sharing_sketches(bucket_start);
+
+-- Lignes réécrites à chaque synchronisation: autovacuum plus fréquent que le défaut (20 %)
+ALTER TABLE license_sharing_sketches SET (autovacuum_vacuum_scale_factor = 0.05);
+
+-- ==============================================
+-- 2. TABLE license_sharing_alerts
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS license_sharing_alerts (
+    id SERIAL PRIMARY KEY,
+    license_id INTEGER REFERENCES licenses(id) ON DELETE CASCADE,
+    key_digest VARCHAR(64) NOT NULL,
+    distinct_machines INTEGER NOT NULL,
+    distinct_ips INTEGER NOT NULL,
+    distinct_subnets INTEGER NOT NULL,
+    reasons VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    acknowledged_at TIMESTAMP,
+    acknowledged_by VARCHAR(255)
+);
+
+CREATE INDEX IF NOT EXISTS ix_license_sharing_alerts_license_id ON license_sharing_alerts(license_id);
+CREATE INDEX IF NOT EXISTS ix_license_sharing_alerts_key_digest ON license_sharing_alerts(key_digest);
+CREATE INDEX IF NOT EXISTS ix_license_sharing_alerts_created_at ON license_sharing_alerts(created_at);
+
+-- Une alerte ouverte au plus par clé (mise à jour à chaque synchronisation)
+CREATE UNIQUE INDEX IF NOT EXISTS ix_license_sharing_alerts_open
+    ON license_sharing_alerts(key_digest)
+    WHERE acknowledged_at IS NULL;
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT COUNT(DISTINCT key_digest) AS tracked_keys,
+       pg_size_pretty(pg_total_relation_size('license_sharing_sketches')) AS sketches_size
+FROM license_sharing_sketches;
+
+SELECT COUNT(*) FILTER (WHERE acknowledged_at IS NULL) AS open_alerts,
+       COUNT(*) AS total_alerts
+FROM license_sharing_alerts;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP TABLE IF EXISTS license_sharing_alerts;
+DROP TABLE IF EXISTS license_sharing_sketches;
+*/
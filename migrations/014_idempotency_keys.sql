@@ -0,0 +1,43 @@
+-- Migration: Clés d'idempotence
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: table idempotency_keys des requêtes rejouables (en-tête Idempotency-Key sur
+--              POST /licenses/trial et POST /api/create-checkout-session): clé réservée avant
+--              l'exécution, réponse enregistrée puis renvoyée aux nouvelles tentatives
+--              (app.services.idempotency). Lignes purgées après IDEMPOTENCY_TTL_SECONDS.
+
+-- ==============================================
+-- 1. TABLE idempotency_keys
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key_digest VARCHAR(32) PRIMARY KEY,
+    request_hash VARCHAR(32) NOT NULL,
+    status_code INTEGER,
+    body BYTEA,
+    claimed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Purge des clés expirées (toutes les minutes par chaque worker)
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
+-- Insertions et suppressions continues: autovacuum plus fréquent que le défaut (20 %)
+ALTER TABLE idempotency_keys SET (autovacuum_vacuum_scale_factor = 0.05);
+
+-- ==============================================
+-- 2. VÉRIFICATION
+-- ==============================================
+
+SELECT COUNT(*) AS keys,
+       COUNT(*) FILTER (WHERE status_code IS NULL) AS in_progress,
+       pg_size_pretty(pg_total_relation_size('idempotency_keys')) AS size
+FROM idempotency_keys;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP TABLE IF EXISTS idempotency_keys;
+*/
@@ -0,0 +1,59 @@
+-- Migration: Index de résolution client du webhook Stripe
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: index des règles de app.services.customer_identity, qui remplacent le
+--              OR machine_id/email du webhook checkout.session.completed:
+--              - ix_licenses_email_lower: email sans tenir compte de la casse
+--              - ix_licenses_pending_link_email: index partiel des achats landing page
+--                pas encore liés à une machine (machine_id PENDING_LINK_...)
+--              Le prédicat de l'index partiel doit rester identique à PENDING_LINK_FILTER.
+
+-- ==============================================
+-- 1. CRÉATION DES INDEX (sans verrouiller les écritures)
+-- ==============================================
+
+-- CONCURRENTLY: ne peut pas s'exécuter dans une transaction
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_licenses_email_lower
+    ON licenses(lower(email), id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_licenses_pending_link_email
+    ON licenses(lower(email), id)
+    WHERE machine_id LIKE 'PENDING_LINK_%';
+
+-- Statistiques de l'expression lower(email) pour le planificateur
+ANALYZE licenses;
+
+-- ==============================================
+-- 2. VÉRIFICATION
+-- ==============================================
+
+-- Attendu: Index Only Scan sur ix_licenses_email_lower, pas de Seq Scan
+EXPLAIN
+SELECT id FROM licenses
+WHERE lower(email) = 'client@example.com'
+ORDER BY id
+LIMIT 1;
+
+-- Attendu: Index Only Scan sur ix_licenses_pending_link_email
+EXPLAIN
+SELECT id FROM licenses
+WHERE lower(email) = 'client@example.com' AND machine_id LIKE 'PENDING_LINK_%'
+ORDER BY id
+LIMIT 1;
+
+-- Emails en double à la casse près (la plus ancienne licence est retenue)
+SELECT lower(email) AS email, COUNT(*) AS licenses
+FROM licenses
+GROUP BY lower(email)
+HAVING COUNT(DISTINCT email) > 1
+ORDER BY licenses DESC
+LIMIT 20;
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP INDEX CONCURRENTLY IF EXISTS ix_licenses_pending_link_email;
+DROP INDEX CONCURRENTLY IF EXISTS ix_licenses_email_lower;
+*/
@@ -0,0 +1,58 @@
+-- Migration: Numéros de modification des baux de postes
+-- Date: 2026-10-19
+-- Version: 1.0
+-- Description: seat_leases.change_id, tiré d'une séquence à chaque publication d'un bail.
+--              Les workers relisent les baux publiés après le dernier numéro lu
+--              (app.services.seat_tracker) au lieu de comparer last_seen, horodaté par
+--              l'horloge de chaque worker.
+-- Prérequis: migrations/012_license_seats.sql. Table petite (baux de la fenêtre
+--            SEAT_WINDOW_SECONDS): la numérotation des lignes existantes est immédiate.
+
+-- ==============================================
+-- 1. SÉQUENCE ET COLONNE change_id
+-- ==============================================
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS seat_leases_change_id_seq;
+
+ALTER TABLE seat_leases ADD COLUMN IF NOT EXISTS change_id BIGINT;
+
+UPDATE seat_leases SET change_id = nextval('seat_leases_change_id_seq') WHERE change_id IS NULL;
+
+ALTER TABLE seat_leases
+    ALTER COLUMN change_id SET DEFAULT nextval('seat_leases_change_id_seq'),
+    ALTER COLUMN change_id SET NOT NULL;
+
+ALTER SEQUENCE seat_leases_change_id_seq OWNED BY seat_leases.change_id;
+
+COMMIT;
+
+-- ==============================================
+-- 2. INDEX DE RELECTURE
+-- ==============================================
+
+-- CONCURRENTLY: ne peut pas s'exécuter dans une transaction
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_seat_leases_change_id ON seat_leases(change_id);
+
+-- ==============================================
+-- 3. VÉRIFICATION
+-- ==============================================
+
+SELECT COUNT(*) AS leases, MAX(change_id) AS last_change
+FROM seat_leases;
+
+-- Attendu: Index Scan sur ix_seat_leases_change_id
+EXPLAIN SELECT license_id, machine_id, first_seen, last_seen, change_id
+FROM seat_leases
+WHERE change_id > (SELECT MAX(change_id) FROM seat_leases);
+
+-- ==============================================
+-- ROLLBACK (si besoin d'annuler la migration)
+-- ==============================================
+
+/*
+DROP INDEX CONCURRENTLY IF EXISTS ix_seat_leases_change_id;
+ALTER TABLE seat_leases DROP COLUMN IF EXISTS change_id;
+DROP SEQUENCE IF EXISTS seat_leases_change_id_seq;
+*/
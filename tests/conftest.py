@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Configuration commune des tests
+
+L'environnement (base SQLite temporaire, clé Fernet de test) est préparé
+avant tout import de `app.*`, comme pour les benchmarks
+(benchmarks.harness.configure_environment).
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import harness  # noqa: E402
+
+harness.configure_environment(harness.default_sqlite_url())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plans de requêtes (benchmarks.plans) sur une base générée par benchmarks.datagen
+
+Base SQLite dédiée, remplie puis expliquée dans des processus séparés
+(comme en usage réel: configure_environment avant l'import de app).
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chaque branche de l'union RESOLVE_WITH_PENDING_LINK a son index
+RESOLVE_CUSTOMER_INDEXES = {"ix_licenses_email_lower", "ix_licenses_pending_link_email", "ix_licenses_machine_id"}
+
+
+def run_module(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-m", *args], cwd=ROOT, env=dict(os.environ),
+                          capture_output=True, text=True)
+
+
+@pytest.fixture(scope="module")
+def plans(tmp_path_factory):
+    database_url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'bench.db'}"
+    run_module("benchmarks.datagen", "--database-url", database_url, "--licenses", "5000",
+               "--activations-per-license", "0", "--heartbeats-per-license", "0").check_returncode()
+    return run_module("benchmarks.plans", "--database-url", database_url, "--json")
+
+
+@pytest.fixture(scope="module")
+def results(plans):
+    return {result["name"]: result for result in json.loads(plans.stdout)}
+
+
+def test_every_endpoint_plan_passes(plans, results):
+    # Toutes les requêtes d'endpoint, problèmes connus compris: aucun ne régresse aujourd'hui sur SQLite
+    failures = {name: result["problems"] for name, result in results.items() if not result["ok"]}
+    assert not failures
+    assert plans.returncode == 0, plans.stderr
+
+
+def test_resolve_customer_uses_every_branch_index(results):
+    result = results["webhook.resolve_customer"]
+    assert RESOLVE_CUSTOMER_INDEXES <= set(result["indexes_used"]), result
+    assert not result["seq_scans"], result
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Postes des licences multi-postes (app.services.seat_tracker): admission,
+expiration en fenêtre glissante et arbitrage first_seen entre workers
+
+Horodatages simulés (now explicite): aucune attente réelle.
+"""
+
+from app.services.seat_tracker import Lease, LocalSeatStore, SeatTracker
+
+WINDOW = 60.0
+T0 = 1_000_000.0
+
+
+def test_acquire_admits_up_to_max_seats():
+    tracker = SeatTracker(LocalSeatStore(), window=WINDOW)
+    assert tracker.acquire(1, 2, "machine-a", now=T0) == (True, 1)
+    assert tracker.acquire(1, 2, "machine-b", now=T0 + 1) == (True, 2)
+    assert tracker.acquire(1, 2, "machine-c", now=T0 + 2) == (False, 2)
+    # Un poste déjà actif est toujours accepté
+    assert tracker.acquire(1, 2, "machine-a", now=T0 + 3).allowed
+    # Les licences sont indépendantes
+    assert tracker.acquire(2, 1, "machine-c", now=T0 + 3).allowed
+    assert tracker.seats_in_use(1, now=T0 + 3) == 2
+
+
+def test_expired_seat_frees_its_place():
+    tracker = SeatTracker(LocalSeatStore(), window=WINDOW)
+    tracker.acquire(1, 1, "machine-a", now=T0)
+    assert not tracker.acquire(1, 1, "machine-b", now=T0 + WINDOW - 1).allowed
+    assert tracker.acquire(1, 1, "machine-b", now=T0 + WINDOW + 1).allowed
+    assert tracker.seats_in_use(1, now=T0 + WINDOW + 1) == 1
+    # Renouvelé à chaque passage: machine-b reste dans la fenêtre
+    tracker.acquire(1, 1, "machine-b", now=T0 + 2 * WINDOW)
+    assert not tracker.acquire(1, 1, "machine-a", now=T0 + 2 * WINDOW + 1).allowed
+
+
+def test_sync_keeps_first_arrived_on_both_workers():
+    store = LocalSeatStore()
+    first, second = SeatTracker(store, window=WINDOW), SeatTracker(store, window=WINDOW)
+    first.acquire(1, 2, "machine-a", now=T0)
+    first.sync(now=T0 + 1)
+    second.sync(now=T0 + 1)
+
+    # Dernière place admise en même temps par les deux workers
+    assert second.acquire(1, 2, "machine-c", now=T0 + 3).allowed
+    assert first.acquire(1, 2, "machine-b", now=T0 + 2).allowed
+    for tracker in (first, second, first):
+        tracker.sync(now=T0 + 4)
+
+    # Même arbitrage partout: machine-b (first_seen plus ancien) garde la place
+    for tracker in (first, second):
+        assert tracker.seats_in_use(1, now=T0 + 5) == 2
+        assert tracker.acquire(1, 2, "machine-b", now=T0 + 5).allowed
+        assert not tracker.acquire(1, 2, "machine-c", now=T0 + 5).allowed
+
+
+def test_sync_keeps_earliest_first_seen():
+    store = LocalSeatStore()
+    store.publish([Lease(1, "machine-a", T0 + 10, T0 + 10)])
+    store.publish([Lease(1, "machine-a", T0, T0 + 5)])
+    tracker = SeatTracker(store, window=WINDOW)
+    tracker.sync(now=T0 + 11)
+    seats = tracker._licenses[1]
+    assert seats.first_seen["machine-a"] == T0
+    assert seats.machines["machine-a"] == T0 + 10
+
+
+def test_local_store_changes_after_and_purge():
+    store = LocalSeatStore()
+    store.publish([Lease(1, "machine-a", T0, T0), Lease(1, "machine-b", T0, T0)])
+    leases, position = store.changes_after(0)
+    assert {lease.machine_id for lease in leases} == {"machine-a", "machine-b"}
+    assert position == 2
+
+    # Seule la dernière publication d'un bail est relue
+    store.publish([Lease(1, "machine-a", T0, T0 + 30)])
+    leases, position = store.changes_after(2)
+    assert leases == [Lease(1, "machine-a", T0, T0 + 30)]
+    assert position == 3
+    assert store.changes_after(position) == ([], 3)
+
+    assert store.purge(T0 + 1) == 1
+    leases, _ = store.changes_after(0)
+    assert [lease.machine_id for lease in leases] == ["machine-a"]
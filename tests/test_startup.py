@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Démarrage d'un worker (benchmarks.startup): import sans effet de bord et
+première réponse dans le budget
+
+Budget par défaut: 3 s jusqu'à la première réponse, le temps mesuré avant
+le démarrage paresseux (~2,9 s sur SQLite); STARTUP_BUDGET_MS l'ajuste
+pour une machine plus lente.
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks.startup import measure_startup
+
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 3000))
+
+
+def test_import_has_no_side_effects(tmp_path):
+    """Importer main ne crée pas la base et ne charge ni Stripe ni le mailer"""
+    database = tmp_path / "untouched.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    output = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print(sorted({'stripe', 'app.utils.mailer'} & set(sys.modules)))"],
+        env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True, capture_output=True, text=True,
+    ).stdout
+    assert output.strip().splitlines()[-1] == "[]"
+    assert not database.exists()
+
+
+def test_first_response_within_budget(tmp_path):
+    report = measure_startup(runs=3, database_url=f"sqlite:///{tmp_path / 'startup.db'}")
+    assert report["ready_ms"] <= report["first_response_ms"] <= report["first_db_response_ms"]
+    assert report["first_response_ms"] < STARTUP_BUDGET_MS, report